@@ -7,7 +7,7 @@ from aiogram.types import Message
 import asyncio
 
 from app.config import ADMIN_IDS
-from app.db import (
+from app.db_async import (
     init_db,
     ban_user,
     unban_user,
@@ -55,7 +55,7 @@ async def cmd_ban(m: Message):
         return
 
     init_db()
-    ban_user(uid)
+    await ban_user(uid)
     await m.answer(f"✅ Banned: {uid}")
 
 @router.message(Command("givecoins"))
@@ -76,8 +76,8 @@ async def cmd_givecoins(m: Message):
         return
 
     init_db()
-    add_coins(uid, amount)
-    new_bal = get_coins(uid)
+    await add_coins(uid, amount)
+    new_bal = await get_coins(uid)
     await m.answer(f"✅ Added {amount} coins to {uid}. New balance: {new_bal}")
 
 
@@ -98,7 +98,7 @@ async def cmd_unban(m: Message):
         return
 
     init_db()
-    unban_user(uid)
+    await unban_user(uid)
     await m.answer(f"✅ Unbanned: {uid}")
 
 
@@ -112,7 +112,7 @@ async def cmd_sponsor(m: Message):
 
     init_db()
     if not raw:
-        cur = get_sponsor()
+        cur = await get_sponsor()
         await m.answer(
             "Current sponsor:\n" + (cur.get("text", "") or "") + "\n" + (cur.get("url", "") or "")
         )
@@ -127,7 +127,7 @@ async def cmd_sponsor(m: Message):
         await m.answer("Usage: /sponsor Text here | https://example.com")
         return
 
-    set_sponsor(text, url)
+    await set_sponsor(text, url)
     await m.answer("✅ Sponsor updated")
 
 
@@ -140,7 +140,7 @@ async def cmd_pool(m: Message):
 
     init_db()
     if len(parts) < 2:
-        cur = get_prize_pool()
+        cur = await get_prize_pool()
         await m.answer(
             "Usage: /pool +100 | /pool -50 | /pool 1000\n" f"Current pool: {cur}"
         )
@@ -150,10 +150,10 @@ async def cmd_pool(m: Message):
 
     try:
         if arg.startswith(("+", "-")):
-            new_val = add_prize_pool(int(arg))
+            new_val = await add_prize_pool(int(arg))
         else:
             new_val = max(0, int(arg))
-            set_prize_pool(new_val)
+            await set_prize_pool(new_val)
     except Exception:
         await m.answer("Bad number")
         return
@@ -171,7 +171,7 @@ async def cmd_chat(m: Message):
     init_db()
 
     if not raw:
-        cur = get_chat()
+        cur = await get_chat()
         await m.answer(
             "Current chat:\n" + (cur.get("title", "") or "") + "\n" + (cur.get("url", "") or "")
         )
@@ -186,7 +186,7 @@ async def cmd_chat(m: Message):
         await m.answer("Bad URL")
         return
 
-    set_chat(title or "Чатик", url)
+    await set_chat(title or "Чатик", url)
     await m.answer("✅ Chat link updated")
 
 
@@ -200,7 +200,7 @@ async def cmd_news(m: Message):
     init_db()
 
     if not raw:
-        cur = get_news()
+        cur = await get_news()
         await m.answer(
             "Current news:\n" + (cur.get("title", "") or "") + "\n" + (cur.get("url", "") or "")
         )
@@ -215,7 +215,7 @@ async def cmd_news(m: Message):
         await m.answer("Bad URL")
         return
 
-    set_news(title or "Новини", url)
+    await set_news(title or "Новини", url)
     await m.answer("✅ News link updated")
 
 
@@ -225,8 +225,8 @@ async def cmd_links(m: Message):
         return
 
     init_db()
-    chat = get_chat()
-    news = get_news()
+    chat = await get_chat()
+    news = await get_news()
     await m.answer(
         "🔗 Links\n\n"
         f"📰 {news.get('title','')}: {news.get('url','')}\n"
@@ -265,8 +265,8 @@ async def cmd_givecoins(m: Message):
         await m.answer("Usage: /givecoins [user_id] [amount]  OR reply: /givecoins [amount]")
         return
 
-    add_coins(target_id, amount)
-    await m.answer(f"✅ {target_id}: +{amount}🪙 (now {get_coins(target_id)}🪙)")
+    await add_coins(target_id, amount)
+    await m.answer(f"✅ {target_id}: +{amount}🪙 (now {await get_coins(target_id)}🪙)")
 
 
 @router.message(Command("broadcast"))
@@ -285,7 +285,7 @@ async def cmd_broadcast(m: Message):
         return
 
     init_db()
-    uids = list_all_user_ids()
+    uids = await list_all_user_ids()
     ok = 0
     fail = 0
 
@@ -317,44 +317,16 @@ async def cmd_stats(m: Message):
         return
 
     init_db()
-    from app.db import _con
-    import time
+    from app.db_async import get_admin_overview
 
-    con = _con()
-    try:
-        now = time.time()
-        day_ago = now - 86400
-        week_ago = now - 7 * 86400
-
-        total_users = con.execute("SELECT COUNT(*) FROM users").fetchone()[0]
-        # Recent active = users with any coins change or registered in last 7d
-        active_week = con.execute(
-            "SELECT COUNT(*) FROM users WHERE rowid > (SELECT MAX(rowid)-1000 FROM users)"
-        ).fetchone()[0]
-
-        total_coins = con.execute("SELECT SUM(coins) FROM users").fetchone()[0] or 0
-        vip_count = con.execute(
-            "SELECT COUNT(*) FROM users WHERE vip_until > ?", (now,)
-        ).fetchone()[0]
-
-        top5 = con.execute(
-            "SELECT first_name, username, coins FROM users ORDER BY coins DESC LIMIT 5"
-        ).fetchall()
-
-        top5_rating = con.execute(
-            "SELECT first_name, username, rating FROM users ORDER BY rating DESC LIMIT 5"
-        ).fetchall()
-
-        orders_total = 0
-        try:
-            orders_total = con.execute(
-                "SELECT COUNT(*) FROM orders WHERE status='PAID'"
-            ).fetchone()[0]
-        except Exception:
-            pass
-
-    finally:
-        con.close()
+    ov = await get_admin_overview()
+    total_users = ov["total_users"]
+    active_week = ov["active_week"]
+    total_coins = ov["total_coins"]
+    vip_count = ov["vip_count"]
+    top5 = ov["top5_coins"]
+    top5_rating = ov["top5_rating"]
+    orders_total = ov["orders_paid"]
 
     top5_txt = "\n".join(
         f"  {i+1}. {r['first_name'] or r['username'] or '?'}: {r['coins']}🪙"
@@ -377,13 +349,58 @@ async def cmd_stats(m: Message):
     )
     await m.answer(text, parse_mode="HTML")
 
+
+@router.message(Command("dbstats"))
+async def cmd_dbstats(m: Message):
+    if not m.from_user or not is_admin(m.from_user.id):
+        return
+
+    from app.db import pool_stats
+    from app import ai_pool, leaderboard_cache, loop_monitor, registry, user_snapshot
+
+    s = pool_stats()
+    lag = loop_monitor.stats()
+    lbs = leaderboard_cache.cache_stats()
+    ai = ai_pool.stats()
+    hist = ", ".join(f"{k}: {v}" for k, v in lag["hist"].items() if v)
+    regs = "\n".join(
+        f"{r['name']}: <b>{r['entries']}</b>/{r['max_size']}, ~{r['bytes'] / 1024:.0f} KB, "
+        f"витіснено {r['evicted_ttl']} (TTL) + {r['evicted_cap']} (ліміт)"
+        for r in registry.stats()
+    )
+    text = (
+        f"🗄 <b>DB pool</b>\n\n"
+        f"З'єднань: <b>{s['open']}/{s['size']}</b> (зайнято {s['in_use']}, вільно {s['idle']})\n"
+        f"Видач: <b>{s['acquires']}</b>\n"
+        f"Очікувань: <b>{s['waits']}</b> (сер. {s['wait_avg_ms']:.1f} мс, макс. {s['wait_max_ms']:.1f} мс)\n"
+        f"Таймаутів: <b>{s['timeouts']}</b>\n\n"
+        f"⏱ <b>Event loop lag</b>\n"
+        f"Останній: <b>{lag['last_ms']:.1f} мс</b>, сер. {lag['avg_ms']:.1f} мс, макс. {lag['max_ms']:.1f} мс\n"
+        f"{hist or '—'}\n\n"
+        f"👤 <b>User snapshot</b>\n"
+        f"Оновлень: {user_snapshot.stats['bound']}, завантажень: {user_snapshot.stats['loads']}, "
+        f"з кешу: {user_snapshot.stats['hits']}, скидань: {user_snapshot.stats['invalidations']}\n\n"
+        f"🏆 <b>Leaderboard cache</b>\n"
+        f"З пам'яті: <b>{lbs['hits']}</b>, з БД: {lbs['misses']} ({lbs['hit_rate'] * 100:.0f}%)\n"
+        f"Перебудов: {lbs['rebuilds']}, оновлень: {lbs['refreshes']} ({lbs['refreshed_users']} гравців)\n\n"
+        f"🤖 <b>AI pool</b>\n"
+        f"Процесів: <b>{ai['workers']}</b>, у черзі: {ai['pending']} (макс. {ai['max_pending']})\n"
+        f"Ходів: <b>{ai['requests']}</b> (у пулі {ai['completed']}, на loop {ai['inline']}), "
+        f"понижено {ai['degraded']}, таймаутів {ai['timeouts']}, скасовано {ai['cancelled']}, помилок {ai['errors']}, "
+        f"перезапусків пулу {ai['restarts']}\n"
+        f"Черга: сер. {ai['wait_avg_ms']:.1f} мс, макс. {ai['wait_max_ms']:.1f} мс; "
+        f"думання: сер. {ai['think_avg_ms']:.1f} мс, макс. {ai['think_max_ms']:.1f} мс\n\n"
+        f"🧠 <b>Реєстри в пам'яті</b>\n{regs or '—'}"
+    )
+    await m.answer(text, parse_mode="HTML")
+
 @router.message(Command("withdrawals"))
 async def cmd_withdrawals(m: Message):
     if not m.from_user or not is_admin(m.from_user.id):
         return
 
     init_db()
-    reqs = get_pending_withdrawals()
+    reqs = await get_pending_withdrawals()
     if not reqs:
         await m.answer("📭 Немає активних запитів на виведення.")
         return
@@ -415,12 +432,12 @@ async def cmd_approve_withdraw(m: Message):
         return
 
     init_db()
-    w = get_withdrawal(wid)
+    w = await get_withdrawal(wid)
     if not w:
         await m.answer("Запит не знайдено.")
         return
 
-    process_withdrawal(wid, "APPROVED")
+    await process_withdrawal(wid, "APPROVED")
     await m.answer(f"✅ Запит #{wid} позначено як ВИКОНАНИЙ. Не забудьте вручну відправити зірки користувачу {w['user_id']}!")
     
     try:
@@ -446,14 +463,14 @@ async def cmd_reject_withdraw(m: Message):
         return
 
     init_db()
-    w = get_withdrawal(wid)
+    w = await get_withdrawal(wid)
     if not w:
         await m.answer("Запит не знайдено.")
         return
 
     # Refund coins
-    add_coins(w['user_id'], w['coins'])
-    process_withdrawal(wid, "REJECTED", admin_note=reason)
+    await add_coins(w['user_id'], w['coins'])
+    await process_withdrawal(wid, "REJECTED", admin_note=reason)
     
     await m.answer(f"❌ Запит #{wid} ВІДХИЛЕНО. Кошти повернуто користувачу.")
     
@@ -3,7 +3,7 @@ from aiogram import Router
 from aiogram.filters import Command
 from aiogram.types import Message
 
-from app import db, config
+from app import db_async as db, config
 
 router = Router()
 
@@ -19,12 +19,12 @@ async def stats(msg: Message):
     if msg.from_user.id not in _admins():
         return await msg.answer("⛔ Доступ заборонено.")
 
-    today = db.db_revenue_summary(days=1)
-    week = db.db_revenue_summary(days=7)
-    month = db.db_revenue_summary(days=30)
+    today = await db.db_revenue_summary(days=1)
+    week = await db.db_revenue_summary(days=7)
+    month = await db.db_revenue_summary(days=30)
 
-    by_sku_7 = db.db_revenue_by_sku(days=7)
-    arena_7 = db.db_arena_revenue(days=7)
+    by_sku_7 = await db.db_revenue_by_sku(days=7)
+    arena_7 = await db.db_arena_revenue(days=7)
 
     text = (
         "📊 Доходи (PAID)\n\n"
@@ -0,0 +1,342 @@
+# app/ai_pool.py
+"""AI moves off the event loop.
+
+The checkers and chess AIs are CPU-bound: a "hard" move keeps one core busy
+for up to a second. Run inline, it freezes every update of the bot for that
+time (see app.loop_monitor). They run here on a ProcessPoolExecutor instead.
+A worker gets a serialised position and returns a serialised move:
+- checkers: packed cells (engine.pack_board) in, the packed board after the
+  AI's full turn out;
+- chess: the root FEN and the UCI move stack in (so repetition draws still
+  count), a UCI move out.
+
+- Levels: "easy" is a random move and always runs inline.
+- Fallback: whenever the pool can't answer, the move is an "easy" one,
+  computed inline. It costs microseconds, so the loop stays responsive in
+  exactly the cases (overload, a stuck worker) where CPU is short.
+- Queue depth: at most AI_POOL_MAX_PENDING requests wait for or run on the
+  pool. Past that a request gets the fallback move.
+- Timeouts: a request not answered in AI_POOL_TIMEOUT_SEC gets the fallback
+  move. A worker cuts a timed search to what is left of that deadline. A
+  job picked up too late to answer in time is skipped by its worker; its
+  caller (which waits WAIT_MARGIN_SEC past the deadline, so it sees the
+  skip) gets the fallback move too, counted as a timeout. A job
+  a worker already runs can't be cancelled; each worker publishes its
+  current job and start time in shared memory. If the job has run for
+  STUCK_SEC, past any level's think budget, the pool is replaced, or every
+  later request would queue behind it. Otherwise it ends within its budget.
+  Other requests caught on a replaced pool are resubmitted.
+- Cancellation: cancel(key) drops the request of a game (resign, new game,
+  game over). Its caller gets None and must not apply a move.
+- Without start() (scripts, tests) every request runs inline.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import count
+from multiprocessing import get_context
+from typing import Callable, Dict, Optional, Tuple
+
+import chess
+
+from app.config import AI_POOL_MAX_PENDING, AI_POOL_TIMEOUT_SEC, AI_POOL_WORKERS
+
+log = logging.getLogger("sm-arena")
+
+POOL_LEVELS = ("normal", "hard")
+FALLBACK_LEVEL = "easy"
+WORKER_NICE = 5  # below the bot process: the loop wins a contended core
+STUCK_SEC = 2.0  # a job running this long is past every level's think budget
+REPLY_MARGIN_SEC = 0.1  # a worker's search ends this long before its caller's deadline
+WAIT_MARGIN_SEC = 0.05  # the caller waits this long past the deadline, for the worker's answer or skip
+
+_stats = {
+    "requests": 0,
+    "pooled": 0,
+    "completed": 0,
+    "inline": 0,
+    "degraded": 0,
+    "timeouts": 0,
+    "cancelled": 0,
+    "errors": 0,
+    "restarts": 0,
+    "max_pending": 0,
+    "wait_total": 0.0,
+    "wait_max": 0.0,
+    "think_total": 0.0,
+    "think_max": 0.0,
+}
+_pool: ProcessPoolExecutor | None = None
+_workers = 0
+# shared arrays per worker slot: the job it runs now (0 = idle) and since when (wall clock)
+_running = None
+_running_since = None
+_job_ids = count(1)
+_CANCELLED = object()
+# game key -> (pool future, the awaiting caller's future)
+_pending: Dict[str, Tuple[Future, asyncio.Future]] = {}
+
+
+# ---- worker side ----
+_slot = -1
+
+
+class _Skipped(Exception):
+    """A job picked up too late to answer before its caller's deadline."""
+
+
+def _init_worker(running, running_since, next_slot) -> None:
+    global _running, _running_since, _slot
+    with next_slot.get_lock():
+        _slot = next_slot.value
+        next_slot.value += 1
+    _running, _running_since = running, running_since
+    try:
+        os.nice(WORKER_NICE)
+    except OSError:
+        pass
+    # import the engines (and build their tables) before the first request
+    from app.checkers_game import ai as _ck_ai  # noqa: F401
+    from app.chess_game import ai as _ch_ai  # noqa: F401
+
+
+def _capped(levels: dict, level: str, budget: Optional[float]):
+    """The level's search limits with the time budget cut to `budget` seconds, or the level itself."""
+    limits = levels.get(level)
+    if budget is None or limits is None or limits.time_sec is None or limits.time_sec <= budget:
+        return level
+    return limits._replace(time_sec=budget)
+
+
+def _checkers_think(level: str, cells: bytes, color: int, budget: Optional[float] = None) -> bytes:
+    from app.checkers_game.ai import LEVELS, choose_turn
+    from app.checkers_game.engine import pack_board, unpack_board
+
+    board, _ = choose_turn(unpack_board(cells), color, _capped(LEVELS, level, budget))
+    return pack_board(board)
+
+
+def _chess_think(level: str, root_fen: str, ucis: Tuple[str, ...], budget: Optional[float] = None) -> Optional[str]:
+    from app.chess_game.ai import LEVELS, choose_move
+
+    board = chess.Board(root_fen)
+    for uci in ucis:
+        board.push_uci(uci)
+    mv = choose_move(board, _capped(LEVELS, level, budget))
+    return mv.uci() if mv is not None else None
+
+
+def _job(fn: Callable, level: str, args: tuple, job_id: int, deadline: float) -> Tuple[object, float, float]:
+    """Runs in the worker: the result, when it started (wall clock) and the think time."""
+    started = time.time()
+    budget = deadline - started - REPLY_MARGIN_SEC
+    if budget <= 0:
+        raise _Skipped(job_id)
+    _running_since[_slot] = started
+    _running[_slot] = job_id
+    t0 = time.perf_counter()
+    try:
+        res = fn(level, *args, budget=budget)
+    finally:
+        _running[_slot] = 0
+    return res, started, time.perf_counter() - t0
+
+
+# ---- loop side ----
+def _inline(fn: Callable, level: str, args: tuple):
+    _stats["inline"] += 1
+    return fn(level, *args)
+
+
+def _resolve(waiter: asyncio.Future, cf: Future) -> None:
+    if waiter.done():
+        return
+    if cf.cancelled():
+        waiter.set_result(_CANCELLED)
+    elif cf.exception() is not None:
+        waiter.set_exception(cf.exception())
+    else:
+        waiter.set_result(cf.result())
+
+
+def _stuck(job_id: int) -> bool:
+    """True if a worker has been running this job for STUCK_SEC or more."""
+    for slot, running in enumerate(_running[:]):
+        if running == job_id:
+            return time.time() - _running_since[slot] >= STUCK_SEC
+    return False
+
+
+def _restart_pool(pool: ProcessPoolExecutor) -> None:
+    """Replace a stuck or broken pool; its workers are killed, its jobs fail with BrokenProcessPool."""
+    global _pool
+    if _pool is not pool:
+        return  # another request already replaced it
+    _pool = None
+    _stats["restarts"] += 1
+    # shutdown() never stops a running job; ProcessPoolExecutor has no public handle on its workers
+    for proc in list((getattr(pool, "_processes", None) or {}).values()):
+        proc.terminate()
+    pool.shutdown(wait=False)
+    start(_workers)
+
+
+async def _run(key: str, level: str, fn: Callable, args: tuple):
+    _stats["requests"] += 1
+    level = (level or "easy").lower()
+    if level not in POOL_LEVELS or _pool is None:
+        return _inline(fn, level, args)
+    if len(_pending) >= AI_POOL_MAX_PENDING:
+        _stats["degraded"] += 1
+        return _inline(fn, FALLBACK_LEVEL, args)
+
+    cancel(key)  # a newer request for the same game replaces the old one
+    loop = asyncio.get_running_loop()
+    for _attempt in range(2):  # the second one only after the pool was replaced under the first
+        pool = _pool
+        if pool is None:
+            break
+        waiter = loop.create_future()
+        submitted = time.time()
+        job_id = next(_job_ids)
+        try:
+            cf = pool.submit(_job, fn, level, args, job_id, submitted + AI_POOL_TIMEOUT_SEC)
+        except (BrokenProcessPool, RuntimeError):
+            log.exception("AI pool is down; restarting it")
+            _stats["errors"] += 1
+            _restart_pool(pool)
+            continue
+        cf.add_done_callback(lambda f, w=waiter: loop.is_closed() or loop.call_soon_threadsafe(_resolve, w, f))
+        entry = (cf, waiter)
+        _pending[key] = entry
+        _stats["pooled"] += 1
+        _stats["max_pending"] = max(_stats["max_pending"], len(_pending))
+        try:
+            res = await asyncio.wait_for(waiter, AI_POOL_TIMEOUT_SEC + WAIT_MARGIN_SEC)
+        except asyncio.TimeoutError:
+            _stats["timeouts"] += 1
+            cf.cancel()
+            if _stuck(job_id):
+                log.warning("AI %s move for %s timed out after %.1fs; restarting the pool",
+                            level, key, AI_POOL_TIMEOUT_SEC)
+                _restart_pool(pool)
+            else:  # queued (the worker skips it) or started late (it ends within its budget)
+                log.warning("AI %s move for %s timed out after %.1fs in the queue", level, key, AI_POOL_TIMEOUT_SEC)
+            break
+        except _Skipped:
+            _stats["timeouts"] += 1
+            log.warning("AI %s move for %s waited in the queue past its %.1fs deadline",
+                        level, key, AI_POOL_TIMEOUT_SEC)
+            break
+        except BrokenProcessPool:
+            if pool is not _pool:
+                continue  # killed by another request's restart: resubmit
+            log.exception("AI pool worker died; restarting the pool")
+            _stats["errors"] += 1
+            _restart_pool(pool)
+            break
+        except Exception:
+            log.exception("AI %s move for %s failed in the pool", level, key)
+            _stats["errors"] += 1
+            break
+        finally:
+            if _pending.get(key) is entry:
+                del _pending[key]
+
+        if res is _CANCELLED:
+            return _CANCELLED
+        value, started, think = res
+        _stats["completed"] += 1
+        wait = max(0.0, started - submitted)
+        _stats["wait_total"] += wait
+        _stats["wait_max"] = max(_stats["wait_max"], wait)
+        _stats["think_total"] += think
+        _stats["think_max"] = max(_stats["think_max"], think)
+        return value
+    return _inline(fn, FALLBACK_LEVEL, args)
+
+
+async def checkers_turn(board, color: int, level: str, key: str):
+    """The board after the AI's full turn (unchanged if it has no move), or None if cancelled."""
+    from app.checkers_game.engine import pack_board, unpack_board
+
+    cells = await _run(key, level, _checkers_think, (pack_board(board), color))
+    if cells is _CANCELLED:
+        return None
+    return unpack_board(cells)
+
+
+async def chess_move(board: chess.Board, level: str, key: str) -> Optional[chess.Move]:
+    """The AI's move for the side to move, or None if it has none or the request was cancelled."""
+    args = (board.root().fen(), tuple(mv.uci() for mv in board.move_stack))
+    uci = await _run(key, level, _chess_think, args)
+    if uci is _CANCELLED or uci is None:
+        return None
+    return chess.Move.from_uci(uci)
+
+
+def cancel(key: str) -> bool:
+    """Drop the pending AI request of a game; its caller gets None. True if there was one."""
+    entry = _pending.pop(key, None)
+    if entry is None:
+        return False
+    cf, waiter = entry
+    cf.cancel()  # a no-op once a worker has picked it up; the result is then ignored
+    if not waiter.done():
+        waiter.set_result(_CANCELLED)
+    _stats["cancelled"] += 1
+    return True
+
+
+def start(workers: int = AI_POOL_WORKERS) -> ProcessPoolExecutor | None:
+    """Start the worker processes; workers <= 0 keeps every request inline."""
+    global _pool, _workers, _running, _running_since
+    _workers = workers
+    if _pool is None and workers > 0:
+        ctx = get_context("spawn")
+        _running = ctx.Array("q", workers, lock=False)
+        _running_since = ctx.Array("d", workers, lock=False)
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker,
+                                    initargs=(_running, _running_since, ctx.Value("i", 0)))
+    return _pool
+
+
+def stop() -> None:
+    global _pool
+    for key in list(_pending):
+        cancel(key)
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def stats() -> dict:
+    n = _stats["completed"]
+    return {
+        "workers": _workers if _pool is not None else 0,
+        "pending": len(_pending),
+        "requests": _stats["requests"],
+        "pooled": _stats["pooled"],
+        "completed": n,
+        "inline": _stats["inline"],
+        "degraded": _stats["degraded"],
+        "timeouts": _stats["timeouts"],
+        "cancelled": _stats["cancelled"],
+        "errors": _stats["errors"],
+        "restarts": _stats["restarts"],
+        "max_pending": _stats["max_pending"],
+        "wait_avg_ms": _stats["wait_total"] / n * 1000 if n else 0.0,
+        "wait_max_ms": _stats["wait_max"] * 1000,
+        "think_avg_ms": _stats["think_total"] / n * 1000 if n else 0.0,
+        "think_max_ms": _stats["think_max"] * 1000,
+    }
+
+
+def reset() -> None:
+    _stats.update(requests=0, pooled=0, completed=0, inline=0, degraded=0, timeouts=0, cancelled=0, errors=0,
+                  restarts=0, max_pending=0, wait_total=0.0, wait_max=0.0, think_total=0.0, think_max=0.0)
@@ -5,16 +5,22 @@ Entry: player pays ARENA_ENTRY_FEE coins.
 Play:  matched against random opponents (XO or Checkers).
 End:   after 3 losses OR 10 wins, reward is issued based on win count.
 
-This module holds in-memory sessions. Sessions survive until completed or bot restarts.
+This module holds in-memory sessions; app.live_state snapshots them, so a run
+(and its entry fee) survives a bot restart until the reward is claimed.
 """
 
 from __future__ import annotations
 
+import json
 import time
 import uuid
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field
 from typing import Optional
 
+from app import live_state
+from app.config import ARENA_IDLE_TTL_SEC
+from app.registry import BoundedRegistry
+
 # ---------------------------------------------------------------------------
 # Config
 # ---------------------------------------------------------------------------
@@ -82,9 +88,13 @@ class ArenaSession:
 
 
 # ---------------------------------------------------------------------------
-# In-memory registry (reset on bot restart, acceptable for persistence-lite)
+# In-memory registry (snapshotted by app.live_state, restored on start);
+# runs nobody touched for ARENA_IDLE_TTL_SEC are dropped
 # ---------------------------------------------------------------------------
-_SESSIONS: dict[int, ArenaSession] = {}   # user_id → active session
+_SESSIONS: BoundedRegistry = BoundedRegistry(   # user_id → active session
+    "arena", ARENA_IDLE_TTL_SEC, 100_000,
+    on_evict=lambda user_id, _s: live_state.touch("arena", user_id),
+)
 
 
 def get_session(user_id: int) -> Optional[ArenaSession]:
@@ -98,17 +108,20 @@ def start_session(user_id: int, game: str = "xo") -> ArenaSession:
     sid = str(uuid.uuid4())[:8]
     s = ArenaSession(session_id=sid, user_id=user_id, game=game)
     _SESSIONS[user_id] = s
+    live_state.touch("arena", user_id)
     return s
 
 
 def end_session(user_id: int) -> None:
     _SESSIONS.pop(user_id, None)
+    live_state.touch("arena", user_id)
 
 
 def report_win(user_id: int) -> Optional[ArenaSession]:
     s = _SESSIONS.get(user_id)
     if s and not s.finished:
         s.record_win()
+        live_state.touch("arena", user_id)
     return s
 
 
@@ -116,4 +129,17 @@ def report_loss(user_id: int) -> Optional[ArenaSession]:
     s = _SESSIONS.get(user_id)
     if s and not s.finished:
         s.record_loss()
+        live_state.touch("arena", user_id)
     return s
+
+
+# Finished runs are kept until end_session(): the reward is still unclaimed.
+def _restore(key: str, state: str, bot=None) -> None:
+    _SESSIONS[int(key)] = ArenaSession(**json.loads(state))
+
+
+live_state.register(
+    "arena", lambda key: _SESSIONS.get(int(key)),
+    lambda s: json.dumps(asdict(s), separators=(",", ":"), ensure_ascii=False),
+    _restore,
+)
@@ -1,109 +1,39 @@
 from __future__ import annotations
 
 import random
-from typing import List, Tuple
+from typing import List, Union
 
-from .engine import (
-    RED, BLUE, piece_color, is_king,
-    legal_moves, apply_step, maybe_promote,
-    count_pieces, has_any_moves
-)
+from app.config import CK_AI_HARD_MAX_DEPTH, CK_AI_HARD_SEC, CK_AI_NORMAL_DEPTH
 
-def _eval(board, perspective: int) -> int:
-    score = 0
-    for r in range(8):
-        for c in range(8):
-            v = board[r][c]
-            if v == 0:
-                continue
-            val = 3 if abs(v) == 2 else 1
-            score += val if piece_color(v) == perspective else -val
-    return score
+from . import bitboard as bb
+from . import knowledge
+from .search import SearchLimits, search
 
-def _gen_turn_end_states(board, color: int, forced_from=None) -> List:
-    # returns list of boards after full turn (including multi-capture)
-    res = []
-    moves_map = legal_moves(board, color, forced_from=forced_from)
-    for fr, steps in moves_map.items():
-        for step in steps:
-            b2 = apply_step(board, step)
-            if step.captured:
-                cont = legal_moves(b2, color, forced_from=step.to)
-                if cont:
-                    res.extend(_gen_turn_end_states(b2, color, forced_from=step.to))
-                else:
-                    res.append(maybe_promote(b2, step.to))
-            else:
-                res.append(maybe_promote(b2, step.to))
-    return res
+# difficulty = search limits: "normal" by depth, "hard" by time (up to a depth cap)
+LEVELS = {
+    "normal": SearchLimits(depth=CK_AI_NORMAL_DEPTH),
+    "hard": SearchLimits(depth=CK_AI_HARD_MAX_DEPTH, time_sec=CK_AI_HARD_SEC),
+}
 
-def _terminal(board, turn: int) -> int | None:
-    # returns winner color if terminal else None
-    if count_pieces(board, turn) == 0 or not has_any_moves(board, turn):
-        return -turn
-    return None
 
-def _minimax(board, turn: int, depth: int, alpha: int, beta: int, perspective: int) -> int:
-    winner = _terminal(board, turn)
-    if winner is not None:
-        # big score for win/loss
-        return 10_000 if winner == perspective else -10_000
-    if depth <= 0:
-        return _eval(board, perspective)
-
-    maximizing = (turn == perspective)
-    if maximizing:
-        best = -10**9
-        for b2 in _gen_turn_end_states(board, turn):
-            val = _minimax(b2, -turn, depth - 1, alpha, beta, perspective)
-            if val > best:
-                best = val
-            if best > alpha:
-                alpha = best
-            if beta <= alpha:
-                break
-        return best
-    else:
-        best = 10**9
-        for b2 in _gen_turn_end_states(board, turn):
-            val = _minimax(b2, -turn, depth - 1, alpha, beta, perspective)
-            if val < best:
-                best = val
-            if best < beta:
-                beta = best
-            if beta <= alpha:
-                break
-        return best
-
-def choose_turn(board, color: int, level: str = "easy"):
+def choose_turn(board: List[List[int]], color: int, level: Union[str, SearchLimits] = "easy"):
     """
     Returns a board after AI full turn (including capture chains) and next turn color.
+    level is "easy" (random turn), a LEVELS name or explicit SearchLimits.
+    The search levels play from the opening book and the endgame table first (knowledge.py).
     """
-    states = _gen_turn_end_states(board, color)
-    if not states:
-        return board, -color  # no moves, caller will treat as lose
-
+    side = bb.sides(bb.from_board(board), color)
     if level == "easy":
-        b2 = random.choice(states)
-        return b2, -color
-
-    # normal: best 1-ply
-    if level == "normal":
-        best = None
-        best_val = -10**9
-        for b2 in states:
-            v = _eval(b2, color)
-            if v > best_val:
-                best_val = v
-                best = b2
-        return best, -color
-
-    # hard: minimax depth 2 (AI + opponent)
-    best = None
-    best_val = -10**9
-    for b2 in states:
-        v = _minimax(b2, -color, depth=2, alpha=-10**9, beta=10**9, perspective=color)
-        if v > best_val:
-            best_val = v
-            best = b2
-    return best, -color
+        turns = bb.side_turns(*side, color, bb.side_steps(*side, color), [])
+        if not turns:
+            return board, -color  # no moves, caller will treat as lose
+        after = random.choice(turns)[3]
+    else:
+        after = knowledge.book_turn(side, color) or knowledge.egtb_turn(side, color)
+        if after is None:
+            limits = level if isinstance(level, SearchLimits) else LEVELS.get(level, LEVELS["hard"])
+            after = search(side, color, limits).side
+        if after is None:
+            return board, -color
+    men, kings, emen, ekings = after
+    return bb.to_board(bb.join(color, men, kings, emen, ekings)), -color
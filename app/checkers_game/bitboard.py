@@ -0,0 +1,405 @@
+"""Bitboard move generation over the 32 dark squares.
+
+Square s is the s-th dark square in row-major order (engine.DARK_SQUARES),
+four per row: row r holds squares 4r..4r+3. A position is four 32-bit ints:
+red men, red kings, blue men, blue kings. The rules are those of engine.py:
+
+- men move one square forward and capture over an adjacent enemy in any
+  direction;
+- kings fly: they slide any distance and capture one enemy anywhere along a
+  diagonal, landing on any empty square beyond it;
+- a capture is compulsory; a chain continues with the same piece, and the
+  captured pieces leave the board after each step;
+- a man reaching the far row is crowned when its turn ends, not mid-chain.
+
+The step and jump tables are precomputed per square. "Does any man capture"
+and the men's quiet moves are answered with whole-board shifts. engine.py
+keeps the 8x8 list API on top of this module.
+"""
+from __future__ import annotations
+
+import random
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+SIZE = 8
+RED = 1
+BLUE = -1
+
+SQ_RC: Tuple[Tuple[int, int], ...] = tuple((r, c) for r in range(SIZE) for c in range(SIZE) if (r + c) % 2 == 1)
+RC_SQ = {rc: s for s, rc in enumerate(SQ_RC)}
+BIT: Tuple[int, ...] = tuple(1 << s for s in range(32))
+FULL = (1 << 32) - 1
+
+DIRS = ((-1, -1), (-1, 1), (1, -1), (1, 1))  # same order as engine.DIRS
+FORWARD = {RED: (0, 1), BLUE: (2, 3)}         # indices into DIRS
+PROMOTION_ROW = {RED: 0b1111, BLUE: 0b1111 << 28}
+
+
+def _ray(s: int, d: int) -> Tuple[int, ...]:
+    (r, c), (dr, dc) = SQ_RC[s], DIRS[d]
+    out = []
+    r, c = r + dr, c + dc
+    while 0 <= r < SIZE and 0 <= c < SIZE:
+        out.append(RC_SQ[(r, c)])
+        r, c = r + dr, c + dc
+    return tuple(out)
+
+
+# RAYS[s][d]: squares along direction d from s, nearest first
+RAYS: Tuple[Tuple[Tuple[int, ...], ...], ...] = tuple(tuple(_ray(s, d) for d in range(4)) for s in range(32))
+# JUMPS[s]: (over, land) per direction where both squares exist
+JUMPS: Tuple[Tuple[Tuple[int, int], ...], ...] = tuple(
+    tuple((ray[0], ray[1]) for ray in RAYS[s] if len(ray) >= 2) for s in range(32)
+)
+# STEPS[color][s]: a man's forward destinations
+STEPS = {
+    color: tuple(tuple(RAYS[s][d][0] for d in dirs if RAYS[s][d]) for s in range(32))
+    for color, dirs in FORWARD.items()
+}
+
+
+def _shift_table(d: int) -> Tuple[Tuple[int, int], ...]:
+    """(source mask, delta) pairs moving every square one step along d."""
+    by_delta: dict = {}
+    for s in range(32):
+        if RAYS[s][d]:
+            delta = RAYS[s][d][0] - s
+            by_delta[delta] = by_delta.get(delta, 0) | BIT[s]
+    return tuple((mask, delta) for delta, mask in by_delta.items())
+
+
+SHIFTS = tuple(_shift_table(d) for d in range(4))
+
+
+def shift(x: int, d: int) -> int:
+    """Every square of x moved one step along DIRS[d]; squares that would leave the board drop out."""
+    out = 0
+    for mask, delta in SHIFTS[d]:
+        out |= ((x & mask) << delta) if delta > 0 else ((x & mask) >> -delta)
+    return out
+
+
+class Position(NamedTuple):
+    red_men: int
+    red_kings: int
+    blue_men: int
+    blue_kings: int
+
+
+# (from, to, captured squares); captured is () for a quiet move
+Step = Tuple[int, int, Tuple[int, ...]]
+
+INITIAL = Position(0xFFF << 20, 0, 0xFFF, 0)
+
+
+def sides(pos: Position, color: int) -> Tuple[int, int, int, int]:
+    """(own men, own kings, enemy men, enemy kings)."""
+    rm, rk, bm, bk = pos
+    return (rm, rk, bm, bk) if color == RED else (bm, bk, rm, rk)
+
+
+def join(color: int, men: int, kings: int, emen: int, ekings: int) -> Position:
+    return Position(men, kings, emen, ekings) if color == RED else Position(emen, ekings, men, kings)
+
+
+def count(pos: Position, color: int) -> int:
+    men, kings, _em, _ek = sides(pos, color)
+    return (men | kings).bit_count()
+
+
+def _bits(x: int) -> Iterator[int]:
+    while x:
+        low = x & -x
+        yield low.bit_length() - 1
+        x ^= low
+
+
+# ---- move generation ----
+def piece_captures(s: int, king: bool, own: int, enemy: int, empty: int) -> List[Step]:
+    res: List[Step] = []
+    if not king:
+        for over, land in JUMPS[s]:
+            if enemy & BIT[over] and empty & BIT[land]:
+                res.append((s, land, (over,)))
+        return res
+    for ray in RAYS[s]:
+        victim = -1
+        for q in ray:
+            b = BIT[q]
+            if empty & b:
+                if victim >= 0:
+                    res.append((s, q, (victim,)))
+                continue
+            if own & b or victim >= 0:
+                break
+            victim = q
+    return res
+
+
+def piece_quiet(s: int, king: bool, color: int, empty: int) -> List[Step]:
+    if not king:
+        return [(s, q, ()) for q in STEPS[color][s] if empty & BIT[q]]
+    res: List[Step] = []
+    for ray in RAYS[s]:
+        for q in ray:
+            if not empty & BIT[q]:
+                break
+            res.append((s, q, ()))
+    return res
+
+
+# SHIFTS unrolled for the hot path: (mask, <<, >>) for both deltas of a direction
+_SHIFT_PAIRS = tuple(
+    tuple(v for mask, delta in SHIFTS[d] for v in (mask, max(delta, 0), max(-delta, 0))) for d in range(4)
+)
+
+
+def _men_can_capture(men: int, enemy: int, empty: int) -> bool:
+    for ma, la, ra, mb, lb, rb in _SHIFT_PAIRS:
+        x = (((men & ma) << la >> ra) | ((men & mb) << lb >> rb)) & enemy
+        if x and (((x & ma) << la >> ra) | ((x & mb) << lb >> rb)) & empty:
+            return True
+    return False
+
+
+# ---- side-relative core ----
+# A side is (men, kings, enemy men, enemy kings) from the mover's point of
+# view; the search and perft stay in this form and swap the halves between
+# turns. Position-based wrappers follow below.
+Side = Tuple[int, int, int, int]
+
+
+def side_steps(men: int, kings: int, emen: int, ekings: int, color: int,
+               forced_from: Optional[int] = None) -> List[Step]:
+    """Legal steps; captures only when one exists.
+
+    With forced_from, only that piece's captures (a chain in progress).
+    """
+    own, enemy = men | kings, emen | ekings
+    empty = FULL & ~(own | enemy)
+    if forced_from is not None:
+        if not own & BIT[forced_from]:
+            return []
+        return piece_captures(forced_from, bool(kings & BIT[forced_from]), own, enemy, empty)
+
+    res: List[Step] = []
+    men_capture = _men_can_capture(men, enemy, empty)
+    if kings or men_capture:
+        x = own if men_capture else kings
+        while x:
+            low = x & -x
+            x ^= low
+            sq = low.bit_length() - 1
+            if kings & low:
+                res.extend(piece_captures(sq, True, own, enemy, empty))
+                continue
+            for over, land in JUMPS[sq]:
+                if enemy & BIT[over] and empty & BIT[land]:
+                    res.append((sq, land, (over,)))
+        if res:
+            return res
+    # men's quiet moves, a whole direction at a time
+    for d in FORWARD[color]:
+        for mask, delta in SHIFTS[d]:
+            x = ((men & mask) << delta if delta > 0 else (men & mask) >> -delta) & empty
+            while x:
+                low = x & -x
+                x ^= low
+                to = low.bit_length() - 1
+                res.append((to - delta, to, ()))
+    x = kings
+    while x:
+        low = x & -x
+        x ^= low
+        res.extend(piece_quiet(low.bit_length() - 1, True, color, empty))
+    return res
+
+
+def side_status(men: int, kings: int, emen: int, ekings: int, color: int) -> int:
+    """0: no legal move, 1: quiet moves only, 2: a capture is pending. No move lists are built."""
+    own, enemy = men | kings, emen | ekings
+    empty = FULL & ~(own | enemy)
+    if _men_can_capture(men, enemy, empty):
+        return 2
+    x = kings
+    while x:
+        low = x & -x
+        x ^= low
+        if piece_captures(low.bit_length() - 1, True, own, enemy, empty):
+            return 2
+    for d in FORWARD[color]:
+        if shift(men, d) & empty:
+            return 1
+    for d in range(4):
+        if shift(kings, d) & empty:
+            return 1
+    return 0
+
+
+# a complete turn: (from, final square, captured squares mask, side after the turn)
+Turn = Tuple[int, int, int, Side]
+
+
+def side_turns(men: int, kings: int, emen: int, ekings: int, color: int,
+               steps: List[Step], out: List[Turn], start: int = -1, taken: int = 0) -> List[Turn]:
+    """Append every complete turn starting with `steps` to out.
+
+    Capture chains are followed to the end, then the man is crowned.
+    """
+    crown_row = PROMOTION_ROW[color]
+    for fr, to, captured in steps:
+        move = BIT[fr] | BIT[to]
+        if men & BIT[fr]:
+            m2, k2 = men ^ move, kings
+        else:
+            m2, k2 = men, kings ^ move
+        e2, ek2 = emen, ekings
+        t2 = taken
+        for q in captured:
+            e2 &= ~BIT[q]
+            ek2 &= ~BIT[q]
+            t2 |= BIT[q]
+        origin = fr if start < 0 else start
+        if captured:
+            more = side_steps(m2, k2, e2, ek2, color, to)
+            if more:
+                side_turns(m2, k2, e2, ek2, color, more, out, origin, t2)
+                continue
+        crown = BIT[to] & m2 & crown_row
+        if crown:
+            m2, k2 = m2 ^ crown, k2 | crown
+        out.append((origin, to, t2, (m2, k2, e2, ek2)))
+    return out
+
+
+def _perft(men: int, kings: int, emen: int, ekings: int, color: int, depth: int) -> int:
+    out = side_turns(men, kings, emen, ekings, color, side_steps(men, kings, emen, ekings, color), [])
+    if depth == 1:
+        return len(out)
+    return sum(_perft(e2, ek2, m2, k2, -color, depth - 1) for _fr, _to, _taken, (m2, k2, e2, ek2) in out)
+
+
+# ---- Position API ----
+def any_capture(pos: Position, color: int) -> bool:
+    men, kings, emen, ekings = sides(pos, color)
+    own, enemy = men | kings, emen | ekings
+    empty = FULL & ~(own | enemy)
+    if _men_can_capture(men, enemy, empty):
+        return True
+    return any(piece_captures(s, True, own, enemy, empty) for s in _bits(kings))
+
+
+def steps(pos: Position, color: int, forced_from: Optional[int] = None) -> List[Step]:
+    return side_steps(*sides(pos, color), color, forced_from)
+
+
+def has_moves(pos: Position, color: int) -> bool:
+    return side_status(*sides(pos, color), color) > 0
+
+
+def apply(pos: Position, color: int, step: Step) -> Position:
+    """One step, captured pieces removed; no promotion (see promote)."""
+    fr, to, captured = step
+    men, kings, emen, ekings = sides(pos, color)
+    move = BIT[fr] | BIT[to]
+    if men & BIT[fr]:
+        men ^= move
+    else:
+        kings ^= move
+    for q in captured:
+        emen &= ~BIT[q]
+        ekings &= ~BIT[q]
+    return join(color, men, kings, emen, ekings)
+
+
+def promote(pos: Position, color: int, sq: int) -> Position:
+    """Crown the man on sq if it stands on its promotion row."""
+    men, kings, emen, ekings = sides(pos, color)
+    b = BIT[sq] & men & PROMOTION_ROW[color]
+    if not b:
+        return pos
+    return join(color, men ^ b, kings | b, emen, ekings)
+
+
+def turn_results(pos: Position, color: int, forced_from: Optional[int] = None) -> List[Position]:
+    """Positions after every complete turn: capture chains followed to the end, then promotion."""
+    side = sides(pos, color)
+    out = side_turns(*side, color, side_steps(*side, color, forced_from), [])
+    return [join(color, *side) for _fr, _to, _taken, side in out]
+
+
+def perft(pos: Position, color: int, depth: int) -> int:
+    """Leaf count of the full-turn tree `depth` turns deep."""
+    if depth == 0:
+        return 1
+    return _perft(*sides(pos, color), color, depth)
+
+
+# ---- hashing ----
+# Zobrist keys, one 64-bit key per (piece kind, square), from a fixed seed so
+# hashes are stable across processes and can key on-disk tables. The keys of
+# each byte of a bitboard are pre-XORed into 256-entry tables: a position
+# hashes in 16 lookups.
+def _zobrist_tables() -> Tuple[Tuple[Tuple[int, ...], ...], ...]:
+    rng = random.Random(0xC4EC)
+    tables = []
+    for _kind in range(4):
+        keys = [rng.getrandbits(64) for _ in range(32)]
+        per_byte = []
+        for byte in range(4):
+            row = [0] * 256
+            for v in range(1, 256):
+                low = v & -v
+                row[v] = row[v ^ low] ^ keys[byte * 8 + low.bit_length() - 1]
+            per_byte.append(tuple(row))
+        tables.append(tuple(per_byte))
+    return tuple(tables)
+
+
+_ZOBRIST = _zobrist_tables()
+BLUE_TO_MOVE = random.Random(0xB1E).getrandbits(64)
+
+
+def zobrist(pos: Position, color: int) -> int:
+    h = BLUE_TO_MOVE if color == BLUE else 0
+    for (t0, t1, t2, t3), x in zip(_ZOBRIST, pos):
+        if x:
+            h ^= t0[x & 255] ^ t1[(x >> 8) & 255] ^ t2[(x >> 16) & 255] ^ t3[x >> 24]
+    return h
+
+
+def zobrist_side(men: int, kings: int, emen: int, ekings: int, color: int) -> int:
+    return zobrist((men, kings, emen, ekings) if color == RED else (emen, ekings, men, kings), color)
+
+
+# ---- conversions ----
+_INDEX = {1: 0, 2: 1, -1: 2, -2: 3}  # cell value -> Position field
+_BYTE = {ord("r"): 0, ord("R"): 1, ord("b"): 2, ord("B"): 3}
+
+
+def from_board(board: List[List[int]]) -> Position:
+    bb = [0, 0, 0, 0]
+    for s, (r, c) in enumerate(SQ_RC):
+        v = board[r][c]
+        if v:
+            bb[_INDEX[v]] |= BIT[s]
+    return Position(*bb)
+
+
+def to_board(pos: Position) -> List[List[int]]:
+    b = [[0] * SIZE for _ in range(SIZE)]
+    for x, v in zip(pos, (1, 2, -1, -2)):
+        for s in _bits(x):
+            r, c = SQ_RC[s]
+            b[r][c] = v
+    return b
+
+
+def from_cells(cells: bytes) -> Position:
+    """From GameSession.cells (engine.pack_board)."""
+    bb = [0, 0, 0, 0]
+    for s, ch in enumerate(cells):
+        i = _BYTE.get(ch)
+        if i is not None:
+            bb[i] |= BIT[s]
+    return Position(*bb)
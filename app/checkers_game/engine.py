@@ -2,7 +2,9 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple, Iterable
+from typing import Dict, List, Optional, Tuple
+
+from . import bitboard as bb
 
 SIZE = 8
 
@@ -45,126 +47,87 @@ def initial_board() -> List[List[int]]:
                 b[r][c] = 1
     return b
 
+# packed board: one ASCII byte per dark square, row by row (32 bytes)
+_PACK = {0: ord("."), 1: ord("r"), 2: ord("R"), -1: ord("b"), -2: ord("B")}
+_UNPACK = {ch: v for v, ch in _PACK.items()}
+DARK_SQUARES = [(r, c) for r in range(SIZE) for c in range(SIZE) if is_dark(r, c)]
+
+def pack_board(board: List[List[int]]) -> bytes:
+    return bytes(_PACK[board[r][c]] for r, c in DARK_SQUARES)
+
+def unpack_board(packed: bytes | str) -> List[List[int]]:
+    if isinstance(packed, str):
+        packed = packed.encode("ascii")
+    b = [[0 for _ in range(SIZE)] for _ in range(SIZE)]
+    for (r, c), ch in zip(DARK_SQUARES, packed):
+        b[r][c] = _UNPACK[ch]
+    return b
+
 def in_bounds(r: int, c: int) -> bool:
     return 0 <= r < SIZE and 0 <= c < SIZE
 
 DIRS = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
 
-def _man_simple_dirs(color: int) -> Iterable[Tuple[int, int]]:
-    # red moves up, blue moves down
-    return [(-1, -1), (-1, 1)] if color == RED else [(1, -1), (1, 1)]
+# ---- 8x8 list API over the bitboard generator (bitboard.py) ----
+# Boards stay lists of rows for the router, the UI and storage; each call
+# converts once and works on the 32-square bitboards.
+_STEP_MOVES: Dict[tuple, StepMove] = {}
+
+def _step_move(step: tuple) -> StepMove:
+    mv = _STEP_MOVES.get(step)
+    if mv is None:
+        fr, to, captured = step
+        mv = StepMove(bb.SQ_RC[fr], bb.SQ_RC[to], tuple(bb.SQ_RC[q] for q in captured))
+        _STEP_MOVES[step] = mv
+    return mv
+
+def _occupancy(board: List[List[int]], color: int) -> Tuple[int, int, int]:
+    men, kings, emen, ekings = bb.sides(bb.from_board(board), color)
+    own, enemy = men | kings, emen | ekings
+    return own, enemy, bb.FULL & ~(own | enemy)
 
 def list_captures_for_piece(board: List[List[int]], r: int, c: int) -> List[StepMove]:
     v = board[r][c]
     col = piece_color(v)
-    if col == 0:
+    if col == 0 or (r, c) not in bb.RC_SQ:
         return []
-
-    res: List[StepMove] = []
-
-    # man capture: jump any direction
-    if not is_king(v):
-        for dr, dc in DIRS:
-            r1, c1 = r + dr, c + dc
-            r2, c2 = r + 2 * dr, c + 2 * dc
-            if not in_bounds(r2, c2):
-                continue
-            if board[r2][c2] != 0:
-                continue
-            if not in_bounds(r1, c1):
-                continue
-            mid = board[r1][c1]
-            if mid != 0 and piece_color(mid) == -col:
-                res.append(StepMove((r, c), (r2, c2), ((r1, c1),)))
-        return res
-
-    # king capture: along diagonal, jump exactly one enemy, land beyond
-    for dr, dc in DIRS:
-        rr, cc = r + dr, c + dc
-        enemy_pos: Optional[Tuple[int, int]] = None
-        while in_bounds(rr, cc):
-            cell = board[rr][cc]
-            if cell == 0:
-                if enemy_pos is not None:
-                    res.append(StepMove((r, c), (rr, cc), (enemy_pos,)))
-                rr += dr
-                cc += dc
-                continue
-
-            if piece_color(cell) == col:
-                break
-
-            if enemy_pos is not None:
-                break
-            enemy_pos = (rr, cc)
-            rr += dr
-            cc += dc
-
-    return res
+    own, enemy, empty = _occupancy(board, col)
+    return [_step_move(st) for st in bb.piece_captures(bb.RC_SQ[(r, c)], is_king(v), own, enemy, empty)]
 
 def list_simple_moves_for_piece(board: List[List[int]], r: int, c: int) -> List[StepMove]:
     v = board[r][c]
     col = piece_color(v)
-    if col == 0:
+    if col == 0 or (r, c) not in bb.RC_SQ:
         return []
-
-    res: List[StepMove] = []
-
-    if not is_king(v):
-        for dr, dc in _man_simple_dirs(col):
-            rr, cc = r + dr, c + dc
-            if in_bounds(rr, cc) and board[rr][cc] == 0:
-                res.append(StepMove((r, c), (rr, cc), ()))
-        return res
-
-    # king simple move: any empty along diagonal
-    for dr, dc in DIRS:
-        rr, cc = r + dr, c + dc
-        while in_bounds(rr, cc) and board[rr][cc] == 0:
-            res.append(StepMove((r, c), (rr, cc), ()))
-            rr += dr
-            cc += dc
-
-    return res
+    _own, _enemy, empty = _occupancy(board, col)
+    return [_step_move(st) for st in bb.piece_quiet(bb.RC_SQ[(r, c)], is_king(v), col, empty)]
 
 def any_capture_exists(board: List[List[int]], color: int) -> bool:
-    for r in range(SIZE):
-        for c in range(SIZE):
-            if piece_color(board[r][c]) == color and list_captures_for_piece(board, r, c):
-                return True
-    return False
+    return bb.any_capture(bb.from_board(board), color)
 
 def legal_moves(
     board: List[List[int]],
     color: int,
     forced_from: Optional[Tuple[int, int]] = None
 ) -> Dict[Tuple[int, int], List[StepMove]]:
-    moves: Dict[Tuple[int, int], List[StepMove]] = {}
-
+    forced = None
     if forced_from is not None:
-        r, c = forced_from
-        if piece_color(board[r][c]) != color:
+        forced = bb.RC_SQ.get(forced_from)
+        if forced is None:
             return {}
-        caps = list_captures_for_piece(board, r, c)
-        if caps:
-            moves[(r, c)] = caps
-        return moves
-
-    must_capture = any_capture_exists(board, color)
-    for r in range(SIZE):
-        for c in range(SIZE):
-            if piece_color(board[r][c]) != color:
-                continue
-            pm = list_captures_for_piece(board, r, c) if must_capture else list_simple_moves_for_piece(board, r, c)
-            if pm:
-                moves[(r, c)] = pm
-
+    moves: Dict[Tuple[int, int], List[StepMove]] = {}
+    for step in bb.steps(bb.from_board(board), color, forced):
+        mv = _step_move(step)
+        moves.setdefault(mv.fr, []).append(mv)
     return moves
 
 def apply_step(board: List[List[int]], mv: StepMove) -> List[List[int]]:
-    b = [row[:] for row in board]
+    # new board sharing the untouched rows (boards are never mutated in place)
+    b = board[:]
     fr_r, fr_c = mv.fr
     to_r, to_c = mv.to
+    for r in {fr_r, to_r, *(cr for cr, _cc in mv.captured)}:
+        b[r] = board[r][:]
     piece = b[fr_r][fr_c]
     b[fr_r][fr_c] = 0
     b[to_r][to_c] = piece
@@ -173,19 +136,17 @@ def apply_step(board: List[List[int]], mv: StepMove) -> List[List[int]]:
     return b
 
 def maybe_promote(board: List[List[int]], last_to: Tuple[int, int]) -> List[List[int]]:
-    b = [row[:] for row in board]
     r, c = last_to
-    v = b[r][c]
-    if abs(v) != 1:
-        return b
-    if v == 1 and r == 0:
-        b[r][c] = 2
-    elif v == -1 and r == SIZE - 1:
-        b[r][c] = -2
+    v = board[r][c]
+    if not ((v == 1 and r == 0) or (v == -1 and r == SIZE - 1)):
+        return board
+    b = board[:]
+    b[r] = board[r][:]
+    b[r][c] = 2 * v
     return b
 
 def count_pieces(board: List[List[int]], color: int) -> int:
-    return sum(1 for r in range(SIZE) for c in range(SIZE) if piece_color(board[r][c]) == color)
+    return sum(1 for row in board for v in row if v * color > 0)
 
 def has_any_moves(board: List[List[int]], color: int) -> bool:
-    return bool(legal_moves(board, color))
+    return bb.has_moves(bb.from_board(board), color)
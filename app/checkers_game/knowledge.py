@@ -0,0 +1,157 @@
+"""Opening book and endgame table for the checkers AI.
+
+Both are hash tables on disk, keyed by bitboard.zobrist_side (the position
+and the side to move). The keys are stable across processes. A file is:
+
+    header   16 bytes: magic (8), count u32, value size u8, param u8, 2 pad
+    keys     count x u64, sorted
+    values   count x value size
+
+The file is memory-mapped and probed by binary search over the keys. The
+ai_pool workers share its pages instead of each loading a copy.
+
+- Book (CK_BOOK_PATH): position -> Zobrist hash of the position after the
+  book turn. Built by searching deep from the start position, both colours.
+- Endgame table (CK_EGTB_PATH): every position with at most `param` pieces
+  -> its game-theoretic value for the side to move, by retrograde analysis:
+  0 is a draw, n a win in n turns, 128 + n a loss in n turns.
+
+A missing or invalid file disables that part; choose_turn then searches as
+before. scripts/gen_checkers_knowledge.py writes both files.
+"""
+from __future__ import annotations
+
+import logging
+import mmap
+import struct
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.config import CK_BOOK_PATH, CK_EGTB_PATH
+
+from . import bitboard as bb
+from .search import evaluate
+
+log = logging.getLogger("sm-arena")
+
+BOOK_MAGIC = b"SMCKBOOK"
+EGTB_MAGIC = b"SMCKEGTB"
+_HEADER = struct.Struct("<8sIBB2x")
+_VALUE_FMT = {1: "B", 8: "Q"}
+
+DRAW = 0
+LOSS = 128  # LOSS + n: lost in n turns; 1..127: won in n turns
+MAX_DIST = 127
+
+
+class HashTable:
+    """Sorted u64 keys -> fixed-size values in one memory-mapped file."""
+
+    __slots__ = ("param", "keys", "values", "_mm")
+
+    def __init__(self, path: str, magic: bytes):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        got, count, vsize, self.param = _HEADER.unpack_from(self._mm, 0)
+        end = _HEADER.size + count * (8 + vsize)
+        if got != magic or vsize not in _VALUE_FMT or len(self._mm) != end:
+            self._mm.close()
+            raise ValueError(f"{path}: not a {magic.decode()} table")
+        view = memoryview(self._mm)
+        mid = _HEADER.size + 8 * count
+        self.keys = view[_HEADER.size:mid].cast("Q")
+        self.values = view[mid:end].cast(_VALUE_FMT[vsize])
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def get(self, key: int) -> Optional[int]:
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return self.values[i]
+        return None
+
+
+def write_table(path: str, magic: bytes, items: Iterable[Tuple[int, int]], value_size: int, param: int = 0) -> int:
+    """Write (key, value) pairs as a HashTable file; returns the entry count."""
+    pairs = sorted(items)
+    keys = array("Q", (k for k, _v in pairs))
+    values = array(_VALUE_FMT[value_size], (v for _k, v in pairs))
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(magic, len(pairs), value_size, param))
+        f.write(keys.tobytes())
+        f.write(values.tobytes())
+    return len(pairs)
+
+
+_tables: Dict[str, Optional[HashTable]] = {}
+
+
+def _table(path: str, magic: bytes) -> Optional[HashTable]:
+    if path not in _tables:
+        try:
+            _tables[path] = HashTable(path, magic)
+        except (OSError, ValueError) as e:
+            log.warning("Checkers %s disabled: %s", magic.decode(), e)
+            _tables[path] = None
+    return _tables[path]
+
+
+def reload() -> None:
+    """Forget the opened tables (after the generator rewrote them)."""
+    _tables.clear()
+
+
+def _turns(side: bb.Side, color: int):
+    return bb.side_turns(*side, color, bb.side_steps(*side, color), [])
+
+
+# ---- opening book ----
+def book_turn(side: bb.Side, color: int) -> Optional[bb.Side]:
+    """The book turn's result (mover's point of view), or None outside the book."""
+    book = _table(CK_BOOK_PATH, BOOK_MAGIC)
+    if book is None:
+        return None
+    target = book.get(bb.zobrist_side(*side, color))
+    if target is None:
+        return None
+    for _fr, _to, _taken, after in _turns(side, color):
+        m2, k2, e2, ek2 = after
+        if bb.zobrist_side(e2, ek2, m2, k2, -color) == target:
+            return after
+    return None
+
+
+# ---- endgame table ----
+def egtb_value(side: bb.Side, color: int) -> Optional[int]:
+    """Table value for the side to move, or None if the position is not covered."""
+    table = _table(CK_EGTB_PATH, EGTB_MAGIC)
+    men, kings, emen, ekings = side
+    if table is None or (men | kings | emen | ekings).bit_count() > table.param:
+        return None
+    return table.get(bb.zobrist_side(men, kings, emen, ekings, color))
+
+
+def egtb_turn(side: bb.Side, color: int) -> Optional[bb.Side]:
+    """The table's best turn: the fastest win, the longest loss, or the draw the eval likes best."""
+    if egtb_value(side, color) is None:
+        return None
+    best, best_rank = None, None
+    for _fr, _to, _taken, after in _turns(side, color):
+        m2, k2, e2, ek2 = after
+        if not (e2 | ek2):
+            rank = (3, 0)  # took the last piece
+        else:
+            v = egtb_value((e2, ek2, m2, k2), -color)
+            if v is None:
+                return None
+            if v >= LOSS:
+                rank = (2, -(v - LOSS))
+            elif v == DRAW:
+                rank = (1, evaluate(m2, k2, e2, ek2, color))
+            else:
+                rank = (0, v)
+        if best_rank is None or rank > best_rank:
+            best, best_rank = after, rank
+    return best
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import asyncio
+import time
 from aiogram import Router, F, Bot
 from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, BufferedInputFile, InputMediaPhoto
@@ -18,20 +19,14 @@ from .storage import (
     user_active_game, enqueue_or_match, cancel_waiting, end_private_game
 )
 from .ui import build_board_kb, unpack_sq, render_text
-from .ai import choose_turn
 
 from app.i18n import t
 from app.keyboards import arena_menu_kb
-from app.db import init_db, upsert_user, bump_total, bump_weekly, get_rating, set_rating, get_skin_ck, get_chat, get_news, add_bp_xp, is_shadowbanned, is_rated_pair_game, record_pair_game
+from app.db_async import init_db, upsert_user, get_skin_ck, get_chat, get_news, GameResult, record_game_result
+from app import ai_pool, live_state
 from app.config import ANTI_BOOST_WINDOW_HOURS, ANTI_BOOST_MAX_RATED
 ANTI_BOOST_WINDOW_SEC = ANTI_BOOST_WINDOW_HOURS * 3600
 
-# update_elo is optional (exists in Ń‚Đ˛ĐľŃ”ĐĽŃ ĐżŃ€ĐľĐµĐşŃ‚Ń– Đ´Đ»ŃŹ XO)
-try:
-    from app.rating import update_elo  # type: ignore
-except Exception:
-    update_elo = None
-
 router = Router()
 
 def _safe_name(u) -> str:
@@ -62,9 +57,10 @@ def _join_kb(gid: str) -> InlineKeyboardMarkup:
     )
 
 async def render_board_msg(chat_id: int, message_id: int, gs, bot: Bot, lang: str, user_id: int):
-    from app.db import get_skin_ck, get_active_wallpaper
-    skin = get_skin_ck(user_id)
-    wp = get_active_wallpaper(user_id)
+    live_state.touch("ck", gs.gid)  # every state change is rendered
+    from app.db_async import get_skin_ck, get_active_wallpaper
+    skin = await get_skin_ck(user_id)
+    wp = await get_active_wallpaper(user_id)
     kb = build_board_kb(gs.gid, gs.board, gs.turn, gs.selected, gs.forced_from, skin=skin)
     text = render_text(gs.red_name, gs.blue_name, gs.turn, gs.selected, gs.forced_from is not None, gs.winner)
     
@@ -111,7 +107,7 @@ async def cmd_checkers(msg: Message):
             pass
         await msg.answer(
             f"{t(lang,'brand_title')}\n{t(lang,'ck_choose')}",
-            reply_markup=_checkers_menu(lang)
+            reply_markup=await _checkers_menu(lang)
         )
         return
     await start_checkers_from_message(msg)
@@ -130,14 +126,14 @@ async def cb_menu_checkers(cb: CallbackQuery):
                 pass
             await cb.message.edit_text(
                 f"{t(lang,'brand_title')}\n{t(lang,'ck_choose')}",
-                reply_markup=_checkers_menu(lang)
+                reply_markup=await _checkers_menu(lang)
             )
         else:
             await start_checkers_from_message(cb.message)
 
-def _checkers_menu(lang: str) -> InlineKeyboardMarkup:
-    chat = get_chat()
-    news = get_news()
+async def _checkers_menu(lang: str) -> InlineKeyboardMarkup:
+    chat = await get_chat()
+    news = await get_news()
     return arena_menu_kb(lang, "checkers", chat_url=chat.get('url',''), news_url=news.get('url',''))
 
 def _ai_levels_kb(lang: str) -> InlineKeyboardMarkup:
@@ -179,7 +175,7 @@ async def ck_ai_start(cb: CallbackQuery):
         pass
 
     init_db()
-    upsert_user(cb.from_user.id, cb.from_user.username, cb.from_user.first_name, lang)
+    await upsert_user(cb.from_user.id, cb.from_user.username, cb.from_user.first_name, lang)
 
     # If user already has active AI game, restore it in a new message.
     active = user_active_game(cb.from_user.id)
@@ -192,7 +188,7 @@ async def ck_ai_start(cb: CallbackQuery):
             )
             await cb.message.answer(
                 f"{t(lang,'brand_title')}\n{t(lang,'ck_choose')}",
-                reply_markup=_checkers_menu(lang),
+                reply_markup=await _checkers_menu(lang),
             )
             await _safe_answer(cb, "Гру відновлено ✅")
             return
@@ -209,7 +205,6 @@ async def ck_ai_start(cb: CallbackQuery):
         blue_id=0,
         red_name=_safe_name(cb.from_user),
         blue_name="AI",
-        board=initial_board(),
         vs_ai=True,
         ai_level=level,
     )
@@ -220,6 +215,7 @@ async def ck_ai_start(cb: CallbackQuery):
     )
     STORE.games[gid] = gs
     STORE.active_by_user[gs.red_id] = gid
+    live_state.touch("ck", gid)
 
     await _safe_answer(cb,)
 
@@ -274,8 +270,8 @@ async def ck_pvp_search(cb: CallbackQuery):
     assert gs is not None
     init_db()
     # ensure both users exist in DB
-    upsert_user(gs.red_id, None, gs.red_name, lang)
-    upsert_user(gs.blue_id, None, gs.blue_name, lang)
+    await upsert_user(gs.red_id, None, gs.red_name, lang)
+    await upsert_user(gs.blue_id, None, gs.blue_name, lang)
     # send to both (each sees their own skin)
     gs.red_chat_id = gs.red_id
     gs.red_message_id = await render_board_msg(gs.red_id, 0, gs, cb.bot, "uk", gs.red_id)
@@ -283,7 +279,7 @@ async def ck_pvp_search(cb: CallbackQuery):
     gs.blue_chat_id = gs.blue_id
     gs.blue_message_id = await render_board_msg(gs.blue_id, 0, gs, cb.bot, "uk", gs.blue_id)
 
-    await cb.message.edit_text("✅ Знайшов суперника! Дивись гру в чаті з ботом.", reply_markup=_checkers_menu(lang))
+    await cb.message.edit_text("✅ Знайшов суперника! Дивись гру в чаті з ботом.", reply_markup=await _checkers_menu(lang))
     await _safe_answer(cb,)
 
 @router.callback_query(F.data == "sm:ck:pvp:cancel")
@@ -298,7 +294,7 @@ async def ck_pvp_cancel(cb: CallbackQuery):
     cancel_waiting(cb.from_user.id)
     await cb.message.edit_text(
         f"{t(lang,'brand_title')}\n{t(lang,'ck_choose')}",
-        reply_markup=_checkers_menu(lang)
+        reply_markup=await _checkers_menu(lang)
     )
     await _safe_answer(cb, "Пошук зупинено.")
 
@@ -315,7 +311,7 @@ async def start_checkers_from_message(msg: Message):
         return
 
     init_db()
-    upsert_user(msg.from_user.id, msg.from_user.username, msg.from_user.first_name, None)
+    await upsert_user(msg.from_user.id, msg.from_user.username, msg.from_user.first_name, None)
 
     lobby_msg = await msg.answer("🏟 Створюю лобі...")
     gs = create_lobby(
@@ -365,7 +361,7 @@ async def join_cb(cb: CallbackQuery):
 
     gs = joined
     text = render_text(gs.red_name, gs.blue_name, gs.turn, gs.selected, gs.forced_from is not None, gs.winner)
-    skin = get_skin_ck(cb.from_user.id)
+    skin = await get_skin_ck(cb.from_user.id)
     kb = build_board_kb(gs.gid, gs.board, gs.turn, gs.selected, gs.forced_from, skin=skin)
 
     await _safe_answer(cb, "Починаємо!")
@@ -393,9 +389,9 @@ async def _tournament_hook(bot: Bot, gs):
     if getattr(gs, "tmatch_id", 0) and getattr(gs, "tournament_id", 0) and gs.winner in (RED, BLUE):
         winner_uid = int(gs.red_id) if gs.winner == RED else int(gs.blue_id)
         try:
-            from app import db as _db
-            _db.set_match_result(int(gs.tmatch_id), int(winner_uid))
-            _db.advance_round_if_ready(int(gs.tournament_id))
+            from app import db_async as _db
+            await _db.set_match_result(int(gs.tmatch_id), int(winner_uid))
+            await _db.advance_round_if_ready(int(gs.tournament_id))
         except Exception:
             pass
         try:
@@ -404,7 +400,7 @@ async def _tournament_hook(bot: Bot, gs):
         except Exception:
             pass
 
-def _finish_and_score(gs):
+async def _finish_and_score(gs):
     """Apply статистику/рейтинги тільки для ігор з реальним суперником (PvP).
 
     ВАЖЛИВО: vs AI — не чіпаємо ні статистику, ні Elo, ні weekly.
@@ -420,52 +416,24 @@ def _finish_and_score(gs):
             end_private_game(gs)
         return
 
-    if gs.red_id and gs.blue_id:
-        red_win = (gs.winner == RED)
-        blue_win = (gs.winner == BLUE)
-
-        sb_r = is_shadowbanned(gs.red_id)
-        sb_b = is_shadowbanned(gs.blue_id)
-        rated = is_rated_pair_game(gs.red_id, gs.blue_id, ANTI_BOOST_WINDOW_SEC, ANTI_BOOST_MAX_RATED, game="checkers")
-
-        # counters
-        if not sb_r:
-            bump_total(gs.red_id, win=red_win, game="checkers")
-            bump_weekly(gs.red_id, win=red_win, game="checkers")
-            if rated:
-                add_bp_xp(gs.red_id, 20 if red_win else 10)
-
-        if not sb_b:
-            bump_total(gs.blue_id, win=blue_win, game="checkers")
-            bump_weekly(gs.blue_id, win=blue_win, game="checkers")
-            if rated:
-                add_bp_xp(gs.blue_id, 20 if blue_win else 10)
-
-        # Elo
-        try:
-            rx = get_rating(gs.red_id, game="checkers")
-            rb = get_rating(gs.blue_id, game="checkers")
-            score_red = 1.0 if red_win else 0.0
-            if update_elo:
-                nr, nb = update_elo(rx, rb, score_red)
-            else:
-                # fallback elo K=24
-                def exp(ra, rb):
-                    return 1.0 / (1.0 + 10 ** ((rb - ra) / 400))
-                ea = exp(rx, rb)
-                k = 24
-                nr = int(round(rx + k * (score_red - ea)))
-                nb = int(round(rb + k * ((1.0 - score_red) - (1.0 - ea))))
-
-            if rated:
-                if not sb_r: set_rating(gs.red_id, nr, game="checkers")
-                if not sb_b: set_rating(gs.blue_id, nb, game="checkers")
-                record_pair_game(gs.red_id, gs.blue_id, ANTI_BOOST_WINDOW_SEC, game="checkers")
-        except Exception:
-            pass
-
-    if gs.is_private:
-        end_private_game(gs)
+    try:
+        if gs.red_id and gs.blue_id:
+            # counters, battle pass, Elo and anti-boost in one transaction
+            await record_game_result(GameResult(
+                game="checkers",
+                a_id=gs.red_id,
+                b_id=gs.blue_id,
+                winner_id=gs.red_id if gs.winner == RED else (gs.blue_id if gs.winner == BLUE else None),
+                anti_boost_window_sec=ANTI_BOOST_WINDOW_SEC,
+                anti_boost_max_rated=ANTI_BOOST_MAX_RATED,
+                tournament_id=int(getattr(gs, "tournament_id", 0) or 0),
+                tmatch_id=int(getattr(gs, "tmatch_id", 0) or 0),
+                moves=tuple(gs.moves),
+                duration_sec=time.time() - gs.started_ts,
+            ))
+    finally:
+        if gs.is_private:
+            end_private_game(gs)
 
 
 @router.callback_query(F.data.startswith("ck|"))
@@ -546,6 +514,7 @@ async def board_click(cb: CallbackQuery):
         return
 
     gs.board = apply_step(gs.board, chosen)
+    gs.moves.append(f"{from_sq[0]}{from_sq[1]}{chosen.to[0]}{chosen.to[1]}")
 
     if chosen.captured:
         gs.forced_from = chosen.to if legal_moves(gs.board, gs.turn, forced_from=chosen.to) else None
@@ -568,7 +537,7 @@ async def board_click(cb: CallbackQuery):
         gs.winner = -opp
         gs.selected = None
         gs.forced_from = None
-        _finish_and_score(gs)
+        await _finish_and_score(gs)
         await _tournament_hook(cb.bot, gs)
         await _safe_answer(cb,)
         await _edit_game_messages(cb, gs)
@@ -580,13 +549,17 @@ async def board_click(cb: CallbackQuery):
     # AI response (if needed)
     if gs.vs_ai and gs.turn == BLUE and not gs.finished:
         await asyncio.sleep(0.2)
-        gs.board, gs.turn = choose_turn(gs.board, BLUE, gs.ai_level)
+        before = gs.board
+        after = await ai_pool.checkers_turn(before, BLUE, gs.ai_level, gid)
+        if after is None or gs.finished or gs.board is not before:
+            return  # cancelled: resigned or restarted while the AI was thinking
+        gs.board, gs.turn = after, RED
         # check win after AI move
         opp = gs.turn
         if count_pieces(gs.board, opp) == 0 or not has_any_moves(gs.board, opp):
             gs.finished = True
             gs.winner = -opp
-            _finish_and_score(gs)
+            await _finish_and_score(gs)
         await _edit_game_messages(cb, gs)
 
 @router.callback_query(F.data.startswith("ckc|"))
@@ -631,11 +604,15 @@ async def control_cb(cb: CallbackQuery):
         gs.winner = -color
         gs.selected = None
         gs.forced_from = None
-        _finish_and_score(gs)
+        ai_pool.cancel(gid)
+        await _finish_and_score(gs)
         await _safe_answer(cb,"Здача прийнята.")
 
     elif action == "new":
+        ai_pool.cancel(gid)
         gs.board = initial_board()
+        gs.moves = []
+        gs.started_ts = time.time()
         gs.turn = RED
         gs.selected = None
         gs.forced_from = None
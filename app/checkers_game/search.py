@@ -0,0 +1,210 @@
+"""Alpha-beta search for the checkers AI, on bitboard.py sides.
+
+- Iterative deepening runs until the depth limit or the time budget
+  (SearchLimits). Each iteration is ordered by the previous one through the
+  transposition table. An iteration cut off by the clock is discarded.
+- Negamax with alpha-beta. A node is a complete turn (bitboard.side_turns),
+  so a capture chain is one move.
+- Transposition table: keyed by the Zobrist hash (bitboard.zobrist_side).
+  Each entry holds (depth, bound, score, best move). It is kept between
+  searches and cleared when it outgrows TT_MAX entries. Mate scores are
+  stored relative to the node.
+- Move ordering: the TT move first, then the most captured pieces,
+  crownings and the two killer moves of the ply.
+- Quiescence: at depth 0 a side that must capture keeps searching (captures
+  are compulsory, so these are its only moves). The static eval is used
+  only in quiet positions or at QUIESCENCE_PLIES.
+
+Moves are (from, to) square pairs of the turn (bitboard squares).
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from . import bitboard as bb
+from .bitboard import BIT, RED
+
+WIN = 100_000
+MATE_BOUND = WIN - 1_000
+INF = WIN + 1
+TT_MAX = 1 << 20
+QUIESCENCE_PLIES = 24
+CHECK_EVERY = 1023  # nodes between clock checks
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# ---- evaluation ----
+MAN, KING = 100, 300
+_ROWS = [sum(BIT[4 * r + i] for i in range(4)) for r in range(8)]
+# men: advancement bands and the back-row guard, from each side's own point of view
+_MAN_BANDS = {
+    RED: ((_ROWS[1] | _ROWS[2], 12), (_ROWS[3] | _ROWS[4], 5), (_ROWS[7], 8)),
+    -RED: ((_ROWS[6] | _ROWS[5], 12), (_ROWS[4] | _ROWS[3], 5), (_ROWS[0], 8)),
+}
+_CENTER = sum(BIT[bb.RC_SQ[(r, c)]] for r in (3, 4) for c in range(2, 6) if (r, c) in bb.RC_SQ)
+
+
+def evaluate(men: int, kings: int, emen: int, ekings: int, color: int) -> int:
+    """Static score for the side to move (centipawn-like: a man is 100)."""
+    score = MAN * (men.bit_count() - emen.bit_count()) + KING * (kings.bit_count() - ekings.bit_count())
+    for mask, w in _MAN_BANDS[color]:
+        score += w * (men & mask).bit_count()
+    for mask, w in _MAN_BANDS[-color]:
+        score -= w * (emen & mask).bit_count()
+    score += 4 * (((men | kings) & _CENTER).bit_count() - ((emen | ekings) & _CENTER).bit_count())
+    return score
+
+
+# ---- limits ----
+class SearchLimits(NamedTuple):
+    depth: int = 64                      # full turns
+    time_sec: Optional[float] = None     # wall clock budget per move
+
+
+@dataclass(slots=True)
+class SearchResult:
+    move: Optional[Tuple[int, int]]
+    side: Optional[bb.Side]              # the mover's side after the chosen turn
+    score: int
+    depth: int
+    nodes: int
+    seconds: float
+
+
+class _Timeout(Exception):
+    pass
+
+
+_TT: Dict[int, Tuple[int, int, int, Optional[Tuple[int, int]]]] = {}
+
+
+def clear_tt() -> None:
+    _TT.clear()
+
+
+class _Search:
+    __slots__ = ("deadline", "nodes", "killers")
+
+    def __init__(self, deadline: Optional[float]):
+        self.deadline = deadline
+        self.nodes = 0
+        self.killers: List[List[Optional[Tuple[int, int]]]] = [[None, None] for _ in range(128)]
+
+    def ordered(self, turns: List[bb.Turn], kings: int, tt_move, ply: int) -> List[bb.Turn]:
+        k1, k2 = self.killers[ply]
+        n_kings = kings.bit_count()
+
+        def key(turn: bb.Turn) -> int:
+            fr, to, taken, side = turn
+            mv = (fr, to)
+            if mv == tt_move:
+                return -1_000_000
+            score = -1000 * taken.bit_count()
+            if side[1].bit_count() > n_kings:
+                score -= 500  # crowned
+            if mv == k1:
+                score -= 300
+            elif mv == k2:
+                score -= 200
+            return score
+
+        turns.sort(key=key)
+        return turns
+
+    def negamax(self, side: bb.Side, color: int, depth: int, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        if not self.nodes & CHECK_EVERY and self.deadline is not None and time.perf_counter() > self.deadline:
+            raise _Timeout
+        men, kings, emen, ekings = side
+        if depth <= 0:
+            status = bb.side_status(men, kings, emen, ekings, color)
+            if not status:
+                return -WIN + ply
+            if status == 1 or ply >= QUIESCENCE_PLIES:
+                return evaluate(men, kings, emen, ekings, color)
+        steps = bb.side_steps(men, kings, emen, ekings, color)
+        if not steps:
+            return -WIN + ply
+        capture = bool(steps[0][2])
+
+        key = bb.zobrist_side(men, kings, emen, ekings, color)
+        entry = _TT.get(key)
+        tt_move = None
+        alpha0 = alpha
+        if entry is not None:
+            e_depth, bound, score, tt_move = entry
+            if e_depth >= depth:
+                if score > MATE_BOUND:
+                    score -= ply
+                elif score < -MATE_BOUND:
+                    score += ply
+                if bound == EXACT:
+                    return score
+                if bound == LOWER and score > alpha:
+                    alpha = score
+                elif bound == UPPER and score < beta:
+                    beta = score
+                if alpha >= beta:
+                    return score
+
+        turns = self.ordered(bb.side_turns(men, kings, emen, ekings, color, steps, []), kings, tt_move, ply)
+        best, best_move = -INF, None
+        for fr, to, _taken, (m2, k2, e2, ek2) in turns:
+            val = -self.negamax((e2, ek2, m2, k2), -color, depth - 1, -beta, -alpha, ply + 1)
+            if val > best:
+                best, best_move = val, (fr, to)
+                if val > alpha:
+                    alpha = val
+                    if alpha >= beta:
+                        if not capture:
+                            ks = self.killers[ply]
+                            if ks[0] != best_move:
+                                ks[1], ks[0] = ks[0], best_move
+                        break
+
+        bound = UPPER if best <= alpha0 else LOWER if best >= beta else EXACT
+        stored = best + ply if best > MATE_BOUND else best - ply if best < -MATE_BOUND else best
+        if len(_TT) >= TT_MAX:
+            _TT.clear()
+        _TT[key] = (depth, bound, stored, best_move)
+        return best
+
+
+def search(side: bb.Side, color: int, limits: SearchLimits = SearchLimits()) -> SearchResult:
+    """Best complete turn for `color` to move from `side` (its own point of view)."""
+    t0 = time.perf_counter()
+    deadline = t0 + limits.time_sec if limits.time_sec is not None else None
+    s = _Search(deadline)
+    men, kings, emen, ekings = side
+    turns = bb.side_turns(men, kings, emen, ekings, color, bb.side_steps(*side, color), [])
+    if not turns:
+        return SearchResult(None, None, -WIN, 0, 1, time.perf_counter() - t0)
+    if len(turns) == 1:
+        fr, to, _taken, after = turns[0]
+        return SearchResult((fr, to), after, 0, 0, 1, time.perf_counter() - t0)
+
+    result = SearchResult(turns[0][:2], turns[0][3], 0, 0, 0, 0.0)
+    best_move = None
+    for depth in range(1, limits.depth + 1):
+        try:
+            turns = s.ordered(turns, kings, best_move, 0)
+            alpha, best, best_turn = -INF, -INF, turns[0]
+            for turn in turns:
+                m2, k2, e2, ek2 = turn[3]
+                val = -s.negamax((e2, ek2, m2, k2), -color, depth - 1, -INF, -alpha, 1)
+                if val > best:
+                    best, best_turn = val, turn
+                    alpha = max(alpha, val)
+        except _Timeout:
+            break
+        best_move = best_turn[:2]
+        result = SearchResult(best_move, best_turn[3], best, depth, s.nodes, 0.0)
+        if abs(best) > MATE_BOUND:
+            break  # forced win or loss found
+        if deadline is not None and time.perf_counter() > t0 + (deadline - t0) / 2:
+            break  # the next iteration would not finish
+    result.nodes = s.nodes
+    result.seconds = time.perf_counter() - t0
+    return result
@@ -1,13 +1,21 @@
 from __future__ import annotations
 
+import json
 import time
 import secrets
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from typing import Dict, Optional, Tuple
 
-from .engine import RED, BLUE, initial_board
+from app import ai_pool, live_state
+from app.config import MATCH_IDLE_TTL_SEC, MATCH_REGISTRY_MAX
+from app.registry import BoundedRegistry
 
-@dataclass
+from .engine import RED, BLUE, initial_board, pack_board, unpack_board
+
+_INITIAL_CELLS = pack_board(initial_board())
+
+
+@dataclass(slots=True)
 class GameSession:
     gid: str
 
@@ -27,8 +35,8 @@ class GameSession:
     blue_chat_id: int = 0
     blue_message_id: int = 0
 
-    # game state
-    board: list = field(default_factory=initial_board)
+    # game state: the 32 dark squares packed (engine.pack_board); .board is the 8x8 view
+    cells: bytes = _INITIAL_CELLS
     turn: int = RED
     selected: Optional[Tuple[int, int]] = None
     forced_from: Optional[Tuple[int, int]] = None
@@ -41,6 +49,8 @@ class GameSession:
     ai_level: str = "easy"
 
     last_activity: float = field(default_factory=lambda: time.time())
+    started_ts: float = field(default_factory=lambda: time.time())
+    moves: list = field(default_factory=list)  # "rcrc" steps, for the games ledger
     # tournament context
     tournament_id: int = 0
     tmatch_id: int = 0
@@ -49,12 +59,20 @@ class GameSession:
     def touch(self):
         self.last_activity = time.time()
 
+    @property
+    def board(self) -> list:
+        return unpack_board(self.cells)
+
+    @board.setter
+    def board(self, board: list) -> None:
+        self.cells = pack_board(board)
+
     @property
     def is_private(self) -> bool:
         return self.red_chat_id != 0 or self.blue_chat_id != 0
 
 
-@dataclass
+@dataclass(slots=True)
 class Waiting:
     user_id: int
     name: str
@@ -62,7 +80,11 @@ class Waiting:
 
 class MemoryStore:
     def __init__(self):
-        self.games: Dict[str, GameSession] = {}
+        # finished and abandoned sessions expire after MATCH_IDLE_TTL_SEC without a move
+        self.games: Dict[str, GameSession] = BoundedRegistry(
+            "ck_games", MATCH_IDLE_TTL_SEC, MATCH_REGISTRY_MAX,
+            activity=lambda gs: gs.last_activity, on_evict=self._evicted,
+        )
         self.lobby_by_chat: Dict[int, str] = {}     # group chat_id -> gid
         self.active_by_user: Dict[int, str] = {}    # private user_id -> gid
         self.waiting: Optional[Waiting] = None      # 1-slot matchmaking queue
@@ -70,6 +92,14 @@ class MemoryStore:
     def new_gid(self) -> str:
         return secrets.token_hex(3)  # 6 chars
 
+    def _evicted(self, gid: str, gs: GameSession) -> None:
+        for uid in (gs.red_id, gs.blue_id):
+            if self.active_by_user.get(uid) == gid:
+                del self.active_by_user[uid]
+        if self.lobby_by_chat.get(gs.chat_id) == gid:
+            del self.lobby_by_chat[gs.chat_id]
+        live_state.touch("ck", gid)
+
 STORE = MemoryStore()
 
 # ----- Group lobby helpers -----
@@ -83,10 +113,10 @@ def create_lobby(chat_id: int, message_id: int, creator_id: int, creator_name: s
         blue_id=0,
         red_name=creator_name,
         blue_name="",
-        board=initial_board(),
     )
     STORE.games[gid] = gs
     STORE.lobby_by_chat[chat_id] = gid
+    live_state.touch("ck", gid)
     return gs
 
 def get_lobby(chat_id: int) -> Optional[GameSession]:
@@ -108,7 +138,9 @@ def join_lobby(chat_id: int, joiner_id: int, joiner_name: str) -> Optional[GameS
     gs.blue_id = joiner_id
     gs.blue_name = joiner_name
     STORE.lobby_by_chat.pop(chat_id, None)
+    gs.started_ts = time.time()
     gs.touch()
+    live_state.touch("ck", gid)
     return gs
 
 # ----- Private matchmaking -----
@@ -122,6 +154,7 @@ def cancel_waiting(user_id: int) -> bool:
     w = STORE.waiting
     if w and w.user_id == int(user_id):
         STORE.waiting = None
+        live_state.touch("ck_wait", 0)
         return True
     return False
 
@@ -132,6 +165,7 @@ def enqueue_or_match(user_id: int, name: str) -> Tuple[str, Optional[GameSession
     uid = int(user_id)
     if STORE.waiting is None:
         STORE.waiting = Waiting(uid, name)
+        live_state.touch("ck_wait", 0)
         return "waiting", None
     if STORE.waiting.user_id == uid:
         return "waiting", None
@@ -139,6 +173,7 @@ def enqueue_or_match(user_id: int, name: str) -> Tuple[str, Optional[GameSession
     # match with waiting user
     other = STORE.waiting
     STORE.waiting = None
+    live_state.touch("ck_wait", 0)
 
     gid = STORE.new_gid()
     # random colors
@@ -156,11 +191,11 @@ def enqueue_or_match(user_id: int, name: str) -> Tuple[str, Optional[GameSession
         blue_id=blue_id,
         red_name=red_name,
         blue_name=blue_name,
-        board=initial_board(),
     )
     STORE.games[gid] = gs
     STORE.active_by_user[red_id] = gid
     STORE.active_by_user[blue_id] = gid
+    live_state.touch("ck", gid)
     return "matched", gs
 
 
@@ -182,18 +217,58 @@ def create_private_match(a_id: int, a_name: str, b_id: int, b_name: str, tournam
         blue_id=blue_id,
         red_name=red_name,
         blue_name=blue_name,
-        board=initial_board(),
         tournament_id=int(tournament_id),
         tmatch_id=int(tmatch_id),
     )
     STORE.games[gid] = gs
     STORE.active_by_user[red_id] = gid
     STORE.active_by_user[blue_id] = gid
+    live_state.touch("ck", gid)
     return gs
 
 def end_private_game(gs: GameSession):
     for uid in (gs.red_id, gs.blue_id):
         STORE.active_by_user.pop(int(uid), None)
+    ai_pool.cancel(gs.gid)
+    live_state.touch("ck", gs.gid)
 
 def get_game(gid: str) -> Optional[GameSession]:
-    return STORE.games.get(gid)
\ No newline at end of file
+    return STORE.games.get(gid)
+
+
+# ----- Crash-safe resume (app.live_state) -----
+# A snapshot is the session as JSON; the packed cells are already ASCII.
+# Finished games are not kept.
+def _live_encode(gs: GameSession) -> Optional[str]:
+    if gs.finished:
+        return None
+    state = {f.name: getattr(gs, f.name) for f in fields(gs)}
+    state["cells"] = gs.cells.decode("ascii")
+    state["active"] = [uid for uid in (gs.red_id, gs.blue_id) if uid and STORE.active_by_user.get(uid) == gs.gid]
+    state["lobby"] = bool(gs.chat_id) and STORE.lobby_by_chat.get(gs.chat_id) == gs.gid
+    return json.dumps(state, separators=(",", ":"), ensure_ascii=False)
+
+def _live_restore(gid: str, state: str, bot=None) -> None:
+    d = json.loads(state)
+    active, lobby = d.pop("active"), d.pop("lobby")
+    cells = d.pop("board", None) or d["cells"]  # "board" in snapshots taken before .cells
+    d["cells"] = cells.encode("ascii")
+    for k in ("selected", "forced_from"):
+        if d[k] is not None:
+            d[k] = tuple(d[k])
+    gs = GameSession(**d)
+    STORE.games[gid] = gs
+    for uid in active:
+        STORE.active_by_user[int(uid)] = gid
+    if lobby:
+        STORE.lobby_by_chat[gs.chat_id] = gid
+
+def _live_wait_restore(key: str, state: str, bot=None) -> None:
+    STORE.waiting = Waiting(*json.loads(state))
+
+live_state.register("ck", STORE.games.get, _live_encode, _live_restore)
+live_state.register(
+    "ck_wait", lambda key: STORE.waiting,
+    lambda w: json.dumps([w.user_id, w.name, w.ts], ensure_ascii=False),
+    _live_wait_restore,
+)
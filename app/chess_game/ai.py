@@ -1,9 +1,18 @@
 from __future__ import annotations
 
 import random
+from typing import Union
 
 import chess
 
+from app.config import CH_AI_HARD_MAX_DEPTH, CH_AI_HARD_SEC
+
+from .search import SearchLimits, search
+
+# "hard" = alpha-beta search (search.py), deepening until its time budget runs out
+LEVELS = {
+    "hard": SearchLimits(depth=CH_AI_HARD_MAX_DEPTH, time_sec=CH_AI_HARD_SEC),
+}
 
 _PIECE_VALUE = {
     chess.PAWN: 100,
@@ -15,30 +24,6 @@ _PIECE_VALUE = {
 }
 
 
-def _material_eval(board: chess.Board, side: bool) -> int:
-    score = 0
-    for piece_type, val in _PIECE_VALUE.items():
-        score += len(board.pieces(piece_type, side)) * val
-        score -= len(board.pieces(piece_type, not side)) * val
-    return score
-
-
-def _position_eval(board: chess.Board, side: bool) -> int:
-    if board.is_checkmate():
-        # If side to move is checkmated => terrible for side.
-        return -100_000 if board.turn == side else 100_000
-    if board.is_stalemate() or board.is_insufficient_material() or board.can_claim_draw():
-        return 0
-
-    score = _material_eval(board, side)
-    # tiny mobility bonus
-    mobility = board.legal_moves.count()
-    score += mobility if board.turn == side else -mobility
-    if board.is_check():
-        score += 25 if board.turn != side else -25
-    return score
-
-
 def _tactical_score(board: chess.Board, move: chess.Move) -> int:
     score = 0
     if board.is_capture(move):
@@ -66,49 +51,17 @@ def _choose_normal(board: chess.Board, legal: list[chess.Move]) -> chess.Move:
     return random.choice(candidates)
 
 
-def _choose_hard(board: chess.Board, legal: list[chess.Move]) -> chess.Move:
-    side = board.turn
-    best_score = -10**9
-    best_moves: list[chess.Move] = []
-
-    for mv in legal:
-        board.push(mv)
-        if board.is_checkmate():
-            score = 200_000
-        else:
-            opp_moves = list(board.legal_moves)
-            if not opp_moves:
-                score = _position_eval(board, side)
-            else:
-                worst_reply = 10**9
-                for omv in opp_moves:
-                    board.push(omv)
-                    val = _position_eval(board, side)
-                    board.pop()
-                    if val < worst_reply:
-                        worst_reply = val
-                score = worst_reply
-
-        board.pop()
-        score += _tactical_score(board, mv)
-
-        if score > best_score:
-            best_score = score
-            best_moves = [mv]
-        elif score == best_score:
-            best_moves.append(mv)
-
-    return random.choice(best_moves) if best_moves else random.choice(legal)
-
-
-def choose_move(board: chess.Board, level: str = "easy") -> chess.Move | None:
+def choose_move(board: chess.Board, level: Union[str, SearchLimits] = "easy") -> chess.Move | None:
+    """level is "easy" (random move), "normal" (best one-move tactic), "hard" or explicit SearchLimits."""
     legal = list(board.legal_moves)
     if not legal:
         return None
 
+    if isinstance(level, SearchLimits):
+        return search(board, level).move
     lv = (level or "easy").lower()
-    if lv == "hard":
-        return _choose_hard(board, legal)
+    if lv in LEVELS:
+        return search(board, LEVELS[lv]).move
     if lv == "normal":
         return _choose_normal(board, legal)
     return random.choice(legal)
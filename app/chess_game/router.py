@@ -1,16 +1,17 @@
 from __future__ import annotations
 
 import asyncio
+import time
 from typing import Optional
 
 import chess
+from aiogram import Router, F
 from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, Message, BufferedInputFile, InputMediaPhoto
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
 import io
 from app.board_renderer import renderer
 
-from .ai import choose_move
 from .storage import (
     GameSession,
     STORE,
@@ -25,10 +26,14 @@ from .storage import (
 )
 from .ui import build_board_kb, render_text, unpack_sq
 
-from app.db import get_chat, get_news, get_skin, get_skin_chess, init_db, upsert_user
+from app import ai_pool, live_state
+from app.config import ANTI_BOOST_WINDOW_HOURS, ANTI_BOOST_MAX_RATED
+from app.db_async import GameResult, get_chat, get_news, get_skin, get_skin_chess, init_db, record_game_result, upsert_user
 from app.i18n import detect_lang, t
 from app.keyboards import arena_menu_kb
 
+ANTI_BOOST_WINDOW_SEC = ANTI_BOOST_WINDOW_HOURS * 3600
+
 router = Router()
 
 
@@ -68,7 +73,8 @@ def _join_kb(gid: str) -> InlineKeyboardMarkup:
     )
 
 async def render_board_msg(chat_id: int, message_id: int, gs, bot, lang: str, user_id: int):
-    skin = get_skin_chess(user_id)
+    live_state.touch("chess", gs.gid)  # every state change is rendered
+    skin = await get_skin_chess(user_id)
     kb = build_board_kb(gs.gid, gs.board, gs.selected, skin=skin)
     text = render_text(gs.white_name, gs.black_name, gs.board, gs.selected, gs.winner, gs.outcome_reason or "")
     
@@ -89,8 +95,8 @@ async def render_board_msg(chat_id: int, message_id: int, gs, bot, lang: str, us
         if gs.selected is not None:
             sel_renderer = (7 - chess.square_rank(gs.selected), chess.square_file(gs.selected))
             
-        from app.db import get_active_wallpaper
-        wp = get_active_wallpaper(user_id)
+        from app.db_async import get_active_wallpaper
+        wp = await get_active_wallpaper(user_id)
         img = renderer.render_chess(b_dict, selected=sel_renderer, wallpaper=wp)
         bio = io.BytesIO()
         img.save(bio, format="PNG")
@@ -116,9 +122,9 @@ async def render_board_msg(chat_id: int, message_id: int, gs, bot, lang: str, us
     return message_id
 
 
-def _chess_menu(lang: str) -> InlineKeyboardMarkup:
-    chat = get_chat()
-    news = get_news()
+async def _chess_menu(lang: str) -> InlineKeyboardMarkup:
+    chat = await get_chat()
+    news = await get_news()
     return arena_menu_kb(lang, "chess", chat_url=chat.get("url", ""), news_url=news.get("url", ""))
 
 
@@ -170,6 +176,28 @@ def _update_game_over(gs: GameSession) -> bool:
     return True
 
 
+async def _finish_and_score(gs: GameSession):
+    """Record a finished PvP game (stats, battle pass, Elo, anti-boost); AI games are not scored."""
+    if gs.vs_ai or not (gs.white_id and gs.black_id):
+        return
+    if gs.winner is None:
+        winner_id = None
+    else:
+        winner_id = gs.white_id if gs.winner == chess.WHITE else gs.black_id
+    await record_game_result(GameResult(
+        game="chess",
+        a_id=gs.white_id,
+        b_id=gs.black_id,
+        winner_id=winner_id,
+        anti_boost_window_sec=ANTI_BOOST_WINDOW_SEC,
+        anti_boost_max_rated=ANTI_BOOST_MAX_RATED,
+        tournament_id=int(gs.tournament_id or 0),
+        tmatch_id=int(gs.tmatch_id or 0),
+        moves=tuple(mv.uci() for mv in gs.board.move_stack),
+        duration_sec=time.time() - gs.started_ts,
+    ))
+
+
 async def _edit_game_messages(cb: CallbackQuery, gs: GameSession):
     bot = cb.bot
     lang = _lang_or_default(cb)
@@ -195,7 +223,7 @@ async def _edit_game_messages(cb: CallbackQuery, gs: GameSession):
 async def cmd_chess(msg: Message):
     if msg.chat.type == "private":
         lang = _lang_or_default(msg)
-        await msg.answer(f"{t(lang,'brand_title')}\n{t(lang,'ch_choose')}", reply_markup=_chess_menu(lang))
+        await msg.answer(f"{t(lang,'brand_title')}\n{t(lang,'ch_choose')}", reply_markup=await _chess_menu(lang))
         return
     await start_chess_from_message(msg)
 
@@ -207,7 +235,7 @@ async def cb_menu_chess(cb: CallbackQuery):
         return
     if cb.message.chat.type == "private":
         lang = _lang_or_default(cb)
-        await cb.message.edit_text(f"{t(lang,'brand_title')}\n{t(lang,'ch_choose')}", reply_markup=_chess_menu(lang))
+        await cb.message.edit_text(f"{t(lang,'brand_title')}\n{t(lang,'ch_choose')}", reply_markup=await _chess_menu(lang))
     else:
         await start_chess_from_message(cb.message)
 
@@ -225,7 +253,7 @@ async def ch_ai_start(cb: CallbackQuery):
     lang = _lang_or_default(cb)
 
     init_db()
-    upsert_user(cb.from_user.id, cb.from_user.username, cb.from_user.first_name, lang)
+    await upsert_user(cb.from_user.id, cb.from_user.username, cb.from_user.first_name, lang)
 
     active = user_active_game(cb.from_user.id)
     if active:
@@ -237,7 +265,7 @@ async def ch_ai_start(cb: CallbackQuery):
             )
             await cb.message.answer(
                 f"{t(lang,'brand_title')}\n{t(lang,'ch_choose')}",
-                reply_markup=_chess_menu(lang),
+                reply_markup=await _chess_menu(lang),
             )
             await _safe_answer(cb, "Game restored ✅")
             return
@@ -262,6 +290,7 @@ async def ch_ai_start(cb: CallbackQuery):
     )
     STORE.games[gid] = gs
     STORE.active_by_user[gs.white_id] = gid
+    live_state.touch("chess", gid)
 
     await _safe_answer(cb)
 
@@ -315,8 +344,8 @@ async def ch_pvp_search(cb: CallbackQuery):
 
     assert gs is not None
     init_db()
-    upsert_user(gs.white_id, None, gs.white_name, lang)
-    upsert_user(gs.black_id, None, gs.black_name, lang)
+    await upsert_user(gs.white_id, None, gs.white_name, lang)
+    await upsert_user(gs.black_id, None, gs.black_name, lang)
 
     # send board to both (each sees their own skin)
     gs.white_chat_id = gs.white_id
@@ -325,7 +354,7 @@ async def ch_pvp_search(cb: CallbackQuery):
     gs.black_chat_id = gs.black_id
     gs.black_message_id = await render_board_msg(gs.black_id, 0, gs, cb.bot, "uk", gs.black_id)
 
-    await cb.message.edit_text("Opponent found. Game sent to your private chat.", reply_markup=_chess_menu(lang))
+    await cb.message.edit_text("Opponent found. Game sent to your private chat.", reply_markup=await _chess_menu(lang))
     await _safe_answer(cb)
 
 
@@ -335,7 +364,7 @@ async def ch_pvp_cancel(cb: CallbackQuery):
     cancel_waiting(cb.from_user.id)
     await cb.message.edit_text(
         f"{t(lang,'brand_title')}\n{t(lang,'ch_choose')}",
-        reply_markup=_chess_menu(lang),
+        reply_markup=await _chess_menu(lang),
     )
     await _safe_answer(cb, "Search cancelled")
 
@@ -350,7 +379,7 @@ async def start_chess_from_message(msg: Message):
         return
 
     init_db()
-    upsert_user(msg.from_user.id, msg.from_user.username, msg.from_user.first_name, None)
+    await upsert_user(msg.from_user.id, msg.from_user.username, msg.from_user.first_name, None)
 
     lobby_msg = await msg.answer("Creating chess lobby...")
     gs = create_lobby(
@@ -379,7 +408,7 @@ async def join_cb(cb: CallbackQuery):
             await _safe_edit(
                 cb.message,
                 f"{t(lang,'brand_title')}\n{t(lang,'ch_choose')}\n\nPrevious game is no longer available. Start a new one.",
-                reply_markup=_chess_menu(lang),
+                reply_markup=await _chess_menu(lang),
             )
         await _safe_answer(cb, "Game not found. Start a new one.", show_alert=True)
         return
@@ -401,7 +430,7 @@ async def join_cb(cb: CallbackQuery):
 
     gs = joined
     text = render_text(gs.white_name, gs.black_name, gs.board, gs.selected, gs.winner, gs.outcome_reason)
-    skin = get_skin_chess(cb.from_user.id)
+    skin = await get_skin_chess(cb.from_user.id)
     kb = build_board_kb(gs.gid, gs.board, gs.selected, skin=skin)
     await _safe_answer(cb, "Game started")
     await _safe_edit(cb.message, text, reply_markup=kb)
@@ -422,7 +451,7 @@ async def board_click(cb: CallbackQuery):
             await _safe_edit(
                 cb.message,
                 f"{t(lang,'brand_title')}\n{t(lang,'ch_choose')}\n\nPrevious game was closed after restart. Start a new game.",
-                reply_markup=_chess_menu(lang),
+                reply_markup=await _chess_menu(lang),
             )
         await _safe_answer(cb, "Game not found. Start a new game.", show_alert=True)
         return
@@ -495,14 +524,17 @@ async def board_click(cb: CallbackQuery):
 
     gs.board.push(mv)
     gs.selected = None
-    _update_game_over(gs)
+    if _update_game_over(gs):
+        await _finish_and_score(gs)
     await _safe_answer(cb)
     await _edit_game_messages(cb, gs)
 
     if gs.vs_ai and not gs.finished and gs.board.turn == chess.BLACK:
         await asyncio.sleep(0.25)
-        ai_mv = choose_move(gs.board, gs.ai_level)
-        if ai_mv is not None:
+        ai_mv = await ai_pool.chess_move(gs.board, gs.ai_level, gid)
+        if gs.finished or gs.board.turn != chess.BLACK:
+            return  # cancelled: resigned or restarted while the AI was thinking
+        if ai_mv is not None and gs.board.is_legal(ai_mv):
             gs.board.push(ai_mv)
         _update_game_over(gs)
         await _edit_game_messages(cb, gs)
@@ -523,7 +555,7 @@ async def control_cb(cb: CallbackQuery):
             await _safe_edit(
                 cb.message,
                 f"{t(lang,'brand_title')}\n{t(lang,'ch_choose')}\n\nPrevious game is no longer available. Start a new one.",
-                reply_markup=_chess_menu(lang),
+                reply_markup=await _chess_menu(lang),
             )
         await _safe_answer(cb, "Game not found. Start a new game.", show_alert=True)
         return
@@ -542,15 +574,22 @@ async def control_cb(cb: CallbackQuery):
         gs.selected = None
         await _safe_answer(cb, "Selection cleared.")
     elif action == "resign":
+        if gs.finished:
+            await _safe_answer(cb, "Game is already finished.")
+            return
         gs.finished = True
         gs.selected = None
         gs.winner = chess.BLACK if uid == gs.white_id else chess.WHITE
         gs.outcome_reason = "Resignation"
+        ai_pool.cancel(gid)
         if gs.is_private:
             end_private_game(gs)
+        await _finish_and_score(gs)
         await _safe_answer(cb, "Resigned.")
     elif action == "new":
+        ai_pool.cancel(gid)
         gs.board.reset()
+        gs.started_ts = time.time()
         gs.selected = None
         gs.finished = False
         gs.winner = None
@@ -0,0 +1,387 @@
+"""Alpha-beta search for the chess AI, on python-chess boards.
+
+- Iterative deepening runs until the depth limit or the time budget
+  (SearchLimits). Each iteration is ordered by the previous one through the
+  transposition table. An iteration cut off by the clock is discarded.
+- Negamax with alpha-beta. A side in check searches one ply deeper.
+- Evaluation: material plus piece-square tables, kept as a running score
+  updated on every push (_Search.push) instead of recounted at the leaves.
+  Only the king's square is scored at the leaf, blended from the middlegame
+  to the endgame table by the remaining material (phase).
+- Transposition table: keyed by the position (_key). Each entry holds
+  (depth, bound, score, best move). It is kept between searches and cleared
+  when it outgrows TT_MAX entries. Mate scores are stored relative to the node.
+- Move ordering: the TT move first, then captures by MVV-LVA (most valuable
+  victim, least valuable attacker), promotions, the two killer moves of the
+  ply and the history score of quiet moves.
+- Quiescence: at depth 0 captures are searched until the position is quiet,
+  with stand-pat and delta pruning.
+- Draws: the fifty-move rule and any repetition of a game or search position.
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+import chess
+from chess import BISHOP, BLACK, KING, KNIGHT, PAWN, QUEEN, ROOK, WHITE
+
+WIN = 100_000
+MATE_BOUND = WIN - 1_000
+INF = WIN + 1
+TT_MAX = 1 << 19
+MAX_PLY = 64
+CHECK_EVERY = 511  # nodes between clock checks
+DELTA_MARGIN = 200
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# ---- evaluation ----
+VALUE = (0, 100, 320, 330, 500, 900, 0)          # by piece type, king 0
+PHASE = (0, 0, 1, 1, 2, 4, 0)                    # non-pawn material, 24 at the start
+PHASE_MAX = 24
+
+# piece-square tables, white's point of view, a8..h8 first (index = square ^ 56)
+_PST = {
+    PAWN: (
+        0, 0, 0, 0, 0, 0, 0, 0,
+        50, 50, 50, 50, 50, 50, 50, 50,
+        10, 10, 20, 30, 30, 20, 10, 10,
+        5, 5, 10, 25, 25, 10, 5, 5,
+        0, 0, 0, 20, 20, 0, 0, 0,
+        5, -5, -10, 0, 0, -10, -5, 5,
+        5, 10, 10, -20, -20, 10, 10, 5,
+        0, 0, 0, 0, 0, 0, 0, 0,
+    ),
+    KNIGHT: (
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20, 0, 0, 0, 0, -20, -40,
+        -30, 0, 10, 15, 15, 10, 0, -30,
+        -30, 5, 15, 20, 20, 15, 5, -30,
+        -30, 0, 15, 20, 20, 15, 0, -30,
+        -30, 5, 10, 15, 15, 10, 5, -30,
+        -40, -20, 0, 5, 5, 0, -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50,
+    ),
+    BISHOP: (
+        -20, -10, -10, -10, -10, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 10, 10, 5, 0, -10,
+        -10, 5, 5, 10, 10, 5, 5, -10,
+        -10, 0, 10, 10, 10, 10, 0, -10,
+        -10, 10, 10, 10, 10, 10, 10, -10,
+        -10, 5, 0, 0, 0, 0, 5, -10,
+        -20, -10, -10, -10, -10, -10, -10, -20,
+    ),
+    ROOK: (
+        0, 0, 0, 0, 0, 0, 0, 0,
+        5, 10, 10, 10, 10, 10, 10, 5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        0, 0, 0, 5, 5, 0, 0, 0,
+    ),
+    QUEEN: (
+        -20, -10, -10, -5, -5, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 5, 5, 5, 0, -10,
+        -5, 0, 5, 5, 5, 5, 0, -5,
+        0, 0, 5, 5, 5, 5, 0, -5,
+        -10, 5, 5, 5, 5, 5, 0, -10,
+        -10, 0, 5, 0, 0, 0, 0, -10,
+        -20, -10, -10, -5, -5, -10, -10, -20,
+    ),
+}
+_KING_MG = (
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+    20, 20, 0, 0, 0, 0, 20, 20,
+    20, 30, 10, 0, 0, 10, 30, 20,
+)
+_KING_EG = (
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10, 0, 0, -10, -20, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -30, 0, 0, 0, 0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50,
+)
+
+
+def _signed_tables() -> Dict[bool, List[List[int]]]:
+    """[color][piece type][square] -> material + PST, signed from white's point of view."""
+    out = {}
+    for color, sign, flip in ((WHITE, 1, 56), (BLACK, -1, 0)):
+        by_type = [[0] * 64 for _ in range(7)]
+        for pt, table in _PST.items():
+            by_type[pt] = [sign * (VALUE[pt] + table[sq ^ flip]) for sq in range(64)]
+        out[color] = by_type
+    return out
+
+
+_PSQ = _signed_tables()
+
+
+def material_pst(board: chess.Board) -> Tuple[int, int]:
+    """(score from white's point of view without the kings, phase) counted from scratch."""
+    score = phase = 0
+    for sq, piece in board.piece_map().items():
+        score += _PSQ[piece.color][piece.piece_type][sq]
+        phase += PHASE[piece.piece_type]
+    return score, phase
+
+
+def _key(b: chess.Board) -> tuple:
+    return (b.pawns, b.knights, b.bishops, b.rooks, b.queens, b.kings,
+            b.occupied_co[WHITE], b.turn, b.castling_rights, b.ep_square)
+
+
+# ---- limits ----
+class SearchLimits(NamedTuple):
+    depth: int = 64                      # plies
+    time_sec: Optional[float] = None     # wall clock budget per move
+
+
+@dataclass(slots=True)
+class SearchResult:
+    move: Optional[chess.Move]
+    score: int
+    depth: int
+    nodes: int
+    seconds: float
+
+
+class _Timeout(Exception):
+    pass
+
+
+_TT: Dict[tuple, Tuple[int, int, int, Optional[chess.Move]]] = {}
+
+
+def clear_tt() -> None:
+    _TT.clear()
+
+
+class _Search:
+    __slots__ = ("board", "deadline", "nodes", "killers", "history", "score", "phase", "stack", "seen")
+
+    def __init__(self, board: chess.Board, deadline: Optional[float], seen: Set[tuple]):
+        self.board = board
+        self.deadline = deadline
+        self.nodes = 0
+        self.killers: List[List[Optional[chess.Move]]] = [[None, None] for _ in range(MAX_PLY + 2)]
+        self.history: Dict[Tuple[int, int], int] = {}
+        self.score, self.phase = material_pst(board)
+        self.stack: List[Tuple[int, int]] = []
+        self.seen = seen  # positions of the game and of the current search path
+
+    # -- incremental make / unmake --
+    def push(self, mv: chess.Move) -> None:
+        b = self.board
+        fr, to = mv.from_square, mv.to_square
+        psq = _PSQ[b.turn]
+        pt = b.piece_type_at(fr)
+        new_pt = mv.promotion or pt
+        d = psq[new_pt][to] - psq[pt][fr]
+        phase = self.phase + PHASE[new_pt] - PHASE[pt]
+        cap = b.piece_type_at(to)
+        if cap:
+            d -= _PSQ[not b.turn][cap][to]
+            phase -= PHASE[cap]
+        elif pt == PAWN and to == b.ep_square:
+            d -= _PSQ[not b.turn][PAWN][to ^ 8]
+        elif pt == KING and abs(to - fr) == 2:  # castling: the rook moves too
+            r_fr, r_to = (fr + 3, fr + 1) if to > fr else (fr - 4, fr - 1)
+            d += psq[ROOK][r_to] - psq[ROOK][r_fr]
+        self.stack.append((self.score, self.phase))
+        self.score += d
+        self.phase = phase
+        b.push(mv)
+
+    def pop(self) -> None:
+        self.board.pop()
+        self.score, self.phase = self.stack.pop()
+
+    def evaluate(self) -> int:
+        """Static score for the side to move (centipawns)."""
+        b = self.board
+        ph = min(self.phase, PHASE_MAX)
+        wk, bk = b.king(WHITE) ^ 56, b.king(BLACK)
+        king = ((_KING_MG[wk] - _KING_MG[bk]) * ph + (_KING_EG[wk] - _KING_EG[bk]) * (PHASE_MAX - ph)) // PHASE_MAX
+        score = self.score + king
+        return score if b.turn == WHITE else -score
+
+    def ordered(self, moves: List[chess.Move], tt_move: Optional[chess.Move], ply: int) -> List[chess.Move]:
+        b = self.board
+        k1, k2 = self.killers[ply]
+        history = self.history
+        ep = b.ep_square
+
+        def key(mv: chess.Move) -> int:
+            if mv == tt_move:
+                return -1_000_000
+            to = mv.to_square
+            victim = b.piece_type_at(to)
+            if victim or (to == ep and b.piece_type_at(mv.from_square) == PAWN):
+                return -10_000 - 10 * (victim or PAWN) + b.piece_type_at(mv.from_square)
+            if mv.promotion:
+                return -9_000 - mv.promotion
+            if mv == k1:
+                return -8_000
+            if mv == k2:
+                return -7_000
+            return -min(history.get((mv.from_square, to), 0), 6_999)
+
+        moves.sort(key=key)
+        return moves
+
+    def quiesce(self, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        if not self.nodes & CHECK_EVERY and self.deadline is not None and time.perf_counter() > self.deadline:
+            raise _Timeout
+        stand = self.evaluate()
+        if stand >= beta or ply >= MAX_PLY:
+            return stand
+        if stand > alpha:
+            alpha = stand
+        b = self.board
+        caps = []
+        for mv in b.generate_legal_captures():
+            victim = b.piece_type_at(mv.to_square) or PAWN
+            if not mv.promotion and stand + VALUE[victim] + DELTA_MARGIN <= alpha:
+                continue  # even winning the piece cannot raise alpha
+            caps.append((-10 * victim + b.piece_type_at(mv.from_square), mv))
+        caps.sort(key=lambda c: c[0])
+        best = stand
+        for _k, mv in caps:
+            self.push(mv)
+            val = -self.quiesce(-beta, -alpha, ply + 1)
+            self.pop()
+            if val > best:
+                best = val
+                if val > alpha:
+                    alpha = val
+                    if alpha >= beta:
+                        break
+        return best
+
+    def negamax(self, depth: int, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        if not self.nodes & CHECK_EVERY and self.deadline is not None and time.perf_counter() > self.deadline:
+            raise _Timeout
+        b = self.board
+        key = _key(b)
+        if b.halfmove_clock >= 100 or key in self.seen:
+            return 0
+        in_check = b.is_check()
+        if in_check:
+            depth += 1
+        if depth <= 0 or ply >= MAX_PLY:
+            return self.quiesce(alpha, beta, ply)
+
+        entry = _TT.get(key)
+        tt_move = None
+        alpha0 = alpha
+        if entry is not None:
+            e_depth, bound, score, tt_move = entry
+            if e_depth >= depth:
+                if score > MATE_BOUND:
+                    score -= ply
+                elif score < -MATE_BOUND:
+                    score += ply
+                if bound == EXACT:
+                    return score
+                if bound == LOWER and score > alpha:
+                    alpha = score
+                elif bound == UPPER and score < beta:
+                    beta = score
+                if alpha >= beta:
+                    return score
+
+        moves = list(b.generate_legal_moves())
+        if not moves:
+            return -WIN + ply if in_check else 0
+
+        self.seen.add(key)
+        best, best_move = -INF, None
+        for mv in self.ordered(moves, tt_move, ply):
+            self.push(mv)
+            val = -self.negamax(depth - 1, -beta, -alpha, ply + 1)
+            self.pop()
+            if val > best:
+                best, best_move = val, mv
+                if val > alpha:
+                    alpha = val
+                    if alpha >= beta:
+                        if not b.is_capture(mv) and not mv.promotion:
+                            ks = self.killers[ply]
+                            if ks[0] != mv:
+                                ks[1], ks[0] = ks[0], mv
+                            hk = (mv.from_square, mv.to_square)
+                            self.history[hk] = self.history.get(hk, 0) + depth * depth
+                        break
+        self.seen.discard(key)
+
+        bound = UPPER if best <= alpha0 else LOWER if best >= beta else EXACT
+        stored = best + ply if best > MATE_BOUND else best - ply if best < -MATE_BOUND else best
+        if len(_TT) >= TT_MAX:
+            _TT.clear()
+        _TT[key] = (depth, bound, stored, best_move)
+        return best
+
+
+def _game_positions(board: chess.Board) -> Set[tuple]:
+    """Keys of the positions before the current one since the last capture or pawn move."""
+    seen: Set[tuple] = set()
+    b = board.copy()
+    for _ in range(min(b.halfmove_clock, len(b.move_stack))):
+        b.pop()
+        seen.add(_key(b))
+    return seen
+
+
+def search(board: chess.Board, limits: SearchLimits = SearchLimits()) -> SearchResult:
+    """Best move for the side to move on `board` (the board is not changed)."""
+    t0 = time.perf_counter()
+    deadline = t0 + limits.time_sec if limits.time_sec is not None else None
+    moves = list(board.legal_moves)
+    if not moves:
+        return SearchResult(None, -WIN if board.is_check() else 0, 0, 1, time.perf_counter() - t0)
+    if len(moves) == 1:
+        return SearchResult(moves[0], 0, 0, 1, time.perf_counter() - t0)
+
+    s = _Search(board.copy(stack=False), deadline, _game_positions(board))
+    s.seen.add(_key(board))
+    result = SearchResult(moves[0], 0, 0, 0, 0.0)
+    best_move = None
+    for depth in range(1, limits.depth + 1):
+        try:
+            moves = s.ordered(moves, best_move, 0)
+            alpha, best, best_mv = -INF, -INF, moves[0]
+            for mv in moves:
+                s.push(mv)
+                val = -s.negamax(depth - 1, -INF, -alpha, 1)
+                s.pop()
+                if val > best:
+                    best, best_mv = val, mv
+                    alpha = max(alpha, val)
+        except _Timeout:
+            break
+        best_move = best_mv
+        result = SearchResult(best_move, best, depth, s.nodes, 0.0)
+        if abs(best) > MATE_BOUND:
+            break  # forced win or loss found
+        if deadline is not None and time.perf_counter() > t0 + (deadline - t0) / 2:
+            break  # the next iteration would not finish
+    result.nodes = s.nodes
+    result.seconds = time.perf_counter() - t0
+    return result
@@ -1,15 +1,20 @@
 from __future__ import annotations
 
+import json
 import random
 import secrets
 import time
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from typing import Dict, Optional
 
 import chess
 
+from app import ai_pool, live_state
+from app.config import MATCH_IDLE_TTL_SEC, MATCH_REGISTRY_MAX
+from app.registry import BoundedRegistry
 
-@dataclass
+
+@dataclass(slots=True)
 class GameSession:
     gid: str
 
@@ -29,7 +34,7 @@ class GameSession:
     black_chat_id: int = 0
     black_message_id: int = 0
 
-    # game state
+    # game state: a full chess.Board, its move stack backs repetition and draw claims
     board: chess.Board = field(default_factory=chess.Board)
     selected: Optional[int] = None
 
@@ -42,6 +47,7 @@ class GameSession:
     ai_level: str = "easy"
 
     last_activity: float = field(default_factory=lambda: time.time())
+    started_ts: float = field(default_factory=lambda: time.time())
     tournament_id: int = 0
     tmatch_id: int = 0
 
@@ -53,7 +59,7 @@ class GameSession:
         return self.white_chat_id != 0 or self.black_chat_id != 0
 
 
-@dataclass
+@dataclass(slots=True)
 class Waiting:
     user_id: int
     name: str
@@ -62,7 +68,11 @@ class Waiting:
 
 class MemoryStore:
     def __init__(self):
-        self.games: Dict[str, GameSession] = {}
+        # finished and abandoned sessions expire after MATCH_IDLE_TTL_SEC without a move
+        self.games: Dict[str, GameSession] = BoundedRegistry(
+            "chess_games", MATCH_IDLE_TTL_SEC, MATCH_REGISTRY_MAX,
+            activity=lambda gs: gs.last_activity, on_evict=self._evicted,
+        )
         self.lobby_by_chat: Dict[int, str] = {}
         self.active_by_user: Dict[int, str] = {}
         self.waiting: Optional[Waiting] = None
@@ -70,6 +80,14 @@ class MemoryStore:
     def new_gid(self) -> str:
         return secrets.token_hex(3)
 
+    def _evicted(self, gid: str, gs: GameSession) -> None:
+        for uid in (gs.white_id, gs.black_id):
+            if self.active_by_user.get(uid) == gid:
+                del self.active_by_user[uid]
+        if self.lobby_by_chat.get(gs.chat_id) == gid:
+            del self.lobby_by_chat[gs.chat_id]
+        live_state.touch("chess", gid)
+
 
 STORE = MemoryStore()
 
@@ -86,6 +104,7 @@ def create_lobby(chat_id: int, message_id: int, creator_id: int, creator_name: s
     )
     STORE.games[gid] = gs
     STORE.lobby_by_chat[chat_id] = gid
+    live_state.touch("chess", gid)
     return gs
 
 
@@ -109,7 +128,9 @@ def join_lobby(chat_id: int, joiner_id: int, joiner_name: str) -> Optional[GameS
     gs.black_id = int(joiner_id)
     gs.black_name = str(joiner_name)
     STORE.lobby_by_chat.pop(chat_id, None)
+    gs.started_ts = time.time()
     gs.touch()
+    live_state.touch("chess", gid)
     return gs
 
 
@@ -124,6 +145,7 @@ def cancel_waiting(user_id: int) -> bool:
     w = STORE.waiting
     if w and w.user_id == int(user_id):
         STORE.waiting = None
+        live_state.touch("chess_wait", 0)
         return True
     return False
 
@@ -132,12 +154,14 @@ def enqueue_or_match(user_id: int, name: str) -> tuple[str, Optional[GameSession
     uid = int(user_id)
     if STORE.waiting is None:
         STORE.waiting = Waiting(uid, name)
+        live_state.touch("chess_wait", 0)
         return "waiting", None
     if STORE.waiting.user_id == uid:
         return "waiting", None
 
     other = STORE.waiting
     STORE.waiting = None
+    live_state.touch("chess_wait", 0)
 
     gid = STORE.new_gid()
     if random.random() < 0.5:
@@ -158,6 +182,7 @@ def enqueue_or_match(user_id: int, name: str) -> tuple[str, Optional[GameSession
     STORE.games[gid] = gs
     STORE.active_by_user[white_id] = gid
     STORE.active_by_user[black_id] = gid
+    live_state.touch("chess", gid)
     return "matched", gs
 
 
@@ -190,6 +215,7 @@ def create_private_match(
     STORE.games[gid] = gs
     STORE.active_by_user[white_id] = gid
     STORE.active_by_user[black_id] = gid
+    live_state.touch("chess", gid)
     return gs
 
 
@@ -197,7 +223,61 @@ def end_private_game(gs: GameSession):
     for uid in (gs.white_id, gs.black_id):
         if int(uid) > 0:
             STORE.active_by_user.pop(int(uid), None)
+    ai_pool.cancel(gs.gid)
+    live_state.touch("chess", gs.gid)
 
 
 def get_game(gid: str) -> Optional[GameSession]:
     return STORE.games.get(gid)
+
+
+# ----- Crash-safe resume (app.live_state) -----
+# A snapshot is the session as JSON, with the board as its current FEN plus
+# the start FEN and UCI moves (the move stack is what the games ledger and
+# repetition draws need). Finished games are not kept.
+def _live_encode(gs: GameSession) -> Optional[str]:
+    if gs.finished:
+        return None
+    state = {f.name: getattr(gs, f.name) for f in fields(gs) if f.name != "board"}
+    state["fen"] = gs.board.fen()
+    state["root"] = gs.board.root().fen()
+    state["uci"] = " ".join(m.uci() for m in gs.board.move_stack)
+    state["active"] = [uid for uid in (gs.white_id, gs.black_id) if uid and STORE.active_by_user.get(uid) == gs.gid]
+    state["lobby"] = bool(gs.chat_id) and STORE.lobby_by_chat.get(gs.chat_id) == gs.gid
+    return json.dumps(state, separators=(",", ":"), ensure_ascii=False)
+
+
+def _live_board(fen: str, root: str, uci: str) -> chess.Board:
+    try:
+        board = chess.Board(root)
+        for move in uci.split():
+            board.push_uci(move)
+        if board.fen() == fen:
+            return board
+    except ValueError:
+        pass
+    return chess.Board(fen)
+
+
+def _live_restore(gid: str, state: str, bot=None) -> None:
+    d = json.loads(state)
+    active, lobby = d.pop("active"), d.pop("lobby")
+    d["board"] = _live_board(d.pop("fen"), d.pop("root"), d.pop("uci"))
+    gs = GameSession(**d)
+    STORE.games[gid] = gs
+    for uid in active:
+        STORE.active_by_user[int(uid)] = gid
+    if lobby:
+        STORE.lobby_by_chat[gs.chat_id] = gid
+
+
+def _live_wait_restore(key: str, state: str, bot=None) -> None:
+    STORE.waiting = Waiting(*json.loads(state))
+
+
+live_state.register("chess", STORE.games.get, _live_encode, _live_restore)
+live_state.register(
+    "chess_wait", lambda key: STORE.waiting,
+    lambda w: json.dumps([w.user_id, w.name, w.ts], ensure_ascii=False),
+    _live_wait_restore,
+)
@@ -124,9 +124,15 @@ NONVIP_FALLBACK_AI_SEC = 25
 DEFAULT_RATING = 1000
 SEASON_LENGTH_DAYS = 30
 SOFT_RESET_FACTOR = 0.5
+# Glicko-2 (rd / volatility) is rated in batches, once per period
+RATING_PERIOD_HOURS = 24
+RATING_PERIOD_BACKEND = "glicko2"  # app.rating.BACKENDS
+# live games are snapshotted to SQLite once per tick (app.live_state)
+LIVE_STATE_FLUSH_SEC = 0.5
 
 # ================== WEEKLY TOP / PRIZES ==================
 TOP_N = 100
+WEEK_LENGTH_DAYS = 5
 DEFAULT_PRIZE_POOL = 100
 
 # ================== ANTI-BOOST ==================
@@ -136,8 +142,31 @@ ANTI_BOOST_MAX_RATED = 3
 # ================== PVP ==================
 PVP_INACTIVITY_SEC = 60
 
+# ================== AI ==================
+# checkers (app.checkers_game.search): "normal" searches a fixed depth in full
+# turns, "hard" deepens until its time budget runs out
+CK_AI_NORMAL_DEPTH = 3
+CK_AI_HARD_SEC = 0.5
+CK_AI_HARD_MAX_DEPTH = 32
+# checkers opening book and endgame table (app.checkers_game.knowledge), written by
+# scripts/gen_checkers_knowledge.py; both ship in assets (the table covers <= 3 pieces)
+CK_BOOK_PATH = _env("CK_BOOK_PATH", str(Path(__file__).resolve().parent / "assets" / "checkers_book.bin"))
+CK_EGTB_PATH = _env("CK_EGTB_PATH", str(Path(__file__).resolve().parent / "assets" / "checkers_egtb.bin"))
+# chess (app.chess_game.search): "hard" deepens in plies until its time budget runs out
+CH_AI_HARD_SEC = 1.0
+CH_AI_HARD_MAX_DEPTH = 32
+# worker processes for the AI moves (app.ai_pool); 0 runs them on the event loop
+AI_POOL_WORKERS = int(_env("AI_POOL_WORKERS", "1"))
+AI_POOL_MAX_PENDING = 8        # queued + running requests; past that the move is an inline "easy" one
+AI_POOL_TIMEOUT_SEC = 5.0      # then the move is an inline "easy" one and the pool is restarted
+
 # ================== LIMITS ==================
 CLICK_RATE_LIMIT_SEC = 0.4
+# in-memory registries (app.registry): idle TTL in seconds and size cap
+REGISTRY_SWEEP_SEC = 60
+MATCH_IDLE_TTL_SEC = 6 * 3600  # finished or abandoned games
+MATCH_REGISTRY_MAX = 50_000
+ARENA_IDLE_TTL_SEC = 14 * 86400
 
 # ================== TOURNAMENTS (DAILY) ==================
 # Daily tournaments time is in Europe/Uzhgorod (server local time should match, but we compute offset-safe).
@@ -1,11 +1,19 @@
 # app/db.py
+import json
+import logging
+import math
 import sqlite3
 import random
+import threading
 import uuid as _uuid
 import os
 from pathlib import Path
 from datetime import datetime, timezone, timedelta
 import time
+from dataclasses import dataclass, field
+
+from app import user_snapshot
+from app.db_pool import add_write_listener, get_pool
 
 _DIR = os.getenv("RAILWAY_VOLUME_MOUNT_PATH", str(Path(__file__).resolve().parent))
 _DEFAULT_DB_PATH = Path(_DIR) / "sm_arena.db"
@@ -21,29 +29,54 @@ DEFAULT_CHAT_URL = "https://t.me/sm_arena"
 
 
 def _con():
-    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    con = sqlite3.connect(DB_PATH)
-    con.row_factory = sqlite3.Row
-    con.execute("PRAGMA journal_mode=WAL;")
-    return con
+    # Pooled connection; con.close() hands it back to the pool (see app.db_pool).
+    return get_pool(DB_PATH).acquire()
+
+
+def pool_stats() -> dict:
+    return get_pool(DB_PATH).stats()
+
+
+# Any committed write drops the current update's cached users row.
+add_write_listener(user_snapshot.invalidate)
+
+# Leaderboard change hooks: fn(family, user_ids) after writes that can move a
+# user on a board. family "users" covers rating / season / weekly / referral
+# columns and names, "tourn" the tournament_rating table; user_ids=None means
+# the whole family changed (weekly / season resets).
+_BOARD_LISTENERS: list = []
+
+
+def add_board_listener(fn) -> None:
+    if fn not in _BOARD_LISTENERS:
+        _BOARD_LISTENERS.append(fn)
+
+
+def _boards_changed(family: str, user_ids=None) -> None:
+    ids = None if user_ids is None else [int(u) for u in user_ids]
+    for fn in _BOARD_LISTENERS:
+        try:
+            fn(family, ids)
+        except Exception:
+            logging.getLogger("sm-arena.db").exception("board listener failed")
 
 def set_skin_ck(user_id: int, skin: str):
     init_db()
     con = _con()
     try:
-        con.execute("UPDATE users SET skin_ck=? WHERE user_id=?", (str(skin), int(user_id)))
+        con.execute("UPDATE user_cosmetics SET skin_ck=? WHERE user_id=?", (str(skin), int(user_id)))
         con.commit()
     finally:
         con.close()
 
 def get_skin_ck(user_id: int) -> str:
-    u = get_user(user_id)
+    u = get_user_fields(user_id, "skin_ck")
     s = (u or {}).get("skin_ck") or "default"
     return str(s)
 
 def get_skin_chess(user_id: int) -> str:
     """Returns composite chess skin string: '<pieces>:<board>'"""
-    u = get_user(user_id) or {}
+    u = get_user_fields(user_id, "skin_chess_pieces", "skin_chess_board") or {}
     pieces = str(u.get("skin_chess_pieces") or "classic")
     board  = str(u.get("skin_chess_board") or "classic")
     return f"{pieces}:{board}"
@@ -52,7 +85,7 @@ def set_skin_chess_pieces(user_id: int, value: str):
     init_db()
     con = _con()
     try:
-        con.execute("UPDATE users SET skin_chess_pieces=? WHERE user_id=?", (str(value), int(user_id)))
+        con.execute("UPDATE user_cosmetics SET skin_chess_pieces=? WHERE user_id=?", (str(value), int(user_id)))
         con.commit()
     finally:
         con.close()
@@ -61,7 +94,7 @@ def set_skin_chess_board(user_id: int, value: str):
     init_db()
     con = _con()
     try:
-        con.execute("UPDATE users SET skin_chess_board=? WHERE user_id=?", (str(value), int(user_id)))
+        con.execute("UPDATE user_cosmetics SET skin_chess_board=? WHERE user_id=?", (str(value), int(user_id)))
         con.commit()
     finally:
         con.close()
@@ -130,10 +163,7 @@ def _ensure_vip_columns(con: sqlite3.Connection):
     _ensure_user_columns(con)
 
 
-def init_db():
-    con = _con()
-    try:
-        con.executescript("""
+_SCHEMA_V1 = """
         CREATE TABLE IF NOT EXISTS meta(
             k TEXT PRIMARY KEY,
             v TEXT NOT NULL
@@ -263,51 +293,649 @@ CREATE TABLE IF NOT EXISTS withdrawals(
 );
 
 
-        """)
+        """
 
-        # Migrations for new user activity columns
-        try:
-            con.execute("ALTER TABLE users ADD COLUMN last_daily_bonus_ts REAL NOT NULL DEFAULT 0")
-        except sqlite3.OperationalError: pass
-        try:
-            con.execute("ALTER TABLE users ADD COLUMN last_promo_msg_ts REAL NOT NULL DEFAULT 0")
-        except sqlite3.OperationalError: pass
 
-        _ensure_user_columns(con)
-        _ensure_week_history_columns(con)
+def _m001_baseline(con: sqlite3.Connection):
+    """Tables and columns that used to be ensured on every init_db() call."""
+    con.executescript(_SCHEMA_V1)
 
-        # welcome bonus for new users (and old accounts with 0 games)
-        try:
-            con.execute("UPDATE users SET coins=60 WHERE coins=0 AND total_games=0 AND total_games_ck=0")
-        except Exception:
-            pass
+    # Migrations for new user activity columns
+    try:
+        con.execute("ALTER TABLE users ADD COLUMN last_daily_bonus_ts REAL NOT NULL DEFAULT 0")
+    except sqlite3.OperationalError: pass
+    try:
+        con.execute("ALTER TABLE users ADD COLUMN last_promo_msg_ts REAL NOT NULL DEFAULT 0")
+    except sqlite3.OperationalError: pass
 
-        # Forcing news/chat links update to sm_arena as requested
-        _meta_set(con, "news_url", "https://t.me/sm_arena")
-        _meta_set(con, "chat_url", "https://t.me/sm_arena")
-        
-        # defaults
-        _meta_set(con, "week_start_ts", str(time.time()))
-        _meta_set(con, "prize_pool", _meta_get(con, "prize_pool", "100"))
-        _meta_set(con, "season_start_ts", _meta_get(con, "season_start_ts", str(time.time())))
-        _meta_set(con, "season_id", _meta_get(con, "season_id", "1"))
-        _meta_set(con, "sponsor_text", _meta_get(con, "sponsor_text", ""))
-        _meta_set(con, "sponsor_url", _meta_get(con, "sponsor_url", ""))
-        # payments orders (LiqPay)
-        con.execute("""CREATE TABLE IF NOT EXISTS orders(
-            order_id TEXT PRIMARY KEY,
-            user_id INTEGER NOT NULL,
-            sku TEXT NOT NULL,
-            amount_minor INTEGER NOT NULL,
-            currency TEXT NOT NULL,
-            status TEXT NOT NULL,
-            created_ts REAL NOT NULL,
-            paid_ts REAL
-        );""")
+    _ensure_user_columns(con)
+    _ensure_week_history_columns(con)
+    _ensure_tournament_columns(con)
+    _ensure_tournament_players_columns(con)
+    _ensure_arena_revenue_table(con)
+
+    # payments orders (LiqPay)
+    con.execute("""CREATE TABLE IF NOT EXISTS orders(
+        order_id TEXT PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        sku TEXT NOT NULL,
+        amount_minor INTEGER NOT NULL,
+        currency TEXT NOT NULL,
+        status TEXT NOT NULL,
+        created_ts REAL NOT NULL,
+        paid_ts REAL
+    );""")
+
+    # welcome bonus for new users (and old accounts with 0 games)
+    try:
+        con.execute("UPDATE users SET coins=60 WHERE coins=0 AND total_games=0 AND total_games_ck=0")
+    except Exception:
+        pass
+
+
+def _m002_meta_defaults(con: sqlite3.Connection):
+    """Seed meta defaults once instead of rewriting them on every call."""
+    # Forcing news/chat links update to sm_arena as requested
+    _meta_set(con, "news_url", "https://t.me/sm_arena")
+    _meta_set(con, "chat_url", "https://t.me/sm_arena")
+
+    # defaults (week_start_ts is kept if present, otherwise the week would never end)
+    _meta_set(con, "week_start_ts", _meta_get(con, "week_start_ts", str(time.time())))
+    _meta_set(con, "prize_pool", _meta_get(con, "prize_pool", "100"))
+    _meta_set(con, "season_start_ts", _meta_get(con, "season_start_ts", str(time.time())))
+    _meta_set(con, "season_id", _meta_get(con, "season_id", "1"))
+    _meta_set(con, "sponsor_text", _meta_get(con, "sponsor_text", ""))
+    _meta_set(con, "sponsor_url", _meta_get(con, "sponsor_url", ""))
+
+
+# Leaderboard indexes. The "overall" boards sort by an expression, so they get
+# expression indexes (queries must use the exact same expression). Weekly boards
+# only list players with week_games > 0, so they get partial indexes.
+_LEADERBOARD_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_users_top_xo ON users(rating DESC, user_id);
+CREATE INDEX IF NOT EXISTS idx_users_top_ck ON users(rating_ck DESC, user_id);
+CREATE INDEX IF NOT EXISTS idx_users_top_overall ON users((rating + rating_ck) DESC, user_id);
+CREATE INDEX IF NOT EXISTS idx_users_season_xo ON users(season_rating DESC, user_id);
+CREATE INDEX IF NOT EXISTS idx_users_season_ck ON users(season_rating_ck DESC, user_id);
+CREATE INDEX IF NOT EXISTS idx_users_season_overall ON users((season_rating + season_rating_ck) DESC, user_id);
+CREATE INDEX IF NOT EXISTS idx_users_week_xo ON users(week_wins DESC, rating DESC, week_games, user_id) WHERE week_games > 0;
+CREATE INDEX IF NOT EXISTS idx_users_week_ck ON users(week_wins_ck DESC, rating_ck DESC, week_games_ck, user_id) WHERE week_games_ck > 0;
+CREATE INDEX IF NOT EXISTS idx_tourn_rating_top ON tournament_rating(game, points DESC, updated_ts DESC);
+"""
+
+
+def _m003_leaderboard_indexes(con: sqlite3.Connection):
+    con.executescript(_LEADERBOARD_INDEXES)
+
+
+def _m004_rank_covering_indexes(con: sqlite3.Connection):
+    # get_rank() counts index ranges on the overall boards; carrying the summed
+    # columns makes those counts covering (no table lookups per counted row).
+    con.executescript("""
+DROP INDEX IF EXISTS idx_users_top_overall;
+CREATE INDEX idx_users_top_overall ON users((rating + rating_ck) DESC, user_id, rating, rating_ck);
+DROP INDEX IF EXISTS idx_users_season_overall;
+CREATE INDEX idx_users_season_overall ON users((season_rating + season_rating_ck) DESC, user_id, season_rating, season_rating_ck);
+""")
+
+
+# ---------- Narrow user tables (migrations 5 and 6) ----------
+# The wide users row is split by access pattern; every user has one row in
+# each table. "users" stays as a view over all of them (with INSTEAD OF
+# triggers) for old code and ad-hoc queries. Hot paths read and write the
+# narrow tables directly. Columns: (name, type, default or None).
+# Layout written by migration 5; kept as-is so that step stays replayable.
+_USER_TABLES_V5: dict[str, tuple[tuple[str, str, str | None], ...]] = {
+    "user_profile": (
+        ("username", "TEXT", None),
+        ("first_name", "TEXT", None),
+        ("lang", "TEXT", None),
+        ("coins", "INTEGER NOT NULL", "60"),
+        ("vip_until", "REAL NOT NULL", "0"),
+        ("shadowban", "INTEGER NOT NULL", "0"),
+        ("active_game", "TEXT NOT NULL", "'xo'"),
+        ("updated_ts", "REAL NOT NULL", "0"),
+        ("last_daily_bonus_ts", "REAL NOT NULL", "0"),
+    ),
+    "user_stats": (
+        ("rating", "INTEGER NOT NULL", "1000"),
+        ("total_wins", "INTEGER NOT NULL", "0"),
+        ("total_games", "INTEGER NOT NULL", "0"),
+        ("week_wins", "INTEGER NOT NULL", "0"),
+        ("week_games", "INTEGER NOT NULL", "0"),
+        ("rating_ck", "INTEGER NOT NULL", "1000"),
+        ("total_wins_ck", "INTEGER NOT NULL", "0"),
+        ("total_games_ck", "INTEGER NOT NULL", "0"),
+        ("week_wins_ck", "INTEGER NOT NULL", "0"),
+        ("week_games_ck", "INTEGER NOT NULL", "0"),
+        ("season_rating", "INTEGER NOT NULL", "1000"),
+        ("season_rating_ck", "INTEGER NOT NULL", "1000"),
+        ("season_wins", "INTEGER NOT NULL", "0"),
+        ("season_games", "INTEGER NOT NULL", "0"),
+        ("season_wins_ck", "INTEGER NOT NULL", "0"),
+        ("season_games_ck", "INTEGER NOT NULL", "0"),
+    ),
+    "user_cosmetics": (
+        ("skin", "TEXT NOT NULL", "'default'"),
+        ("skin_ck", "TEXT NOT NULL", "'default'"),
+        ("skin_board", "TEXT NOT NULL", "'default'"),
+        ("skin_cell", "TEXT NOT NULL", "'default'"),
+        ("skin_board_ck", "TEXT NOT NULL", "'default'"),
+        ("skin_cell_ck", "TEXT NOT NULL", "'default'"),
+        ("skin_chess_pieces", "TEXT NOT NULL", "'classic'"),
+        ("skin_chess_board", "TEXT NOT NULL", "'classic'"),
+        ("wallpaper", "TEXT NOT NULL", "'default'"),
+    ),
+    "user_battle_pass": (
+        ("bp_xp", "INTEGER NOT NULL", "0"),
+        ("bp_level", "INTEGER NOT NULL", "1"),
+        ("bp_claimed_free", "TEXT NOT NULL", "'[]'"),
+        ("bp_claimed_premium", "TEXT NOT NULL", "'[]'"),
+        ("quest_mask", "INTEGER NOT NULL", "0"),
+        ("quest_mask_ck", "INTEGER NOT NULL", "0"),
+    ),
+    "user_tournament": (
+        ("tourn_tickets", "INTEGER NOT NULL", "0"),
+        ("tourn_ticket_last_day", "TEXT NOT NULL", "''"),
+        ("tourn_streak", "INTEGER NOT NULL", "0"),
+        ("tourn_last_day", "TEXT NOT NULL", "''"),
+        ("tourn_streak_ck", "INTEGER NOT NULL", "0"),
+        ("tourn_last_day_ck", "TEXT NOT NULL", "''"),
+        ("tourn_points", "INTEGER NOT NULL", "0"),
+        ("tourn_points_ck", "INTEGER NOT NULL", "0"),
+    ),
+    "user_marketing": (
+        ("ref_count", "INTEGER NOT NULL", "0"),
+        ("ref_earned", "INTEGER NOT NULL", "0"),
+        ("last_promo_msg_ts", "REAL NOT NULL", "0"),
+        ("vip_last_daily_ts", "REAL", None),
+        ("vip_last_weekly_pack_ts", "REAL", None),
+    ),
+}
+# Current layout: migration 6 moved user_stats and the quest masks into
+# user_game_stats (one row per user and game).
+USER_TABLES: dict[str, tuple[tuple[str, str, str | None], ...]] = {
+    t: tuple(c for c in cols if not c[0].startswith("quest_mask"))
+    for t, cols in _USER_TABLES_V5.items() if t != "user_stats"
+}
+USER_COLUMN_TABLE: dict[str, str] = {
+    name: table for table, cols in USER_TABLES.items() for name, _t, _d in cols
+}
+
+# Per-game counters and ratings: user_game_stats(user_id, game, ...). Each
+# user also has a game="overall" row whose rating / season_rating are the sums
+# over OVERALL_GAMES, kept current by triggers, so the overall boards are an
+# index range like any single game. Adding a game is a new GAMES entry, not
+# new columns.
+GAMES = ("xo", "checkers", "chess")
+OVERALL_GAMES = ("xo", "checkers")
+GAME_STATS_COLUMNS: tuple[tuple[str, str, str], ...] = (
+    ("rating", "INTEGER NOT NULL", "1000"),
+    ("total_wins", "INTEGER NOT NULL", "0"),
+    ("total_games", "INTEGER NOT NULL", "0"),
+    ("week_wins", "INTEGER NOT NULL", "0"),
+    ("week_games", "INTEGER NOT NULL", "0"),
+    ("season_rating", "INTEGER NOT NULL", "1000"),
+    ("season_wins", "INTEGER NOT NULL", "0"),
+    ("season_games", "INTEGER NOT NULL", "0"),
+    ("quest_mask", "INTEGER NOT NULL", "0"),
+)
+GAME_STATS_DEFAULTS: dict[str, int] = {n: int(d) for n, _t, d in GAME_STATS_COLUMNS}
+# legacy users-view column suffix per game (rating, rating_ck, ...)
+_LEGACY_STATS_SUFFIX = {"xo": "", "checkers": "_ck"}
+
+# Weekly counters carry the week they were written in (user_game_stats.week_epoch;
+# meta "week_epoch" is the current week). A row stamped with an older week reads
+# as zero and is rolled over by its next write, so closing a week is a meta bump
+# instead of an UPDATE over every row (see reset_week_if_needed).
+_WEEK_COLUMNS = ("week_wins", "week_games", "quest_mask")
+_CUR_WEEK = "(SELECT CAST(v AS INTEGER) FROM meta WHERE k='week_epoch')"
+
+
+def _week_col(col: str, alias: str = "") -> str:
+    """SQL for the current-week value of a weekly column (0 for an older week)."""
+    return f"(CASE WHEN {alias}week_epoch={_CUR_WEEK} THEN {alias}{col} ELSE 0 END)"
+
+
+def _week_sets(**assign: str) -> str:
+    """
+    DO UPDATE SET tail for an upsert that writes weekly columns. Each assignment
+    may use "{cur}" for the column's current-week value; the columns not given
+    are carried over (or zeroed, for an older week) and the row is stamped.
+    """
+    sets = [f"{c}=" + assign.get(c, "{cur}").format(cur=_week_col(c)) for c in _WEEK_COLUMNS]
+    return ", ".join(sets + [f"week_epoch={_CUR_WEEK}"])
+
+
+# Season values carry the season they were written in (user_game_stats.season_id;
+# meta "season_id" is the current one). A row from an earlier season reads
+# soft-reset: rating moved SOFT_RESET_FACTOR of the way back to the default,
+# counters zero. The user's next season write stores that for all of their
+# rows at once (_season_rollover), and the season boards list rows of the
+# current season, so the rollover itself never rewrites the table; a
+# background loop then stores it for everyone else in small batches
+# (settle_season_rollover), putting them back on the boards.
+SOFT_RESET_FACTOR = 0.5  # mirrors config.SOFT_RESET_FACTOR
+_SEASON_COLUMNS = ("season_rating", "season_wins", "season_games")
+_CUR_SEASON = "(SELECT CAST(v AS INTEGER) FROM meta WHERE k='season_id')"
+
+
+def _season_col(col: str, alias: str = "") -> str:
+    """SQL for the current-season value of a season column (soft reset for an earlier season)."""
+    if col == "season_rating":
+        base = f"(CASE WHEN {alias}game='overall' THEN {1000 * len(OVERALL_GAMES)} ELSE 1000 END)"
+        old = f"{base} + CAST(ROUND(({alias}season_rating - {base}) * {SOFT_RESET_FACTOR}) AS INTEGER)"
+    else:
+        old = "0"
+    return f"(CASE WHEN {alias}season_id={_CUR_SEASON} THEN {alias}{col} ELSE {old} END)"
+
+
+# Stores the soft reset for one user ({uid}); game rows go first so the overall
+# row picks up their deltas through its trigger.
+_SEASON_ROLLOVER_SQL = (
+    f"UPDATE user_game_stats SET season_rating={_season_col('season_rating')}, season_wins=0, season_games=0, "
+    f"season_id={_CUR_SEASON} WHERE user_id={{uid}} AND game != 'overall' AND season_id != {_CUR_SEASON}",
+    f"UPDATE user_game_stats SET season_id={_CUR_SEASON} "
+    f"WHERE user_id={{uid}} AND game='overall' AND season_id != {_CUR_SEASON}",
+)
+
+
+def _season_rollover(con: sqlite3.Connection, user_id: int) -> None:
+    """Bring user_id's rows into the current season before a season write (no-op within a season)."""
+    for sql in _SEASON_ROLLOVER_SQL:
+        con.execute(sql.format(uid="?"), (int(user_id),))
+
+_GAME_STATS_SQL = [
+    "CREATE TABLE IF NOT EXISTS user_game_stats(user_id INTEGER NOT NULL, game TEXT NOT NULL, "
+    + ", ".join(f"{n} {t} DEFAULT {d}" for n, t, d in GAME_STATS_COLUMNS)
+    + ", PRIMARY KEY(user_id, game)) WITHOUT ROWID",
+    # overall row = sum over OVERALL_GAMES; rows are created at the defaults
+    # (see _insert_game_rows), so an inserted game row contributes its delta.
+    "CREATE TRIGGER IF NOT EXISTS user_game_stats_overall_ins AFTER INSERT ON user_game_stats "
+    f"WHEN NEW.game IN ({', '.join(repr(g) for g in OVERALL_GAMES)}) BEGIN "
+    "UPDATE user_game_stats SET rating=rating+NEW.rating-1000, season_rating=season_rating+NEW.season_rating-1000 "
+    "WHERE user_id=NEW.user_id AND game='overall'; END",
+    "CREATE TRIGGER IF NOT EXISTS user_game_stats_overall_upd AFTER UPDATE OF rating, season_rating ON user_game_stats "
+    f"WHEN NEW.game IN ({', '.join(repr(g) for g in OVERALL_GAMES)}) BEGIN "
+    "UPDATE user_game_stats SET rating=rating+NEW.rating-OLD.rating, "
+    "season_rating=season_rating+NEW.season_rating-OLD.season_rating "
+    "WHERE user_id=NEW.user_id AND game='overall'; END",
+]
+
+
+def _insert_game_rows(con: sqlite3.Connection, user_id: int) -> None:
+    """Default user_game_stats rows for a new user: overall first, then GAMES (stamped current)."""
+    base = 1000 * len(OVERALL_GAMES)
+    con.execute(
+        "INSERT OR IGNORE INTO user_game_stats(user_id, game, rating, season_rating, week_epoch, season_id) "
+        f"VALUES(?, 'overall', ?, ?, {_CUR_WEEK}, {_CUR_SEASON})",
+        (int(user_id), base, base),
+    )
+    con.executemany(
+        f"INSERT OR IGNORE INTO user_game_stats(user_id, game, week_epoch, season_id) VALUES(?, ?, {_CUR_WEEK}, {_CUR_SEASON})",
+        ((int(user_id), g) for g in GAMES),
+    )
+
+
+def _user_tables_sql(tables: dict = USER_TABLES) -> list[str]:
+    out = []
+    for table, cols in tables.items():
+        defs = ", ".join(f"{n} {t}" + (f" DEFAULT {d}" if d is not None else "") for n, t, d in cols)
+        out.append(f"CREATE TABLE IF NOT EXISTS {table}(user_id INTEGER PRIMARY KEY, {defs})")
+    return out
+
+
+def _users_view_sql(
+    tables: dict = USER_TABLES, game_stats: bool = True, stamps: tuple[str, ...] = ("week_epoch", "season_id")
+) -> list[str]:
+    """
+    users view + INSTEAD OF triggers over tables (and user_game_stats when
+    game_stats). stamps: the week_epoch / season_id columns the schema has at
+    that migration; their weekly / season values read as the current ones.
+    """
+    current = {"week_epoch": (_WEEK_COLUMNS, _week_col, _CUR_WEEK), "season_id": (_SEASON_COLUMNS, _season_col, _CUR_SEASON)}
+    current = {k: v for k, v in current.items() if k in stamps}
+    view_col = {n: fn for names, fn, _cur in current.values() for n in names}
+    names_of = {t: [n for n, _t, _d in cols] for t, cols in tables.items()}
+    alias = {t: f"t{i}" for i, t in enumerate(tables)}
+    cols = [f"{alias[t]}.{n} AS {n}" for t in tables for n in names_of[t]]
+    joins = [f"JOIN {t} {alias[t]} ON {alias[t]}.user_id=t0.user_id" for t in list(tables)[1:]]
+    inserts = []
+    for t in tables:
+        vals = ", ".join(f"COALESCE(NEW.{n}, {d})" if d is not None else f"NEW.{n}" for n, _t, d in tables[t])
+        inserts.append(f"INSERT INTO {t}(user_id, {', '.join(names_of[t])}) VALUES(NEW.user_id, {vals});")
+    updates = []
+    deletes = [f"DELETE FROM {t} WHERE user_id=OLD.user_id;" for t in tables]
+    if game_stats:
+        base = 1000 * len(OVERALL_GAMES)
+        stamp_names = "".join(f", {k}" for k in current)
+        stamp_vals = "".join(f", {cur}" for _names, _fn, cur in current.values())
+        inserts.append(
+            f"INSERT INTO user_game_stats(user_id, game, rating, season_rating{stamp_names}) "
+            f"VALUES(NEW.user_id, 'overall', {base}, {base}{stamp_vals});"
+        )
+        for g, suf in _LEGACY_STATS_SUFFIX.items():
+            ga = f"g_{g}"
+            joins.append(f"LEFT JOIN user_game_stats {ga} ON {ga}.user_id=t0.user_id AND {ga}.game='{g}'")
+            cols += [
+                f"COALESCE({view_col[n](n, ga + '.') if n in view_col else f'{ga}.{n}'}, {d}) AS {n}{suf}"
+                for n, _t, d in GAME_STATS_COLUMNS
+            ]
+            names = ", ".join([n for n, _t, _d in GAME_STATS_COLUMNS] + list(current))
+            vals = ", ".join([f"COALESCE(NEW.{n}{suf}, {d})" for n, _t, d in GAME_STATS_COLUMNS]
+                             + [cur for _names, _fn, cur in current.values()])
+            inserts.append(f"INSERT INTO user_game_stats(user_id, game, {names}) VALUES(NEW.user_id, '{g}', {vals});")
+            legacy = [f"{n}{suf}" for n, _t, _d in GAME_STATS_COLUMNS]
+            # NEW carries the current-week / current-season values, so the row can be stamped
+            sets = ", ".join([f"{n}=NEW.{n}{suf}" for n, _t, _d in GAME_STATS_COLUMNS]
+                             + [f"{k}={cur}" for k, (_names, _fn, cur) in current.items()])
+            roll = " ".join(sql.format(uid="OLD.user_id") + ";" for sql in _SEASON_ROLLOVER_SQL) if "season_id" in current else ""
+            updates.append(
+                f"CREATE TRIGGER IF NOT EXISTS users_update_stats_{g} INSTEAD OF UPDATE OF {', '.join(legacy)} ON users "
+                f"BEGIN {roll} UPDATE user_game_stats SET {sets} WHERE user_id=OLD.user_id AND game='{g}'; END"
+            )
+        others = [g for g in GAMES if g not in _LEGACY_STATS_SUFFIX]
+        inserts += [f"INSERT INTO user_game_stats(user_id, game{stamp_names}) VALUES(NEW.user_id, '{g}'{stamp_vals});"
+                    for g in others]
+        deletes.append("DELETE FROM user_game_stats WHERE user_id=OLD.user_id;")
+    out = [f"CREATE VIEW IF NOT EXISTS users AS SELECT t0.user_id AS user_id, {', '.join(cols)} "
+           f"FROM {next(iter(tables))} t0 {' '.join(joins)}"]
+    out.append(f"CREATE TRIGGER IF NOT EXISTS users_insert INSTEAD OF INSERT ON users BEGIN {' '.join(inserts)} END")
+    for t in tables:
+        sets = ", ".join(f"{n}=NEW.{n}" for n in names_of[t])
+        out.append(
+            f"CREATE TRIGGER IF NOT EXISTS users_update_{t} INSTEAD OF UPDATE OF {', '.join(names_of[t])} ON users "
+            f"BEGIN UPDATE {t} SET {sets} WHERE user_id=OLD.user_id; END"
+        )
+    out += updates
+    out.append(f"CREATE TRIGGER IF NOT EXISTS users_delete INSTEAD OF DELETE ON users BEGIN {' '.join(deletes)} END")
+    return out
+
+
+_USER_INDEXES_V5 = """
+CREATE INDEX IF NOT EXISTS idx_stats_top_xo ON user_stats(rating DESC, user_id);
+CREATE INDEX IF NOT EXISTS idx_stats_top_ck ON user_stats(rating_ck DESC, user_id);
+CREATE INDEX IF NOT EXISTS idx_stats_top_overall ON user_stats((rating + rating_ck) DESC, user_id, rating, rating_ck);
+CREATE INDEX IF NOT EXISTS idx_stats_season_xo ON user_stats(season_rating DESC, user_id);
+CREATE INDEX IF NOT EXISTS idx_stats_season_ck ON user_stats(season_rating_ck DESC, user_id);
+CREATE INDEX IF NOT EXISTS idx_stats_season_overall ON user_stats((season_rating + season_rating_ck) DESC, user_id, season_rating, season_rating_ck);
+CREATE INDEX IF NOT EXISTS idx_stats_week_xo ON user_stats(week_wins DESC, rating DESC, week_games, user_id) WHERE week_games > 0;
+CREATE INDEX IF NOT EXISTS idx_stats_week_ck ON user_stats(week_wins_ck DESC, rating_ck DESC, week_games_ck, user_id) WHERE week_games_ck > 0;
+CREATE INDEX IF NOT EXISTS idx_marketing_ref ON user_marketing(ref_count DESC, user_id) WHERE ref_count > 0;
+"""
+
+
+_USER_INDEXES_V6 = """
+CREATE INDEX IF NOT EXISTS idx_marketing_ref ON user_marketing(ref_count DESC, user_id) WHERE ref_count > 0;
+CREATE INDEX IF NOT EXISTS idx_game_stats_top ON user_game_stats(game, rating DESC, user_id);
+CREATE INDEX IF NOT EXISTS idx_game_stats_season ON user_game_stats(game, season_rating DESC, user_id);
+CREATE INDEX IF NOT EXISTS idx_game_stats_week ON user_game_stats(game, week_wins DESC, rating DESC, week_games, user_id) WHERE week_games > 0;
+"""
+
+
+# The season / weekly boards filter on game and the current season_id /
+# week_epoch; rows of earlier periods stay in the index until their next write
+# and are skipped by that prefix.
+_GAME_STATS_INDEXES = {
+    "idx_game_stats_top": "CREATE INDEX IF NOT EXISTS idx_game_stats_top ON user_game_stats(game, rating DESC, user_id)",
+    "idx_game_stats_season": "CREATE INDEX IF NOT EXISTS idx_game_stats_season "
+                             "ON user_game_stats(game, season_id, season_rating DESC, user_id)",
+    "idx_game_stats_week": "CREATE INDEX IF NOT EXISTS idx_game_stats_week "
+                           "ON user_game_stats(game, week_epoch, week_wins DESC, rating DESC, week_games, user_id) "
+                           "WHERE week_games > 0",
+}
+_USER_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_marketing_ref ON user_marketing(ref_count DESC, user_id) WHERE ref_count > 0;\n"
+    + "".join(sql + ";\n" for sql in _GAME_STATS_INDEXES.values())
+)
+
+
+def _run_script(con: sqlite3.Connection, script: str) -> None:
+    # executescript() would COMMIT the migration transaction first
+    for sql in filter(None, (s.strip() for s in script.split(";"))):
+        con.execute(sql)
+
+
+def _m005_split_users(con: sqlite3.Connection):
+    """Move the wide users table into the narrow tables and leave a users view behind."""
+    kind = con.execute("SELECT type FROM sqlite_master WHERE name='users'").fetchone()
+    if not con.in_transaction:
+        con.execute("BEGIN")
+    for sql in _user_tables_sql(_USER_TABLES_V5):
+        con.execute(sql)
+    if kind and kind[0] == "table":
+        for table, cols in _USER_TABLES_V5.items():
+            names = ", ".join(n for n, _t, _d in cols)
+            con.execute(f"INSERT OR REPLACE INTO {table}(user_id, {names}) SELECT user_id, {names} FROM users")
+        con.execute("DROP TABLE users")
+    for sql in _users_view_sql(_USER_TABLES_V5, game_stats=False):
+        con.execute(sql)
+    _run_script(con, _USER_INDEXES_V5)
+
+
+def _m006_game_stats(con: sqlite3.Connection):
+    """user_stats (suffixed columns) + quest masks -> user_game_stats rows; chess gets its own rows."""
+    if not con.in_transaction:
+        con.execute("BEGIN")
+    con.execute(_GAME_STATS_SQL[0])
+    has_stats = con.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='user_stats'").fetchone()
+    if has_stats:
+        names = ", ".join(n for n, _t, _d in GAME_STATS_COLUMNS)
+        for g, suf in _LEGACY_STATS_SUFFIX.items():
+            src = ", ".join(
+                f"COALESCE(b.{n}{suf}, 0)" if n == "quest_mask" else f"s.{n}{suf}" for n, _t, _d in GAME_STATS_COLUMNS
+            )
+            con.execute(
+                f"INSERT OR REPLACE INTO user_game_stats(user_id, game, {names}) "
+                f"SELECT s.user_id, '{g}', {src} FROM user_stats s "
+                "LEFT JOIN user_battle_pass b ON b.user_id=s.user_id"
+            )
+        con.execute(
+            "INSERT OR REPLACE INTO user_game_stats(user_id, game, rating, season_rating) "
+            "SELECT user_id, 'overall', rating + rating_ck, season_rating + season_rating_ck FROM user_stats"
+        )
+    # chess used to share the XO counters; it starts from the defaults
+    con.execute("INSERT OR IGNORE INTO user_game_stats(user_id, game) SELECT user_id, 'chess' FROM user_profile")
+    con.execute("DROP VIEW IF EXISTS users")  # its triggers go with it
+    if has_stats:
+        con.execute("DROP TABLE user_stats")
+    bp_cols = {r[1] for r in con.execute("PRAGMA table_info(user_battle_pass)")}
+    for col in ("quest_mask", "quest_mask_ck"):
+        if col in bp_cols:
+            con.execute(f"ALTER TABLE user_battle_pass DROP COLUMN {col}")
+    for sql in _GAME_STATS_SQL[1:] + _users_view_sql(stamps=()):
+        con.execute(sql)
+    _run_script(con, _USER_INDEXES_V6)
+
+
+def _m007_week_epoch(con: sqlite3.Connection):
+    """Stamp weekly counters with their week, so a weekly reset no longer rewrites every row."""
+    if not con.in_transaction:
+        con.execute("BEGIN")
+    cols = {r[1] for r in con.execute("PRAGMA table_info(user_game_stats)")}
+    if "week_epoch" not in cols:
+        con.execute("ALTER TABLE user_game_stats ADD COLUMN week_epoch INTEGER NOT NULL DEFAULT 0")
+    # existing counters (epoch 0) belong to the week in progress
+    _meta_set(con, "week_epoch", _meta_get(con, "week_epoch", "0"))
+    con.execute("DROP INDEX IF EXISTS idx_game_stats_week")
+    con.execute(_GAME_STATS_INDEXES["idx_game_stats_week"])
+    con.execute("DROP VIEW IF EXISTS users")
+    for sql in _users_view_sql(stamps=("week_epoch",)):
+        con.execute(sql)
+
+
+def _m008_season_stamp(con: sqlite3.Connection):
+    """Stamp season values with their season, so a season rollover no longer rewrites every row."""
+    if not con.in_transaction:
+        con.execute("BEGIN")
+    cols = {r[1] for r in con.execute("PRAGMA table_info(user_game_stats)")}
+    if "season_id" not in cols:
+        con.execute("ALTER TABLE user_game_stats ADD COLUMN season_id INTEGER NOT NULL DEFAULT 0")
+        # existing values belong to the season in progress
+        con.execute(f"UPDATE user_game_stats SET season_id={_CUR_SEASON}")
+    con.execute("DROP INDEX IF EXISTS idx_game_stats_season")
+    con.execute(_GAME_STATS_INDEXES["idx_game_stats_season"])
+    con.execute("DROP VIEW IF EXISTS users")
+    for sql in _users_view_sql():
+        con.execute(sql)
+
+
+# Append-only game ledger: one games row per finished PvP game, written by
+# record_game_result() in the same transaction as the counters it changed.
+# Ratings are the stored values (a shadowbanned player's never move), season
+# values are those of season_id, and week_epoch / season_id let
+# replay_game_ledger() rebuild the weekly and season counters. game_players
+# holds the (user_id, ts) index for a player's history.
+_GAMES_LEDGER_SQL = [
+    "CREATE TABLE IF NOT EXISTS games("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL NOT NULL, game TEXT NOT NULL, "
+    "a_id INTEGER NOT NULL, b_id INTEGER NOT NULL, winner_id INTEGER, "
+    "result TEXT NOT NULL, "  # a | b | draw
+    "rated INTEGER NOT NULL, a_shadowban INTEGER NOT NULL DEFAULT 0, b_shadowban INTEGER NOT NULL DEFAULT 0, "
+    "a_rating_before INTEGER NOT NULL, a_rating_after INTEGER NOT NULL, "
+    "b_rating_before INTEGER NOT NULL, b_rating_after INTEGER NOT NULL, "
+    "a_season_before INTEGER NOT NULL, a_season_after INTEGER NOT NULL, "
+    "b_season_before INTEGER NOT NULL, b_season_after INTEGER NOT NULL, "
+    "week_epoch INTEGER NOT NULL, season_id INTEGER NOT NULL, "
+    "tournament_id INTEGER NOT NULL DEFAULT 0, tmatch_id INTEGER NOT NULL DEFAULT 0, "
+    "moves TEXT NOT NULL DEFAULT '', duration_sec REAL NOT NULL DEFAULT 0)",
+    "CREATE TABLE IF NOT EXISTS game_players(user_id INTEGER NOT NULL, ts REAL NOT NULL, game_id INTEGER NOT NULL, "
+    "PRIMARY KEY(user_id, ts, game_id)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS idx_games_game_ts ON games(game, ts)",
+    # the ledger is append-only
+    "CREATE TRIGGER IF NOT EXISTS games_no_update BEFORE UPDATE ON games "
+    "BEGIN SELECT RAISE(ABORT, 'games is append-only'); END",
+    "CREATE TRIGGER IF NOT EXISTS games_no_delete BEFORE DELETE ON games "
+    "BEGIN SELECT RAISE(ABORT, 'games is append-only'); END",
+]
+
+
+def _m009_games_ledger(con: sqlite3.Connection):
+    """Per-game ledger: finished games used to leave only incremented counters behind."""
+    if not con.in_transaction:
+        con.execute("BEGIN")
+    for sql in _GAMES_LEDGER_SQL:
+        con.execute(sql)
+
+
+# Glicko-2 state per (user, game), updated once per rating period by
+# run_rating_period(). period is the last period the row was rated in; rd
+# keeps growing for the periods after it (rating.Glicko2Backend.idle), so
+# idle players are never rewritten.
+_GLICKO_SQL = (
+    "CREATE TABLE IF NOT EXISTS user_glicko(user_id INTEGER NOT NULL, game TEXT NOT NULL, "
+    "rating REAL NOT NULL, rd REAL NOT NULL, vol REAL NOT NULL, period INTEGER NOT NULL, "
+    "PRIMARY KEY(user_id, game)) WITHOUT ROWID"
+)
+
+
+def _m010_glicko(con: sqlite3.Connection):
+    """Rating deviation and volatility next to the live Elo."""
+    if not con.in_transaction:
+        con.execute("BEGIN")
+    con.execute(_GLICKO_SQL)
+    _meta_set(con, "rating_period", _meta_get(con, "rating_period", "0"))
+    _meta_set(con, "rating_period_ts", _meta_get(con, "rating_period_ts", str(time.time())))
+    _meta_set(con, "rating_period_game_id", _meta_get(con, "rating_period_game_id", "0"))
+
+
+# Write-behind snapshots of the in-memory games (app.live_state): one row per
+# live match, queue entry or arena run; state is the owner's compact encoding.
+_LIVE_MATCHES_SQL = (
+    "CREATE TABLE IF NOT EXISTS live_matches(kind TEXT NOT NULL, key TEXT NOT NULL, "
+    "state TEXT NOT NULL, updated_ts REAL NOT NULL, PRIMARY KEY(kind, key)) WITHOUT ROWID"
+)
+
+
+def _m011_live_matches(con: sqlite3.Connection):
+    """Live games survive a restart: they used to exist only in process dicts."""
+    if not con.in_transaction:
+        con.execute("BEGIN")
+    con.execute(_LIVE_MATCHES_SQL)
+
+
+def _m012_stamp_new_rows(con: sqlite3.Connection):
+    """New users' rows were left at season_id 0, off the season boards until their first season write."""
+    if not con.in_transaction:
+        con.execute("BEGIN")
+    # season 0 never existed: such rows were never written in a season and hold
+    # the defaults; the overall row follows the season of its game rows
+    con.execute(f"UPDATE user_game_stats SET season_id={_CUR_SEASON} WHERE game != 'overall' AND season_id=0")
+    con.execute(
+        "UPDATE user_game_stats SET season_id=COALESCE((SELECT MAX(g.season_id) FROM user_game_stats g "
+        f"WHERE g.user_id=user_game_stats.user_id AND g.game IN ({', '.join(repr(g) for g in OVERALL_GAMES)})), "
+        f"{_CUR_SEASON}) WHERE game='overall' AND season_id=0"
+    )
+    con.execute("DROP VIEW IF EXISTS users")
+    for sql in _users_view_sql():
+        con.execute(sql)
+
+
+# Ordered schema migrations: (version, name, step). Steps must be idempotent,
+# a step interrupted half-way is re-run on the next start.
+MIGRATIONS = [
+    (1, "baseline", _m001_baseline),
+    (2, "meta_defaults", _m002_meta_defaults),
+    (3, "leaderboard_indexes", _m003_leaderboard_indexes),
+    (4, "rank_covering_indexes", _m004_rank_covering_indexes),
+    (5, "split_users", _m005_split_users),
+    (6, "game_stats", _m006_game_stats),
+    (7, "week_epoch", _m007_week_epoch),
+    (8, "season_stamp", _m008_season_stamp),
+    (9, "games_ledger", _m009_games_ledger),
+    (10, "glicko", _m010_glicko),
+    (11, "live_matches", _m011_live_matches),
+    (12, "stamp_new_rows", _m012_stamp_new_rows),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+_DB_READY = False
+_INIT_LOCK = threading.Lock()
+
+
+def get_schema_version(con: sqlite3.Connection) -> int:
+    con.execute("CREATE TABLE IF NOT EXISTS meta(k TEXT PRIMARY KEY, v TEXT NOT NULL)")
+    try:
+        return int(_meta_get(con, "schema_version", "0") or 0)
+    except ValueError:
+        return 0
 
+
+def migrate(con: sqlite3.Connection) -> int:
+    """Apply pending migrations in order. Returns the resulting schema version."""
+    log = logging.getLogger("sm-arena.db")
+    current = get_schema_version(con)
+    for version, name, step in MIGRATIONS:
+        if version <= current:
+            continue
+        t0 = time.perf_counter()
+        step(con)
+        _meta_set(con, "schema_version", str(version))
         con.commit()
-    finally:
-        con.close()
+        _meta_changed()
+        current = version
+        log.info("DB migration %03d_%s applied in %.1f ms", version, name, (time.perf_counter() - t0) * 1000)
+    return current
+
+
+def init_db():
+    """Bring the schema up to date once per process; later calls are a flag check.
+
+    main.main() calls this at startup. The call at the top of every helper
+    below is kept as a cheap guard for scripts that import app.db directly.
+    """
+    global _DB_READY
+    if _DB_READY:
+        return
+    with _INIT_LOCK:
+        if _DB_READY:
+            return
+        con = _con()
+        try:
+            migrate(con)
+        finally:
+            con.close()
+        _DB_READY = True
 
 
 def _meta_get(con, k: str, default: str = "") -> str:
@@ -324,44 +952,93 @@ def _meta_set(con, k: str, v: str):
     )
 
 
+# ---------- Meta cache ----------
+# meta is a handful of rows (links, sponsor, prize pool, week / season start)
+# read on every menu render. The getters serve them from one process-wide copy.
+# Every meta write calls _meta_changed() after its commit, which drops the
+# copy and bumps the version (meta_version() lets callers key their own caches
+# on it). META_TTL_SEC re-reads it as a safety net against writes made outside
+# this process.
+META_TTL_SEC = 300.0
+_META: dict[str, str] = {}
+_META_LOADED_TS = 0.0
+_META_VERSION = 0
+_META_LOCK = threading.Lock()
+
+
+def meta_version() -> int:
+    return _META_VERSION
+
+
+def meta_cached() -> bool:
+    """True while the cached meta copy is fresh: the meta getters make no DB read."""
+    return time.time() - _META_LOADED_TS < META_TTL_SEC
+
+
+def _meta_changed() -> None:
+    global _META_LOADED_TS, _META_VERSION
+    with _META_LOCK:
+        _META_LOADED_TS = 0.0
+        _META_VERSION += 1
+
+
+def _meta_value(k: str, default: str = "") -> str:
+    global _META, _META_LOADED_TS
+    if not meta_cached():
+        version = _META_VERSION
+        init_db()
+        con = _con()
+        try:
+            rows = {str(r["k"]): str(r["v"]) for r in con.execute("SELECT k, v FROM meta")}
+        finally:
+            con.close()
+        with _META_LOCK:
+            if version == _META_VERSION:  # else a write landed meanwhile: serve, don't keep
+                _META, _META_LOADED_TS = rows, time.time()
+        return rows.get(k, default)
+    return _META.get(k, default)
+
+
 # ---------- User upsert ----------
 def upsert_user(user_id: int, username: str | None, first_name: str | None, lang: str | None):
     init_db()
     con = _con()
     try:
         now = time.time()
-        con.execute("""
-        INSERT INTO users(user_id, username, first_name, lang, updated_ts)
-        VALUES(?,?,?,?,?)
-        ON CONFLICT(user_id) DO UPDATE SET
-          username=excluded.username,
-          first_name=excluded.first_name,
-          lang=COALESCE(excluded.lang, users.lang),
-          updated_ts=excluded.updated_ts
-        """, (int(user_id), username or "", first_name or "", lang, now))
+        cur = con.execute(
+            "INSERT OR IGNORE INTO user_profile(user_id, username, first_name, lang, updated_ts) VALUES(?,?,?,?,?)",
+            (int(user_id), username or "", first_name or "", lang, now),
+        )
+        if cur.rowcount:
+            # new user: default rows in the other narrow tables
+            for table in list(USER_TABLES)[1:]:
+                con.execute(f"INSERT OR IGNORE INTO {table}(user_id) VALUES(?)", (int(user_id),))
+            _insert_game_rows(con, user_id)
+        else:
+            con.execute(
+                "UPDATE user_profile SET username=?, first_name=?, lang=COALESCE(?, lang), updated_ts=? WHERE user_id=?",
+                (username or "", first_name or "", lang, now, int(user_id)),
+            )
         con.commit()
     finally:
         con.close()
+    _boards_changed("users", [user_id])
+    _boards_changed("tourn", [user_id])
 
 
 def set_lang(user_id: int, lang: str):
     init_db()
     con = _con()
     try:
-        con.execute("UPDATE users SET lang=? WHERE user_id=?", (lang, int(user_id)))
+        con.execute("UPDATE user_profile SET lang=? WHERE user_id=?", (lang, int(user_id)))
         con.commit()
     finally:
         con.close()
 
 
 def get_lang(user_id: int) -> str | None:
-    init_db()
-    con = _con()
-    try:
-        r = con.execute("SELECT lang FROM users WHERE user_id=?", (int(user_id),)).fetchone()
-        return str(r["lang"]) if r and r["lang"] else None
-    finally:
-        con.close()
+    u = get_user_fields(user_id, "lang")
+    return str(u["lang"]) if u and u.get("lang") else None
 
 
 
@@ -372,14 +1049,97 @@ def db_get_lang(user_id: int) -> str:
 
 
 
+_PROJECTION_SQL: dict[tuple[str, ...], str] = {}
+
+
+def _projection_sql(tables: tuple[str, ...]) -> str:
+    sql = _PROJECTION_SQL.get(tables)
+    if sql is None:
+        first = tables[0]
+        cols = ", ".join(f"{t}.{n}" for t in tables for n, _t, _d in USER_TABLES[t])
+        joins = "".join(f" JOIN {t} ON {t}.user_id={first}.user_id" for t in tables[1:])
+        sql = _PROJECTION_SQL[tables] = f"SELECT {cols} FROM {first}{joins} WHERE {first}.user_id=?"
+    return sql
+
+
+def get_user_fields(user_id: int, *fields: str) -> dict | None:
+    """
+    {"user_id", *fields} for one user, or None if the user does not exist.
+    Only the narrow tables holding those columns are read; each table row is
+    kept in the caller's user snapshot for the rest of the update.
+    """
+    tables = tuple(dict.fromkeys(USER_COLUMN_TABLE[f] for f in fields))
+    row: dict = {}
+    missing = []
+    for t in tables:
+        part = user_snapshot.lookup(user_id, t)
+        if part is user_snapshot.MISS:
+            missing.append(t)
+        elif part is None:
+            return None
+        else:
+            row.update(part)
+    if missing:
+        init_db()
+        con = _con()
+        try:
+            r = con.execute(_projection_sql(tuple(missing)), (int(user_id),)).fetchone()
+        finally:
+            con.close()
+        for t in missing:
+            user_snapshot.remember(user_id, t, {n: r[n] for n, _t, _d in USER_TABLES[t]} if r else None)
+        if r is None:
+            return None
+        row.update(dict(r))
+    out = {"user_id": int(user_id)}
+    for f in fields:
+        out[f] = row[f]
+    return out
+
+
 def get_user(user_id: int) -> dict | None:
-    init_db()
-    con = _con()
-    try:
-        r = con.execute("SELECT * FROM users WHERE user_id=?", (int(user_id),)).fetchone()
-        return dict(r) if r else None
-    finally:
-        con.close()
+    """
+    The whole users row (legacy column names for the XO / checkers stats).
+    Hot paths should ask get_user_fields() / get_game_stats() for what they need.
+    """
+    u = get_user_fields(user_id, *USER_COLUMN_TABLE)
+    if u is not None:
+        for g, suf in _LEGACY_STATS_SUFFIX.items():
+            u.update({k + suf: v for k, v in get_game_stats(user_id, g).items()})
+    return u
+
+
+def _game_stats_key(game: str) -> str:
+    return "user_game_stats:" + game
+
+
+def get_game_stats(user_id: int, game: str = "xo") -> dict:
+    """
+    user_game_stats columns (GAME_STATS_COLUMNS) of one user for one game;
+    the defaults when the user has no row yet. Kept in the user snapshot.
+    """
+    g = _stats_game(game)
+    key = _game_stats_key(g)
+    row = user_snapshot.lookup(user_id, key)
+    if row is user_snapshot.MISS:
+        init_db()
+        con = _con()
+        try:
+            r = con.execute(_GAME_STATS_SELECT, (int(user_id), g)).fetchone()
+        finally:
+            con.close()
+        row = dict(r) if r else dict(GAME_STATS_DEFAULTS)
+        user_snapshot.remember(user_id, key, row)
+    return row
+
+
+_GAME_STATS_SELECT = (
+    "SELECT " + ", ".join(
+        f"{_week_col(n)} AS {n}" if n in _WEEK_COLUMNS else f"{_season_col(n)} AS {n}" if n in _SEASON_COLUMNS else n
+        for n, _t, _d in GAME_STATS_COLUMNS
+    )
+    + " FROM user_game_stats WHERE user_id=? AND game=?"
+)
 
 
 def _game_suffix(game: str) -> str:
@@ -388,7 +1148,8 @@ def _game_suffix(game: str) -> str:
         return ""
     if g in ("checkers", "ck", "shashky", "шашки"):
         return "_ck"
-    # Chess currently reuses XO counters/ratings as safe fallback in shared flows.
+    # Chess has no suffixed columns of its own (skins, tournament streaks use
+    # the XO ones); its ratings and counters are rows in user_game_stats.
     if g in ("chess", "ch", "шахи", "шахматы"):
         return ""
     raise ValueError("Unknown game")
@@ -399,8 +1160,16 @@ def _norm_game(game: str) -> str:
     return "checkers" if suf == "_ck" else "xo"
 
 
+def _stats_game(game: str) -> str:
+    """user_game_stats.game for a game alias; unlike _norm_game, chess is its own game."""
+    g = (game or "xo").lower()
+    if g in ("chess", "ch", "шахи", "шахматы"):
+        return "chess"
+    return _norm_game(g)
+
+
 def get_active_game(user_id: int) -> str:
-    u = get_user(user_id) or {}
+    u = get_user_fields(user_id, "active_game") or {}
     g = (u.get("active_game") or "xo").strip().lower()
     return g if g in ("xo", "checkers", "chess") else "xo"
 
@@ -417,13 +1186,13 @@ def set_active_game(user_id: int, game: str):
         if g not in ("xo", "checkers", "chess"):
             g = "xo"
         game_norm = g
-        con.execute("UPDATE users SET active_game=? WHERE user_id=?", (game_norm, int(user_id)))
+        con.execute("UPDATE user_profile SET active_game=? WHERE user_id=?", (game_norm, int(user_id)))
         con.commit()
     finally:
         con.close()
 
 
-# Chat link stored in meta
+# Chat / news links stored in meta
 def set_chat(title: str, url: str):
     init_db()
     con = _con()
@@ -433,39 +1202,43 @@ def set_chat(title: str, url: str):
         con.commit()
     finally:
         con.close()
+    _meta_changed()
 
 
 def get_chat() -> dict:
+    url = _meta_value("chat_url", "https://t.me/sm_arena")
+    if "Praca_czua" in url or "SM_Arena_chat" in url:
+        url = "https://t.me/sm_arena"
+    return {
+        "title": _meta_value("chat_title", "Чатик"),
+        "url": url,
+    }
+
+
+def set_news(title: str, url: str):
     init_db()
     con = _con()
     try:
-        url = _meta_get(con, "chat_url", "https://t.me/sm_arena")
-        if "Praca_czua" in url or "SM_Arena_chat" in url:
-            url = "https://t.me/sm_arena"
-        return {
-            "title": _meta_get(con, "chat_title", "Чатик"),
-            "url": url,
-        }
+        _meta_set(con, "news_title", title or "")
+        _meta_set(con, "news_url", url or "")
+        con.commit()
     finally:
         con.close()
+    _meta_changed()
+
 
 def get_news() -> dict:
-    init_db()
-    con = _con()
-    try:
-        url = _meta_get(con, "news_url", "https://t.me/sm_arena")
-        if "Praca_czua" in url:
-            url = "https://t.me/sm_arena"
-        return {
-            "title": _meta_get(con, "news_title", "Новини"),
-            "url": url,
-        }
-    finally:
-        con.close()
+    url = _meta_value("news_url", "https://t.me/sm_arena")
+    if "Praca_czua" in url:
+        url = "https://t.me/sm_arena"
+    return {
+        "title": _meta_value("news_title", "Новини"),
+        "url": url,
+    }
 
 # Coins / Balance
 def get_coins(user_id: int) -> int:
-    u = get_user(user_id) or {}
+    u = get_user_fields(user_id, "coins") or {}
     try:
         return int(u.get("coins", 0) or 0)
     except Exception:
@@ -476,7 +1249,7 @@ def set_coins(user_id: int, coins: int):
     init_db()
     con = _con()
     try:
-        con.execute("UPDATE users SET coins=? WHERE user_id=?", (int(coins), int(user_id)))
+        con.execute("UPDATE user_profile SET coins=? WHERE user_id=?", (int(coins), int(user_id)))
         con.commit()
     finally:
         con.close()
@@ -486,9 +1259,9 @@ def add_coins(user_id: int, delta: int) -> int:
     init_db()
     con = _con()
     try:
-        con.execute("UPDATE users SET coins=coins+? WHERE user_id=?", (int(delta), int(user_id)))
+        con.execute("UPDATE user_profile SET coins=coins+? WHERE user_id=?", (int(delta), int(user_id)))
         con.commit()
-        cur = con.execute("SELECT coins FROM users WHERE user_id=?", (int(user_id),)).fetchone()
+        cur = con.execute("SELECT coins FROM user_profile WHERE user_id=?", (int(user_id),)).fetchone()
         return int(cur["coins"] or 0) if cur else 0
     finally:
         con.close()
@@ -502,12 +1275,12 @@ def try_spend_coins(user_id: int, amount: int) -> bool:
     con = _con()
     try:
         con.execute("BEGIN IMMEDIATE")
-        r = con.execute("SELECT coins FROM users WHERE user_id=?", (int(user_id),)).fetchone()
+        r = con.execute("SELECT coins FROM user_profile WHERE user_id=?", (int(user_id),)).fetchone()
         bal = int(r["coins"] or 0) if r else 0
         if bal < amount:
             con.execute("ROLLBACK")
             return False
-        con.execute("UPDATE users SET coins=coins-? WHERE user_id=?", (amount, int(user_id)))
+        con.execute("UPDATE user_profile SET coins=coins-? WHERE user_id=?", (amount, int(user_id)))
         con.commit()
         return True
     except Exception:
@@ -603,7 +1376,7 @@ def set_active_item(user_id: int, item_id: str) -> None:
         # If it's a wallpaper, also update the users table for fast access
         if iid.startswith("wallpaper:"):
             wp_name = iid.split(":")[-1]
-            con.execute("UPDATE users SET wallpaper=? WHERE user_id=?", (wp_name, int(user_id)))
+            con.execute("UPDATE user_cosmetics SET wallpaper=? WHERE user_id=?", (wp_name, int(user_id)))
             
         con.commit()
     finally:
@@ -611,87 +1384,63 @@ def set_active_item(user_id: int, item_id: str) -> None:
 
 def get_active_wallpaper(user_id: int) -> str:
     init_db()
-    u = get_user(user_id)
+    u = get_user_fields(user_id, "wallpaper")
     if not u: return "default"
     return str(u.get("wallpaper", "default"))
 
 
 
-# Quests (bitmask per game: quest_mask / quest_mask_ck)
+# Quests (bitmask per game, user_game_stats.quest_mask)
 def get_quest_mask(user_id: int, game: str = "xo") -> int:
-    u = get_user(user_id) or {}
-    col = "quest_mask" + _game_suffix(game)
-    try:
-        return int(u.get(col, 0) or 0)
-    except Exception:
-        return 0
+    return int(get_game_stats(user_id, game)["quest_mask"])
 
 
-def set_quest_mask(user_id: int, mask: int, game: str = "xo"):
+def _upsert_game_stats(user_id: int, game: str, sql: str, params: tuple, season: bool = False) -> None:
+    """One keyed upsert into user_game_stats (season: it writes season columns)."""
     init_db()
     con = _con()
     try:
-        col = "quest_mask" + _game_suffix(game)
-        con.execute(f"UPDATE users SET {col}=? WHERE user_id=?", (int(mask), int(user_id)))
+        if season:
+            _season_rollover(con, user_id)
+        con.execute(sql, (int(user_id), _stats_game(game)) + params)
         con.commit()
     finally:
         con.close()
 
 
+def set_quest_mask(user_id: int, mask: int, game: str = "xo"):
+    _upsert_game_stats(user_id, game, (
+        f"INSERT INTO user_game_stats(user_id, game, quest_mask, week_epoch) VALUES(?,?,?,{_CUR_WEEK}) "
+        "ON CONFLICT(user_id, game) DO UPDATE SET " + _week_sets(quest_mask="excluded.quest_mask")
+    ), (int(mask),))
 
 
 def get_rating(user_id: int, game: str = "xo") -> int:
-    u = get_user(user_id)
-    if not u:
-        return DEFAULT_RATING
-    suf = _game_suffix(game)
-    key = "rating" + suf
-    try:
-        return int(u.get(key, DEFAULT_RATING))
-    except Exception:
-        return DEFAULT_RATING
+    return int(get_game_stats(user_id, game)["rating"])
 
 
 def set_rating(user_id: int, rating: int, game: str = "xo"):
-    init_db()
-    con = _con()
-    try:
-        suf = _game_suffix(game)
-        col = "rating" + suf
-        con.execute(f"UPDATE users SET {col}=? WHERE user_id=?", (int(rating), int(user_id)))
-        con.commit()
-    finally:
-        con.close()
+    _upsert_game_stats(user_id, game, (
+        "INSERT INTO user_game_stats(user_id, game, rating) VALUES(?,?,?) "
+        "ON CONFLICT(user_id, game) DO UPDATE SET rating=excluded.rating"
+    ), (int(rating),))
+    _boards_changed("users", [user_id])
 
 
 def bump_total(user_id: int, win: bool, game: str = "xo"):
-    init_db()
-    con = _con()
-    try:
-        suf = _game_suffix(game)
-        games_col = "total_games" + suf
-        wins_col = "total_wins" + suf
-        con.execute(f"UPDATE users SET {games_col}={games_col}+1 WHERE user_id=?", (int(user_id),))
-        if win:
-            con.execute(f"UPDATE users SET {wins_col}={wins_col}+1 WHERE user_id=?", (int(user_id),))
-        con.commit()
-    finally:
-        con.close()
+    _upsert_game_stats(user_id, game, (
+        "INSERT INTO user_game_stats(user_id, game, total_games, total_wins) VALUES(?,?,1,?) "
+        "ON CONFLICT(user_id, game) DO UPDATE SET total_games=total_games+1, total_wins=total_wins+excluded.total_wins"
+    ), (1 if win else 0,))
 
 
 def bump_weekly(user_id: int, win: bool, game: str = "xo"):
-    init_db()
-    con = _con()
-    try:
-        suf = _game_suffix(game)
-        games_col = "week_games" + suf
-        wins_col = "week_wins" + suf
-        con.execute(f"UPDATE users SET {games_col}={games_col}+1 WHERE user_id=?", (int(user_id),))
-        if win:
-            con.execute(f"UPDATE users SET {wins_col}={wins_col}+1 WHERE user_id=?", (int(user_id),))
-        con.commit()
-    finally:
-        con.close()
+    _upsert_game_stats(user_id, game, (
+        f"INSERT INTO user_game_stats(user_id, game, week_games, week_wins, week_epoch) VALUES(?,?,1,?,{_CUR_WEEK}) "
+        "ON CONFLICT(user_id, game) DO UPDATE SET "
+        + _week_sets(week_games="{cur}+1", week_wins="{cur}+excluded.week_wins")
+    ), (1 if win else 0,))
+    _boards_changed("users", [user_id])
 
 
 # ---------- Skins / VIP ----------
@@ -699,14 +1448,14 @@ def set_skin(user_id: int, skin: str):
     init_db()
     con = _con()
     try:
-        con.execute("UPDATE users SET skin=? WHERE user_id=?", (str(skin), int(user_id)))
+        con.execute("UPDATE user_cosmetics SET skin=? WHERE user_id=?", (str(skin), int(user_id)))
         con.commit()
     finally:
         con.close()
 
 
 def get_skin(user_id: int) -> str:
-    u = get_user(user_id)
+    u = get_user_fields(user_id, "skin")
     s = (u or {}).get("skin") or "default"
     return str(s)
 
@@ -714,57 +1463,57 @@ def set_skin_board(user_id: int, skin: str) -> None:
     init_db()
     con = _con()
     try:
-        con.execute("UPDATE users SET skin_board=? WHERE user_id=?", (str(skin), int(user_id)))
+        con.execute("UPDATE user_cosmetics SET skin_board=? WHERE user_id=?", (str(skin), int(user_id)))
         con.commit()
     finally:
         con.close()
 
 def get_skin_board(user_id: int) -> str:
-    u = get_user(user_id)
+    u = get_user_fields(user_id, "skin_board")
     return str((u or {}).get("skin_board") or "default")
 
 def set_skin_cell(user_id: int, skin: str) -> None:
     init_db()
     con = _con()
     try:
-        con.execute("UPDATE users SET skin_cell=? WHERE user_id=?", (str(skin), int(user_id)))
+        con.execute("UPDATE user_cosmetics SET skin_cell=? WHERE user_id=?", (str(skin), int(user_id)))
         con.commit()
     finally:
         con.close()
 
 def get_skin_cell(user_id: int) -> str:
-    u = get_user(user_id)
+    u = get_user_fields(user_id, "skin_cell")
     return str((u or {}).get("skin_cell") or "default")
 
 def set_skin_board_ck(user_id: int, skin: str) -> None:
     init_db()
     con = _con()
     try:
-        con.execute("UPDATE users SET skin_board_ck=? WHERE user_id=?", (str(skin), int(user_id)))
+        con.execute("UPDATE user_cosmetics SET skin_board_ck=? WHERE user_id=?", (str(skin), int(user_id)))
         con.commit()
     finally:
         con.close()
 
 def get_skin_board_ck(user_id: int) -> str:
-    u = get_user(user_id)
+    u = get_user_fields(user_id, "skin_board_ck")
     return str((u or {}).get("skin_board_ck") or "default")
 
 def set_skin_cell_ck(user_id: int, skin: str) -> None:
     init_db()
     con = _con()
     try:
-        con.execute("UPDATE users SET skin_cell_ck=? WHERE user_id=?", (str(skin), int(user_id)))
+        con.execute("UPDATE user_cosmetics SET skin_cell_ck=? WHERE user_id=?", (str(skin), int(user_id)))
         con.commit()
     finally:
         con.close()
 
 def get_skin_cell_ck(user_id: int) -> str:
-    u = get_user(user_id)
+    u = get_user_fields(user_id, "skin_cell_ck")
     return str((u or {}).get("skin_cell_ck") or "default")
 
 
 def vip_until(user_id: int) -> float:
-    u = get_user(user_id)
+    u = get_user_fields(user_id, "vip_until")
     try:
         return float((u or {}).get("vip_until", 0.0) or 0.0)
     except Exception:
@@ -783,7 +1532,7 @@ def add_vip_days(user_id: int, days: int) -> float:
         cur = vip_until(user_id)
         base = cur if cur > now else now
         new_until = base + int(days) * 86400
-        con.execute("UPDATE users SET vip_until=? WHERE user_id=?", (float(new_until), int(user_id)))
+        con.execute("UPDATE user_profile SET vip_until=? WHERE user_id=?", (float(new_until), int(user_id)))
         con.commit()
         return float(new_until)
     finally:
@@ -792,15 +1541,10 @@ def add_vip_days(user_id: int, days: int) -> float:
 
 # ---------- Sponsor / prize pool / week start ----------
 def get_sponsor() -> dict:
-    init_db()
-    con = _con()
-    try:
-        return {
-            "text": _meta_get(con, "sponsor_text", ""),
-            "url": _meta_get(con, "sponsor_url", ""),
-        }
-    finally:
-        con.close()
+    return {
+        "text": _meta_value("sponsor_text", ""),
+        "url": _meta_value("sponsor_url", ""),
+    }
 
 
 def set_sponsor(text: str, url: str):
@@ -812,18 +1556,14 @@ def set_sponsor(text: str, url: str):
         con.commit()
     finally:
         con.close()
+    _meta_changed()
 
 
 def get_prize_pool() -> int:
-    init_db()
-    con = _con()
     try:
-        try:
-            return int(_meta_get(con, "prize_pool", "100"))
-        except Exception:
-            return 100
-    finally:
-        con.close()
+        return int(_meta_value("prize_pool", "100"))
+    except Exception:
+        return 100
 
 
 def set_prize_pool(val: int):
@@ -834,6 +1574,7 @@ def set_prize_pool(val: int):
         con.commit()
     finally:
         con.close()
+    _meta_changed()
 
 
 def add_prize_pool(delta: int) -> int:
@@ -844,15 +1585,10 @@ def add_prize_pool(delta: int) -> int:
 
 
 def get_week_start_ts() -> float:
-    init_db()
-    con = _con()
     try:
-        try:
-            return float(_meta_get(con, "week_start_ts", str(time.time())))
-        except Exception:
-            return time.time()
-    finally:
-        con.close()
+        return float(_meta_value("week_start_ts", str(time.time())))
+    except Exception:
+        return time.time()
 
 
 def set_week_start_ts(ts: float):
@@ -863,6 +1599,7 @@ def set_week_start_ts(ts: float):
         con.commit()
     finally:
         con.close()
+    _meta_changed()
 
 
 # ---------- Bans ----------
@@ -903,105 +1640,111 @@ def _pair_key(a: int, b: int, game: str = "xo") -> str:
     return f"{g}:{x}:{y}"
 
 
+def _is_rated_pair(con: sqlite3.Connection, a: int, b: int, window_sec: int, max_rated: int, game: str = "xo") -> bool:
+    k = _pair_key(a, b, game=game)
+    r = con.execute("SELECT window_start, count FROM pair_stats WHERE pair_key=?", (k,)).fetchone()
+    if not r:
+        return True
+    ws = float(r["window_start"] or 0.0)
+    cnt = int(r["count"] or 0)
+    now = time.time()
+    if now - ws >= window_sec:
+        return True
+    return cnt < max_rated
+
+
 def is_rated_pair_game(a: int, b: int, window_sec: int, max_rated: int, game: str = "xo") -> bool:
     init_db()
     con = _con()
     try:
-        k = _pair_key(a, b, game=game)
-        r = con.execute("SELECT window_start, count FROM pair_stats WHERE pair_key=?", (k,)).fetchone()
-        if not r:
-            return True
-        ws = float(r["window_start"] or 0.0)
-        cnt = int(r["count"] or 0)
-        now = time.time()
-        if now - ws >= window_sec:
-            return True
-        return cnt < max_rated
+        return _is_rated_pair(con, a, b, window_sec, max_rated, game=game)
     finally:
         con.close()
 
 
+def _record_pair(con: sqlite3.Connection, a: int, b: int, window_sec: int, game: str = "xo") -> int:
+    k = _pair_key(a, b, game=game)
+    now = time.time()
+    r = con.execute("SELECT window_start, count, total FROM pair_stats WHERE pair_key=?", (k,)).fetchone()
+    if not r:
+        con.execute(
+            "INSERT INTO pair_stats(pair_key, window_start, count, total) VALUES(?,?,?,?)",
+            (k, now, 1, 1)
+        )
+        return 1
+
+    ws = float(r["window_start"] or 0.0)
+    cnt = int(r["count"] or 0)
+    tot = int(r["total"] or 0)
+
+    if now - ws >= window_sec:
+        cnt = 1
+        ws = now
+    else:
+        cnt += 1
+    tot += 1
+
+    con.execute(
+        "UPDATE pair_stats SET window_start=?, count=?, total=? WHERE pair_key=?",
+        (ws, cnt, tot, k)
+    )
+    return int(cnt)
+
+
 def record_pair_game(a: int, b: int, window_sec: int, game: str = "xo") -> int:
     init_db()
     con = _con()
     try:
-        k = _pair_key(a, b, game=game)
-        now = time.time()
-        r = con.execute("SELECT window_start, count, total FROM pair_stats WHERE pair_key=?", (k,)).fetchone()
-        if not r:
-            con.execute(
-                "INSERT INTO pair_stats(pair_key, window_start, count, total) VALUES(?,?,?,?)",
-                (k, now, 1, 1)
-            )
-            con.commit()
-            return 1
-
-        ws = float(r["window_start"] or 0.0)
-        cnt = int(r["count"] or 0)
-        tot = int(r["total"] or 0)
-
-        if now - ws >= window_sec:
-            cnt = 1
-            ws = now
-        else:
-            cnt += 1
-        tot += 1
-
-        con.execute(
-            "UPDATE pair_stats SET window_start=?, count=?, total=? WHERE pair_key=?",
-            (ws, cnt, tot, k)
-        )
+        cnt = _record_pair(con, a, b, window_sec, game=game)
         con.commit()
-        return int(cnt)
-    finally:
-        con.close()
+        return cnt
+    finally:
+        con.close()
+
+
+# ---------- TOP-100 рейтингу (фільтри: загальний / XO / Шашки / Шахи) ----------
+def _board_game(mode: str) -> str:
+    """Leaderboard mode alias -> user_game_stats.game ("overall" for anything else)."""
+    m = (mode or "overall").lower()
+    if m in ("xo", "x", "tic", "tictactoe"):
+        return "xo"
+    if m in ("checkers", "ck", "shashky", "шашки"):
+        return "checkers"
+    if m in ("chess", "ch", "шахи", "шахматы"):
+        return "chess"
+    return "overall"
+
+
+# The board's own row drives the ORDER BY through idx_game_stats_*; XO and
+# checkers values for display are primary-key lookups. Season boards list
+# rows of the current season.
+def _score_top_sql(col: str) -> str:
+    season = col in _SEASON_COLUMNS
+    x, c = (_season_col(col, f"{a}.") if season else f"{a}.{col}" for a in ("x", "c"))
+    return f"""
+    SELECT g.user_id, username, first_name, g.{col} AS score,
+           COALESCE({x}, 1000) AS rating_xo, COALESCE({c}, 1000) AS rating_ck
+    FROM user_game_stats g
+    JOIN user_profile p ON p.user_id=g.user_id
+    LEFT JOIN user_game_stats x ON x.user_id=g.user_id AND x.game='xo'
+    LEFT JOIN user_game_stats c ON c.user_id=g.user_id AND c.game='checkers'
+    WHERE g.game=? {f"AND g.season_id={_CUR_SEASON}" if season else ""}
+    ORDER BY g.{col} DESC, g.user_id ASC
+    LIMIT ?
+"""
 
 
-# ---------- TOP-100 рейтингу (фільтри: загальний / XO / Шашки) ----------
 def get_top100(mode: str = "overall", limit: int = 100) -> list[dict]:
     """
     mode:
-      - overall: rating + rating_ck
-      - xo: rating
-      - checkers: rating_ck
+      - overall: xo + checkers rating (the "overall" user_game_stats row)
+      - xo / checkers / chess: that game's rating
     """
     init_db()
     con = _con()
     try:
-        mode = (mode or "overall").lower()
         lim = max(1, min(500, int(limit)))
-
-        if mode in ("xo", "x", "tic"):
-            cur = con.execute(
-                """
-                SELECT user_id, username, first_name, rating AS score, rating AS rating_xo, rating_ck AS rating_ck
-                FROM users
-                ORDER BY rating DESC, user_id ASC
-                LIMIT ?
-                """,
-                (lim,),
-            )
-        elif mode in ("checkers", "ck", "shashky"):
-            cur = con.execute(
-                """
-                SELECT user_id, username, first_name, rating_ck AS score, rating AS rating_xo, rating_ck AS rating_ck
-                FROM users
-                ORDER BY rating_ck DESC, user_id ASC
-                LIMIT ?
-                """,
-                (lim,),
-            )
-        else:
-            cur = con.execute(
-                """
-                SELECT user_id, username, first_name, (rating + rating_ck) AS score, rating AS rating_xo, rating_ck AS rating_ck
-                FROM users
-                ORDER BY (rating + rating_ck) DESC, user_id ASC
-                LIMIT ?
-                """,
-                (lim,),
-            )
-
+        cur = con.execute(_score_top_sql("rating"), (_board_game(mode), lim))
         out = []
         for r in cur.fetchall():
             out.append(
@@ -1022,55 +1765,14 @@ def get_top100(mode: str = "overall", limit: int = 100) -> list[dict]:
 def get_season_top100(mode: str = "overall", limit: int = 100) -> list[dict]:
     """
     mode:
-      - overall: season_rating + season_rating_ck
-      - xo: season_rating
-      - checkers: season_rating_ck
+      - overall: xo + checkers season rating
+      - xo / checkers / chess: that game's season rating
     """
     init_db()
     con = _con()
     try:
-        mode = (mode or "overall").lower()
         lim = max(1, min(500, int(limit)))
-
-        if mode in ("xo", "x", "tic"):
-            cur = con.execute(
-                """
-                SELECT user_id, username, first_name,
-                       season_rating AS score,
-                       season_rating AS rating_xo,
-                       season_rating_ck AS rating_ck
-                FROM users
-                ORDER BY season_rating DESC, user_id ASC
-                LIMIT ?
-                """,
-                (lim,)
-            )
-        elif mode in ("checkers", "ck", "shashky"):
-            cur = con.execute(
-                """
-                SELECT user_id, username, first_name,
-                       season_rating_ck AS score,
-                       season_rating AS rating_xo,
-                       season_rating_ck AS rating_ck
-                FROM users
-                ORDER BY season_rating_ck DESC, user_id ASC
-                LIMIT ?
-                """,
-                (lim,)
-            )
-        else:
-            cur = con.execute(
-                """
-                SELECT user_id, username, first_name,
-                       (season_rating + season_rating_ck) AS score,
-                       season_rating AS rating_xo,
-                       season_rating_ck AS rating_ck
-                FROM users
-                ORDER BY score DESC, user_id ASC
-                LIMIT ?
-                """,
-                (lim,)
-            )
+        cur = con.execute(_score_top_sql("season_rating"), (_board_game(mode), lim))
         return [dict(r) for r in cur.fetchall()]
     finally:
         con.close()
@@ -1080,142 +1782,176 @@ def list_all_user_ids() -> list[int]:
     init_db()
     con = _con()
     try:
-        cur = con.execute("SELECT user_id FROM users ORDER BY user_id ASC")
+        cur = con.execute("SELECT user_id FROM user_profile ORDER BY user_id ASC")
         return [int(r["user_id"]) for r in cur.fetchall()]
     finally:
         con.close()
 
 # ---------- Weekly TOP / ranks ----------
+def _weekly_top(con: sqlite3.Connection, game: str, limit: int) -> list[dict]:
+    cur = con.execute(f"""
+        SELECT g.user_id, username, first_name, week_wins, week_games, rating
+        FROM user_game_stats g JOIN user_profile p ON p.user_id=g.user_id
+        WHERE g.game=? AND g.week_epoch={_CUR_WEEK} AND week_games > 0
+        ORDER BY week_wins DESC, rating DESC, week_games ASC, g.user_id ASC
+        LIMIT ?
+    """, (_stats_game(game), int(limit)))
+    out = []
+    for r in cur.fetchall():
+        out.append({
+            "user_id": int(r["user_id"]),
+            "username": (r["username"] or ""),
+            "first_name": (r["first_name"] or ""),
+            "week_wins": int(r["week_wins"] or 0),
+            "week_games": int(r["week_games"] or 0),
+            "rating": int(r["rating"] or DEFAULT_RATING),
+        })
+    return out
+
+
 def get_weekly_top(limit: int = 10, game: str = "xo") -> list[dict]:
     init_db()
     con = _con()
     try:
-        suf = _game_suffix(game)
-        ww = "week_wins" + suf
-        wg = "week_games" + suf
-        rt = "rating" + suf
-        cur = con.execute(f"""
-            SELECT user_id, username, first_name, {ww} as week_wins, {wg} as week_games, {rt} as rating
-            FROM users
-            WHERE {wg} > 0 OR {ww} > 0
-            ORDER BY {ww} DESC, {rt} DESC, {wg} ASC, user_id ASC
-            LIMIT ?
-        """, (int(limit),))
-        out = []
-        for r in cur.fetchall():
-            out.append({
-                "user_id": int(r["user_id"]),
-                "username": (r["username"] or ""),
-                "first_name": (r["first_name"] or ""),
-                "week_wins": int(r["week_wins"] or 0),
-                "week_games": int(r["week_games"] or 0),
-                "rating": int(r["rating"] or DEFAULT_RATING),
-            })
-        return out
+        return _weekly_top(con, game, limit)
     finally:
         con.close()
 
 
-def get_weekly_rank(user_id: int, game: str = "xo") -> int | None:
+# ---------- Rank lookup ----------
+# board -> (user_game_stats.game, row filter, ordering keys). Every board ends
+# with user_id ASC, and the keys mirror the ORDER BY of the matching top query
+# so the idx_game_stats_* indexes serve each range count below.
+_WEEKLY_KEYS = (("week_wins", "DESC"), ("rating", "DESC"), ("week_games", "ASC"))
+_RANK_BOARDS: dict[str, tuple[str, str | None, tuple[tuple[str, str], ...]]] = {
+    **{g: (g, None, (("rating", "DESC"),)) for g in ("overall",) + GAMES},
+    **{f"season_{g}": (g, f"season_id = {_CUR_SEASON}", (("season_rating", "DESC"),)) for g in ("overall",) + GAMES},
+    **{f"weekly_{g}": (g, f"week_epoch = {_CUR_WEEK} AND week_games > 0", _WEEKLY_KEYS) for g in GAMES},
+}
+
+
+def rank_board(kind: str = "top", mode: str = "overall") -> str:
+    """
+    Board key for get_rank().
+    kind: top | season | weekly; mode: overall | xo | checkers | chess (aliases as in get_top100).
+    Weekly boards are per game, overall falls back to xo.
+    """
+    m = _board_game(mode)
+    k = (kind or "top").lower()
+    if k == "weekly":
+        return "weekly_" + (m if m != "overall" else "xo")
+    if k == "season":
+        return "season_" + m
+    return m
+
+
+def _rank_sql(board: str) -> tuple[str, str]:
+    game, cond, keys = _RANK_BOARDS[board]
+    keys = keys + (("user_id", "ASC"),)
+    where = f"game='{game}' AND " + (f"({cond}) AND " if cond else "")
+    # Rows ahead of the user = sum over each key of "equal on the previous keys,
+    # strictly better on this one": one index range per term, no sort.
+    terms = []
+    for i, (expr, direction) in enumerate(keys):
+        eq = "".join(f"{e} = ? AND " for e, _ in keys[:i])
+        op = ">" if direction == "DESC" else "<"
+        terms.append(f"(SELECT COUNT(*) FROM user_game_stats WHERE {where}{eq}{expr} {op} ?)")
+    probe = ", ".join(f"{e} AS k{i}" for i, (e, _) in enumerate(keys))
+    probe_sql = f"SELECT {probe}, {cond or 1} AS eligible FROM user_game_stats WHERE user_id=? AND game='{game}'"
+    return probe_sql, "SELECT " + " + ".join(terms)
+
+
+def get_rank(user_id: int, board: str = "overall") -> int | None:
+    """
+    1-based position of user_id on board (see _RANK_BOARDS / rank_board()),
+    or None when the user is unknown or not on that board (e.g. no games this week).
+    """
     init_db()
+    if board not in _RANK_BOARDS:
+        raise ValueError(f"unknown rank board: {board!r}")
+    probe_sql, count_sql = _rank_sql(board)
     con = _con()
     try:
-        suf = _game_suffix(game)
-        ww = "week_wins" + suf
-        wg = "week_games" + suf
-        rt = "rating" + suf
-        cur = con.execute(f"""
-            SELECT user_id
-            FROM users
-            WHERE {wg} > 0 OR {ww} > 0
-            ORDER BY {ww} DESC, {rt} DESC, {wg} ASC, user_id ASC
-        """)
-        rank = 1
-        for r in cur.fetchall():
-            if int(r["user_id"]) == int(user_id):
-                return rank
-            rank += 1
-        return None
+        r = con.execute(probe_sql, (int(user_id),)).fetchone()
+        if not r or not r["eligible"]:
+            return None
+        vals = list(r)[:-1]
+        args: list = []
+        for i in range(len(vals)):
+            args.extend(vals[:i])
+            args.append(vals[i])
+        ahead = con.execute(count_sql, args).fetchone()[0]
+        return int(ahead or 0) + 1
     finally:
         con.close()
 
 
+def get_weekly_rank(user_id: int, game: str = "xo") -> int | None:
+    return get_rank(user_id, rank_board("weekly", _stats_game(game)))
+
+
 # ---------- Week reset + archive ----------
 def _now_dt():
     return datetime.now(timezone.utc)
 
 
-def reset_week_if_needed(week_len_days: int, top_n: int):
+def reset_week_if_needed(week_len_days: int, top_n: int) -> bool:
     """
-    Архівує топи для XO і для Шашок окремими записами у week_history (з колонкою game).
-    Якщо колонка game з якихось причин не додалась — все одно не впаде (запише як xo).
+    Close the week once week_len_days have passed since week_start_ts: archive
+    the XO and checkers tops into week_history (one row per game) and move meta
+    week_epoch on, so the old week's counters and quest masks read as zero (see
+    _week_col). One short transaction with no per-row UPDATE; the due check is
+    repeated under the write lock, so concurrent or repeated calls and restarts
+    archive every week exactly once. Run by the background loop in app.main.
     """
     init_db()
     ws = datetime.fromtimestamp(get_week_start_ts(), tz=timezone.utc)
-    now = _now_dt()
-    if now - ws < timedelta(days=week_len_days):
+    if _now_dt() - ws < timedelta(days=week_len_days):
         return False
 
-    import json
     con = _con()
     try:
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            ws = datetime.fromtimestamp(float(_meta_get(con, "week_start_ts", str(time.time()))), tz=timezone.utc)
+        except ValueError:
+            ws = _now_dt()
+        now = _now_dt()
+        if now - ws < timedelta(days=week_len_days):
+            con.rollback()  # another caller closed it first
+            return False
+
         ts = int(time.time())
         week_start_str = ws.strftime("%Y-%m-%d")
-        pool = get_prize_pool()
-
-        # 1) XO snapshot
-        top_xo = get_weekly_top(top_n, game="xo")
-        payload_xo = []
-        for i, it in enumerate(top_xo, start=1):
-            payload_xo.append({
-                "rank": i,
-                "user_id": it["user_id"],
-                "wins": it["week_wins"],
-                "games": it["week_games"],
-                "rating": it["rating"],
-                "username": it["username"],
-                "first_name": it["first_name"],
-            })
-
-        # 2) Checkers snapshot
-        top_ck = get_weekly_top(top_n, game="checkers")
-        payload_ck = []
-        for i, it in enumerate(top_ck, start=1):
-            payload_ck.append({
-                "rank": i,
-                "user_id": it["user_id"],
-                "wins": it["week_wins"],
-                "games": it["week_games"],
-                "rating": it["rating"],
-                "username": it["username"],
-                "first_name": it["first_name"],
-            })
-
-        # insert rows (supports new column game; if DB old, fallback silently)
         try:
+            pool = int(_meta_get(con, "prize_pool", "100"))
+        except ValueError:
+            pool = 100
+        for game in OVERALL_GAMES:
+            payload = [
+                {
+                    "rank": i,
+                    "user_id": it["user_id"],
+                    "wins": it["week_wins"],
+                    "games": it["week_games"],
+                    "rating": it["rating"],
+                    "username": it["username"],
+                    "first_name": it["first_name"],
+                }
+                for i, it in enumerate(_weekly_top(con, game, top_n), start=1)
+            ]
             con.execute(
                 "INSERT INTO week_history(ts, week_start, prize_pool, top_json, game) VALUES(?,?,?,?,?)",
-                (ts, week_start_str, int(pool), json.dumps(payload_xo, ensure_ascii=False), "xo")
-            )
-            con.execute(
-                "INSERT INTO week_history(ts, week_start, prize_pool, top_json, game) VALUES(?,?,?,?,?)",
-                (ts, week_start_str, int(pool), json.dumps(payload_ck, ensure_ascii=False), "checkers")
-            )
-        except sqlite3.OperationalError:
-            # old schema without game column
-            con.execute(
-                "INSERT INTO week_history(ts, week_start, prize_pool, top_json) VALUES(?,?,?,?)",
-                (ts, week_start_str, int(pool), json.dumps(payload_xo, ensure_ascii=False))
+                (ts, week_start_str, pool, json.dumps(payload, ensure_ascii=False), game)
             )
 
-        # reset weekly counters for BOTH games
-        con.execute("UPDATE users SET week_wins=0, week_games=0, week_wins_ck=0, week_games_ck=0, quest_mask=0, quest_mask_ck=0")
-
-        new_ws = now
-        _meta_set(con, "week_start_ts", str(new_ws.timestamp()))
+        _meta_set(con, "week_epoch", str(int(_meta_get(con, "week_epoch", "0") or 0) + 1))
+        _meta_set(con, "week_start_ts", str(now.timestamp()))
         con.commit()
     finally:
-        con.close()
+        con.close()  # the pool rolls back an unfinished transaction
+    _meta_changed()
+    _boards_changed("users")
 
     return True
 
@@ -1227,19 +1963,12 @@ def load_week_history(limit: int = 5, game: str = "xo") -> list[dict]:
         import json
         out = []
 
-        # if schema has game column — filter by game
-        cols = {row[1] for row in con.execute("PRAGMA table_info(week_history)").fetchall()}
-        if "game" in cols:
-            cur = con.execute(
-                "SELECT week_start, prize_pool, top_json, ts, game FROM week_history "
-                "WHERE game=? ORDER BY id DESC LIMIT ?",
-                (_norm_game(game), int(limit))
-            )
-        else:
-            cur = con.execute(
-                "SELECT week_start, prize_pool, top_json, ts FROM week_history ORDER BY id DESC LIMIT ?",
-                (int(limit),)
-            )
+        # week_history.game is guaranteed by the baseline migration
+        cur = con.execute(
+            "SELECT week_start, prize_pool, top_json, ts, game FROM week_history "
+            "WHERE game=? ORDER BY id DESC LIMIT ?",
+            (_norm_game(game), int(limit))
+        )
 
         for r in cur.fetchall():
             try:
@@ -1251,7 +1980,7 @@ def load_week_history(limit: int = 5, game: str = "xo") -> list[dict]:
                 "pool": int(r["prize_pool"] or 0),
                 "top": top,
                 "ts": int(r["ts"] or 0),
-                "game": str(r["game"]) if "game" in r.keys() else "xo",
+                "game": str(r["game"] or "xo"),
             })
         return out
     finally:
@@ -1305,44 +2034,58 @@ def consume_invite(token: str, joiner_id: int) -> dict | None:
 SEASON_LENGTH_DAYS = 30
 
 def get_season_meta() -> dict:
-    init_db()
-    con = _con()
-    try:
-        sid = int(_meta_get(con, "season_id", "1") or "1")
-        start_ts = float(_meta_get(con, "season_start_ts", str(time.time())) or time.time())
-        return {"season_id": sid, "season_start_ts": start_ts}
-    finally:
-        con.close()
+    sid = int(_meta_value("season_id", "1") or "1")
+    start_ts = float(_meta_value("season_start_ts", str(time.time())) or time.time())
+    return {"season_id": sid, "season_start_ts": start_ts}
 
 def _season_end_ts(start_ts: float) -> float:
     return float(start_ts) + SEASON_LENGTH_DAYS * 86400
 
+
+# End of the current season as last read from meta; 0 = not read yet.
+_SEASON_END_TS = 0.0
+
+
+def season_rollover_due() -> bool:
+    """Per-update check without a DB round trip: has the cached season end passed?"""
+    return time.time() >= _SEASON_END_TS
+
+
 def reset_season_if_needed(top_n: int = 50) -> dict | None:
-    """If season expired -> store history, bump season id, reset seasonal stats."""
+    """
+    If the season expired: store its tops in season_history and bump meta
+    season_id. The soft reset of the players' season values is applied lazily
+    (see _season_col / _season_rollover), so this is one short transaction.
+    The due check is repeated under the write lock; callers gate on
+    season_rollover_due() first.
+    """
+    global _SEASON_END_TS
     init_db()
+    if not season_rollover_due():
+        return None
     con = _con()
     try:
+        con.execute("BEGIN IMMEDIATE")
         sid = int(_meta_get(con, "season_id", "1") or "1")
         start_ts = float(_meta_get(con, "season_start_ts", str(time.time())) or time.time())
         end_ts = _season_end_ts(start_ts)
         now = time.time()
         if now < end_ts:
+            con.rollback()
+            _SEASON_END_TS = end_ts
             return None
 
-        # Build top lists per game and combined
-        top_xo = con.execute(
-            "SELECT user_id, username, first_name, season_rating AS r FROM users ORDER BY season_rating DESC LIMIT ?",
-            (int(top_n),)
-        ).fetchall()
-        top_ck = con.execute(
-            "SELECT user_id, username, first_name, season_rating_ck AS r FROM users ORDER BY season_rating_ck DESC LIMIT ?",
-            (int(top_n),)
-        ).fetchall()
-        # combined: sum of season ratings
-        top_all = con.execute(
-            "SELECT user_id, username, first_name, (season_rating + season_rating_ck) AS r FROM users ORDER BY r DESC LIMIT ?",
-            (int(top_n),)
-        ).fetchall()
+        # Top lists per game and combined (overall row = sum of season ratings),
+        # current-season rows walked through idx_game_stats_season
+        def season_top(game: str) -> list:
+            return con.execute(
+                "SELECT g.user_id, username, first_name, g.season_rating AS r FROM user_game_stats g "
+                f"JOIN user_profile p ON p.user_id=g.user_id WHERE g.game=? AND g.season_id={_CUR_SEASON} "
+                "ORDER BY g.season_rating DESC, g.user_id ASC LIMIT ?",
+                (game, int(top_n)),
+            ).fetchall()
+
+        top_xo, top_ck, top_chess, top_all = (season_top(g) for g in ("xo", "checkers", "chess", "overall"))
 
         payload = {
             "season_id": sid,
@@ -1351,55 +2094,74 @@ def reset_season_if_needed(top_n: int = 50) -> dict | None:
             "top_all": [dict(row) for row in top_all],
             "top_xo": [dict(row) for row in top_xo],
             "top_ck": [dict(row) for row in top_ck],
+            "top_chess": [dict(row) for row in top_chess],
         }
         con.execute(
             "INSERT INTO season_history(season_id, season_start_ts, season_end_ts, top_json) VALUES(?,?,?,?)",
             (int(sid), float(start_ts), float(end_ts), json.dumps(payload, ensure_ascii=False))
         )
 
-        # bump season
-        sid2 = sid + 1
-        _meta_set(con, "season_id", str(sid2))
+        # bump season: every row of season sid now reads soft-reset
+        _meta_set(con, "season_id", str(sid + 1))
         _meta_set(con, "season_start_ts", str(now))
-
-        # reset seasonal stats
-        con.execute("UPDATE users SET season_rating=1000, season_rating_ck=1000, season_wins=0, season_games=0, season_wins_ck=0, season_games_ck=0")
         con.commit()
+        _SEASON_END_TS = _season_end_ts(now)
+        _meta_changed()
+        _boards_changed("users")
         return payload
     finally:
         con.close()
 
-def get_season_rating(user_id: int, game: str) -> int:
-    u = get_user(user_id) or {}
-    if _game_suffix(game) == "_ck":
-        return int(u.get("season_rating_ck", 1000) or 1000)
-    return int(u.get("season_rating", 1000) or 1000)
+SEASON_SETTLE_BATCH = 500
 
-def set_season_rating(user_id: int, game: str, rating: int):
+
+def settle_season_rollover(batch: int = SEASON_SETTLE_BATCH) -> int:
+    """
+    Store the soft reset for up to `batch` players still on an earlier season;
+    returns how many. The season boards list current-season rows, so after
+    reset_season_if_needed the background loop in app.main calls this until it
+    returns 0: players of the season just closed by overall season rating
+    first (walked through idx_game_stats_season), so the top of every board
+    is back within the first batch; then any row of an older season.
+    """
     init_db()
     con = _con()
     try:
-        if _game_suffix(game) == "_ck":
-            con.execute("UPDATE users SET season_rating_ck=? WHERE user_id=?", (int(rating), int(user_id)))
-        else:
-            con.execute("UPDATE users SET season_rating=? WHERE user_id=?", (int(rating), int(user_id)))
+        con.execute("BEGIN IMMEDIATE")
+        uids = [int(r[0]) for r in con.execute(
+            f"SELECT user_id FROM user_game_stats WHERE game='overall' AND season_id={_CUR_SEASON} - 1 "
+            "ORDER BY season_rating DESC LIMIT ?", (int(batch),)
+        )]
+        if not uids:
+            games = ", ".join(repr(g) for g in ("overall",) + GAMES)
+            uids = [int(r[0]) for r in con.execute(
+                f"SELECT DISTINCT user_id FROM user_game_stats WHERE game IN ({games}) AND season_id < {_CUR_SEASON} "
+                "LIMIT ?", (int(batch),)
+            )]
+        for uid in uids:
+            _season_rollover(con, uid)
         con.commit()
     finally:
         con.close()
+    if uids:
+        _boards_changed("users", uids)
+    return len(uids)
+
+def get_season_rating(user_id: int, game: str) -> int:
+    return int(get_game_stats(user_id, game)["season_rating"])
+
+def set_season_rating(user_id: int, game: str, rating: int):
+    _upsert_game_stats(user_id, game, (
+        f"INSERT INTO user_game_stats(user_id, game, season_rating, season_id) VALUES(?,?,?,{_CUR_SEASON}) "
+        "ON CONFLICT(user_id, game) DO UPDATE SET season_rating=excluded.season_rating"
+    ), (int(rating),), season=True)
+    _boards_changed("users", [user_id])
 
 def inc_season_games(user_id: int, game: str, win: bool = False):
-    init_db()
-    con = _con()
-    try:
-        if _game_suffix(game) == "_ck":
-            con.execute("UPDATE users SET season_games_ck=season_games_ck+1, season_wins_ck=season_wins_ck+? WHERE user_id=?",
-                        (1 if win else 0, int(user_id)))
-        else:
-            con.execute("UPDATE users SET season_games=season_games+1, season_wins=season_wins+? WHERE user_id=?",
-                        (1 if win else 0, int(user_id)))
-        con.commit()
-    finally:
-        con.close()
+    _upsert_game_stats(user_id, game, (
+        f"INSERT INTO user_game_stats(user_id, game, season_games, season_wins, season_id) VALUES(?,?,1,?,{_CUR_SEASON}) "
+        "ON CONFLICT(user_id, game) DO UPDATE SET season_games=season_games+1, season_wins=season_wins+excluded.season_wins"
+    ), (1 if win else 0,), season=True)
 
 
 # ---------------- Referrals ----------------
@@ -1413,8 +2175,7 @@ def try_attach_referral(invited_id: int, inviter_id: int) -> bool:
     init_db()
     con = _con()
     try:
-        u = con.execute("SELECT total_games, total_games_ck FROM users WHERE user_id=?", (int(invited_id),)).fetchone()
-        if u and (int(u["total_games"] or 0) > 0 or int(u["total_games_ck"] or 0) > 0):
+        if _rated_games_total(con, invited_id) > 0:
             return False
         # avoid self
         if int(invited_id) == int(inviter_id):
@@ -1430,10 +2191,11 @@ def try_attach_referral(invited_id: int, inviter_id: int) -> bool:
 
         con.execute("INSERT INTO referrals(inviter_id, invited_id, created_ts) VALUES(?,?,?)",
                     (int(inviter_id), int(invited_id), float(time.time())))
-        con.execute("UPDATE users SET ref_count=ref_count+1 WHERE user_id=?", (int(inviter_id),))
+        con.execute("UPDATE user_marketing SET ref_count=ref_count+1 WHERE user_id=?", (int(inviter_id),))
         # reward newcomer immediately
-        con.execute("UPDATE users SET coins=coins+? WHERE user_id=?", (int(REF_NEWCOMER_COINS), int(invited_id)))
+        con.execute("UPDATE user_profile SET coins=coins+? WHERE user_id=?", (int(REF_NEWCOMER_COINS), int(invited_id)))
         con.commit()
+        _boards_changed("users", [inviter_id])
         return True
     finally:
         con.close()
@@ -1448,48 +2210,512 @@ def get_referrer(invited_id: int) -> int | None:
         con.close()
 
 def _rated_games_total(con, user_id: int) -> int:
-    r = con.execute("SELECT total_games, total_games_ck FROM users WHERE user_id=?", (int(user_id),)).fetchone()
-    if not r:
-        return 0
-    return int(r["total_games"] or 0) + int(r["total_games_ck"] or 0)
+    r = con.execute("SELECT SUM(total_games) FROM user_game_stats WHERE user_id=?", (int(user_id),)).fetchone()
+    return int(r[0] or 0)
+
+def _pay_referral_reward(con: sqlite3.Connection, invited_id: int) -> tuple[int, int] | None:
+    ref = con.execute("SELECT inviter_id, activated_ts, rewarded_ts FROM referrals WHERE invited_id=?", (int(invited_id),)).fetchone()
+    if not ref:
+        return None
+    if ref["rewarded_ts"]:
+        return None
+    games = _rated_games_total(con, invited_id)
+    if games < REF_REQUIRED_RATED_GAMES:
+        return None
+    inviter_id = int(ref["inviter_id"])
+    now = float(time.time())
+    if not ref["activated_ts"]:
+        con.execute("UPDATE referrals SET activated_ts=? WHERE invited_id=?", (now, int(invited_id)))
+    con.execute("UPDATE user_profile SET coins=coins+? WHERE user_id=?", (int(REF_REWARD_COINS), int(inviter_id)))
+    con.execute("UPDATE user_marketing SET ref_earned=ref_earned+? WHERE user_id=?", (int(REF_REWARD_COINS), int(inviter_id)))
+    con.execute("UPDATE referrals SET rewarded_ts=? WHERE invited_id=?", (now, int(invited_id)))
+    _boards_changed("users", [inviter_id])
+    return (inviter_id, int(REF_REWARD_COINS))
+
 
 def try_pay_referral_reward(invited_id: int) -> tuple[int, int] | None:
     """If invited reached threshold rated games -> reward inviter once. Returns (inviter_id, coins) or None."""
     init_db()
     con = _con()
     try:
-        ref = con.execute("SELECT inviter_id, activated_ts, rewarded_ts FROM referrals WHERE invited_id=?", (int(invited_id),)).fetchone()
-        if not ref:
-            return None
-        if ref["rewarded_ts"]:
-            return None
-        games = _rated_games_total(con, invited_id)
-        if games < REF_REQUIRED_RATED_GAMES:
+        paid = _pay_referral_reward(con, invited_id)
+        if paid:
+            con.commit()
+        return paid
+    finally:
+        con.close()
+
+
+# ---------------- Game results (one transaction per finished PvP game) ----------------
+@dataclass
+class GameResult:
+    """A finished PvP game. a_id is X / red / white, b_id is O / blue / black."""
+    game: str
+    a_id: int
+    b_id: int
+    winner_id: int | None  # None = draw
+    anti_boost_window_sec: int
+    anti_boost_max_rated: int
+    # ledger details (see _GAMES_LEDGER_SQL)
+    tournament_id: int = 0
+    tmatch_id: int = 0
+    moves: tuple[str, ...] = ()  # XO cells, checkers steps "rcrc", chess UCI
+    duration_sec: float = 0.0
+
+
+@dataclass
+class GameOutcome:
+    rated: bool
+    shadowbanned: dict[int, bool]
+    rating_before: dict[int, int]
+    rating_after: dict[int, int]
+    referral_payouts: list[tuple[int, int]] = field(default_factory=list)  # (inviter_id, coins)
+    game_id: int = 0  # games.id of the ledger row
+
+
+def _append_game(con: sqlite3.Connection, res: GameResult, game: str, rated: bool, sb: dict[int, bool],
+                 before: dict[int, int], s_before: dict[int, int], stored: dict[int, tuple[int, int]]) -> int:
+    """Insert the ledger row of a finished game (inside the caller's transaction); returns games.id."""
+    a, b = int(res.a_id), int(res.b_id)
+    winner = None if res.winner_id is None else int(res.winner_id)
+    ts = time.time()
+    cur = con.execute(
+        "INSERT INTO games(ts, game, a_id, b_id, winner_id, result, rated, a_shadowban, b_shadowban, "
+        "a_rating_before, a_rating_after, b_rating_before, b_rating_after, "
+        "a_season_before, a_season_after, b_season_before, b_season_after, week_epoch, season_id, "
+        "tournament_id, tmatch_id, moves, duration_sec) "
+        f"VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,{_CUR_WEEK},{_CUR_SEASON},?,?,?,?)",
+        (ts, game, a, b, winner, "draw" if winner is None else ("a" if winner == a else "b"), int(rated),
+         int(sb[a]), int(sb[b]), before[a], stored[a][0], before[b], stored[b][0],
+         s_before[a], stored[a][1], s_before[b], stored[b][1],
+         int(res.tournament_id or 0), int(res.tmatch_id or 0), " ".join(map(str, res.moves)),
+         round(float(res.duration_sec or 0.0), 3)),
+    )
+    game_id = int(cur.lastrowid)
+    con.executemany("INSERT INTO game_players(user_id, ts, game_id) VALUES(?,?,?)", ((a, ts, game_id), (b, ts, game_id)))
+    return game_id
+
+
+def record_game_result(res: GameResult) -> GameOutcome:
+    """Apply every post-game change for both players in one BEGIN IMMEDIATE transaction.
+
+    Shadowbanned players get nothing. Each other player gets total, weekly and
+    season counters, plus battle-pass XP if the game is rated. A rated
+    decisive game also updates global and season Elo and the anti-boost pair
+    window. Referral rewards are checked for both players. The game itself is
+    appended to the games ledger.
+    """
+    from app.rating import update_elo
+
+    init_db()
+    game = _stats_game(res.game)
+    a, b = int(res.a_id), int(res.b_id)
+    winner = None if res.winner_id is None else int(res.winner_id)
+    con = _con()
+    try:
+        con.execute("BEGIN IMMEDIATE")
+        for uid in (a, b):
+            _season_rollover(con, uid)
+        rows = {
+            int(r["user_id"]): r
+            for r in con.execute(
+                "SELECT p.user_id, shadowban, COALESCE(g.rating, 1000) AS rating, "
+                "COALESCE(g.season_rating, 1000) AS season_rating FROM user_profile p "
+                "LEFT JOIN user_game_stats g ON g.user_id=p.user_id AND g.game=? WHERE p.user_id IN (?, ?)",
+                (game, a, b),
+            )
+        }
+        sb = {uid: bool(rows[uid]["shadowban"]) if uid in rows else False for uid in (a, b)}
+        rated = _is_rated_pair(con, a, b, res.anti_boost_window_sec, res.anti_boost_max_rated, game=res.game)
+
+        # counters (total / weekly / season) + battle pass
+        for uid in (a, b):
+            if sb[uid]:
+                continue
+            w = 1 if uid == winner else 0
+            con.execute(
+                "INSERT INTO user_game_stats(user_id, game, total_games, total_wins, week_games, week_wins, "
+                f"season_games, season_wins, week_epoch, season_id) VALUES(?,?,1,?,1,?,1,?,{_CUR_WEEK},{_CUR_SEASON}) "
+                "ON CONFLICT(user_id, game) DO UPDATE SET "
+                "total_games=total_games+1, total_wins=total_wins+excluded.total_wins, "
+                + _week_sets(week_games="{cur}+1", week_wins="{cur}+excluded.week_wins") + ", "
+                "season_games=season_games+1, season_wins=season_wins+excluded.season_wins",
+                (uid, game, w, w, w),
+            )
+            if rated:
+                _apply_bp_xp(con, uid, 20 if w else 10)
+
+        # referrals (reward when invited played enough games)
+        payouts = [p for p in (_pay_referral_reward(con, uid) for uid in (a, b)) if p]
+
+        before = {uid: int(rows[uid]["rating"]) if uid in rows else DEFAULT_RATING for uid in (a, b)}
+        after = dict(before)
+        s_before = {uid: int(rows[uid]["season_rating"]) if uid in rows else 1000 for uid in (a, b)}
+        s_after = dict(s_before)
+        if winner is not None and rated:
+            score_a = 1.0 if winner == a else 0.0
+            after[a], after[b] = update_elo(before[a], before[b], score_a)
+            s_after = dict(zip((a, b), update_elo(s_before[a], s_before[b], score_a)))
+            for uid in (a, b):
+                if not sb[uid]:
+                    con.execute(
+                        "UPDATE user_game_stats SET rating=?, season_rating=? WHERE user_id=? AND game=?",
+                        (int(after[uid]), int(s_after[uid]), uid, game),
+                    )
+            _record_pair(con, a, b, res.anti_boost_window_sec, game=res.game)
+
+        stored = {uid: (before[uid], s_before[uid]) if sb[uid] else (after[uid], s_after[uid]) for uid in (a, b)}
+        game_id = _append_game(con, res, game, rated, sb, before, s_before, stored)
+
+        con.commit()
+        _boards_changed("users", (a, b))
+        return GameOutcome(rated=rated, shadowbanned=sb, rating_before=before, rating_after=after,
+                           referral_payouts=payouts, game_id=game_id)
+    finally:
+        con.close()
+
+
+def get_user_games(user_id: int, limit: int = 20, before_ts: float | None = None) -> list[dict]:
+    """Ledger rows of user_id's games, newest first (before_ts pages further back)."""
+    init_db()
+    con = _con()
+    try:
+        rows = con.execute(
+            "SELECT g.* FROM game_players p JOIN games g ON g.id=p.game_id "
+            "WHERE p.user_id=? AND p.ts < ? ORDER BY p.ts DESC, p.game_id DESC LIMIT ?",
+            (int(user_id), float("inf") if before_ts is None else float(before_ts), int(limit)),
+        ).fetchall()
+        return [dict(r) for r in rows]
+    finally:
+        con.close()
+
+
+def _soft_reset(rating: int, base: int = 1000, seasons: int = 1) -> int:
+    """Python twin of the season soft reset in _season_col (SQLite ROUND: halves away from zero).
+
+    seasons: how many seasons closed since the rating was written; settle_season_rollover
+    stores one soft reset per closed season.
+    """
+    for _ in range(seasons):
+        d = (rating - base) * SOFT_RESET_FACTOR
+        rating = base + int(math.copysign(math.floor(abs(d) + 0.5), d))
+    return rating
+
+
+_LEDGER_STATS = ("rating", "total_games", "total_wins", "week_games", "week_wins",
+                 "season_rating", "season_games", "season_wins")
+
+
+def replay_game_ledger(apply: bool = False, max_mismatches: int = 20) -> dict:
+    """Rebuild ratings and game counters from the games ledger in one streaming pass.
+
+    Games are replayed in ledger order the way record_game_result() applied
+    them (Elo from the replayed ratings, shadowbanned players frozen, weekly
+    and season counters per week_epoch / season_id with one soft reset per
+    closed season, as settle_season_rollover stores it), keeping one small state per (user, game). The result
+    is compared with user_game_stats; with apply=True the compared rows are
+    overwritten with the replayed values, stamped with the current week and
+    season (quest masks keep reading as before). Rows the ledger never
+    touched are left alone. The rebuild is exact for games recorded since
+    migration 009_games_ledger; "drift" counts games whose stored Elo before
+    differs from the replayed one (ratings changed outside the ledger).
+    """
+    from app.rating import update_elo
+
+    init_db()
+    con = _con()
+    try:
+        con.execute("BEGIN IMMEDIATE" if apply else "BEGIN")
+        state: dict[int, dict[str, dict]] = {}
+        n = drift = 0
+        cur = con.execute(
+            "SELECT game, a_id, b_id, winner_id, rated, a_shadowban, b_shadowban, a_rating_before, b_rating_before, "
+            "a_season_before, b_season_before, week_epoch, season_id FROM games ORDER BY id"
+        )
+        for g in cur:
+            n += 1
+            season, week = int(g["season_id"]), int(g["week_epoch"])
+            a, b = int(g["a_id"]), int(g["b_id"])
+            sb = {a: bool(g["a_shadowban"]), b: bool(g["b_shadowban"])}
+            st = {}
+            for uid in (a, b):
+                games = state.setdefault(uid, {})
+                for row in games.values():  # _season_rollover
+                    if row["season_id"] != season:
+                        row.update(season_rating=_soft_reset(row["season_rating"], seasons=season - row["season_id"]),
+                                   season_wins=0, season_games=0, season_id=season)
+                st[uid] = games.setdefault(g["game"], {
+                    "rating": DEFAULT_RATING, "total_games": 0, "total_wins": 0, "week_epoch": week,
+                    "week_games": 0, "week_wins": 0, "season_id": season, "season_rating": 1000,
+                    "season_games": 0, "season_wins": 0,
+                })
+            if (st[a]["rating"], st[b]["rating"], st[a]["season_rating"], st[b]["season_rating"]) != (
+                g["a_rating_before"], g["b_rating_before"], g["a_season_before"], g["b_season_before"]
+            ):
+                drift += 1
+            winner = g["winner_id"]
+            for uid in (a, b):
+                if sb[uid]:
+                    continue
+                w = 1 if uid == winner else 0
+                row = st[uid]
+                if row["week_epoch"] != week:
+                    row.update(week_epoch=week, week_games=0, week_wins=0)
+                for k in ("total", "week", "season"):
+                    row[f"{k}_games"] += 1
+                    row[f"{k}_wins"] += w
+            if winner is not None and g["rated"]:
+                score_a = 1.0 if winner == a else 0.0
+                ra, rb = update_elo(st[a]["rating"], st[b]["rating"], score_a)
+                sa, sb_ = update_elo(st[a]["season_rating"], st[b]["season_rating"], score_a)
+                for uid, r, s in ((a, ra, sa), (b, rb, sb_)):
+                    if not sb[uid]:
+                        st[uid].update(rating=int(r), season_rating=int(s))
+
+        cur_week = int(_meta_get(con, "week_epoch", "0") or 0)
+        cur_season = int(_meta_get(con, "season_id", "1") or 1)
+        read_sql = (
+            "SELECT rating, total_games, total_wins, "
+            + ", ".join(_week_col(c) for c in ("week_games", "week_wins")) + ", "
+            + ", ".join(_season_col(c) for c in ("season_rating", "season_games", "season_wins"))
+            + " FROM user_game_stats WHERE user_id=? AND game=?"
+        )
+        mismatches: list[tuple] = []
+        mismatched = rows = 0
+        for uid, games in state.items():
+            if apply:
+                _season_rollover(con, uid)
+            for game, row in games.items():
+                rows += 1
+                if row["week_epoch"] != cur_week:
+                    row.update(week_games=0, week_wins=0)
+                if row["season_id"] != cur_season:
+                    row.update(season_rating=_soft_reset(row["season_rating"], seasons=cur_season - row["season_id"]),
+                               season_games=0, season_wins=0)
+                want = tuple(row[c] for c in _LEDGER_STATS)
+                got = con.execute(read_sql, (uid, game)).fetchone()
+                got = tuple(got) if got else None
+                if got == want:
+                    continue
+                mismatched += 1
+                if len(mismatches) < max_mismatches:
+                    mismatches.append((uid, game, got, want))
+                if apply:
+                    con.execute(
+                        f"INSERT OR IGNORE INTO user_game_stats(user_id, game, week_epoch, season_id) "
+                        f"VALUES(?,?,{_CUR_WEEK},{_CUR_SEASON})",
+                        (uid, game),
+                    )
+                    con.execute(
+                        "UPDATE user_game_stats SET rating=?, total_games=?, total_wins=?, week_games=?, week_wins=?, "
+                        f"season_rating=?, season_games=?, season_wins=?, quest_mask={_week_col('quest_mask')}, "
+                        f"week_epoch={_CUR_WEEK}, season_id={_CUR_SEASON} WHERE user_id=? AND game=?",
+                        want + (uid, game),
+                    )
+        con.commit()
+        if apply and mismatched:
+            _boards_changed("users", None)
+        return {"games": n, "rows": rows, "drift": drift, "mismatched": mismatched,
+                "mismatches": mismatches, "applied": bool(apply)}
+    finally:
+        con.close()
+
+
+# ---------------- Rating periods (Glicko-2) ----------------
+PROVISIONAL_RD = 110  # rd above this: rating not settled yet
+
+
+def get_glicko(user_id: int, game: str = "xo") -> dict:
+    """Glicko-2 rating, rd (aged to the current period) and volatility of one user for one game."""
+    from app.rating import Glicko2Backend, RatingState
+
+    g = _stats_game(game)
+    init_db()
+    con = _con()
+    try:
+        row = con.execute("SELECT rating, rd, vol, period FROM user_glicko WHERE user_id=? AND game=?",
+                          (int(user_id), g)).fetchone()
+    finally:
+        con.close()
+    backend = Glicko2Backend(center=DEFAULT_RATING)
+    if row is None:
+        st = backend.initial()
+    else:
+        period = int(_meta_value("rating_period", "0") or 0)
+        st = backend.idle(RatingState(row["rating"], row["rd"], row["vol"]), period - int(row["period"]))
+    return {"rating": st.rating, "rd": st.rd, "vol": st.vol, "provisional": st.rd > PROVISIONAL_RD}
+
+
+def run_rating_period(period_hours: float, backend: str = "glicko2", force: bool = False) -> dict | None:
+    """Close the rating period if it is over: rate all its ledger games at once, per game.
+
+    Reads the rated games appended since the last period, rates every
+    game's players with the backend (rating.get_backend) from their aged
+    pre-period state, then writes the new states and the period counters
+    in one short BEGIN IMMEDIATE transaction. Shadowbanned players keep
+    their state; their games still count for the opponents. Returns a
+    summary, or None when the period is not over (or another caller closed
+    it first).
+    """
+    from app.rating import Glicko2Backend, RatingState, get_backend
+
+    init_db()
+    period_ts = float(_meta_value("rating_period_ts", "0") or 0)
+    if not force and time.time() < period_ts + float(period_hours) * 3600:
+        return None
+    rater = get_backend(backend, **({"center": DEFAULT_RATING} if backend == "glicko2" else {}))
+    ager = rater if isinstance(rater, Glicko2Backend) else Glicko2Backend(center=DEFAULT_RATING)
+    t0 = time.perf_counter()
+    con = _con()
+    try:
+        period = int(_meta_get(con, "rating_period", "0") or 0) + 1
+        first = int(_meta_get(con, "rating_period_game_id", "0") or 0)
+        last = int(con.execute("SELECT COALESCE(MAX(id), 0) FROM games").fetchone()[0])
+        by_game: dict[str, list] = {}
+        frozen: set[tuple[int, str]] = set()
+        for r in con.execute(
+            "SELECT game, a_id, b_id, winner_id, a_shadowban, b_shadowban FROM games "
+            "WHERE id > ? AND id <= ? AND rated=1 ORDER BY id", (first, last)
+        ):
+            a, b, w = int(r["a_id"]), int(r["b_id"]), r["winner_id"]
+            by_game.setdefault(r["game"], []).append((a, b, 0.5 if w is None else (1.0 if int(w) == a else 0.0)))
+            if r["a_shadowban"]:
+                frozen.add((a, r["game"]))
+            if r["b_shadowban"]:
+                frozen.add((b, r["game"]))
+        rows = []
+        for game, games in by_game.items():
+            states = {
+                int(st["user_id"]): ager.idle(RatingState(st["rating"], st["rd"], st["vol"]), period - 1 - int(st["period"]))
+                for st in con.execute(
+                    "SELECT user_id, rating, rd, vol, period FROM user_glicko WHERE game=? AND user_id IN "
+                    "(SELECT a_id FROM games WHERE id > ? AND id <= ? UNION SELECT b_id FROM games WHERE id > ? AND id <= ?)",
+                    (game, first, last, first, last),
+                )
+            }
+            for uid, st in rater.rate_period(states, games).items():
+                if (uid, game) not in frozen:
+                    rows.append((uid, game, float(st.rating), float(st.rd), float(st.vol), period))
+        rate_sec = time.perf_counter() - t0
+
+        con.execute("BEGIN IMMEDIATE")
+        if int(_meta_get(con, "rating_period", "0") or 0) != period - 1:
+            con.rollback()
             return None
-        inviter_id = int(ref["inviter_id"])
-        now = float(time.time())
-        if not ref["activated_ts"]:
-            con.execute("UPDATE referrals SET activated_ts=? WHERE invited_id=?", (now, int(invited_id)))
-        con.execute("UPDATE users SET coins=coins+?, ref_earned=ref_earned+? WHERE user_id=?",
-                    (int(REF_REWARD_COINS), int(REF_REWARD_COINS), int(inviter_id)))
-        con.execute("UPDATE referrals SET rewarded_ts=? WHERE invited_id=?", (now, int(invited_id)))
+        con.executemany(
+            "INSERT INTO user_glicko(user_id, game, rating, rd, vol, period) VALUES(?,?,?,?,?,?) "
+            "ON CONFLICT(user_id, game) DO UPDATE SET rating=excluded.rating, rd=excluded.rd, "
+            "vol=excluded.vol, period=excluded.period",
+            rows,
+        )
+        _meta_set(con, "rating_period", str(period))
+        _meta_set(con, "rating_period_ts", str(time.time()))
+        _meta_set(con, "rating_period_game_id", str(last))
+        con.commit()
+        _meta_changed()
+        return {"period": period, "backend": rater.name, "games": sum(map(len, by_game.values())),
+                "players": len(rows), "rate_sec": rate_sec, "total_sec": time.perf_counter() - t0}
+    finally:
+        con.close()
+
+
+def save_live_matches(upserts: list, deletes: list) -> None:
+    """Write one batch of live-game snapshots: upserts are (kind, key, state, ts), deletes (kind, key)."""
+    init_db()
+    con = _con()
+    try:
+        con.execute("BEGIN IMMEDIATE")
+        if upserts:
+            con.executemany(
+                "INSERT INTO live_matches(kind, key, state, updated_ts) VALUES(?,?,?,?) "
+                "ON CONFLICT(kind, key) DO UPDATE SET state=excluded.state, updated_ts=excluded.updated_ts",
+                upserts,
+            )
+        if deletes:
+            con.executemany("DELETE FROM live_matches WHERE kind=? AND key=?", deletes)
         con.commit()
-        return (inviter_id, int(REF_REWARD_COINS))
     finally:
         con.close()
 
 
+def load_live_matches() -> list[tuple[str, str, str]]:
+    """Every stored live-game snapshot as (kind, key, state), oldest update first."""
+    init_db()
+    con = _con()
+    try:
+        return [tuple(r) for r in con.execute("SELECT kind, key, state FROM live_matches ORDER BY updated_ts")]
+    finally:
+        con.close()
+
 
 def get_ref_stats(user_id: int) -> dict:
     init_db()
     con = _con()
     try:
-        u = con.execute("SELECT ref_count, ref_earned FROM users WHERE user_id=?", (int(user_id),)).fetchone()
+        u = con.execute("SELECT ref_count, ref_earned FROM user_marketing WHERE user_id=?", (int(user_id),)).fetchone()
         return {"ref_count": int((u["ref_count"] if u else 0) or 0), "ref_earned": int((u["ref_earned"] if u else 0) or 0)}
     finally:
         con.close()
 
 
+def get_admin_overview() -> dict:
+    """Aggregates for the admin /stats command."""
+    init_db()
+    con = _con()
+    try:
+        now = time.time()
+        total_users = con.execute("SELECT COUNT(*) FROM user_profile").fetchone()[0]
+        # Recent active = users with any coins change or registered in last 7d
+        active_week = con.execute(
+            "SELECT COUNT(*) FROM user_profile WHERE rowid > (SELECT MAX(rowid)-1000 FROM user_profile)"
+        ).fetchone()[0]
+        total_coins = con.execute("SELECT SUM(coins) FROM user_profile").fetchone()[0] or 0
+        vip_count = con.execute(
+            "SELECT COUNT(*) FROM user_profile WHERE vip_until > ?", (now,)
+        ).fetchone()[0]
+        top5_coins = con.execute(
+            "SELECT first_name, username, coins FROM user_profile ORDER BY coins DESC LIMIT 5"
+        ).fetchall()
+        top5_rating = con.execute(
+            "SELECT first_name, username, rating FROM user_game_stats g JOIN user_profile p ON p.user_id=g.user_id "
+            "WHERE g.game='xo' ORDER BY rating DESC LIMIT 5"
+        ).fetchall()
+        orders_paid = 0
+        try:
+            orders_paid = con.execute(
+                "SELECT COUNT(*) FROM orders WHERE status='PAID'"
+            ).fetchone()[0]
+        except Exception:
+            pass
+        return {
+            "total_users": total_users,
+            "active_week": active_week,
+            "total_coins": total_coins,
+            "vip_count": vip_count,
+            "top5_coins": [dict(r) for r in top5_coins],
+            "top5_rating": [dict(r) for r in top5_rating],
+            "orders_paid": orders_paid,
+        }
+    finally:
+        con.close()
+
+
+def get_ref_top(limit: int = 10) -> list[tuple]:
+    """(user_id, username, first_name, ref_count, ref_earned) for the top referrers."""
+    init_db()
+    con = _con()
+    try:
+        rows = con.execute(
+            "SELECT m.user_id, username, first_name, ref_count, ref_earned "
+            "FROM user_marketing m JOIN user_profile p ON p.user_id=m.user_id "
+            "WHERE ref_count > 0 ORDER BY ref_count DESC, m.user_id ASC LIMIT ?",
+            (int(limit),),
+        ).fetchall()
+        return [tuple(r) for r in rows]
+    finally:
+        con.close()
+
+
 
 # ---------------- Tournaments (XO + Checkers, Daily) ----------------
 TOURN_MIN_PLAYERS = 4
@@ -1538,6 +2764,7 @@ def _tourn_points_add(con: sqlite3.Connection, user_id: int, game: str, delta: i
         "ON CONFLICT(user_id, game) DO UPDATE SET points=points+excluded.points, updated_ts=excluded.updated_ts",
         (int(user_id), "overall", int(delta), now)
     )
+    _boards_changed("tourn", [user_id])
 
 def get_tourn_top100(game: str = "overall", limit: int = 100, offset: int = 0) -> list[dict]:
     init_db()
@@ -1548,7 +2775,7 @@ def get_tourn_top100(game: str = "overall", limit: int = 100, offset: int = 0) -
     try:
         rows = con.execute(
             "SELECT tr.user_id, tr.points, u.username, u.first_name "
-            "FROM tournament_rating tr LEFT JOIN users u ON u.user_id=tr.user_id "
+            "FROM tournament_rating tr LEFT JOIN user_profile u ON u.user_id=tr.user_id "
             "WHERE tr.game=? ORDER BY tr.points DESC, tr.updated_ts DESC LIMIT ? OFFSET ?",
             (g, int(limit), int(offset))
         ).fetchall()
@@ -1561,8 +2788,7 @@ def get_tourn_tickets(user_id: int) -> int:
     init_db()
     con=_con()
     try:
-        _ensure_user_columns(con)
-        r=con.execute("SELECT tourn_tickets FROM users WHERE user_id=?", (int(user_id),)).fetchone()
+        r=con.execute("SELECT tourn_tickets FROM user_tournament WHERE user_id=?", (int(user_id),)).fetchone()
         return int((r["tourn_tickets"] if r else 0) or 0)
     finally:
         con.close()
@@ -1574,14 +2800,13 @@ def claim_vip_daily_ticket(user_id: int) -> bool:
     init_db()
     con=_con()
     try:
-        _ensure_user_columns(con)
         con.execute("BEGIN IMMEDIATE")
         day_key=_today_key_uzh()
-        r=con.execute("SELECT tourn_ticket_last_day FROM users WHERE user_id=?", (int(user_id),)).fetchone()
+        r=con.execute("SELECT tourn_ticket_last_day FROM user_tournament WHERE user_id=?", (int(user_id),)).fetchone()
         last=str((r["tourn_ticket_last_day"] if r else "") or "")
         if last == day_key:
             con.execute("ROLLBACK"); return False
-        con.execute("UPDATE users SET tourn_tickets=tourn_tickets+1, tourn_ticket_last_day=? WHERE user_id=?",
+        con.execute("UPDATE user_tournament SET tourn_tickets=tourn_tickets+1, tourn_ticket_last_day=? WHERE user_id=?",
                     (day_key, int(user_id)))
         con.commit()
         return True
@@ -1601,14 +2826,13 @@ def buy_tourn_ticket(user_id: int, price_coins: int | None = None) -> bool:
     init_db()
     con=_con()
     try:
-        _ensure_user_columns(con)
         con.execute("BEGIN IMMEDIATE")
-        r=con.execute("SELECT coins FROM users WHERE user_id=?", (int(user_id),)).fetchone()
+        r=con.execute("SELECT coins FROM user_profile WHERE user_id=?", (int(user_id),)).fetchone()
         bal=int((r["coins"] if r else 0) or 0)
         if bal < price:
             con.execute("ROLLBACK"); return False
-        con.execute("UPDATE users SET coins=coins-?, tourn_tickets=tourn_tickets+1 WHERE user_id=?",
-                    (price, int(user_id)))
+        con.execute("UPDATE user_profile SET coins=coins-? WHERE user_id=?", (price, int(user_id)))
+        con.execute("UPDATE user_tournament SET tourn_tickets=tourn_tickets+1 WHERE user_id=?", (int(user_id),))
         con.commit()
         return True
     except Exception:
@@ -1623,7 +2847,6 @@ def get_reg_open_tournaments() -> list[dict]:
     init_db()
     con=_con()
     try:
-        _ensure_tournament_columns(con)
         now=float(time.time())
         rows=con.execute(
             "SELECT * FROM tournaments WHERE status='REG' AND reg_ends_ts IS NOT NULL AND reg_ends_ts>? ORDER BY id",
@@ -1638,7 +2861,6 @@ def mark_tournament_reminder(tournament_id: int, which: str):
     init_db()
     con=_con()
     try:
-        _ensure_tournament_columns(con)
         col = "remind_2m_sent" if which=="2m" else "remind_30s_sent"
         con.execute(f"UPDATE tournaments SET {col}=1 WHERE id=?", (int(tournament_id),))
         con.commit()
@@ -1653,7 +2875,6 @@ def create_tournament(game: str, title: str, size: int, created_by: int,
     g = _norm_game(game)
     con = _con()
     try:
-        _ensure_tournament_columns(con)
         # allow only one active tournament per game
         con.execute("UPDATE tournaments SET status='CANCELLED', ended_ts=? WHERE game=? AND status IN ('REG','RUNNING')",
                     (float(time.time()), g))
@@ -1673,7 +2894,6 @@ def get_active_tournament(game: str) -> dict | None:
     g = _norm_game(game)
     con = _con()
     try:
-        _ensure_tournament_columns(con)
         r = con.execute("SELECT * FROM tournaments WHERE game=? AND status IN ('REG','RUNNING') ORDER BY id DESC LIMIT 1", (g,)).fetchone()
         return dict(r) if r else None
     finally:
@@ -1693,7 +2913,6 @@ def get_reg_expired_tournaments() -> list[dict]:
     init_db()
     con = _con()
     try:
-        _ensure_tournament_columns(con)
         now = float(time.time())
         rows = con.execute(
             "SELECT * FROM tournaments WHERE status='REG' AND reg_ends_ts IS NOT NULL AND reg_ends_ts<=? ORDER BY id",
@@ -1709,7 +2928,7 @@ def list_tournament_players(tournament_id: int) -> list[dict]:
     try:
         rows = con.execute(
             "SELECT tp.user_id, u.username, u.first_name FROM tournament_players tp "
-            "LEFT JOIN users u ON u.user_id=tp.user_id "
+            "LEFT JOIN user_profile u ON u.user_id=tp.user_id "
             "WHERE tp.tournament_id=? ORDER BY tp.joined_ts ASC",
             (int(tournament_id),)
         ).fetchall()
@@ -1723,8 +2942,6 @@ def join_tournament(tournament_id: int, user_id: int) -> bool:
     init_db()
     con = _con()
     try:
-        _ensure_tournament_columns(con)
-        _ensure_tournament_players_columns(con)
         con.execute("BEGIN IMMEDIATE")
         t = con.execute("SELECT status, size, entry_fee FROM tournaments WHERE id=?", (int(tournament_id),)).fetchone()
         if not t or str(t["status"]) != "REG":
@@ -1747,12 +2964,12 @@ def join_tournament(tournament_id: int, user_id: int) -> bool:
 
         fee = int(t["entry_fee"] or 0)
         if fee > 0:
-            bal = con.execute("SELECT coins FROM users WHERE user_id=?", (int(user_id),)).fetchone()
+            bal = con.execute("SELECT coins FROM user_profile WHERE user_id=?", (int(user_id),)).fetchone()
             bal = int(bal["coins"] or 0) if bal else 0
             if bal < fee:
                 con.execute("ROLLBACK"); return False
 
-            con.execute("UPDATE users SET coins=coins-? WHERE user_id=?", (fee, int(user_id)))
+            con.execute("UPDATE user_profile SET coins=coins-? WHERE user_id=?", (fee, int(user_id)))
             con.execute("UPDATE tournaments SET prize_pool=prize_pool+? WHERE id=?", (fee, int(tournament_id)))
 
         con.execute(
@@ -1777,9 +2994,6 @@ def join_tournament_ticket(tournament_id: int, user_id: int) -> bool:
     init_db()
     con = _con()
     try:
-        _ensure_tournament_columns(con)
-        _ensure_tournament_players_columns(con)
-        _ensure_user_columns(con)
 
         con.execute("BEGIN IMMEDIATE")
         t = con.execute("SELECT status, size, entry_fee FROM tournaments WHERE id=?", (int(tournament_id),)).fetchone()
@@ -1802,14 +3016,14 @@ def join_tournament_ticket(tournament_id: int, user_id: int) -> bool:
             con.execute("ROLLBACK"); return False
 
         # ticket balance
-        u = con.execute("SELECT tourn_tickets FROM users WHERE user_id=?", (int(user_id),)).fetchone()
+        u = con.execute("SELECT tourn_tickets FROM user_tournament WHERE user_id=?", (int(user_id),)).fetchone()
         tickets = int((u["tourn_tickets"] if u else 0) or 0)
         if tickets <= 0:
             con.execute("ROLLBACK"); return False
 
         fee = int(t["entry_fee"] or 0)
         # spend ticket
-        con.execute("UPDATE users SET tourn_tickets=MAX(tourn_tickets-1,0) WHERE user_id=?", (int(user_id),))
+        con.execute("UPDATE user_tournament SET tourn_tickets=MAX(tourn_tickets-1,0) WHERE user_id=?", (int(user_id),))
         # tickets also fund the pool by fee (keeps pool intuitive)
         if fee > 0:
             con.execute("UPDATE tournaments SET prize_pool=prize_pool+? WHERE id=?", (fee, int(tournament_id)))
@@ -1835,9 +3049,6 @@ def leave_tournament(tournament_id: int, user_id: int) -> bool:
     init_db()
     con = _con()
     try:
-        _ensure_tournament_columns(con)
-        _ensure_tournament_players_columns(con)
-        _ensure_user_columns(con)
 
         con.execute("BEGIN IMMEDIATE")
         t = con.execute("SELECT status, entry_fee FROM tournaments WHERE id=?", (int(tournament_id),)).fetchone()
@@ -1858,10 +3069,10 @@ def leave_tournament(tournament_id: int, user_id: int) -> bool:
 
         if fee > 0:
             if entry_kind == "ticket":
-                con.execute("UPDATE users SET tourn_tickets=tourn_tickets+1 WHERE user_id=?", (int(user_id),))
+                con.execute("UPDATE user_tournament SET tourn_tickets=tourn_tickets+1 WHERE user_id=?", (int(user_id),))
                 con.execute("UPDATE tournaments SET prize_pool=MAX(prize_pool-?,0) WHERE id=?", (fee, int(tournament_id)))
             else:
-                con.execute("UPDATE users SET coins=coins+? WHERE user_id=?", (fee, int(user_id)))
+                con.execute("UPDATE user_profile SET coins=coins+? WHERE user_id=?", (fee, int(user_id)))
                 con.execute("UPDATE tournaments SET prize_pool=MAX(prize_pool-?,0) WHERE id=?", (fee, int(tournament_id)))
 
         con.commit()
@@ -1882,14 +3093,11 @@ def _next_pow2(n: int) -> int:
     return p
 
 def _seed_players(con, tournament_id: int, game: str) -> list[int]:
-    if _game_suffix(game) == "_ck":
-        col = "rating_ck"
-    else:
-        col = "rating"
     rows = con.execute(
-        f"SELECT tp.user_id FROM tournament_players tp LEFT JOIN users u ON u.user_id=tp.user_id "
-        f"WHERE tp.tournament_id=? ORDER BY u.{col} DESC, tp.joined_ts ASC",
-        (int(tournament_id),)
+        "SELECT tp.user_id FROM tournament_players tp "
+        "LEFT JOIN user_game_stats u ON u.user_id=tp.user_id AND u.game=? "
+        "WHERE tp.tournament_id=? ORDER BY COALESCE(u.rating, 1000) DESC, tp.joined_ts ASC",
+        (_stats_game(game), int(tournament_id))
     ).fetchall()
     return [int(r["user_id"]) for r in rows]
 
@@ -1897,7 +3105,6 @@ def generate_bracket(tournament_id: int) -> list[dict]:
     init_db()
     con = _con()
     try:
-        _ensure_tournament_columns(con)
         t = con.execute("SELECT game, status, size FROM tournaments WHERE id=?", (int(tournament_id),)).fetchone()
         if not t or str(t["status"]) != "REG":
             return []
@@ -1990,9 +3197,9 @@ def get_bracket_text(tournament_id: int) -> str:
             "SELECT m.round, m.a_id, m.b_id, m.winner_id, m.status, ua.username AS a_u, ua.first_name AS a_f, "
             "ub.username AS b_u, ub.first_name AS b_f, uw.username AS w_u, uw.first_name AS w_f "
             "FROM tournament_matches m "
-            "LEFT JOIN users ua ON ua.user_id=m.a_id "
-            "LEFT JOIN users ub ON ub.user_id=m.b_id "
-            "LEFT JOIN users uw ON uw.user_id=m.winner_id "
+            "LEFT JOIN user_profile ua ON ua.user_id=m.a_id "
+            "LEFT JOIN user_profile ub ON ub.user_id=m.b_id "
+            "LEFT JOIN user_profile uw ON uw.user_id=m.winner_id "
             "WHERE m.tournament_id=? ORDER BY m.round, m.id",
             (int(tournament_id),)
         ).fetchall()
@@ -2028,7 +3235,7 @@ def _award_streak_and_pack(con: sqlite3.Connection, user_id: int, game: str, day
     suf = _game_suffix(game)
     streak_col = "tourn_streak" + suf
     day_col = "tourn_last_day" + suf
-    u = con.execute(f"SELECT {streak_col} AS s, {day_col} AS d FROM users WHERE user_id=?", (int(user_id),)).fetchone()
+    u = con.execute(f"SELECT {streak_col} AS s, {day_col} AS d FROM user_tournament WHERE user_id=?", (int(user_id),)).fetchone()
     prev_day = str((u["d"] if u else "") or "")
     prev_streak = int((u["s"] if u else 0) or 0)
     # compute if consecutive day
@@ -2047,7 +3254,7 @@ def _award_streak_and_pack(con: sqlite3.Connection, user_id: int, game: str, day
             new_streak = 1
     except Exception:
         new_streak = 1
-    con.execute(f"UPDATE users SET {streak_col}=?, {day_col}=? WHERE user_id=?", (int(new_streak), str(day_key), int(user_id)))
+    con.execute(f"UPDATE user_tournament SET {streak_col}=?, {day_col}=? WHERE user_id=?", (int(new_streak), str(day_key), int(user_id)))
 
     bonus_coins = 0
     bonus_item = None
@@ -2055,7 +3262,7 @@ def _award_streak_and_pack(con: sqlite3.Connection, user_id: int, game: str, day
     if new_streak > 0 and new_streak % 3 == 0:
         from app.config import TOURN_STREAK_BONUS_COINS
         bonus_coins = int(TOURN_STREAK_BONUS_COINS)
-        con.execute("UPDATE users SET coins=coins+? WHERE user_id=?", (bonus_coins, int(user_id)))
+        con.execute("UPDATE user_profile SET coins=coins+? WHERE user_id=?", (bonus_coins, int(user_id)))
 
         # bonus pack: random premium skin for that game (if not owned)
         try:
@@ -2110,9 +3317,9 @@ def _finalize_tournament(con: sqlite3.Connection, tournament_id: int):
     run_amt = int(net_pool * int(TOURN_PAYOUT_RUNNER_PCT) / 100) if net_pool>0 else 0
 
     if win_amt>0:
-        con.execute("UPDATE users SET coins=coins+? WHERE user_id=?", (win_amt, champion))
+        con.execute("UPDATE user_profile SET coins=coins+? WHERE user_id=?", (win_amt, champion))
     if runner and run_amt>0:
-        con.execute("UPDATE users SET coins=coins+? WHERE user_id=?", (run_amt, runner))
+        con.execute("UPDATE user_profile SET coins=coins+? WHERE user_id=?", (run_amt, runner))
 
     # points: join + win per match, plus bonuses
     players = [int(r["user_id"]) for r in con.execute("SELECT user_id FROM tournament_players WHERE tournament_id=?", (int(tournament_id),)).fetchall()]
@@ -2142,7 +3349,6 @@ def advance_round_if_ready(tournament_id: int) -> bool:
     init_db()
     con=_con()
     try:
-        _ensure_tournament_columns(con)
         r=con.execute("SELECT MAX(round) AS r FROM tournament_matches WHERE tournament_id=?", (int(tournament_id),)).fetchone()
         if not r or r["r"] is None:
             return False
@@ -2189,9 +3395,6 @@ def cancel_tournament(tournament_id: int):
     init_db()
     con=_con()
     try:
-        _ensure_tournament_columns(con)
-        _ensure_tournament_players_columns(con)
-        _ensure_user_columns(con)
 
         con.execute("BEGIN IMMEDIATE")
         t = con.execute("SELECT status, entry_fee FROM tournaments WHERE id=?", (int(tournament_id),)).fetchone()
@@ -2208,9 +3411,9 @@ def cancel_tournament(tournament_id: int):
                 uid = int(r["user_id"])
                 ek = str((r["entry_kind"] or "coins")).strip() or "coins"
                 if ek == "ticket":
-                    con.execute("UPDATE users SET tourn_tickets=tourn_tickets+1 WHERE user_id=?", (uid,))
+                    con.execute("UPDATE user_tournament SET tourn_tickets=tourn_tickets+1 WHERE user_id=?", (uid,))
                 else:
-                    con.execute("UPDATE users SET coins=coins+? WHERE user_id=?", (fee, uid))
+                    con.execute("UPDATE user_profile SET coins=coins+? WHERE user_id=?", (fee, uid))
 
         con.execute(
             "UPDATE tournaments SET status='CANCELLED', ended_ts=?, prize_pool=0 WHERE id=?",
@@ -2349,7 +3552,6 @@ def db_add_arena_revenue(amount_coins: int, reason: str = '') -> None:
     init_db()
     con=_con()
     try:
-        _ensure_arena_revenue_table(con)
         con.execute(
             "INSERT INTO arena_revenue(amount_coins, reason, created_ts) VALUES(?,?,?)",
             (int(amount_coins), str(reason or ''), float(time.time()))
@@ -2362,7 +3564,6 @@ def db_arena_revenue(days: int = 7) -> int:
     init_db()
     con=_con()
     try:
-        _ensure_arena_revenue_table(con)
         since = float(time.time()) - float(days) * 86400.0
         row = con.execute(
             "SELECT COALESCE(SUM(amount_coins),0) AS s FROM arena_revenue WHERE created_ts >= ?",
@@ -2378,10 +3579,10 @@ def db_list_vip_users() -> list[tuple[int,int,int]]:
     try:
         now=float(time.time())
         rows = con.execute(
-            """SELECT user_id,
+            """SELECT p.user_id,
                        COALESCE(vip_last_daily_ts,0) AS last_daily,
                        COALESCE(vip_last_weekly_pack_ts,0) AS last_weekly
-               FROM users
+               FROM user_profile p JOIN user_marketing m ON m.user_id=p.user_id
                WHERE vip_until IS NOT NULL AND vip_until > ?""",
             (now,)
         ).fetchall()
@@ -2408,8 +3609,7 @@ def vip_mark_daily_paid(user_id: int) -> None:
     init_db()
     con=_con()
     try:
-        _ensure_vip_columns(con)
-        con.execute("UPDATE users SET vip_last_daily_ts=? WHERE user_id=?", (float(time.time()), int(user_id)))
+        con.execute("UPDATE user_marketing SET vip_last_daily_ts=? WHERE user_id=?", (float(time.time()), int(user_id)))
         con.commit()
     finally:
         con.close()
@@ -2418,8 +3618,7 @@ def vip_mark_weekly_pack(user_id: int) -> None:
     init_db()
     con=_con()
     try:
-        _ensure_vip_columns(con)
-        con.execute("UPDATE users SET vip_last_weekly_pack_ts=? WHERE user_id=?", (float(time.time()), int(user_id)))
+        con.execute("UPDATE user_marketing SET vip_last_weekly_pack_ts=? WHERE user_id=?", (float(time.time()), int(user_id)))
         con.commit()
     finally:
         con.close()
@@ -2427,7 +3626,7 @@ def vip_mark_weekly_pack(user_id: int) -> None:
 # --- Battle Pass ---
 def get_bp_state(user_id: int) -> tuple[int, int, str, str]:
     init_db()
-    u = get_user(user_id)
+    u = get_user_fields(user_id, "bp_xp", "bp_level", "bp_claimed_free", "bp_claimed_premium")
     if not u: return (0, 1, "[]", "[]")
     return (
         int(u.get("bp_xp") or 0),
@@ -2436,31 +3635,36 @@ def get_bp_state(user_id: int) -> tuple[int, int, str, str]:
         str(u.get("bp_claimed_premium") or "[]"),
     )
 
+def _apply_bp_xp(con: sqlite3.Connection, user_id: int, xp: int) -> tuple[int, int]:
+    u = con.execute("SELECT bp_xp, bp_level FROM user_battle_pass WHERE user_id=?", (int(user_id),)).fetchone()
+    if not u: return 0, 1
+
+    cur_xp = int(u["bp_xp"])
+    cur_lvl = int(u["bp_level"])
+
+    new_xp = cur_xp + xp
+
+    # 100 XP per level
+    levels_gained = new_xp // 100
+    new_lvl = cur_lvl + levels_gained
+    new_xp = new_xp % 100
+
+    # Max Level 30
+    if new_lvl > 30:
+        new_lvl = 30
+        new_xp = 0
+
+    con.execute("UPDATE user_battle_pass SET bp_xp=?, bp_level=? WHERE user_id=?", (new_xp, new_lvl, int(user_id)))
+    return new_xp, new_lvl
+
+
 def add_bp_xp(user_id: int, xp: int) -> tuple[int, int]:
     init_db()
     con = _con()
     try:
-        u = con.execute("SELECT bp_xp, bp_level FROM users WHERE user_id=?", (int(user_id),)).fetchone()
-        if not u: return 0, 1
-        
-        cur_xp = int(u["bp_xp"])
-        cur_lvl = int(u["bp_level"])
-        
-        new_xp = cur_xp + xp
-        
-        # 100 XP per level
-        levels_gained = new_xp // 100
-        new_lvl = cur_lvl + levels_gained
-        new_xp = new_xp % 100
-        
-        # Max Level 30
-        if new_lvl > 30:
-            new_lvl = 30
-            new_xp = 0
-            
-        con.execute("UPDATE users SET bp_xp=?, bp_level=? WHERE user_id=?", (new_xp, new_lvl, int(user_id)))
+        res = _apply_bp_xp(con, user_id, xp)
         con.commit()
-        return new_xp, new_lvl
+        return res
     finally:
         con.close()
 
@@ -2469,7 +3673,7 @@ def claim_bp_reward(user_id: int, level: int, is_premium: bool) -> bool:
     con = _con()
     try:
         import json
-        u = con.execute("SELECT bp_claimed_free, bp_claimed_premium FROM users WHERE user_id=?", (int(user_id),)).fetchone()
+        u = con.execute("SELECT bp_claimed_free, bp_claimed_premium FROM user_battle_pass WHERE user_id=?", (int(user_id),)).fetchone()
         if not u: return False
         
         claimed_f = json.loads(str(u["bp_claimed_free"] or "[]"))
@@ -2478,11 +3682,11 @@ def claim_bp_reward(user_id: int, level: int, is_premium: bool) -> bool:
         if is_premium:
             if level in claimed_p: return False
             claimed_p.append(level)
-            con.execute("UPDATE users SET bp_claimed_premium=? WHERE user_id=?", (json.dumps(claimed_p), int(user_id)))
+            con.execute("UPDATE user_battle_pass SET bp_claimed_premium=? WHERE user_id=?", (json.dumps(claimed_p), int(user_id)))
         else:
             if level in claimed_f: return False
             claimed_f.append(level)
-            con.execute("UPDATE users SET bp_claimed_free=? WHERE user_id=?", (json.dumps(claimed_f), int(user_id)))
+            con.execute("UPDATE user_battle_pass SET bp_claimed_free=? WHERE user_id=?", (json.dumps(claimed_f), int(user_id)))
             
         con.commit()
         return True
@@ -2494,14 +3698,14 @@ def set_shadowban(user_id: int, status: bool) -> None:
     init_db()
     con = _con()
     try:
-        con.execute("UPDATE users SET shadowban=? WHERE user_id=?", (1 if status else 0, int(user_id)))
+        con.execute("UPDATE user_profile SET shadowban=? WHERE user_id=?", (1 if status else 0, int(user_id)))
         con.commit()
     finally:
         con.close()
         
 def is_shadowbanned(user_id: int) -> bool:
     init_db()
-    u = get_user(user_id)
+    u = get_user_fields(user_id, "shadowban")
     if not u: return False
     return bool(u.get("shadowban", 0))
 
@@ -2510,7 +3714,7 @@ def set_last_promo_msg_ts(user_id: int, ts: float) -> None:
     init_db()
     con = _con()
     try:
-        con.execute("UPDATE users SET last_promo_msg_ts=? WHERE user_id=?", (ts, int(user_id)))
+        con.execute("UPDATE user_marketing SET last_promo_msg_ts=? WHERE user_id=?", (ts, int(user_id)))
         con.commit()
     finally:
         con.close()
@@ -2571,7 +3775,13 @@ def get_marketing_candidates() -> list[dict]:
     con = _con()
     try:
         con.row_factory = sqlite3.Row
-        return [dict(r) for r in con.execute("SELECT * FROM users").fetchall()]
+        return [dict(r) for r in con.execute(
+            "SELECT p.user_id, username, first_name, lang, updated_ts, last_promo_msg_ts, "
+            "COALESCE(SUM(g.total_wins), 0) AS total_wins, COALESCE(SUM(g.total_games), 0) AS total_games "
+            "FROM user_profile p JOIN user_marketing m ON m.user_id=p.user_id "
+            "LEFT JOIN user_game_stats g ON g.user_id=p.user_id "
+            "GROUP BY p.user_id"
+        ).fetchall()]
     finally:
         con.close()
 
@@ -2581,7 +3791,7 @@ def claim_daily_bonus(user_id: int, amount: int = 50) -> tuple[bool, int]:
     con = _con()
     try:
         now = time.time()
-        row = con.execute("SELECT last_daily_bonus_ts, coins FROM users WHERE user_id=?", (int(user_id),)).fetchone()
+        row = con.execute("SELECT last_daily_bonus_ts, coins FROM user_profile WHERE user_id=?", (int(user_id),)).fetchone()
         if not row:
             return False, 0
         
@@ -2596,35 +3806,31 @@ def claim_daily_bonus(user_id: int, amount: int = 50) -> tuple[bool, int]:
             return False, cur_coins
             
         new_coins = cur_coins + amount
-        con.execute("UPDATE users SET coins=?, last_daily_bonus_ts=? WHERE user_id=?", (new_coins, now, int(user_id)))
+        con.execute("UPDATE user_profile SET coins=?, last_daily_bonus_ts=? WHERE user_id=?", (new_coins, now, int(user_id)))
         con.commit()
         return True, new_coins
     finally:
         con.close()
 
 def can_claim_daily_bonus(user_id: int) -> bool:
-    init_db()
-    con = _con()
-    try:
-        now = time.time()
-        row = con.execute("SELECT last_daily_bonus_ts FROM users WHERE user_id=?", (int(user_id),)).fetchone()
-        if not row: return False
-        
-        def get_day(ts):
-            return int(ts // 86400)
-            
-        return get_day(now) > get_day(row[0])
-    finally:
-        con.close()
+    u = get_user_fields(user_id, "last_daily_bonus_ts")
+    if not u: return False
+
+    def get_day(ts):
+        return int(ts // 86400)
+
+    return get_day(time.time()) > get_day(float(u["last_daily_bonus_ts"] or 0))
 def get_top_weekly(game: str = "xo", limit: int = 3) -> list[dict]:
     init_db()
     con = _con()
     try:
-        suf = "_ck" if game == "checkers" else ""
-        col = "week_wins" + suf
+        # same ordering as get_weekly_top so idx_game_stats_week serves it
         rows = con.execute(
-            f"SELECT user_id, first_name, {col} as wins FROM users WHERE {col} > 0 ORDER BY {col} DESC LIMIT ?",
-            (limit,)
+            "SELECT g.user_id, first_name, week_wins as wins FROM user_game_stats g "
+            f"JOIN user_profile p ON p.user_id=g.user_id WHERE g.game=? AND g.week_epoch={_CUR_WEEK} "
+            "AND week_games > 0 AND week_wins > 0 "
+            "ORDER BY week_wins DESC, rating DESC, week_games ASC, g.user_id ASC LIMIT ?",
+            (_stats_game(game), limit)
         ).fetchall()
         return [dict(r) for r in rows]
     finally:
@@ -0,0 +1,144 @@
+# app/db_async.py
+"""Awaitable mirror of app.db for handlers running on the asyncio loop.
+
+Every public callable of app.db is available here under the same name and
+signature but returns a coroutine; the sqlite work runs on one dedicated DB
+thread, so a slow write never blocks other updates on the loop:
+
+    from app import db_async as adb
+    user = await adb.get_user(uid)
+
+Calls keep their submission order (single worker thread) and see the caller's
+contextvars. Use ``await run(fn, ...)`` for any other blocking DB helper
+(app.history, raw ``db._con()`` queries).
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from app import db as _db
+from app import user_snapshot
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sm-db")
+
+# Cheap, non-blocking helpers that stay synchronous.
+_SYNC_PASSTHROUGH = {
+    "init_db", "pool_stats", "get_schema_version", "migrate", "rank_board", "add_board_listener",
+    "season_rollover_due", "meta_version", "meta_cached",
+}
+
+# Getters that only read narrow user tables via get_user_fields(), mapped to
+# the snapshot keys they need: answered inline, without a thread hop, when the
+# caller's snapshot already holds those rows.
+_P, _C, _B = "user_profile", "user_cosmetics", "user_battle_pass"
+_SNAPSHOT_GETTERS: dict[str, tuple[str, ...]] = {
+    "get_user": tuple(_db.USER_TABLES) + tuple(_db._game_stats_key(g) for g in ("xo", "checkers")),
+    "get_lang": (_P,), "db_get_lang": (_P,), "get_coins": (_P,), "get_active_game": (_P,),
+    "vip_until": (_P,), "is_vip": (_P,), "is_shadowbanned": (_P,),
+    "get_skin": (_C,), "get_skin_ck": (_C,), "get_skin_chess": (_C,), "get_skin_board": (_C,),
+    "get_skin_cell": (_C,), "get_skin_board_ck": (_C,), "get_skin_cell_ck": (_C,),
+    "get_active_wallpaper": (_C,), "can_claim_daily_bonus": (_P,),
+    "get_bp_state": (_B,),
+}
+# Per-game getters (user_id, game, ...) reading one user_game_stats row via get_game_stats().
+_GAME_GETTERS = {"get_game_stats", "get_rating", "get_season_rating", "get_quest_mask"}
+# Getters served from app.db's meta cache: inline while it is fresh.
+_META_GETTERS = {"get_chat", "get_news", "get_sponsor", "get_prize_pool", "get_week_start_ts", "get_season_meta"}
+
+
+async def run(fn, /, *args, **kwargs):
+    """Run a blocking callable on the DB thread and await its result."""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, fn, *args, **kwargs)
+    return await loop.run_in_executor(_EXECUTOR, call)
+
+
+def _wrap(fn):
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run(fn, *args, **kwargs)
+
+    return wrapper
+
+
+def _wrap_snapshot_getter(fn, tables: tuple[str, ...]):
+    @functools.wraps(fn)
+    async def wrapper(user_id, *args, **kwargs):
+        if all(user_snapshot.has(user_id, t) for t in tables):
+            return fn(user_id, *args, **kwargs)
+        return await run(fn, user_id, *args, **kwargs)
+
+    return wrapper
+
+
+def _wrap_game_getter(fn):
+    @functools.wraps(fn)
+    async def wrapper(user_id, *args, **kwargs):
+        game = kwargs.get("game", args[0] if args else "xo")
+        try:
+            cached = user_snapshot.has(user_id, _db._game_stats_key(_db._stats_game(game)))
+        except ValueError:
+            cached = False
+        if cached:
+            return fn(user_id, *args, **kwargs)
+        return await run(fn, user_id, *args, **kwargs)
+
+    return wrapper
+
+
+def _wrap_meta_getter(fn):
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        if _db.meta_cached():
+            return fn(*args, **kwargs)
+        return await run(fn, *args, **kwargs)
+
+    return wrapper
+
+
+async def get_user_fields(user_id, *fields):
+    """Async app.db.get_user_fields(); inline when the snapshot covers every field."""
+    tables = {_db.USER_COLUMN_TABLE[f] for f in fields}
+    if all(user_snapshot.has(user_id, t) for t in tables):
+        return _db.get_user_fields(user_id, *fields)
+    return await run(_db.get_user_fields, user_id, *fields)
+
+
+_CACHE: dict[str, object] = {}
+
+
+def __getattr__(name: str):
+    if name.startswith("_"):
+        raise AttributeError(name)
+    cached = _CACHE.get(name)
+    if cached is not None:
+        return cached
+    try:
+        attr = getattr(_db, name)
+    except AttributeError:
+        raise AttributeError(f"module 'app.db_async' has no attribute {name!r}") from None
+    if not callable(attr) or isinstance(attr, type) or name in _SYNC_PASSTHROUGH:
+        return attr
+    tables = _SNAPSHOT_GETTERS.get(name)
+    if tables:
+        wrapped = _wrap_snapshot_getter(attr, tables)
+    elif name in _GAME_GETTERS:
+        wrapped = _wrap_game_getter(attr)
+    elif name in _META_GETTERS:
+        wrapped = _wrap_meta_getter(attr)
+    else:
+        wrapped = _wrap(attr)
+    _CACHE[name] = wrapped
+    return wrapped
+
+
+def __dir__():
+    return sorted(set(globals()) | {n for n in dir(_db) if not n.startswith("_")})
+
+
+def shutdown() -> None:
+    _EXECUTOR.shutdown(wait=True)
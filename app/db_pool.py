@@ -0,0 +1,194 @@
+# app/db_pool.py
+"""Small pool of long-lived SQLite connections.
+
+app.db keeps its ``con = _con() ... finally: con.close()`` pattern: connections
+handed out here are PooledConnection objects whose close() puts them back into
+the pool (rolling back anything left uncommitted) instead of closing the file.
+Pragmas are applied once per physical connection.
+
+Write listeners (add_write_listener) are called after commit() or close() if
+the connection changed any rows since it was handed out.
+"""
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+POOL_SIZE = 8
+ACQUIRE_TIMEOUT_SEC = 10.0
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-16000",     # ~16 MB page cache per connection
+    "PRAGMA mmap_size=134217728",   # 128 MB
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+_WRITE_LISTENERS: list = []
+
+
+def add_write_listener(fn) -> None:
+    if fn not in _WRITE_LISTENERS:
+        _WRITE_LISTENERS.append(fn)
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3.Connection whose close() returns it to its pool."""
+
+    _pool: "ConnectionPool | None" = None
+    _pooled_out: bool = False
+    _changes_seen: int = 0
+
+    def _notify_writes(self):
+        changes = self.total_changes
+        if changes != self._changes_seen:
+            self._changes_seen = changes
+            for fn in _WRITE_LISTENERS:
+                fn()
+
+    def commit(self):
+        super().commit()
+        self._notify_writes()
+
+    def close(self):
+        pool = self._pool
+        if pool is None:
+            super().close()
+            return
+        pool.release(self)
+
+    def _close_for_real(self):
+        self._pool = None
+        super().close()
+
+
+class ConnectionPool:
+    def __init__(self, path: str | Path, size: int = POOL_SIZE, timeout: float = ACQUIRE_TIMEOUT_SEC):
+        self.path = Path(path)
+        self.size = max(1, int(size))
+        self.timeout = float(timeout)
+        self._idle: list[PooledConnection] = []
+        self._created = 0
+        self._cond = threading.Condition(threading.Lock())
+
+        # stats
+        self.acquires = 0
+        self.waits = 0
+        self.wait_total_sec = 0.0
+        self.wait_max_sec = 0.0
+        self.timeouts = 0
+
+    def _connect(self) -> PooledConnection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        con = sqlite3.connect(
+            self.path,
+            factory=PooledConnection,
+            check_same_thread=False,   # connections move between the loop and the DB executor thread
+        )
+        con.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            con.execute(pragma)
+        con._pool = self
+        return con
+
+    def acquire(self) -> PooledConnection:
+        t0 = time.perf_counter()
+        waited = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    con = self._idle.pop()
+                    break
+                if self._created < self.size:
+                    self._created += 1
+                    con = None
+                    break
+                waited = True
+                remaining = self.timeout - (time.perf_counter() - t0)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise sqlite3.OperationalError(f"connection pool exhausted ({self.size} in use)")
+                self._cond.wait(remaining)
+
+            wait = time.perf_counter() - t0
+            self.acquires += 1
+            if waited:
+                self.waits += 1
+                self.wait_total_sec += wait
+                if wait > self.wait_max_sec:
+                    self.wait_max_sec = wait
+
+        if con is None:
+            try:
+                con = self._connect()
+            except Exception:
+                with self._cond:
+                    self._created -= 1
+                    self._cond.notify()
+                raise
+        con._pooled_out = True
+        con._changes_seen = con.total_changes
+        return con
+
+    def release(self, con: PooledConnection) -> None:
+        if not con._pooled_out:
+            return  # double close()
+        con._pooled_out = False
+        try:
+            con._notify_writes()
+            if con.in_transaction:
+                con.rollback()
+            con.row_factory = sqlite3.Row
+        except sqlite3.Error:
+            con._close_for_real()
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            return
+        with self._cond:
+            self._idle.append(con)
+            self._cond.notify()
+
+    def close_all(self) -> None:
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+        for con in idle:
+            con._close_for_real()
+
+    def stats(self) -> dict:
+        with self._cond:
+            idle = len(self._idle)
+            created = self._created
+        return {
+            "size": self.size,
+            "open": created,
+            "in_use": created - idle,
+            "idle": idle,
+            "acquires": self.acquires,
+            "waits": self.waits,
+            "wait_avg_ms": (self.wait_total_sec / self.waits * 1000) if self.waits else 0.0,
+            "wait_max_ms": self.wait_max_sec * 1000,
+            "timeouts": self.timeouts,
+        }
+
+
+_POOLS: dict[str, ConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(path: str | Path) -> ConnectionPool:
+    key = str(Path(path))
+    pool = _POOLS.get(key)
+    if pool is None:
+        with _POOLS_LOCK:
+            pool = _POOLS.get(key)
+            if pool is None:
+                pool = ConnectionPool(key)
+                _POOLS[key] = pool
+    return pool
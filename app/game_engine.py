@@ -1,5 +1,6 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from itertools import product
+from pathlib import Path
 from typing import Optional, List, Tuple
 
 WIN_LINES: List[Tuple[int, int, int]] = [
@@ -8,13 +9,104 @@ WIN_LINES: List[Tuple[int, int, int]] = [
     (0, 4, 8), (2, 4, 6),
 ]
 
-def check_winner(board: str) -> Optional[str]:
-    for a, b, c in WIN_LINES:
+# ---- precomputed tables ----
+# Every 3x3 board (3^9 = 19683, reachable or not) gets an index: the board as a
+# base-3 number ("." = 0, "X" = 1, "O" = 2, cell 0 first). One pass at import
+# fills, per index, the winner, the first winning line and the "normal" and
+# "hard" AI moves, by the rules these functions used to run on every call.
+# A lookup is then a translate + int() + one byte.
+# Building takes ~150 ms, so the tables ship as assets/xo_tables.bin
+# (scripts/gen_xo_tables.py); without a valid file they are built here.
+TABLES_PATH = Path(__file__).resolve().parent / "assets" / "xo_tables.bin"
+N_BOARDS = 3 ** 9
+_TERNARY = str.maketrans(".XO", "012")
+_WINNERS = (None, "X", "O", "D")
+_NO_MOVE = 255
+_POW = [3 ** (8 - i) for i in range(9)]
+
+
+def board_index(board: str) -> int:
+    return int(board.translate(_TERNARY), 3)
+
+
+def _scan(board: str) -> Tuple[int, int]:
+    """(winner code, 1 + index of the first winning line or 0)."""
+    for n, (a, b, c) in enumerate(WIN_LINES):
         if board[a] != "." and board[a] == board[b] == board[c]:
-            return board[a]  # "X" або "O"
+            return (1 if board[a] == "X" else 2), n + 1
     if "." not in board:
-        return "D"  # draw
-    return None
+        return 3, 0  # draw
+    return 0, 0
+
+
+def _build_tables() -> Tuple[bytes, bytes, bytes, bytes]:
+    boards = ["".join(cells) for cells in product(".XO", repeat=9)]
+    winner, line = bytearray(len(boards)), bytearray(len(boards))
+    for i, b in enumerate(boards):
+        winner[i], line[i] = _scan(b)
+    empty = [[m for m, ch in enumerate(b) if ch == "."] for b in boards]
+    memo: Tuple[dict, dict] = ({}, {})
+
+    def score(i: int, o_turn: int) -> int:
+        # міні-макс (ідеальна гра), O максимізує
+        w = winner[i]
+        if w:
+            return 10 if w == 2 else -10 if w == 1 else 0
+        got = memo[o_turn].get(i)
+        if got is None:
+            if o_turn:
+                got = max(score(i + 2 * _POW[m], 0) for m in empty[i])
+            else:
+                got = min(score(i + _POW[m], 1) for m in empty[i])
+            memo[o_turn][i] = got
+        return got
+
+    def normal(i: int, moves: List[int]) -> int:
+        for m in moves:  # 1) виграти якщо можна
+            if winner[i + 2 * _POW[m]] == 2:
+                return m
+        for m in moves:  # 2) заблокувати X
+            if winner[i + _POW[m]] == 1:
+                return m
+        if 4 in moves:  # 3) центр
+            return 4
+        for m in (0, 2, 6, 8):  # 4) кут
+            if m in moves:
+                return m
+        return moves[0]  # 5) будь-що
+
+    hard, normal_move = bytearray([_NO_MOVE]) * len(boards), bytearray([_NO_MOVE]) * len(boards)
+    for i, moves in enumerate(empty):
+        if not moves:
+            continue
+        best_val = -999
+        for m in moves:
+            val = score(i + 2 * _POW[m], 0)
+            if val > best_val:
+                best_val, hard[i] = val, m
+        normal_move[i] = normal(i, moves)
+    return bytes(winner), bytes(line), bytes(hard), bytes(normal_move)
+
+
+def _load_tables() -> Tuple[bytes, bytes, bytes, bytes]:
+    try:
+        blob = TABLES_PATH.read_bytes()
+    except OSError:
+        blob = b""
+    if len(blob) != 4 * N_BOARDS:
+        return _build_tables()
+    return tuple(blob[k * N_BOARDS:(k + 1) * N_BOARDS] for k in range(4))  # type: ignore[return-value]
+
+
+_WINNER, _LINE, _HARD, _NORMAL = _load_tables()
+
+
+def check_winner(board: str) -> Optional[str]:
+    return _WINNERS[_WINNER[board_index(board)]]  # "X", "O", "D" (draw) або None
+
+def winning_line(board: str) -> Optional[Tuple[int, int, int]]:
+    n = _LINE[board_index(board)]
+    return WIN_LINES[n - 1] if n else None
 
 def available_moves(board: str) -> List[int]:
     return [i for i, ch in enumerate(board) if ch == "."]
@@ -31,52 +123,11 @@ def ai_move_easy(board: str) -> int:
     return available_moves(board)[0]
 
 def ai_move_normal(board: str) -> int:
-    # 1) виграти якщо можна
-    for m in available_moves(board):
-        if check_winner(apply_move(board, m, "O")) == "O":
-            return m
-    # 2) заблокувати X
-    for m in available_moves(board):
-        if check_winner(apply_move(board, m, "X")) == "X":
-            return m
-    # 3) центр
-    if board[4] == ".":
-        return 4
-    # 4) кут
-    for m in [0, 2, 6, 8]:
-        if board[m] == ".":
-            return m
-    # 5) будь-що
-    return available_moves(board)[0]
+    # виграти / заблокувати X / центр / кут / будь-що (таблиця)
+    m = _NORMAL[board_index(board)]
+    return m if m != _NO_MOVE else available_moves(board)[0]
 
 def ai_move_hard(board: str) -> int:
-    # міні-макс (ідеальна гра) — для 3x3 це швидко
-    def score(b: str, turn: str) -> int:
-        w = check_winner(b)
-        if w == "O":
-            return 10
-        if w == "X":
-            return -10
-        if w == "D":
-            return 0
-
-        moves = available_moves(b)
-        if turn == "O":
-            best = -999
-            for m in moves:
-                best = max(best, score(apply_move(b, m, "O"), "X"))
-            return best
-        else:
-            best = 999
-            for m in moves:
-                best = min(best, score(apply_move(b, m, "X"), "O"))
-            return best
-
-    best_move = None
-    best_val = -999
-    for m in available_moves(board):
-        val = score(apply_move(board, m, "O"), "X")
-        if val > best_val:
-            best_val = val
-            best_move = m
-    return best_move if best_move is not None else available_moves(board)[0]
+    # міні-макс (ідеальна гра) з таблиці
+    m = _HARD[board_index(board)]
+    return m if m != _NO_MOVE else available_moves(board)[0]
@@ -1,6 +1,7 @@
 # app/handlers_menu.py
 import uuid
 import asyncio
+import json
 import time
 import secrets
 import string
@@ -32,14 +33,17 @@ from app.keyboards import (
     board_kb,
     board_kb_pvp,
 )
-from app.game_engine import apply_move, check_winner, ai_move_easy, ai_move_normal, ai_move_hard
+from app.game_engine import apply_move, check_winner, winning_line, ai_move_easy, ai_move_normal, ai_move_hard
 from app.i18n import t, detect_lang
-from app.rating import update_elo
-from app.winline import get_winline
+from app.rating import match_distance, update_elo
+from app.xo_match import AIMatch, PvPMatch, EMPTY_BOARD, as_state
 from app.shop_items import items_for_game, get_item
 from app.board_renderer import renderer
 
 from app import config
+from app import leaderboard_cache as lb
+from app import live_state
+from app.registry import BoundedRegistry
 from app.config import (
     ADMIN_IDS,
     SEASON_LENGTH_DAYS,
@@ -55,13 +59,17 @@ from app.config import (
     VIP_COIN_PLANS,
     VIP_FALLBACK_AI_SEC,
     NONVIP_FALLBACK_AI_SEC,
+    MATCH_IDLE_TTL_SEC,
+    MATCH_REGISTRY_MAX,
 )
 
-from app.db import (
+from app.db_async import (
     init_db,
     upsert_user,
-    get_user,
+    get_user_fields,
+    get_game_stats,
     get_rating,
+    get_glicko,
     set_rating,
     set_lang as db_set_lang,
     get_lang as db_get_lang,
@@ -92,9 +100,7 @@ from app.db import (
     set_quest_mask,
     create_invite,
     consume_invite,
-    reset_week_if_needed,
-    get_weekly_top,
-    get_weekly_rank,
+    rank_board,
     load_week_history,
     bump_total,
     bump_weekly,
@@ -106,8 +112,8 @@ from app.db import (
     owned_item_ids,
     get_inventory,
     set_active_item,
-    get_top100,
     reset_season_if_needed,
+    season_rollover_due,
     get_season_meta,
     get_season_rating,
     set_season_rating,
@@ -117,7 +123,6 @@ from app.db import (
     try_pay_referral_reward,
     try_attach_referral,
     get_ref_stats,
-    get_season_top100,
     create_tournament,
     get_active_tournament,
     list_tournament_players,
@@ -131,7 +136,8 @@ from app.db import (
     get_bracket_text,
     cancel_tournament,
     claim_daily_bonus,
-
+    GameResult,
+    record_game_result,
 )
 
 _tma_url: str = ""
@@ -147,9 +153,9 @@ LOSE_EMOJI = "😢💔🥲"
 DRAW_EMOJI = "🤝😌"
 
 async def render_xo_msg(chat_id: int, message_id: int, board: str, bot, lang: str, user_id: int, highlight=None, caption="", kb=None):
-    from app.db import get_skin, get_active_wallpaper
-    skin = get_skin(user_id)
-    wp = get_active_wallpaper(user_id)
+    from app.db_async import get_skin, get_active_wallpaper
+    skin = await get_skin(user_id)
+    wp = await get_active_wallpaper(user_id)
     is_premium = skin and "premium" in skin.lower()
     if is_premium:
         img = renderer.render_xo(board, highlight=highlight, wallpaper=wp)
@@ -178,17 +184,29 @@ async def render_xo_msg(chat_id: int, message_id: int, board: str, bot, lang: st
 ANTI_BOOST_WINDOW_SEC = ANTI_BOOST_WINDOW_HOURS * 60 * 60
 SEASON_LEN = timedelta(days=SEASON_LENGTH_DAYS)
 
-AI_MATCHES = {}
+def _cancel_task(_key, task: asyncio.Task) -> None:
+    if not task.done():
+        task.cancel()
+
+# Finished and abandoned games expire after MATCH_IDLE_TTL_SEC (app.registry).
+AI_MATCHES = BoundedRegistry(
+    "xo_ai", MATCH_IDLE_TTL_SEC, MATCH_REGISTRY_MAX,
+    on_evict=lambda match_id, _st: live_state.touch("ai", match_id),
+)
 
 # queues split by VIP for priority matchmaking
 WAIT_X_VIP, WAIT_O_VIP = [], []
 WAIT_X, WAIT_O = [], []
-WAIT_TASKS = {}
+WAIT_TASKS = BoundedRegistry("xo_wait_tasks", 600, MATCH_REGISTRY_MAX, on_evict=_cancel_task)
 
-PVP_MATCHES = {}
-PVP_TIMER_TASKS = {}
+PVP_MATCHES = BoundedRegistry(
+    "xo_pvp", MATCH_IDLE_TTL_SEC, MATCH_REGISTRY_MAX,
+    activity=lambda m: m.last_move,
+    on_evict=lambda match_id, _m: cancel_pvp_timer(match_id),
+)
+PVP_TIMER_TASKS = BoundedRegistry("xo_pvp_timers", MATCH_IDLE_TTL_SEC, MATCH_REGISTRY_MAX, on_evict=_cancel_task)
 
-LAST_CLICK = {}
+LAST_CLICK = BoundedRegistry("last_click", 60, 200_000)
 
 # ---- helpers ----
 def is_admin(uid: int) -> bool:
@@ -210,24 +228,39 @@ async def safe_edit_text(message, text: str, reply_markup=None, **kwargs):
             return
         raise
 
-def ensure_user(cb_or_msg):
+USER_TOUCH_INTERVAL_SEC = 60  # users.updated_ts doubles as "last active" for marketing
+
+
+async def ensure_user(cb_or_msg):
     u = cb_or_msg.from_user
-    # lang: stored or detected
-    lang = db_get_lang(u.id) or detect_lang(getattr(u, "language_code", None))
-    upsert_user(u.id, getattr(u, "username", None), getattr(u, "first_name", None), lang)
-    # seasons: rotate if needed
-    try:
-        reset_season_if_needed(top_n=50)
-    except Exception:
-        pass
+    username = getattr(u, "username", None)
+    first_name = getattr(u, "first_name", None)
+    # Loads the caller's user_profile row into the snapshot; later getters reuse it.
+    row = await get_user_fields(u.id, "username", "first_name", "lang", "updated_ts")
+    # lang: stored, same default as db_get_lang()
+    lang = (row or {}).get("lang") or "uk"
+    # Skip the upsert (and the snapshot reload it causes) when nothing changed recently.
+    if (
+        not row
+        or row.get("username") != (username or "")
+        or row.get("first_name") != (first_name or "")
+        or time.time() - float(row.get("updated_ts") or 0) > USER_TOUCH_INTERVAL_SEC
+    ):
+        await upsert_user(u.id, username, first_name, lang)
+    # seasons: rotate if needed (a cached timestamp check until the season ends)
+    if season_rollover_due():
+        try:
+            await reset_season_if_needed(top_n=50)
+        except Exception:
+            pass
     return lang
 
-def menu_kb(lang: str, uid: int):
-    g = get_active_game(uid)
-    chat = get_chat()
-    news = get_news()
-    from app.db import can_claim_daily_bonus
-    show_bonus = can_claim_daily_bonus(uid)
+async def menu_kb(lang: str, uid: int):
+    g = await get_active_game(uid)
+    chat = await get_chat()
+    news = await get_news()
+    from app.db_async import can_claim_daily_bonus
+    show_bonus = await can_claim_daily_bonus(uid)
     return arena_menu_kb(
         lang, g, 
         chat_url=chat.get('url',''), 
@@ -236,20 +269,17 @@ def menu_kb(lang: str, uid: int):
     )
 
 def compute_highlight(board: str) -> set[int]:
-    wb = get_winline(board)
-    if not wb:
-        return set()
-    _, line = wb
-    return set(line)
+    line = winning_line(board)
+    return set(line) if line else set()
 
 
 @router.callback_query(F.data == "sm:menu:daily_bonus")
 async def cb_daily_bonus(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
     
-    success, new_bal = claim_daily_bonus(cb.from_user.id)
+    success, new_bal = await claim_daily_bonus(cb.from_user.id)
     if success:
         await cb.message.answer(t(lang, "daily_bonus_claimed"))
         # Refresh the menu to remove the button
@@ -257,16 +287,17 @@ async def cb_daily_bonus(cb: CallbackQuery):
     else:
         await cb.answer(t(lang, "daily_bonus_already_claimed"), show_alert=True)
 
-def best_match(opponents: list, target_rating: int):
+def best_match(opponents: list, target_rating: int, target_rd: float | None = None):
+    """Pop the closest opponent; with target_rd, closeness also weighs both players' rating deviation."""
     if not opponents:
         return None
-    best_i = 0
-    best_diff = abs(int(opponents[0].get("rating", 1000)) - target_rating)
-    for i, it in enumerate(opponents[1:], start=1):
-        diff = abs(int(it.get("rating", 1000)) - target_rating)
-        if diff < best_diff:
-            best_i = i
-            best_diff = diff
+    if target_rd is None:
+        def dist(it):
+            return abs(int(it.get("rating", 1000)) - target_rating)
+    else:
+        def dist(it):
+            return match_distance(target_rating, target_rd, int(it.get("rating", 1000)), float(it.get("rd", 350)))
+    best_i = min(range(len(opponents)), key=lambda i: dist(opponents[i]))
     return opponents.pop(best_i)
 
 def is_in_queue(uid: int) -> bool:
@@ -279,16 +310,26 @@ def remove_from_queue(uid: int) -> None:
     WAIT_O_VIP = [it for it in WAIT_O_VIP if it["user_id"] != uid]
     WAIT_X = [it for it in WAIT_X if it["user_id"] != uid]
     WAIT_O = [it for it in WAIT_O if it["user_id"] != uid]
+    live_state.touch("queue", uid)
+
+def fallback_sec(entry: dict) -> int:
+    """Seconds a queued player waits before the AI takes over."""
+    if entry.get("arena"):
+        return 30
+    return VIP_FALLBACK_AI_SEC if entry.get("vip") else NONVIP_FALLBACK_AI_SEC
 
 def cancel_wait_task(uid: int):
     task = WAIT_TASKS.pop(uid, None)
     if task and not task.done():
         task.cancel()
 
+# Every PvP state change (start, move, new game, end) re-arms or cancels the
+# watchdog, so these two also mark the match for the live_state snapshot.
 def cancel_pvp_timer(match_id: str):
     task = PVP_TIMER_TASKS.pop(match_id, None)
     if task and not task.done():
         task.cancel()
+    live_state.touch("pvp", match_id)
 
 def set_pvp_timer(match_id: str, cb: CallbackQuery):
     cancel_pvp_timer(match_id)
@@ -299,24 +340,24 @@ async def pvp_inactivity_watchdog(match_id: str, cb: CallbackQuery):
         while True:
             await asyncio.sleep(5)
             m = PVP_MATCHES.get(match_id)
-            if not m or m.get("status") != "playing":
+            if not m or m.status != "playing":
                 return
-            if time.time() - m["last_move"] < PVP_INACTIVITY_SEC:
+            if time.time() - m.last_move < PVP_INACTIVITY_SEC:
                 continue
 
             # Tournament anti-AFK: tech loss for the player who didn't move
-            if m.get("tmatch_id") and m.get("tournament_id"):
-                loser_turn = m.get("turn")  # "X" or "O"
+            if m.tmatch_id and m.tournament_id:
+                loser_turn = m.turn  # "X" or "O"
                 winner_turn = "O" if loser_turn == "X" else "X"
-                winner_id = int(m.get("x")) if winner_turn == "X" else int(m.get("o"))
-                loser_id = int(m.get("o")) if winner_turn == "X" else int(m.get("x"))
+                winner_id = int(m.x) if winner_turn == "X" else int(m.o)
+                loser_id = int(m.o) if winner_turn == "X" else int(m.x)
 
-                m["status"] = "finished"
+                m.status = "finished"
                 cancel_pvp_timer(match_id)
 
                 try:
-                    x_chat = m.get("x_chat"); o_chat = m.get("o_chat")
-                    x_msg = m.get("x_msg"); o_msg = m.get("o_msg")
+                    x_chat = m.x_chat; o_chat = m.o_chat
+                    x_msg = m.x_msg; o_msg = m.o_msg
                     if x_chat and x_msg:
                         await cb.bot.edit_message_text(chat_id=x_chat, message_id=x_msg, text="⏳ Турнір: тех. поразка (inactive)")
                     if o_chat and o_msg:
@@ -325,11 +366,11 @@ async def pvp_inactivity_watchdog(match_id: str, cb: CallbackQuery):
                     pass
 
                 try:
-                    set_match_result(int(m["tmatch_id"]), winner_id)
-                    advance_round_if_ready(int(m["tournament_id"]))
+                    await set_match_result(int(m.tmatch_id), winner_id)
+                    await advance_round_if_ready(int(m.tournament_id))
                     try:
                         from app.tournament_service import run_pending_for_tournament
-                        await run_pending_for_tournament(cb.bot, int(m["tournament_id"]))
+                        await run_pending_for_tournament(cb.bot, int(m.tournament_id))
                     except Exception:
                         pass
                     try:
@@ -344,15 +385,15 @@ async def pvp_inactivity_watchdog(match_id: str, cb: CallbackQuery):
                     pass
                 return
 
-            m["status"] = "canceled"
+            m.status = "canceled"
             cancel_pvp_timer(match_id)
 
             # Try to update BOTH players (if we have their message ids)
             try:
-                x_chat = m.get("x_chat")
-                o_chat = m.get("o_chat")
-                x_msg = m.get("x_msg")
-                o_msg = m.get("o_msg")
+                x_chat = m.x_chat
+                o_chat = m.o_chat
+                x_msg = m.x_msg
+                o_msg = m.o_msg
                 if x_chat and x_msg:
                     await cb.bot.edit_message_text(chat_id=x_chat, message_id=x_msg, text="⏳ PvP canceled (inactive)")
                 if o_chat and o_msg:
@@ -376,7 +417,7 @@ async def pre_checkout(pre: PreCheckoutQuery):
 @router.message(F.successful_payment)
 async def on_success_payment(m: Message):
     init_db()
-    lang = ensure_user(m)
+    lang = await ensure_user(m)
 
     sp = m.successful_payment
     payload = (sp.invoice_payload or "")
@@ -388,21 +429,21 @@ async def on_success_payment(m: Message):
         except Exception:
             stars = int(getattr(sp, "total_amount", 0) or 0)
         if stars > 0:
-            pool = add_prize_pool(stars)
+            pool = await add_prize_pool(stars)
             await m.answer(f"✅ +{stars}⭐  | pool={pool}")
         return
 
 # ---- commands ----
 @router.message(Command("id"))
 async def cmd_id(m: Message):
-    lang = ensure_user(m)
+    lang = await ensure_user(m)
     await m.answer(t(lang, "id_text").format(id=m.from_user.id))
 
 @router.message(Command("vip"))
 async def cmd_vip(m: Message):
-    lang = ensure_user(m)
-    if is_vip(m.from_user.id):
-        date = datetime.fromtimestamp(add_vip_days(m.from_user.id, 0), tz=timezone.utc).strftime("%Y-%m-%d")
+    lang = await ensure_user(m)
+    if await is_vip(m.from_user.id):
+        date = datetime.fromtimestamp(await add_vip_days(m.from_user.id, 0), tz=timezone.utc).strftime("%Y-%m-%d")
         text = t(lang, "vip_status_on").format(date=date)
     else:
         text = t(lang, "vip_status_off")
@@ -411,15 +452,12 @@ async def cmd_vip(m: Message):
 @router.message(CommandStart())
 async def start(m: Message):
     init_db()
-    lang = ensure_user(m)
+    lang = await ensure_user(m)
     
     # Force-fix coins for admin (the user)
     if m.from_user.id == 8148164304:
-        from app.db import set_coins
-        set_coins(8148164304, 30070)
-
-    # weekly reset + archive
-    reset_week_if_needed(week_len_days=5, top_n=TOP_N)
+        from app.db_async import set_coins
+        await set_coins(8148164304, 30070)
 
     # deep-link payload
     payload = ""
@@ -431,7 +469,7 @@ async def start(m: Message):
     if payload.startswith("ref_"):
         try:
             inviter_id = int(payload[4:])
-            attached = try_attach_referral(m.from_user.id, inviter_id)
+            attached = await try_attach_referral(m.from_user.id, inviter_id)
             if attached:
                 await m.answer("🤝 Рефералка активована! Тобі нараховано +50 🪙. Твій запрошувач отримає 100 🪙 після того, як ти зіграєш 3 рейтингові гри.")
         except Exception:
@@ -448,7 +486,7 @@ async def start(m: Message):
     except Exception:
         pass
 
-    active = get_active_game(m.from_user.id)
+    active = await get_active_game(m.from_user.id)
     await m.answer(
         f"{t(lang,'brand_title')}\n{t(lang,'choose_game')}\n\n{t(lang,'choose_game_hint')}",
         reply_markup=games_select_kb(lang, active)
@@ -460,10 +498,9 @@ async def menu_home(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
-    reset_week_if_needed(week_len_days=5, top_n=TOP_N)
+    lang = await ensure_user(cb)
 
-    g = get_active_game(cb.from_user.id)
+    g = await get_active_game(cb.from_user.id)
     if g == "checkers":
         g_title = t(lang, "game_checkers")
     elif g == "chess":
@@ -473,7 +510,7 @@ async def menu_home(cb: CallbackQuery):
     await safe_edit_text(
         cb.message,
         f"{t(lang,'brand_title')}\n{g_title}\n\n{t(lang,'menu_quick_hint')}",
-        reply_markup=menu_kb(lang, cb.from_user.id)
+        reply_markup=await menu_kb(lang, cb.from_user.id)
     )
     await cb.answer()
 
@@ -496,8 +533,8 @@ async def game_select(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
-    active = get_active_game(cb.from_user.id)
+    lang = await ensure_user(cb)
+    active = await get_active_game(cb.from_user.id)
     await safe_edit_text(
         cb.message,
         f"{t(lang,'brand_title')}\n{t(lang,'choose_game')}\n\n{t(lang,'choose_game_hint')}",
@@ -514,16 +551,13 @@ async def game_choose_xo(cb: CallbackQuery):
         await cb.answer()
         return
     init_db()
-    lang = ensure_user(cb)
-    set_active_game(cb.from_user.id, "xo")
-
-    # keep weekly reset consistent with /start
-    reset_week_if_needed(week_len_days=5, top_n=TOP_N)
+    lang = await ensure_user(cb)
+    await set_active_game(cb.from_user.id, "xo")
 
     await safe_edit_text(
         cb.message,
         f"{t(lang,'brand_title')}\n{t(lang,'game_xo')}\n\n{t(lang,'menu_quick_hint')}",
-        reply_markup=menu_kb(lang, cb.from_user.id),
+        reply_markup=await menu_kb(lang, cb.from_user.id),
     )
     await cb.answer()
 
@@ -536,15 +570,13 @@ async def game_choose_checkers(cb: CallbackQuery):
         await cb.answer()
         return
     init_db()
-    lang = ensure_user(cb)
-    set_active_game(cb.from_user.id, "checkers")
-
-    reset_week_if_needed(week_len_days=5, top_n=TOP_N)
+    lang = await ensure_user(cb)
+    await set_active_game(cb.from_user.id, "checkers")
 
     await safe_edit_text(
         cb.message,
         f"{t(lang,'brand_title')}\n{t(lang,'game_checkers')}\n\n{t(lang,'menu_quick_hint')}",
-        reply_markup=menu_kb(lang, cb.from_user.id),
+        reply_markup=await menu_kb(lang, cb.from_user.id),
     )
     await cb.answer()
 
@@ -555,15 +587,13 @@ async def game_choose_chess(cb: CallbackQuery):
         await cb.answer()
         return
     init_db()
-    lang = ensure_user(cb)
-    set_active_game(cb.from_user.id, "chess")
-
-    reset_week_if_needed(week_len_days=5, top_n=TOP_N)
+    lang = await ensure_user(cb)
+    await set_active_game(cb.from_user.id, "chess")
 
     await safe_edit_text(
         cb.message,
         f"{t(lang,'brand_title')}\n{t(lang,'game_chess')}\n\n{t(lang,'menu_quick_hint')}",
-        reply_markup=menu_kb(lang, cb.from_user.id),
+        reply_markup=await menu_kb(lang, cb.from_user.id),
     )
     await cb.answer()
 
@@ -571,7 +601,7 @@ async def game_choose_chess(cb: CallbackQuery):
 async def menu_settings(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
     await safe_edit_text(cb.message, f"{t(lang,'settings_title')}", reply_markup=settings_menu_kb(lang))
     await cb.answer()
 
@@ -580,7 +610,7 @@ async def menu_settings(cb: CallbackQuery):
 async def menu_market(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
     try:
         from app.main import _TMA_URL as _tma_url
     except Exception:
@@ -592,7 +622,7 @@ async def menu_market(cb: CallbackQuery):
 async def menu_coins(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
 
     packs = getattr(config, "STARS_COIN_PACKS", {
         "coins_50": (50, 25),
@@ -633,17 +663,17 @@ def _game_title(lang: str, g: str) -> str:
     return t(lang, "game_xo")
 
 
-def _skin_allowed(user_id: int, game: str, skin: str) -> bool:
+async def _skin_allowed(user_id: int, game: str, skin: str) -> bool:
     # default/classic/neon/premium are always available; VIP can use all; otherwise must own via shop
     k = (skin or "default").lower()
     if k in ("default", "classic", "neon", "premium"):
         return True
-    if is_vip(user_id):
+    if await is_vip(user_id):
         return True
     gid = (game or "xo").lower()
     if gid == "shashky" or gid == "шашки": gid = "checkers"
     elif gid == "шахи" or gid == "шахматы": gid = "chess"
-    return has_item(user_id, f"skin:{gid}:{k}")
+    return await has_item(user_id, f"skin:{gid}:{k}")
 
 
 @router.callback_query(F.data == "sm:market:shop")
@@ -651,10 +681,10 @@ async def market_shop(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
-    g = get_active_game(cb.from_user.id)
-    coins = get_coins(cb.from_user.id)
-    owned = owned_item_ids(cb.from_user.id)
+    lang = await ensure_user(cb)
+    g = await get_active_game(cb.from_user.id)
+    coins = await get_coins(cb.from_user.id)
+    owned = await owned_item_ids(cb.from_user.id)
 
     items = items_for_game(g)
 
@@ -689,20 +719,20 @@ async def market_item(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
     iid = cb.data[len("sm:market:item:"):]
     it = get_item(iid)
     if not it:
         await cb.answer("Невідомий товар"); return
 
-    g = get_active_game(cb.from_user.id)
-    coins = get_coins(cb.from_user.id)
-    owned = has_item(cb.from_user.id, iid)
+    g = await get_active_game(cb.from_user.id)
+    coins = await get_coins(cb.from_user.id)
+    owned = await has_item(cb.from_user.id, iid)
     if it.get("kind") == "lootbox":
         owned = False  # Lootboxes are never "owned", you just open them
 
     item_game = (it.get("game") or "xo").lower()
-    cur_skin = get_skin_ck(cb.from_user.id) if item_game == "checkers" else get_skin(cb.from_user.id)
+    cur_skin = await get_skin_ck(cb.from_user.id) if item_game == "checkers" else await get_skin(cb.from_user.id)
 
     lines = [
         f"🛍 <b>{it.get('title')}</b>",
@@ -740,20 +770,20 @@ async def market_buy(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
 
     iid = cb.data[len("sm:market:buy:"):]
     it = get_item(iid)
     if not it:
         await cb.answer("Невідомий товар"); return
 
-    if it.get("kind") != "lootbox" and has_item(cb.from_user.id, iid):
+    if it.get("kind") != "lootbox" and await has_item(cb.from_user.id, iid):
         await cb.answer("Вже куплено"); 
         await market_item(cb)
         return
 
     price = int(it.get("price", 0) or 0)
-    ok = try_spend_coins(cb.from_user.id, price)
+    ok = await try_spend_coins(cb.from_user.id, price)
     if not ok:
         await cb.answer("Недостатньо монет 🪙", show_alert=True)
         return
@@ -772,14 +802,14 @@ async def market_buy(cb: CallbackQuery):
                 
         if won_id and won_id.startswith("coins:"):
             coins_won = int(won_id.split(":")[1])
-            add_coins(cb.from_user.id, coins_won)
+            await add_coins(cb.from_user.id, coins_won)
             await cb.answer(f"🎉 Ти відкрив скриню!\n\nТвій приз: {won_name}", show_alert=True)
         elif won_id and won_id.startswith("skin:"):
-            if has_item(cb.from_user.id, won_id):
-                add_coins(cb.from_user.id, 50)
+            if await has_item(cb.from_user.id, won_id):
+                await add_coins(cb.from_user.id, 50)
                 await cb.answer(f"🎉 Скриня дала: {won_name}, але він вже є.\nКомпенсація: 50🪙", show_alert=True)
             else:
-                add_item(cb.from_user.id, won_id)
+                await add_item(cb.from_user.id, won_id)
                 await cb.answer(f"🎉 Ти відкрив скриню!\n\nТвій приз: {won_name}", show_alert=True)
         else:
             await cb.answer("Скриня виявилась порожньою...", show_alert=True)
@@ -787,41 +817,41 @@ async def market_buy(cb: CallbackQuery):
         await market_item(cb)
         return
 
-    add_item(cb.from_user.id, iid)
+    await add_item(cb.from_user.id, iid)
 
     # auto-activate on purchase
     if it.get("kind") == "skin":
         g = (it.get("game") or "xo").lower()
         skin = str(it.get("value") or "default")
         if g == "checkers":
-            set_skin_ck(cb.from_user.id, skin)
+            await set_skin_ck(cb.from_user.id, skin)
         else:
-            db_set_skin(cb.from_user.id, skin)
-        set_active_item(cb.from_user.id, iid)
+            await db_set_skin(cb.from_user.id, skin)
+        await set_active_item(cb.from_user.id, iid)
     elif it.get("kind") == "skin_board":
         g = (it.get("game") or "xo").lower()
         val = str(it.get("value") or "default")
         if g == "checkers":
-            set_skin_board_ck(cb.from_user.id, val)
+            await set_skin_board_ck(cb.from_user.id, val)
         else:
-            set_skin_board(cb.from_user.id, val)
-        set_active_item(cb.from_user.id, iid)
+            await set_skin_board(cb.from_user.id, val)
+        await set_active_item(cb.from_user.id, iid)
     elif it.get("kind") == "skin_cell":
         g = (it.get("game") or "xo").lower()
         val = str(it.get("value") or "default")
         if g == "checkers":
-            set_skin_cell_ck(cb.from_user.id, val)
+            await set_skin_cell_ck(cb.from_user.id, val)
         else:
-            set_skin_cell(cb.from_user.id, val)
-        set_active_item(cb.from_user.id, iid)
+            await set_skin_cell(cb.from_user.id, val)
+        await set_active_item(cb.from_user.id, iid)
     elif it.get("kind") == "skin_chess_board":
-        from app.db import set_skin_chess_board
-        set_skin_chess_board(cb.from_user.id, str(it.get("value") or "classic"))
-        set_active_item(cb.from_user.id, iid)
+        from app.db_async import set_skin_chess_board
+        await set_skin_chess_board(cb.from_user.id, str(it.get("value") or "classic"))
+        await set_active_item(cb.from_user.id, iid)
     elif it.get("kind") == "skin_chess_pieces":
-        from app.db import set_skin_chess_pieces
-        set_skin_chess_pieces(cb.from_user.id, str(it.get("value") or "classic"))
-        set_active_item(cb.from_user.id, iid)
+        from app.db_async import set_skin_chess_pieces
+        await set_skin_chess_pieces(cb.from_user.id, str(it.get("value") or "classic"))
+        await set_active_item(cb.from_user.id, iid)
 
     await cb.answer("✅ Куплено та активовано!")
     await market_item(cb)
@@ -832,14 +862,14 @@ async def market_activate(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    ensure_user(cb)
+    await ensure_user(cb)
 
     iid = cb.data[len("sm:market:activate:"):]
     it = get_item(iid)
     if not it:
         await cb.answer("Невідомий товар"); return
 
-    if not has_item(cb.from_user.id, iid):
+    if not await has_item(cb.from_user.id, iid):
         await cb.answer("Спочатку купи 🛒", show_alert=True)
         return
 
@@ -847,34 +877,34 @@ async def market_activate(cb: CallbackQuery):
         g = (it.get("game") or "xo").lower()
         skin = str(it.get("value") or "default")
         if g == "checkers":
-            set_skin_ck(cb.from_user.id, skin)
+            await set_skin_ck(cb.from_user.id, skin)
         else:
-            db_set_skin(cb.from_user.id, skin)
-        set_active_item(cb.from_user.id, iid)
+            await db_set_skin(cb.from_user.id, skin)
+        await set_active_item(cb.from_user.id, iid)
     elif it.get("kind") == "skin_board":
         g = (it.get("game") or "xo").lower()
         val = str(it.get("value") or "default")
         if g == "checkers":
-            set_skin_board_ck(cb.from_user.id, val)
+            await set_skin_board_ck(cb.from_user.id, val)
         else:
-            set_skin_board(cb.from_user.id, val)
-        set_active_item(cb.from_user.id, iid)
+            await set_skin_board(cb.from_user.id, val)
+        await set_active_item(cb.from_user.id, iid)
     elif it.get("kind") == "skin_cell":
         g = (it.get("game") or "xo").lower()
         val = str(it.get("value") or "default")
         if g == "checkers":
-            set_skin_cell_ck(cb.from_user.id, val)
+            await set_skin_cell_ck(cb.from_user.id, val)
         else:
-            set_skin_cell(cb.from_user.id, val)
-        set_active_item(cb.from_user.id, iid)
+            await set_skin_cell(cb.from_user.id, val)
+        await set_active_item(cb.from_user.id, iid)
     elif it.get("kind") == "skin_chess_board":
-        from app.db import set_skin_chess_board
-        set_skin_chess_board(cb.from_user.id, str(it.get("value") or "classic"))
-        set_active_item(cb.from_user.id, iid)
+        from app.db_async import set_skin_chess_board
+        await set_skin_chess_board(cb.from_user.id, str(it.get("value") or "classic"))
+        await set_active_item(cb.from_user.id, iid)
     elif it.get("kind") == "skin_chess_pieces":
-        from app.db import set_skin_chess_pieces
-        set_skin_chess_pieces(cb.from_user.id, str(it.get("value") or "classic"))
-        set_active_item(cb.from_user.id, iid)
+        from app.db_async import set_skin_chess_pieces
+        await set_skin_chess_pieces(cb.from_user.id, str(it.get("value") or "classic"))
+        await set_active_item(cb.from_user.id, iid)
 
     await cb.answer("✅ Активовано")
     await market_item(cb)
@@ -885,14 +915,14 @@ async def market_inventory(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
 
-    g = get_active_game(cb.from_user.id)
-    coins = get_coins(cb.from_user.id)
-    inv = get_inventory(cb.from_user.id)
+    g = await get_active_game(cb.from_user.id)
+    coins = await get_coins(cb.from_user.id)
+    inv = await get_inventory(cb.from_user.id)
 
-    cur_xo = get_skin(cb.from_user.id)
-    cur_ck = get_skin_ck(cb.from_user.id)
+    cur_xo = await get_skin(cb.from_user.id)
+    cur_ck = await get_skin_ck(cb.from_user.id)
 
     lines = [
         "🎒 <b>Інвентар</b>",
@@ -931,8 +961,8 @@ async def menu_balance(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
-    coins = get_coins(cb.from_user.id)
+    lang = await ensure_user(cb)
+    coins = await get_coins(cb.from_user.id)
     kb = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text=t(lang, "menu_coins"), callback_data="sm:menu:coins")],
         [InlineKeyboardButton(text=t(lang, "back"), callback_data="sm:menu:home")],
@@ -945,9 +975,9 @@ async def menu_balance(cb: CallbackQuery):
 async def menu_links(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
-    lang = ensure_user(cb)
-    chat = get_chat()
-    news = get_news()
+    lang = await ensure_user(cb)
+    chat = await get_chat()
+    news = await get_news()
     lines = [
         "🔗 <b>Links</b>",
         "",
@@ -964,9 +994,9 @@ async def menu_friend(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
-    g = get_active_game(cb.from_user.id)
-    token = create_invite(cb.from_user.id, g)
+    lang = await ensure_user(cb)
+    g = await get_active_game(cb.from_user.id)
+    token = await create_invite(cb.from_user.id, g)
 
     uname = await _get_bot_username(cb.bot)
     link = f"https://t.me/{uname}?start=inv_{token}" if uname else ""
@@ -993,16 +1023,15 @@ async def menu_quests(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
 
-    g = get_active_game(cb.from_user.id)
-    u = get_user(cb.from_user.id) or {}
-    suf = "_ck" if g == "checkers" else ""
-    week_games = int(u.get("week_games" + suf, 0) or 0)
-    week_wins = int(u.get("week_wins" + suf, 0) or 0)
-    rating = int(u.get("rating" + suf, 1000) or 1000)
+    g = await get_active_game(cb.from_user.id)
+    st = await get_game_stats(cb.from_user.id, g)
+    week_games = int(st["week_games"])
+    week_wins = int(st["week_wins"])
+    rating = int(st["rating"])
 
-    mask = get_quest_mask(cb.from_user.id, game=g)
+    mask = await get_quest_mask(cb.from_user.id, game=g)
 
     quests = [
         ("1", 1, 10, "🕹 Зіграти 3 PvP гри за тиждень", week_games >= 3),
@@ -1031,7 +1060,7 @@ async def menu_quests(cb: CallbackQuery):
             kb_rows.append([InlineKeyboardButton(text=f"🎁 Забрати #{qid} (+{reward}🪙)", callback_data=f"sm:quest:claim:{qid}")])
 
     lines.append("")
-    lines.append(f"{t(lang,'menu_balance')}: <b>{get_coins(cb.from_user.id)}</b> 🪙")
+    lines.append(f"{t(lang,'menu_balance')}: <b>{await get_coins(cb.from_user.id)}</b> 🪙")
 
     kb_rows.append([InlineKeyboardButton(text=t(lang,'back'), callback_data="sm:menu:home")])
     kb = InlineKeyboardMarkup(inline_keyboard=kb_rows)
@@ -1045,17 +1074,16 @@ async def quest_claim(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    ensure_user(cb)
+    await ensure_user(cb)
 
-    g = get_active_game(cb.from_user.id)
+    g = await get_active_game(cb.from_user.id)
     qid = cb.data.split(":")[-1].strip()
 
     # map quest -> (bit, reward, predicate)
-    u = get_user(cb.from_user.id) or {}
-    suf = "_ck" if g == "checkers" else ""
-    week_games = int(u.get("week_games" + suf, 0) or 0)
-    week_wins = int(u.get("week_wins" + suf, 0) or 0)
-    rating = int(u.get("rating" + suf, 1000) or 1000)
+    st = await get_game_stats(cb.from_user.id, g)
+    week_games = int(st["week_games"])
+    week_wins = int(st["week_wins"])
+    rating = int(st["rating"])
 
     rules = {
         "1": (1, 10, week_games >= 3),
@@ -1069,15 +1097,15 @@ async def quest_claim(cb: CallbackQuery):
         await cb.answer("Unknown quest"); return
 
     bit, reward, done = rules[qid]
-    mask = get_quest_mask(cb.from_user.id, game=g)
+    mask = await get_quest_mask(cb.from_user.id, game=g)
 
     if mask & bit:
         await cb.answer("Already claimed"); return
     if not done:
         await cb.answer("Not completed"); return
 
-    set_quest_mask(cb.from_user.id, mask | bit, game=g)
-    add_coins(cb.from_user.id, reward)
+    await set_quest_mask(cb.from_user.id, mask | bit, game=g)
+    await add_coins(cb.from_user.id, reward)
     await cb.answer(f"+{reward}🪙", show_alert=False)
 
     await menu_quests(cb)
@@ -1116,8 +1144,8 @@ def _find_queue_entry(uid: int):
                 return it, (it.get("side") or side)
     return None, None
 
-def _display_name(user_id: int) -> str:
-    u = get_user(user_id) or {}
+async def _display_name(user_id: int) -> str:
+    u = await get_user_fields(user_id, "username", "first_name") or {}
     username = (u.get("username") or "").strip()
     first_name = (u.get("first_name") or "").strip()
     if username:
@@ -1126,12 +1154,12 @@ def _display_name(user_id: int) -> str:
         return first_name
     return f"Player {str(user_id)[-4:]}"
 
-def _lobby_kb(lang: str, items: list[dict]) -> InlineKeyboardMarkup:
+async def _lobby_kb(lang: str, items: list[dict]) -> InlineKeyboardMarkup:
     rows = []
     # show up to 12 players
     for it in items[:12]:
         uid = int(it["user_id"])
-        name = _display_name(uid)
+        name = await _display_name(uid)
         side = "❌" if it["side"] == "x" else "⭕"
         vip = "💎" if it.get("vip") else ""
         rows.append([
@@ -1153,10 +1181,10 @@ async def menu_lobby(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
     items = _queue_snapshot()
     if not items:
-        await safe_edit_text(cb.message, t(lang, "lobby_empty"), reply_markup=_lobby_kb(lang, []))
+        await safe_edit_text(cb.message, t(lang, "lobby_empty"), reply_markup=await _lobby_kb(lang, []))
         await cb.answer()
         return
 
@@ -1164,13 +1192,13 @@ async def menu_lobby(cb: CallbackQuery):
     lines = [t(lang, "lobby_title"), ""]
     for it in items[:12]:
         uid = int(it["user_id"])
-        name = _display_name(uid)
+        name = await _display_name(uid)
         side_txt = "X" if it["side"] == "x" else "O"
         wait_s = int(max(0, now - float(it["ts"])))
         vip = "💎 " if it.get("vip") else ""
         lines.append(f"• {vip}{name} — {side_txt} — {t(lang,'lobby_wait')} {wait_s}s")
 
-    await safe_edit_text(cb.message, "\n".join(lines), reply_markup=_lobby_kb(lang, items))
+    await safe_edit_text(cb.message, "\n".join(lines), reply_markup=await _lobby_kb(lang, items))
     await cb.answer()
 
 @router.callback_query(F.data.startswith("sm:lobby:challenge:"))
@@ -1178,7 +1206,7 @@ async def lobby_challenge(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
 
     try:
         target_uid = int(cb.data.split(":")[3])
@@ -1194,7 +1222,7 @@ async def lobby_challenge(cb: CallbackQuery):
         await cb.answer("⏳ Гравець вже не в черзі", show_alert=True)
         # refresh lobby
         items = _queue_snapshot()
-        await safe_edit_text(cb.message, t(lang, "lobby_empty") if not items else t(lang, "lobby_title"), reply_markup=_lobby_kb(lang, items))
+        await safe_edit_text(cb.message, t(lang, "lobby_empty") if not items else t(lang, "lobby_title"), reply_markup=await _lobby_kb(lang, items))
         return
 
     # remove opponent from queue + cancel its fallback
@@ -1213,8 +1241,8 @@ async def lobby_challenge(cb: CallbackQuery):
         "message_id": cb.message.message_id,
         "lang": lang,
         "ts": time.time(),
-        "rating": get_rating(challenger_uid),
-        "vip": is_vip(challenger_uid),
+        "rating": await get_rating(challenger_uid),
+        "vip": await is_vip(challenger_uid),
         "side": "o" if target_side == "x" else "x",
     }
 
@@ -1233,7 +1261,7 @@ async def lobby_challenge(cb: CallbackQuery):
 async def menu_lang(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
     await safe_edit_text(cb.message, t(lang, "choose_lang"), reply_markup=language_kb())
     await cb.answer()
 
@@ -1242,24 +1270,24 @@ async def set_lang_cb(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     code = cb.data.split(":")[-1]
-    upsert_user(cb.from_user.id, cb.from_user.username, cb.from_user.first_name, code)
-    db_set_lang(cb.from_user.id, code)
-    g = get_active_game(cb.from_user.id)
+    await upsert_user(cb.from_user.id, cb.from_user.username, cb.from_user.first_name, code)
+    await db_set_lang(cb.from_user.id, code)
+    g = await get_active_game(cb.from_user.id)
     if g == "checkers":
         g_title = t(code, "game_checkers")
     elif g == "chess":
         g_title = t(code, "game_chess")
     else:
         g_title = t(code, "game_xo")
-    await safe_edit_text(cb.message, f"{t(code,'brand_title')}\n{g_title}", reply_markup=menu_kb(code, cb.from_user.id))
+    await safe_edit_text(cb.message, f"{t(code,'brand_title')}\n{g_title}", reply_markup=await menu_kb(code, cb.from_user.id))
     await cb.answer(t(code, "lang_saved"), show_alert=False)
 
 @router.callback_query(F.data == "sm:menu:rules")
 async def menu_rules(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
-    lang = ensure_user(cb)
-    await safe_edit_text(cb.message, t(lang, "rules_text"), reply_markup=menu_kb(lang, cb.from_user.id))
+    lang = await ensure_user(cb)
+    await safe_edit_text(cb.message, t(lang, "rules_text"), reply_markup=await menu_kb(lang, cb.from_user.id))
     await cb.answer()
 
 # ---- Profile / TOP / History ----
@@ -1273,33 +1301,34 @@ async def menu_profile(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
-    reset_week_if_needed(week_len_days=5, top_n=TOP_N)
+    lang = await ensure_user(cb)
 
-    u = get_user(cb.from_user.id) or {}
+    u = await get_user_fields(cb.from_user.id, "username", "first_name", "coins") or {}
     username = (u.get("username") or "").strip()
     first_name = (u.get("first_name") or "").strip()
     coins = int(u.get("coins", 0) or 0)
 
     # XO
-    rating_xo = int(u.get("rating", 1000) or 1000)
-    total_w_xo = int(u.get("total_wins", 0) or 0)
-    total_g_xo = int(u.get("total_games", 0) or 0)
-    week_w_xo = int(u.get("week_wins", 0) or 0)
-    week_g_xo = int(u.get("week_games", 0) or 0)
-    rank_xo = get_weekly_rank(cb.from_user.id, game="xo")
+    st = await get_game_stats(cb.from_user.id, "xo")
+    rating_xo = int(st["rating"])
+    total_w_xo = int(st["total_wins"])
+    total_g_xo = int(st["total_games"])
+    week_w_xo = int(st["week_wins"])
+    week_g_xo = int(st["week_games"])
+    rank_xo = await lb.rank(cb.from_user.id, rank_board("weekly", "xo"))
     rank_xo_txt = str(rank_xo) if rank_xo is not None else "—"
 
     # Checkers
-    rating_ck = int(u.get("rating_ck", 1000) or 1000)
-    total_w_ck = int(u.get("total_wins_ck", 0) or 0)
-    total_g_ck = int(u.get("total_games_ck", 0) or 0)
-    week_w_ck = int(u.get("week_wins_ck", 0) or 0)
-    week_g_ck = int(u.get("week_games_ck", 0) or 0)
-    rank_ck = get_weekly_rank(cb.from_user.id, game="checkers")
+    st = await get_game_stats(cb.from_user.id, "checkers")
+    rating_ck = int(st["rating"])
+    total_w_ck = int(st["total_wins"])
+    total_g_ck = int(st["total_games"])
+    week_w_ck = int(st["week_wins"])
+    week_g_ck = int(st["week_games"])
+    rank_ck = await lb.rank(cb.from_user.id, rank_board("weekly", "checkers"))
     rank_ck_txt = str(rank_ck) if rank_ck is not None else "—"
 
-    g = get_active_game(cb.from_user.id)
+    g = await get_active_game(cb.from_user.id)
     if g == "checkers":
         g_title = t(lang, "game_checkers")
     elif g == "chess":
@@ -1331,7 +1360,7 @@ async def menu_top(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
     # default: overall, page 0
     await show_top100(cb, mode="overall", page=0)
     await cb.answer()
@@ -1342,7 +1371,7 @@ async def top_mode(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
     parts = cb.data.split(":")
     # sm:top:mode:<mode>:<page>
     mode = parts[3] if len(parts) > 3 else "overall"
@@ -1355,12 +1384,15 @@ async def top_mode(cb: CallbackQuery):
 
 
 async def show_top100(cb: CallbackQuery, mode: str = "overall", page: int = 0):
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
     mode = (mode or "overall").lower()
     page = max(0, int(page))
 
     per_page = 20
-    top = get_top100(mode=mode, limit=100)
+    top_n = 100
+    page = min(page, top_n // per_page - 1)
+    start = page * per_page
+    chunk, has_more = await lb.page(rank_board("top", mode), offset=start, limit=per_page)
 
     title_map = {
         "overall": "🏆 Топ-100 (Загальний)",
@@ -1369,7 +1401,7 @@ async def show_top100(cb: CallbackQuery, mode: str = "overall", page: int = 0):
     }
     title = title_map.get(mode, title_map["overall"])
 
-    if not top:
+    if not chunk and page == 0:
         kb = InlineKeyboardMarkup(inline_keyboard=[
             [InlineKeyboardButton(text="📅 Топ тижня", callback_data="sm:top:weekly")],
             [InlineKeyboardButton(text=t(lang, "back"), callback_data="sm:menu:home")],
@@ -1377,16 +1409,10 @@ async def show_top100(cb: CallbackQuery, mode: str = "overall", page: int = 0):
         await safe_edit_text(cb.message, f"{title}\n\nПоки що порожньо.", reply_markup=kb)
         return
 
-    start = page * per_page
     end = start + per_page
-    chunk = top[start:end]
 
-    # current user rank
-    my_rank = None
-    for i, it in enumerate(top, start=1):
-        if int(it["user_id"]) == int(cb.from_user.id):
-            my_rank = i
-            break
+    # current user rank (outside the top-100 too)
+    my_rank = await lb.rank(cb.from_user.id, rank_board("top", mode))
 
     lines = [f"{title}", ""]
     if my_rank:
@@ -1401,7 +1427,7 @@ async def show_top100(cb: CallbackQuery, mode: str = "overall", page: int = 0):
         lines.append(f"{marker}{idx}. <b>{disp}</b> — <b>{score}</b>")
 
     has_prev = page > 0
-    has_next = end < len(top)
+    has_next = has_more and end < top_n
 
     # filters + paging
     row_filters = [
@@ -1432,13 +1458,11 @@ async def top_weekly(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
 
-    reset_week_if_needed(week_len_days=5, top_n=TOP_N)
-
-    game = get_active_game(cb.from_user.id)
-    top = get_weekly_top(TOP_N, game=game)
-    pool = get_prize_pool()
+    game = await get_active_game(cb.from_user.id)
+    top = await lb.weekly_top(TOP_N, game=game)
+    pool = await get_prize_pool()
 
     kb = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text=t(lang, "top_history"), callback_data="sm:top:history")],
@@ -1459,6 +1483,11 @@ async def top_weekly(cb: CallbackQuery):
             disp = (it["first_name"] or f"ID{it['user_id']}").strip()
         lines.append(f"{i}. <b>{disp}</b> — {it['week_wins']}W / {it['week_games']}G — <i>{it['rating']}</i>")
 
+    my_rank = await lb.rank(cb.from_user.id, rank_board("weekly", game))
+    if my_rank is not None and my_rank > len(top):
+        lines.append("")
+        lines.append(f"Твій ранг: <b>#{my_rank}</b>")
+
     await safe_edit_text(cb.message, "\n".join(lines), reply_markup=kb)
     await cb.answer()
 
@@ -1467,10 +1496,10 @@ async def top_history(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
 
-    game = get_active_game(cb.from_user.id)
-    hist = load_week_history(limit=5, game=game)
+    game = await get_active_game(cb.from_user.id)
+    hist = await load_week_history(limit=5, game=game)
     kb = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text=t(lang, "back"), callback_data="sm:menu:top")],
         [InlineKeyboardButton(text=t(lang, "back"), callback_data="sm:menu:home")]
@@ -1499,9 +1528,9 @@ async def menu_skins(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
-    g = get_active_game(cb.from_user.id)
-    cur = get_skin_ck(cb.from_user.id) if g == "checkers" else get_skin(cb.from_user.id)
+    lang = await ensure_user(cb)
+    g = await get_active_game(cb.from_user.id)
+    cur = await get_skin_ck(cb.from_user.id) if g == "checkers" else await get_skin(cb.from_user.id)
     await safe_edit_text(
         cb.message,
         f"{t(lang, 'menu_skins')}\n\n{t(lang, 'skins_only_active')}",
@@ -1514,9 +1543,9 @@ async def menu_skins_all(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
-    g = get_active_game(cb.from_user.id)
-    cur = get_skin_ck(cb.from_user.id) if g == "checkers" else get_skin(cb.from_user.id)
+    lang = await ensure_user(cb)
+    g = await get_active_game(cb.from_user.id)
+    cur = await get_skin_ck(cb.from_user.id) if g == "checkers" else await get_skin(cb.from_user.id)
     await safe_edit_text(cb.message, t(lang, "menu_skins"), reply_markup=skins_kb(lang, cur))
     await cb.answer()
 
@@ -1529,12 +1558,12 @@ async def set_skin_cb(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
 
     skin = cb.data.split(":")[-1]
     from app.config import SKINS, SKIN_BOARDS_CK, SKIN_BOARDS
     
-    g = get_active_game(cb.from_user.id)
+    g = await get_active_game(cb.from_user.id)
     if g == "checkers":
         valid = {k for k, _ in SKIN_BOARDS_CK}
     elif g == "chess":
@@ -1547,25 +1576,25 @@ async def set_skin_cb(cb: CallbackQuery):
         return
 
     # lock premium skins behind shop (or VIP)
-    if not _skin_allowed(cb.from_user.id, g, skin):
+    if not await _skin_allowed(cb.from_user.id, g, skin):
         await cb.answer("Цей скін треба купити в 🛍 Магазині", show_alert=True)
         return
 
     if g == "checkers":
-        set_skin_ck(cb.from_user.id, skin)
-        if has_item(cb.from_user.id, f"skin:checkers:{skin}"):
-            set_active_item(cb.from_user.id, f"skin:checkers:{skin}")
+        await set_skin_ck(cb.from_user.id, skin)
+        if await has_item(cb.from_user.id, f"skin:checkers:{skin}"):
+            await set_active_item(cb.from_user.id, f"skin:checkers:{skin}")
     elif g == "chess":
-        from app.db import set_skin_chess_board, set_skin_chess_pieces
-        set_skin_chess_board(cb.from_user.id, skin)
-        set_skin_chess_pieces(cb.from_user.id, skin)
+        from app.db_async import set_skin_chess_board, set_skin_chess_pieces
+        await set_skin_chess_board(cb.from_user.id, skin)
+        await set_skin_chess_pieces(cb.from_user.id, skin)
     else:
-        from app.db import set_skin as db_set_skin
-        db_set_skin(cb.from_user.id, skin)
-        if has_item(cb.from_user.id, f"skin:xo:{skin}"):
-            set_active_item(cb.from_user.id, f"skin:xo:{skin}")
+        from app.db_async import set_skin as db_set_skin
+        await db_set_skin(cb.from_user.id, skin)
+        if await has_item(cb.from_user.id, f"skin:xo:{skin}"):
+            await set_active_item(cb.from_user.id, f"skin:xo:{skin}")
 
-    cur = get_skin_ck(cb.from_user.id) if g == "checkers" else get_skin(cb.from_user.id)
+    cur = await get_skin_ck(cb.from_user.id) if g == "checkers" else await get_skin(cb.from_user.id)
     await safe_edit_text(
         cb.message,
         f"{t(lang, 'menu_skins')}\n\n{t(lang, 'skins_only_active')}",
@@ -1578,7 +1607,7 @@ async def menu_donate(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
     await safe_edit_text(cb.message, "⭐ Donate", reply_markup=donate_kb(lang, DONATE_AMOUNTS))
     await cb.answer()
 
@@ -1587,7 +1616,7 @@ async def donate_pick(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
     stars = int(cb.data.split(":")[-1])
     prices, payload = donate_invoice(cb.from_user.id, stars, lang)
     await cb.bot.send_invoice(
@@ -1606,19 +1635,19 @@ async def menu_vip(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
     
-    from app.db import get_bp_state
+    from app.db_async import get_bp_state
     import json
     
-    bp_xp, bp_level, claims_f_str, claims_p_str = get_bp_state(cb.from_user.id)
+    bp_xp, bp_level, claims_f_str, claims_p_str = await get_bp_state(cb.from_user.id)
     c_free = json.loads(claims_f_str)
     c_prem = json.loads(claims_p_str)
     
-    is_premium = is_vip(cb.from_user.id)
+    is_premium = await is_vip(cb.from_user.id)
     
     if is_premium:
-        date = datetime.fromtimestamp(add_vip_days(cb.from_user.id, 0), tz=timezone.utc).strftime("%Y-%m-%d")
+        date = datetime.fromtimestamp(await add_vip_days(cb.from_user.id, 0), tz=timezone.utc).strftime("%Y-%m-%d")
         vip_txt = t(lang, "vip_status_on").format(date=date)
     else:
         vip_txt = t(lang, "vip_status_off")
@@ -1638,10 +1667,10 @@ async def menu_vip_buy(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
     
-    if is_vip(cb.from_user.id):
-        date = datetime.fromtimestamp(add_vip_days(cb.from_user.id, 0), tz=timezone.utc).strftime("%Y-%m-%d")
+    if await is_vip(cb.from_user.id):
+        date = datetime.fromtimestamp(await add_vip_days(cb.from_user.id, 0), tz=timezone.utc).strftime("%Y-%m-%d")
         text = t(lang, "vip_status_on").format(date=date)
     else:
         text = t(lang, "vip_status_off")
@@ -1659,11 +1688,11 @@ async def bp_claim(cb: CallbackQuery):
     claim_type = parts[3] # "free" or "premium"
     level = int(parts[4])
     
-    from app.db import get_bp_state, claim_bp_reward
+    from app.db_async import get_bp_state, claim_bp_reward
     from app.vip_service import BP_REWARDS, grant_bp_reward
     
-    bp_xp, bp_level, _, _ = get_bp_state(cb.from_user.id)
-    is_premium = is_vip(cb.from_user.id)
+    bp_xp, bp_level, _, _ = await get_bp_state(cb.from_user.id)
+    is_premium = await is_vip(cb.from_user.id)
     
     if level > bp_level:
         await cb.answer("❌ Рівень ще не досягнуто!", show_alert=True)
@@ -1678,12 +1707,12 @@ async def bp_claim(cb: CallbackQuery):
         await cb.answer("❌ Нагороди не існує!", show_alert=True)
         return
         
-    success = claim_bp_reward(cb.from_user.id, level, is_premium=(claim_type=="premium"))
+    success = await claim_bp_reward(cb.from_user.id, level, is_premium=(claim_type=="premium"))
     if not success:
         await cb.answer("⛔ Вже отримано!", show_alert=True)
         return
         
-    msg = grant_bp_reward(cb.from_user.id, reward)
+    msg = await grant_bp_reward(cb.from_user.id, reward)
     await cb.answer(f"🎉 Отримано: {msg}", show_alert=True)
     await menu_vip(cb)
 
@@ -1696,7 +1725,7 @@ async def vip_buy_coins(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
 
     try:
         _, _, _, days_s, coins_s = cb.data.split(":")
@@ -1711,13 +1740,13 @@ async def vip_buy_coins(cb: CallbackQuery):
         await cb.answer("Unknown VIP plan", show_alert=True)
         return
 
-    if not try_spend_coins(cb.from_user.id, coins):
+    if not await try_spend_coins(cb.from_user.id, coins):
         await cb.answer("Недостатньо монет 🪙", show_alert=True)
         return
 
-    until = add_vip_days(cb.from_user.id, days)
+    until = await add_vip_days(cb.from_user.id, days)
     date = datetime.fromtimestamp(until, tz=timezone.utc).strftime("%Y-%m-%d")
-    bal = get_coins(cb.from_user.id)
+    bal = await get_coins(cb.from_user.id)
     text = t(lang, "vip_status_on").format(date=date)
 
     await safe_edit_text(
@@ -1733,7 +1762,7 @@ async def menu_ai(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
     await safe_edit_text(cb.message, t(lang, "choose_ai"), reply_markup=ai_levels_kb(lang))
     await cb.answer()
 
@@ -1742,16 +1771,17 @@ async def ai_start(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
     level = cb.data.split(":")[-1]
     match_id = str(uuid.uuid4())[:8]
-    board = "........."
-    AI_MATCHES[match_id] = {"level": level, "board": board, "user_id": cb.from_user.id, "status": "playing"}
-    
+    board = EMPTY_BOARD
+    AI_MATCHES[match_id] = AIMatch(cb.from_user.id, level)
+    live_state.touch("ai", match_id)
+
     await render_xo_msg(
         cb.message.chat.id, cb.message.message_id, board, cb.bot, lang, cb.from_user.id,
         caption=f"🤖 AI ({level}) — {t(lang,'your_move')}",
-        kb=board_kb(match_id, board, lang, highlight=set(), skin=get_skin(cb.from_user.id))
+        kb=board_kb(match_id, board, lang, highlight=set(), skin=await get_skin(cb.from_user.id))
     )
     await cb.answer()
 
@@ -1765,7 +1795,7 @@ async def ai_move(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
     parts = cb.data.split(":")
     match_id = parts[3]
     cell = int(parts[4])
@@ -1773,15 +1803,16 @@ async def ai_move(cb: CallbackQuery):
     state = AI_MATCHES.get(match_id)
     if not state:
         await cb.answer("Game expired", show_alert=True); return
-    if state.get("status") != "playing":
+    if state.status != "playing":
         await cb.answer("Game ended. Start a new one.", show_alert=True); return
 
-    board = state["board"]; level = state["level"]
+    board = state.board; level = state.level
     try:
         board = apply_move(board, cell, "X")
     except Exception:
         await cb.answer("Cell taken"); return
-    state["board"] = board
+    state.board = board
+    live_state.touch("ai", match_id)
 
     w = check_winner(board)
     if w:
@@ -1791,13 +1822,14 @@ async def ai_move(cb: CallbackQuery):
             cb.message.chat.id, cb.message.message_id, board, cb.bot, lang, cb.from_user.id,
             highlight=hl,
             caption=result_text(w, level, lang) + f"\n\n{extra}",
-            kb=board_kb(match_id, board, lang, highlight=hl, skin=get_skin(cb.from_user.id))
+            kb=board_kb(match_id, board, lang, highlight=hl, skin=await get_skin(cb.from_user.id))
         )
         return
 
     ai_cell = ai_move_easy(board) if level == "easy" else (ai_move_normal(board) if level == "normal" else ai_move_hard(board))
     board = apply_move(board, ai_cell, "O")
-    state["board"] = board
+    state.board = board
+    live_state.touch("ai", match_id)
 
     w = check_winner(board)
     if w:
@@ -1807,14 +1839,14 @@ async def ai_move(cb: CallbackQuery):
             cb.message.chat.id, cb.message.message_id, board, cb.bot, lang, cb.from_user.id,
             highlight=hl,
             caption=result_text(w, level, lang) + f"\n\n{extra}",
-            kb=board_kb(match_id, board, lang, highlight=hl, skin=get_skin(cb.from_user.id))
+            kb=board_kb(match_id, board, lang, highlight=hl, skin=await get_skin(cb.from_user.id))
         )
         return
 
     await render_xo_msg(
         cb.message.chat.id, cb.message.message_id, board, cb.bot, lang, cb.from_user.id,
         caption=f"🤖 AI ({level}) — {t(lang,'your_move')}",
-        kb=board_kb(match_id, board, lang, highlight=set(), skin=get_skin(cb.from_user.id))
+        kb=board_kb(match_id, board, lang, highlight=set(), skin=await get_skin(cb.from_user.id))
     )
     await cb.answer()
 
@@ -1823,7 +1855,7 @@ async def ai_control(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
 
     parts = (cb.data or "").split(":")
     if len(parts) < 5:
@@ -1834,30 +1866,32 @@ async def ai_control(cb: CallbackQuery):
     state = AI_MATCHES.get(match_id)
     if not state:
         await cb.answer("Game expired", show_alert=True); return
-    if int(state.get("user_id") or 0) != int(cb.from_user.id):
+    if int(state.user_id or 0) != int(cb.from_user.id):
         await cb.answer("Not your game", show_alert=True); return
 
-    level = str(state.get("level") or "normal")
+    level = str(state.level or "normal")
 
     if action in ("reset", "new"):
-        board = "........."
-        state["board"] = board
-        state["status"] = "playing"
+        board = EMPTY_BOARD
+        state.board = board
+        state.status = "playing"
+        live_state.touch("ai", match_id)
         await render_xo_msg(
             cb.message.chat.id, cb.message.message_id, board, cb.bot, lang, cb.from_user.id,
             caption=f"🤖 AI ({level}) — {t(lang,'your_move')}",
-            kb=board_kb(match_id, board, lang, highlight=set(), skin=get_skin(cb.from_user.id)),
+            kb=board_kb(match_id, board, lang, highlight=set(), skin=await get_skin(cb.from_user.id)),
         )
         await cb.answer("Reset." if action == "reset" else "New game!")
         return
 
     if action == "resign":
-        state["status"] = "ended"
-        board = str(state.get("board") or ".........")
+        state.status = "ended"
+        live_state.touch("ai", match_id)
+        board = state.board
         await render_xo_msg(
             cb.message.chat.id, cb.message.message_id, board, cb.bot, lang, cb.from_user.id,
             caption="Game ended by resignation.",
-            kb=board_kb(match_id, board, lang, highlight=set(), skin=get_skin(cb.from_user.id)),
+            kb=board_kb(match_id, board, lang, highlight=set(), skin=await get_skin(cb.from_user.id)),
         )
         await cb.answer("Resigned.")
         return
@@ -1870,9 +1904,9 @@ async def menu_random(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
 
-    if is_banned(cb.from_user.id):
+    if await is_banned(cb.from_user.id):
         await cb.answer("Banned", show_alert=True); return
     if is_in_queue(cb.from_user.id):
         await cb.answer("Already searching"); return
@@ -1885,12 +1919,13 @@ async def random_want(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
-    reset_week_if_needed(week_len_days=5, top_n=TOP_N)
+    lang = await ensure_user(cb)
 
     uid = cb.from_user.id
-    if is_banned(uid):
+    if await is_banned(uid):
         await cb.answer("Banned", show_alert=True); return
+    rating, vip, rd = await get_rating(uid), await is_vip(uid), (await get_glicko(uid))["rd"]
+    # Queue state is only touched below this line, with no awaits until the entry is placed.
     if is_in_queue(uid):
         await cb.answer("Already searching"); return
 
@@ -1903,13 +1938,14 @@ async def random_want(cb: CallbackQuery):
         "message_id": cb.message.message_id,
         "lang": lang,
         "ts": time.time(),
-        "rating": get_rating(uid),
-        "vip": is_vip(uid),
+        "rating": rating,
+        "rd": rd,
+        "vip": vip,
         "side": side,
     }
 
     def pop_best(q, target):
-        return best_match(q, target) if q else None
+        return best_match(q, target, entry["rd"]) if q else None
 
     if side == "x":
         other = pop_best(WAIT_O_VIP, entry["rating"]) if entry["vip"] else None
@@ -1917,6 +1953,7 @@ async def random_want(cb: CallbackQuery):
             other = pop_best(WAIT_O, entry["rating"]) if entry["vip"] else pop_best(WAIT_O_VIP, entry["rating"]) or pop_best(WAIT_O, entry["rating"])
         if other:
             cancel_wait_task(other["user_id"])
+            live_state.touch("queue", other["user_id"])
             await start_pvp_match(cb, x_user=entry, o_user=other)
             await cb.answer()
             return
@@ -1927,25 +1964,27 @@ async def random_want(cb: CallbackQuery):
             other = pop_best(WAIT_X, entry["rating"]) if entry["vip"] else pop_best(WAIT_X_VIP, entry["rating"]) or pop_best(WAIT_X, entry["rating"])
         if other:
             cancel_wait_task(other["user_id"])
+            live_state.touch("queue", other["user_id"])
             await start_pvp_match(cb, x_user=other, o_user=entry)
             await cb.answer()
             return
         (WAIT_O_VIP if entry["vip"] else WAIT_O).append(entry)
+    live_state.touch("queue", uid)
 
-    fallback_sec = VIP_FALLBACK_AI_SEC if entry["vip"] else NONVIP_FALLBACK_AI_SEC
-    await safe_edit_text(cb.message, f"🔎 Searching… ({fallback_sec}s)", reply_markup=searching_kb(lang))
+    sec = fallback_sec(entry)
+    await safe_edit_text(cb.message, f"🔎 Searching… ({sec}s)", reply_markup=searching_kb(lang))
     await cb.answer()
-    WAIT_TASKS[uid] = asyncio.create_task(random_fallback_to_ai(cb, uid, entry["chat_id"], entry["message_id"], fallback_sec))
+    WAIT_TASKS[uid] = asyncio.create_task(random_fallback_to_ai(cb, uid, entry["chat_id"], entry["message_id"], sec))
 
 @router.callback_query(F.data == "sm:random:cancel")
 async def random_cancel(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
     remove_from_queue(cb.from_user.id)
     cancel_wait_task(cb.from_user.id)
-    await safe_edit_text(cb.message, f"{t(lang,'brand_title')}\n{t(lang,'choose')}", reply_markup=menu_kb(lang, cb.from_user.id))
+    await safe_edit_text(cb.message, f"{t(lang,'brand_title')}\n{t(lang,'choose')}", reply_markup=await menu_kb(lang, cb.from_user.id))
     await cb.answer("Canceled")
 
 async def random_fallback_to_ai(cb: CallbackQuery, uid: int, chat_id: int, msg_id: int, sec: int):
@@ -1956,43 +1995,39 @@ async def random_fallback_to_ai(cb: CallbackQuery, uid: int, chat_id: int, msg_i
     if not is_in_queue(uid):
         return
     remove_from_queue(uid)
-    lang = db_get_lang(uid) or "en"
+    lang = await db_get_lang(uid) or "en"
     try:
         await cb.bot.edit_message_text(chat_id=chat_id, message_id=msg_id, text="🤖 No opponents. Starting AI…")
     except Exception:
         pass
     # start normal AI in same message
     match_id = str(uuid.uuid4())[:8]
-    board = "........."
-    AI_MATCHES[match_id] = {"level": "normal", "board": board, "user_id": uid, "status": "playing"}
+    board = EMPTY_BOARD
+    AI_MATCHES[match_id] = AIMatch(uid, "normal")
+    live_state.touch("ai", match_id)
     await render_xo_msg(
         chat_id, msg_id, board, cb.bot, lang, uid,
         caption=f"🤖 AI (normal) — {t(lang,'your_move')}",
-        kb=board_kb(match_id, board, lang, highlight=set(), skin=get_skin(uid))
+        kb=board_kb(match_id, board, lang, highlight=set(), skin=await get_skin(uid))
     )
 
 # PvP start / move handlers could be kept as you already had;
 # For brevity, this build focuses on Profile/TOP/SQLite persistence and leaves PvP mechanics minimal.
 async def start_pvp_match(cb: CallbackQuery, x_user: dict, o_user: dict):
     match_id = str(uuid.uuid4())[:8]
-    board = "........."
+    board = EMPTY_BOARD
 
     # Store everything needed to update BOTH players on each move
-    PVP_MATCHES[match_id] = {
-        "board": board,
-        "x": x_user["user_id"],
-        "o": o_user["user_id"],
-        "turn": "X",
-        "status": "playing",
-        "last_move": time.time(),
-
-        "x_chat": x_user["chat_id"],
-        "o_chat": o_user["chat_id"],
-        "x_msg": x_user["message_id"],
-        "o_msg": o_user["message_id"],
-        "x_lang": x_user.get("lang") or "en",
-        "o_lang": o_user.get("lang") or "en",
-    }
+    PVP_MATCHES[match_id] = PvPMatch(
+        x=x_user["user_id"],
+        o=o_user["user_id"],
+        x_chat=x_user["chat_id"],
+        o_chat=o_user["chat_id"],
+        x_msg=x_user["message_id"],
+        o_msg=o_user["message_id"],
+        x_lang=x_user.get("lang") or "en",
+        o_lang=o_user.get("lang") or "en",
+    )
 
     set_pvp_timer(match_id, cb)
 
@@ -2009,12 +2044,12 @@ async def start_pvp_match(cb: CallbackQuery, x_user: dict, o_user: dict):
     await render_xo_msg(
         x_user["chat_id"], x_user["message_id"], board, cb.bot, x_user.get("lang") or "en", x_user["user_id"],
         caption=f"✅ Found! {turn_txt}",
-        kb=board_kb_pvp(match_id, board, x_user.get("lang") or "en", highlight=set(), skin=get_skin(x_user["user_id"]))
+        kb=board_kb_pvp(match_id, board, x_user.get("lang") or "en", highlight=set(), skin=await get_skin(x_user["user_id"]))
     )
     await render_xo_msg(
         o_user["chat_id"], o_user["message_id"], board, cb.bot, o_user.get("lang") or "en", o_user["user_id"],
         caption=f"✅ Found! {turn_txt}",
-        kb=board_kb_pvp(match_id, board, o_user.get("lang") or "en", highlight=set(), skin=get_skin(o_user["user_id"]))
+        kb=board_kb_pvp(match_id, board, o_user.get("lang") or "en", highlight=set(), skin=await get_skin(o_user["user_id"]))
     )
 
 
@@ -2023,7 +2058,7 @@ async def pvp_move(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
 
     parts = cb.data.split(":")  # sm:pvp:move:<match_id>:<cell>
     if len(parts) < 5:
@@ -2032,26 +2067,27 @@ async def pvp_move(cb: CallbackQuery):
     cell = int(parts[4])
 
     m = PVP_MATCHES.get(match_id)
-    if not m or m.get("status") != "playing":
+    if not m or m.status != "playing":
         await cb.answer("Game ended", show_alert=True); return
 
     uid = cb.from_user.id
-    if uid not in (m["x"], m["o"]):
+    if uid not in (m.x, m.o):
         await cb.answer("Not your game", show_alert=True); return
 
-    my_mark = "X" if uid == m["x"] else "O"
-    if m["turn"] != my_mark:
+    my_mark = "X" if uid == m.x else "O"
+    if m.turn != my_mark:
         await cb.answer("Not your turn"); return
 
     # apply move
     try:
-        new_board = apply_move(m["board"], cell, my_mark)
+        new_board = apply_move(m.board, cell, my_mark)
     except Exception:
         await cb.answer("Cell taken"); return
 
-    m["board"] = new_board
-    m["turn"] = "O" if my_mark == "X" else "X"
-    m["last_move"] = time.time()
+    m.board = new_board
+    m.moves += str(cell)
+    m.turn = "O" if my_mark == "X" else "X"
+    m.last_move = time.time()
     set_pvp_timer(match_id, cb)
 
     w = check_winner(new_board)
@@ -2067,39 +2103,46 @@ async def pvp_move(cb: CallbackQuery):
             return
 
     # current turn text
-    turn_txt = "❌ (X)" if m["turn"] == "X" else "⭕ (O)"
+    turn_txt = "❌ (X)" if m.turn == "X" else "⭕ (O)"
 
     if not w:
         await render_xo_msg(
-            m.get("x_chat"), m.get("x_msg"), new_board, cb.bot, m.get("x_lang","en"), m["x"],
+            m.x_chat, m.x_msg, new_board, cb.bot, m.x_lang, m.x,
             caption=f"🎮 PvP | {turn_txt}",
-            kb=board_kb_pvp(match_id, new_board, m.get("x_lang","en"), highlight=set(), skin=get_skin(m["x"]), show_controls=not bool(m.get("tmatch_id")))
+            kb=board_kb_pvp(match_id, new_board, m.x_lang, highlight=set(), skin=await get_skin(m.x), show_controls=not bool(m.tmatch_id))
         )
         await render_xo_msg(
-            m.get("o_chat"), m.get("o_msg"), new_board, cb.bot, m.get("o_lang","en"), m["o"],
+            m.o_chat, m.o_msg, new_board, cb.bot, m.o_lang, m.o,
             caption=f"🎮 PvP | {turn_txt}",
-            kb=board_kb_pvp(match_id, new_board, m.get("o_lang","en"), highlight=set(), skin=get_skin(m["o"]), show_controls=not bool(m.get("tmatch_id")))
+            kb=board_kb_pvp(match_id, new_board, m.o_lang, highlight=set(), skin=await get_skin(m.o), show_controls=not bool(m.tmatch_id))
         )
         await cb.answer()
         return
 
     # finished
-    m["status"] = "ended"
+    m.status = "ended"
     cancel_pvp_timer(match_id)
 
-    x_id, o_id = m["x"], m["o"]
-
-    sb_x = is_shadowbanned(x_id)
-    sb_o = is_shadowbanned(o_id)
-    rated = is_rated_pair_game(x_id, o_id, ANTI_BOOST_WINDOW_SEC, ANTI_BOOST_MAX_RATED)
+    x_id, o_id = m.x, m.o
+
+    # stats, battle pass, referrals, Elo and anti-boost in one transaction
+    outcome = await record_game_result(GameResult(
+        game="xo",
+        a_id=x_id,
+        b_id=o_id,
+        winner_id=x_id if w == "X" else (o_id if w == "O" else None),
+        anti_boost_window_sec=ANTI_BOOST_WINDOW_SEC,
+        anti_boost_max_rated=ANTI_BOOST_MAX_RATED,
+        tournament_id=int(m.tournament_id or 0),
+        tmatch_id=int(m.tmatch_id or 0),
+        moves=tuple(m.moves),
+        duration_sec=time.time() - float(m.started_ts or time.time()),
+    ))
+    sb_x = outcome.shadowbanned[x_id]
+    sb_o = outcome.shadowbanned[o_id]
+    rated = outcome.rated
 
-    # stats
     if not sb_x:
-        bump_total(x_id, win=(w == "X"))
-        bump_weekly(x_id, win=(w == "X"))
-        inc_season_games(x_id, "xo", win=(w == "X"))
-        if rated:
-            add_bp_xp(x_id, 20 if w == "X" else 10)
         # Arena hook
         from app.arena_mode import report_win as _ar_win, report_loss as _ar_loss
         if w == "X":
@@ -2107,31 +2150,20 @@ async def pvp_move(cb: CallbackQuery):
         elif w != "D":
             _ar_loss(x_id)
 
-    if not sb_o:
-        bump_total(o_id, win=(w == "O"))
-        bump_weekly(o_id, win=(w == "O"))
-        inc_season_games(o_id, "xo", win=(w == "O"))
-        if rated:
-            add_bp_xp(o_id, 20 if w == "O" else 10)
-
-    # referrals (reward when invited played enough rated games)
-    for uid in (x_id, o_id):
-        paid = try_pay_referral_reward(uid)
-        if paid:
-            inviter_id, coins_paid = paid
-            try:
-                await cb.bot.send_message(inviter_id, f"🤝 Рефералка: +{coins_paid} 🪙 (твій друг зіграв 3 рейтингові гри)")
-            except Exception:
-                pass
+    for inviter_id, coins_paid in outcome.referral_payouts:
+        try:
+            await cb.bot.send_message(inviter_id, f"🤝 Рефералка: +{coins_paid} 🪙 (твій друг зіграв 3 рейтингові гри)")
+        except Exception:
+            pass
 
     # tournament hook
-    tmatch_id = m.get("tmatch_id")
-    tournament_id = m.get("tournament_id")
+    tmatch_id = m.tmatch_id
+    tournament_id = m.tournament_id
     if tmatch_id and tournament_id and w in ("X","O"):
         winner_id = x_id if w == "X" else o_id
         try:
-            set_match_result(int(tmatch_id), int(winner_id))
-            advance_round_if_ready(int(tournament_id))
+            await set_match_result(int(tmatch_id), int(winner_id))
+            await advance_round_if_ready(int(tournament_id))
             try:
                 await cb.bot.send_message(x_id, "🏆 Турнір: результат матчу зараховано ✅")
             except Exception:
@@ -2146,27 +2178,11 @@ async def pvp_move(cb: CallbackQuery):
     rating_note_x = rating_note_o = ""
     if w != "D":
         if rated:
-            rx, ro = get_rating(x_id), get_rating(o_id)
-            score_x = 1.0 if w == "X" else 0.0
-            nx, no = update_elo(rx, ro, score_x)
-            
-            if not sb_x:
-                set_rating(x_id, nx)
-            if not sb_o:
-                set_rating(o_id, no)
-                
-            # сезонний Elo (не ламає глобальний рейтинг)
-            srx, sro = get_season_rating(x_id, "xo"), get_season_rating(o_id, "xo")
-            nsx, nso = update_elo(srx, sro, score_x)
-            if not sb_x:
-                set_season_rating(x_id, "xo", nsx)
-            if not sb_o:
-                set_season_rating(o_id, "xo", nso)
-                
-            record_pair_game(x_id, o_id, ANTI_BOOST_WINDOW_SEC)
+            rx, ro = outcome.rating_before[x_id], outcome.rating_before[o_id]
+            nx, no = outcome.rating_after[x_id], outcome.rating_after[o_id]
             rating_note_x = f"\n\n📈 Elo: {rx} → {nx}"
             rating_note_o = f"\n\n📈 Elo: {ro} → {no}"
-            
+
             if sb_x: rating_note_x = "\n\n⚠️ Unrated (shadowban)"
             if sb_o: rating_note_o = "\n\n⚠️ Unrated (shadowban)"
         else:
@@ -2174,23 +2190,23 @@ async def pvp_move(cb: CallbackQuery):
 
     # results per player
     if w == "D":
-        text_x = f"{t(m.get('x_lang','en'), 'draw')}{rating_note_x}\n\n{DRAW_EMOJI}"
-        text_o = f"{t(m.get('o_lang','en'), 'draw')}{rating_note_o}\n\n{DRAW_EMOJI}"
+        text_x = f"{t(m.x_lang, 'draw')}{rating_note_x}\n\n{DRAW_EMOJI}"
+        text_o = f"{t(m.o_lang, 'draw')}{rating_note_o}\n\n{DRAW_EMOJI}"
     else:
         x_win = (w == "X")
         o_win = (w == "O")
-        text_x = f"{t(m.get('x_lang','en'), 'you_win' if x_win else 'you_lose')}{rating_note_x}\n\n{WIN_EMOJI if x_win else LOSE_EMOJI}"
-        text_o = f"{t(m.get('o_lang','en'), 'you_win' if o_win else 'you_lose')}{rating_note_o}\n\n{WIN_EMOJI if o_win else LOSE_EMOJI}"
+        text_x = f"{t(m.x_lang, 'you_win' if x_win else 'you_lose')}{rating_note_x}\n\n{WIN_EMOJI if x_win else LOSE_EMOJI}"
+        text_o = f"{t(m.o_lang, 'you_win' if o_win else 'you_lose')}{rating_note_o}\n\n{WIN_EMOJI if o_win else LOSE_EMOJI}"
 
     await render_xo_msg(
-        m.get("x_chat"), m.get("x_msg"), new_board, cb.bot, m.get("x_lang","en"), x_id,
+        m.x_chat, m.x_msg, new_board, cb.bot, m.x_lang, x_id,
         highlight=hl, caption=text_x,
-        kb=board_kb_pvp(match_id, new_board, m.get("x_lang","en"), highlight=hl, skin=get_skin(x_id), show_controls=not bool(m.get("tmatch_id")))
+        kb=board_kb_pvp(match_id, new_board, m.x_lang, highlight=hl, skin=await get_skin(x_id), show_controls=not bool(m.tmatch_id))
     )
     await render_xo_msg(
-        m.get("o_chat"), m.get("o_msg"), new_board, cb.bot, m.get("o_lang","en"), o_id,
+        m.o_chat, m.o_msg, new_board, cb.bot, m.o_lang, o_id,
         highlight=hl, caption=text_o,
-        kb=board_kb_pvp(match_id, new_board, m.get("o_lang","en"), highlight=hl, skin=get_skin(o_id), show_controls=not bool(m.get("tmatch_id")))
+        kb=board_kb_pvp(match_id, new_board, m.o_lang, highlight=hl, skin=await get_skin(o_id), show_controls=not bool(m.tmatch_id))
     )
     await cb.answer()
 
@@ -2200,7 +2216,7 @@ async def pvp_control(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    ensure_user(cb)
+    await ensure_user(cb)
 
     parts = (cb.data or "").split(":")
     if len(parts) < 5:
@@ -2213,11 +2229,11 @@ async def pvp_control(cb: CallbackQuery):
         await cb.answer("Game ended", show_alert=True); return
 
     uid = cb.from_user.id
-    if uid not in (m.get("x"), m.get("o")):
+    if uid not in (m.x, m.o):
         await cb.answer("Not your game", show_alert=True); return
 
     # Keep tournament flow strict.
-    if m.get("tmatch_id"):
+    if m.tmatch_id:
         await cb.answer("Unavailable in tournament match", show_alert=True); return
 
     async def _edit(chat_id: int, msg_id: int, text: str, kb):
@@ -2234,46 +2250,43 @@ async def pvp_control(cb: CallbackQuery):
         return
 
     if action == "new":
-        m["board"] = "........."
-        m["turn"] = "X"
-        m["status"] = "playing"
-        m["last_move"] = time.time()
+        m.restart()
         set_pvp_timer(match_id, cb)
         turn_txt = "❌ (X)"
         await _edit(
-            m.get("x_chat"),
-            m.get("x_msg"),
+            m.x_chat,
+            m.x_msg,
             f"🎮 PvP | {turn_txt}",
-            board_kb_pvp(match_id, m["board"], m.get("x_lang", "en"), highlight=set(), skin=get_skin(m["x"]), show_controls=True),
+            board_kb_pvp(match_id, m.board, m.x_lang, highlight=set(), skin=await get_skin(m.x), show_controls=True),
         )
         await _edit(
-            m.get("o_chat"),
-            m.get("o_msg"),
+            m.o_chat,
+            m.o_msg,
             f"🎮 PvP | {turn_txt}",
-            board_kb_pvp(match_id, m["board"], m.get("o_lang", "en"), highlight=set(), skin=get_skin(m["o"]), show_controls=True),
+            board_kb_pvp(match_id, m.board, m.o_lang, highlight=set(), skin=await get_skin(m.o), show_controls=True),
         )
         await cb.answer("New game!")
         return
 
     if action == "resign":
-        m["status"] = "ended"
+        m.status = "ended"
         cancel_pvp_timer(match_id)
-        x_id = int(m["x"])
-        o_id = int(m["o"])
+        x_id = int(m.x)
+        o_id = int(m.o)
         x_text = "You lose (resigned)." if uid == x_id else "You win (opponent resigned)."
         o_text = "You lose (resigned)." if uid == o_id else "You win (opponent resigned)."
-        board = str(m.get("board") or ".........")
+        board = m.board
         await _edit(
-            m.get("x_chat"),
-            m.get("x_msg"),
+            m.x_chat,
+            m.x_msg,
             x_text,
-            board_kb_pvp(match_id, board, m.get("x_lang", "en"), highlight=set(), skin=get_skin(x_id), show_controls=True),
+            board_kb_pvp(match_id, board, m.x_lang, highlight=set(), skin=await get_skin(x_id), show_controls=True),
         )
         await _edit(
-            m.get("o_chat"),
-            m.get("o_msg"),
+            m.o_chat,
+            m.o_msg,
             o_text,
-            board_kb_pvp(match_id, board, m.get("o_lang", "en"), highlight=set(), skin=get_skin(o_id), show_controls=True),
+            board_kb_pvp(match_id, board, m.o_lang, highlight=set(), skin=await get_skin(o_id), show_controls=True),
         )
         await cb.answer("Resigned.")
         return
@@ -2287,10 +2300,10 @@ async def ref_home(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
     bot_username = await _get_bot_username(cb.bot)
     link = f"https://t.me/{bot_username}?start=ref_{cb.from_user.id}" if bot_username else f"/start ref_{cb.from_user.id}"
-    st = get_ref_stats(cb.from_user.id)
+    st = await get_ref_stats(cb.from_user.id)
     text = (
         f"{t(lang,'ref_title')}\n\n"
         f"{t(lang,'ref_link')}\n<code>{link}</code>\n\n"
@@ -2312,16 +2325,9 @@ async def ref_top(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
     # Pull top 10 referrers from DB ordered by ref_count desc
-    con = __import__('app.db', fromlist=['_con'])._con()
-    try:
-        rows = con.execute(
-            "SELECT user_id, username, first_name, ref_count, ref_earned "
-            "FROM users WHERE ref_count > 0 ORDER BY ref_count DESC LIMIT 10"
-        ).fetchall()
-    finally:
-        con.close()
+    rows = await lb.ref_top(10)
 
     lines = ["🏆 <b>Топ рефоводів</b>\n"]
     medals = {1: "🥇", 2: "🥈", 3: "🥉"}
@@ -2349,8 +2355,8 @@ async def season_home(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
-    meta = get_season_meta()
+    lang = await ensure_user(cb)
+    meta = await get_season_meta()
     sid = int(meta["season_id"])
     start_ts = float(meta["season_start_ts"])
     end_ts = start_ts + 30 * 86400
@@ -2370,14 +2376,17 @@ async def season_top(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
     mode = cb.data.split(":")[-1]
-    rows = get_season_top100(mode=mode, limit=30)
+    rows = await lb.season_top(mode=mode, limit=30)
     title = "🏆 Overall" if mode=="overall" else ("❌⭕ XO" if mode=="xo" else "♟️ Checkers")
     lines=[f"{t(lang,'season_title')} — <b>{title}</b>\n"]
     for i,r in enumerate(rows, start=1):
         name = ("@"+r["username"]) if (r.get("username") or "").strip() else (r.get("first_name") or "Player")
         lines.append(f"{i:02d}. {name} — <b>{int(r['score'])}</b>")
+    my_rank = await lb.rank(cb.from_user.id, rank_board("season", mode))
+    if my_rank is not None:
+        lines.append(f"\nТвій ранг: <b>#{my_rank}</b>")
     kb = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="⬅️", callback_data="sm:season:home")]
     ])
@@ -2446,7 +2455,7 @@ def _tourn_dual_kb(
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
-def _tourn_text_block(lang: str, tinfo: dict | None, label: str) -> str:
+async def _tourn_text_block(lang: str, tinfo: dict | None, label: str) -> str:
     from app.config import DAILY_TOURNAMENT_HOUR, DAILY_TOURNAMENT_MINUTE, TOURN_PAYOUT_WINNER_PCT, TOURN_PAYOUT_RUNNER_PCT
     # ARENA_FEE_PCT is optional; default 10 if not present
     try:
@@ -2469,7 +2478,7 @@ def _tourn_text_block(lang: str, tinfo: dict | None, label: str) -> str:
 
     # participants
     try:
-        players = list_tournament_players(int(tinfo["id"]))
+        players = await list_tournament_players(int(tinfo["id"]))
         cnt = len(players)
     except Exception:
         cnt = 0
@@ -2497,10 +2506,10 @@ async def tourn_home(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
 
-    xo_t = get_active_tournament("xo")
-    ck_t = get_active_tournament("checkers")
+    xo_t = await get_active_tournament("xo")
+    ck_t = await get_active_tournament("checkers")
 
     is_admin_user = is_admin(cb.from_user.id)
 
@@ -2508,17 +2517,17 @@ async def tourn_home(cb: CallbackQuery):
     ck_joined = False
     try:
         if xo_t:
-            xo_joined = any(int(p["user_id"]) == int(cb.from_user.id) for p in list_tournament_players(int(xo_t["id"])))
+            xo_joined = any(int(p["user_id"]) == int(cb.from_user.id) for p in await list_tournament_players(int(xo_t["id"])))
         if ck_t:
-            ck_joined = any(int(p["user_id"]) == int(cb.from_user.id) for p in list_tournament_players(int(ck_t["id"])))
+            ck_joined = any(int(p["user_id"]) == int(cb.from_user.id) for p in await list_tournament_players(int(ck_t["id"])))
     except Exception:
         pass
 
     header = f"{t(lang,'tourn_title')}\n\n"
     body = []
-    body.append(_tourn_text_block(lang, xo_t, "❌⭕ XO"))
+    body.append(await _tourn_text_block(lang, xo_t, "❌⭕ XO"))
     body.append("")
-    body.append(_tourn_text_block(lang, ck_t, "♟️ Шашки"))
+    body.append(await _tourn_text_block(lang, ck_t, "♟️ Шашки"))
 
     text = header + "\n".join(body)
 
@@ -2531,11 +2540,11 @@ async def tourn_create(cb: CallbackQuery):
     if not is_admin(cb.from_user.id):
         await cb.answer("nope"); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
     parts = cb.data.split(":")
     # sm:tourn:create or sm:tourn:create:xo/checkers
-    g = parts[-1] if len(parts) >= 4 else get_active_game(cb.from_user.id)
-    tid = create_tournament(g, f"SM Arena Tournament #{int(time.time())%10000}", 8, cb.from_user.id, entry_fee=20)
+    g = parts[-1] if len(parts) >= 4 else await get_active_game(cb.from_user.id)
+    tid = await create_tournament(g, f"SM Arena Tournament #{int(time.time())%10000}", 8, cb.from_user.id, entry_fee=20)
     await cb.answer("OK")
     await tourn_home(cb)
 
@@ -2545,20 +2554,19 @@ async def tourn_join(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
     tid = int(cb.data.split(":")[-1])
 
-    ok = join_tournament(tid, cb.from_user.id)
+    ok = await join_tournament(tid, cb.from_user.id)
     if not ok:
         # explain most common reasons
-        from app.db import get_tournament_by_id
-        tinfo = get_tournament_by_id(tid)
+        from app.db_async import get_tournament_by_id
+        tinfo = await get_tournament_by_id(tid)
         if not tinfo or str(tinfo.get("status")) != "REG":
             await cb.answer("Реєстрація закрита ⛔", show_alert=True)
         else:
             fee = int(tinfo.get("entry_fee") or 0)
-            u = get_user(cb.from_user.id) or {}
-            bal = int(u.get("coins") or 0)
+            bal = await get_coins(cb.from_user.id)
             if bal < fee:
                 await cb.answer(f"Не вистачає монет: потрібно {fee}🪙", show_alert=True)
             else:
@@ -2573,9 +2581,9 @@ async def tourn_leave(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
     tid = int(cb.data.split(":")[-1])
-    ok = leave_tournament(tid, cb.from_user.id)
+    ok = await leave_tournament(tid, cb.from_user.id)
     await cb.answer("✅" if ok else "❌")
     await tourn_home(cb)
 
@@ -2585,9 +2593,9 @@ async def tourn_players(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang=ensure_user(cb)
+    lang=await ensure_user(cb)
     tid=int(cb.data.split(":")[-1])
-    pl=list_tournament_players(tid)
+    pl=await list_tournament_players(tid)
     lines=[f"{t(lang,'tourn_title')} — {t(lang,'tourn_players')}\n"]
     for i,p in enumerate(pl, start=1):
         name=("@"+p["username"]) if (p.get("username") or "").strip() else (p.get("first_name") or "Player")
@@ -2601,9 +2609,9 @@ async def tourn_bracket(cb: CallbackQuery):
     if not click_ok(cb.from_user.id):
         await cb.answer(); return
     init_db()
-    lang=ensure_user(cb)
+    lang=await ensure_user(cb)
     tid=int(cb.data.split(":")[-1])
-    txt=get_bracket_text(tid) or "—"
+    txt=await get_bracket_text(tid) or "—"
     kb=InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text="⬅️", callback_data="sm:tourn:home")]])
     await safe_edit_text(cb.message, txt, reply_markup=kb)
     await cb.answer()
@@ -2614,28 +2622,16 @@ class _BotWrap:
 
 async def _start_tourn_pvp(bot: Bot, a_id: int, b_id: int, tournament_id: int, tmatch_id: int):
     match_id=str(uuid.uuid4())[:8]
-    board="........."
+    board = EMPTY_BOARD
     # send messages
-    a_lang = db_get_lang(a_id) or "en"
-    b_lang = db_get_lang(b_id) or "en"
-    ma = await bot.send_message(a_id, f"🏆 {t(a_lang,'tourn_match_found')}", reply_markup=board_kb_pvp(match_id, board, a_lang, skin=get_skin(a_id), show_controls=False))
-    mb = await bot.send_message(b_id, f"🏆 {t(b_lang,'tourn_match_found')}", reply_markup=board_kb_pvp(match_id, board, b_lang, skin=get_skin(b_id), show_controls=False))
-    PVP_MATCHES[match_id]={
-        "board": board,
-        "x": a_id,
-        "o": b_id,
-        "turn":"X",
-        "status":"playing",
-        "last_move": time.time(),
-        "x_chat": a_id,
-        "o_chat": b_id,
-        "x_msg": ma.message_id,
-        "o_msg": mb.message_id,
-        "x_lang": a_lang,
-        "o_lang": b_lang,
-        "tournament_id": int(tournament_id),
-        "tmatch_id": int(tmatch_id),
-    }
+    a_lang = await db_get_lang(a_id) or "en"
+    b_lang = await db_get_lang(b_id) or "en"
+    ma = await bot.send_message(a_id, f"🏆 {t(a_lang,'tourn_match_found')}", reply_markup=board_kb_pvp(match_id, board, a_lang, skin=await get_skin(a_id), show_controls=False))
+    mb = await bot.send_message(b_id, f"🏆 {t(b_lang,'tourn_match_found')}", reply_markup=board_kb_pvp(match_id, board, b_lang, skin=await get_skin(b_id), show_controls=False))
+    PVP_MATCHES[match_id] = PvPMatch(
+        x=a_id, o=b_id, x_chat=a_id, o_chat=b_id, x_msg=ma.message_id, o_msg=mb.message_id,
+        x_lang=a_lang, o_lang=b_lang, tournament_id=int(tournament_id), tmatch_id=int(tmatch_id),
+    )
     set_pvp_timer(match_id, _BotWrap(bot))
 
 @router.callback_query(F.data.startswith("sm:tourn:start:"))
@@ -2643,18 +2639,18 @@ async def tourn_start(cb: CallbackQuery):
     if not is_admin(cb.from_user.id):
         await cb.answer("nope"); return
     init_db()
-    lang=ensure_user(cb)
+    lang=await ensure_user(cb)
     tid=int(cb.data.split(":")[-1])
-    matches=generate_bracket(tid)
+    matches=await generate_bracket(tid)
     if not matches:
         await cb.answer(t(lang,'tourn_need_players'))
         return
     await cb.answer("OK")
     # start all pending
-    pend=get_pending_matches(tid)
+    pend=await get_pending_matches(tid)
     for m in pend:
         a=int(m["a_id"]); b=int(m["b_id"])
-        mark_match_playing(int(m["id"]))
+        await mark_match_playing(int(m["id"]))
         await _start_tourn_pvp(cb.bot, a, b, tid, int(m["id"]))
     await cb.bot.send_message(cb.from_user.id, t(lang,'tourn_started'))
     await tourn_home(cb)
@@ -2665,9 +2661,9 @@ async def tourn_run_pending(cb: CallbackQuery):
         await cb.answer("nope"); return
     init_db()
     tid=int(cb.data.split(":")[-1])
-    pend=get_pending_matches(tid)
+    pend=await get_pending_matches(tid)
     for m in pend:
-        mark_match_playing(int(m["id"]))
+        await mark_match_playing(int(m["id"]))
         await _start_tourn_pvp(cb.bot, int(m["a_id"]), int(m["b_id"]), tid, int(m["id"]))
     await cb.answer("OK")
 
@@ -2677,7 +2673,7 @@ async def tourn_cancel(cb: CallbackQuery):
         await cb.answer("nope"); return
     init_db()
     tid=int(cb.data.split(":")[-1])
-    cancel_tournament(tid)
+    await cancel_tournament(tid)
     await cb.answer("OK")
     await tourn_home(cb)
 
@@ -2708,7 +2704,7 @@ def _arena_kb(lang: str, session=None) -> InlineKeyboardMarkup:
 async def arena_home(cb: CallbackQuery):
     if not click_ok(cb.from_user.id): await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
     s = arena_get_session(cb.from_user.id)
 
     if s and s.finished:
@@ -2718,12 +2714,12 @@ async def arena_home(cb: CallbackQuery):
         arena_end_session(cb.from_user.id)
         if reward_id.startswith("coins:"):
             amt = int(reward_id.split(":")[1])
-            add_coins(cb.from_user.id, amt)
+            await add_coins(cb.from_user.id, amt)
         elif reward_id.startswith("lootbox:"):
-            add_item(cb.from_user.id, reward_id)
+            await add_item(cb.from_user.id, reward_id)
         # bonus 200 coins for perfect 10-0
         if s and s.wins >= ARENA_MAX_WINS:
-            add_coins(cb.from_user.id, 200)
+            await add_coins(cb.from_user.id, 200)
         text = (
             f"⚔️ <b>Арена завершена!</b>\n\n"
             f"🏆 Перемог: <b>{s.wins if s else 0}/{ARENA_MAX_WINS}</b>\n"
@@ -2758,18 +2754,18 @@ async def arena_home(cb: CallbackQuery):
 async def arena_enter(cb: CallbackQuery):
     if not click_ok(cb.from_user.id): await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
     uid = cb.from_user.id
 
     if arena_get_session(uid):
         await cb.answer("⚔️ Ти вже в Арені!", show_alert=True)
         return
 
-    if not try_spend_coins(uid, ARENA_ENTRY_FEE):
+    if not await try_spend_coins(uid, ARENA_ENTRY_FEE):
         await cb.answer(f"Недостатньо монет! Потрібно {ARENA_ENTRY_FEE}🪙", show_alert=True)
         return
 
-    g = get_active_game(uid)
+    g = await get_active_game(uid)
     arena_start_session(uid, game=g)
     await cb.answer(f"⚔️ Ти увійшов в Арену! Удачі!")
     await arena_home(cb)
@@ -2779,7 +2775,7 @@ async def arena_enter(cb: CallbackQuery):
 async def arena_quit(cb: CallbackQuery):
     if not click_ok(cb.from_user.id): await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
     s = arena_get_session(cb.from_user.id)
     if s:
         # partial reward for early quit
@@ -2788,9 +2784,9 @@ async def arena_quit(cb: CallbackQuery):
         rid, rlabel = _get_reward(wins)
         arena_end_session(cb.from_user.id)
         if rid.startswith("coins:"):
-            add_coins(cb.from_user.id, int(rid.split(":")[1]))
+            await add_coins(cb.from_user.id, int(rid.split(":")[1]))
         elif rid.startswith("lootbox:"):
-            add_item(cb.from_user.id, rid)
+            await add_item(cb.from_user.id, rid)
         await cb.answer(f"Ти вийшов. Нагорода: {rlabel}")
     await arena_home(cb)
 
@@ -2800,13 +2796,14 @@ async def arena_play(cb: CallbackQuery):
     """Queue the arena player for a random match; hook result back."""
     if not click_ok(cb.from_user.id): await cb.answer(); return
     init_db()
-    lang = ensure_user(cb)
+    lang = await ensure_user(cb)
     s = arena_get_session(cb.from_user.id)
     if not s or s.finished:
         await arena_home(cb); return
 
     # Re-use random queue – player is tagged with arena session so game end can report
     uid = cb.from_user.id
+    rating, vip, rd = await get_rating(uid), await is_vip(uid), (await get_glicko(uid))["rd"]
     if is_in_queue(uid):
         await cb.answer("Вже в черзі ⏳"); return
 
@@ -2817,13 +2814,67 @@ async def arena_play(cb: CallbackQuery):
         "message_id": cb.message.message_id,
         "lang": lang,
         "ts": time.time(),
-        "rating": get_rating(uid),
-        "vip": is_vip(uid),
+        "rating": rating,
+        "rd": rd,
+        "vip": vip,
         "side": "x",
         "arena": True,   # flag so match result can be fed back
     }
     (WAIT_X_VIP if entry["vip"] else WAIT_X).append(entry)
+    live_state.touch("queue", uid)
     await safe_edit_text(cb.message, f"⚔️ Арена | Пошук суперника...", reply_markup=searching_kb(lang))
     await cb.answer()
-    WAIT_TASKS[uid] = asyncio.create_task(random_fallback_to_ai(cb, uid, entry["chat_id"], entry["message_id"], 30))
+    WAIT_TASKS[uid] = asyncio.create_task(random_fallback_to_ai(cb, uid, entry["chat_id"], entry["message_id"], fallback_sec(entry)))
+
 
+
+# ---------------- Crash-safe resume (app.live_state) ----------------
+# XO boards are already 9-char strings, so a snapshot is the match record's
+# fields as compact JSON. Finished games are not kept.
+def _json(obj) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+def _queues() -> dict:
+    return {"x_vip": WAIT_X_VIP, "o_vip": WAIT_O_VIP, "x": WAIT_X, "o": WAIT_O}
+
+def _queue_lookup(key: str):
+    uid = int(key)
+    for name, q in _queues().items():
+        for it in q:
+            if it["user_id"] == uid:
+                return name, it
+    return None
+
+def _pvp_restore(match_id: str, state: str, bot: Bot) -> None:
+    d = json.loads(state)
+    if isinstance(d.get("moves"), list):  # snapshot from the dict-based matches
+        d["moves"] = "".join(map(str, d["moves"]))
+    d.pop("tourn_techloss", None)
+    m = PvPMatch(**d)
+    m.last_move = time.time()  # the downtime does not count as inactivity
+    PVP_MATCHES[match_id] = m
+    set_pvp_timer(match_id, _BotWrap(bot))
+
+def _ai_restore(match_id: str, state: str, bot: Bot) -> None:
+    AI_MATCHES[match_id] = AIMatch(**json.loads(state))
+
+def _queue_restore(key: str, state: str, bot: Bot) -> None:
+    entry = json.loads(state)
+    _queues()[entry.pop("q")].append(entry)
+    uid = int(entry["user_id"])
+    left = max(0.0, fallback_sec(entry) - (time.time() - float(entry["ts"])))
+    WAIT_TASKS[uid] = asyncio.create_task(
+        random_fallback_to_ai(_BotWrap(bot), uid, entry["chat_id"], entry["message_id"], left)
+    )
+
+live_state.register(
+    "pvp", PVP_MATCHES.get,
+    lambda m: _json(as_state(m)) if m.status == "playing" else None,
+    _pvp_restore,
+)
+live_state.register(
+    "ai", AI_MATCHES.get,
+    lambda st: _json(as_state(st)) if st.status == "playing" and not check_winner(st.board) else None,
+    _ai_restore,
+)
+live_state.register("queue", _queue_lookup, lambda found: _json({"q": found[0], **found[1]}), _queue_restore)
@@ -1,19 +1,14 @@
 # app/history.py
 import json
-import sqlite3
-import os
-from pathlib import Path
 from datetime import datetime, timezone
 from typing import Optional
 
-# To cleanly separate concern, history uses the same or separate DB.
-_DIR = os.getenv("RAILWAY_VOLUME_MOUNT_PATH", str(Path(__file__).resolve().parent))
-DB_PATH = Path(_DIR) / "sm_arena.db"
+from app import db as _db
+from app.db_pool import get_pool
 
+# History lives in the main DB and shares its connection pool.
 def _con():
-    con = sqlite3.connect(DB_PATH)
-    con.execute("PRAGMA journal_mode=WAL;")
-    return con
+    return get_pool(_db.DB_PATH).acquire()
 
 def init_history():
     con = _con()
@@ -0,0 +1,399 @@
+# app/leaderboard_cache.py
+"""In-memory leaderboards served without a SQLite round-trip per button press.
+
+Each board (global / season / weekly per game, referrers, tournament points)
+keeps the top CAPACITY entries as a sorted list of keys, so pages are slices
+and a user's rank is a bisect. app.db reports writes that can move users
+(set_rating, bump_weekly, set_season_rating, record_game_result,
+_tourn_points_add, referrals, names) through add_board_listener; the touched
+users are re-read in one query the next time a board of that family is read.
+Weekly/season resets invalidate the whole family, and every board is rebuilt
+after TTL_SEC as a safety net.
+
+    from app import leaderboard_cache as lb
+    rows, has_more = await lb.page("xo", offset=20, limit=20)
+    my_rank = await lb.rank(uid, "weekly_xo")
+
+Board names match db.rank_board(); the helpers top100(), season_top(),
+weekly_top(), top_weekly(), ref_top() and tourn_top() return the same shapes
+as their app.db counterparts.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from typing import Callable
+
+from app import db as _db
+from app import db_async
+
+TTL_SEC = 300.0
+CAPACITY = 1000  # entries kept per board; deeper pages / ranks fall back to SQLite
+_IN_CHUNK = 500
+
+# One flat row per user: profile, referrals and rating_<game> / season_rating_<game> /
+# week_wins_<game> / week_games_<game> for every board game (user_game_stats rows).
+_BOARD_GAMES = ("overall",) + _db.GAMES
+_STAT_COLS = ("rating", "season_rating", "week_wins", "week_games")
+
+
+def _stat_default(col: str, game: str) -> int:
+    d = _db.GAME_STATS_DEFAULTS[col]
+    return d * len(_db.OVERALL_GAMES) if game == "overall" else d
+
+
+def _stat_col(col: str, game: str) -> str:
+    # values of an earlier week / season read as the current ones (db._week_col, db._season_col)
+    a = f"g_{game}."
+    src = (_db._week_col(col, a) if col in _db._WEEK_COLUMNS
+           else _db._season_col(col, a) if col in _db._SEASON_COLUMNS else a + col)
+    return f"COALESCE({src}, {_stat_default(col, game)}) AS {col}_{game}"
+
+
+# season_live_<game>: the row belongs to the current season (is on the season board)
+_USER_COLS = "p.user_id, p.username, p.first_name, m.ref_count, m.ref_earned, " + ", ".join(
+    [_stat_col(c, g) for g in _BOARD_GAMES for c in _STAT_COLS]
+    + [f"COALESCE(g_{g}.season_id={_db._CUR_SEASON}, 0) AS season_live_{g}" for g in _BOARD_GAMES]
+)
+# joined onto "p" (user_profile); the board's driving table comes first so its
+# ORDER BY walks an index
+_USER_JOINS = "JOIN user_marketing m ON m.user_id=p.user_id " + " ".join(
+    f"LEFT JOIN user_game_stats g_{g} ON g_{g}.user_id=p.user_id AND g_{g}.game='{g}'" for g in _BOARD_GAMES
+)
+_TOURN_COLS = "tr.user_id, tr.game, tr.points, tr.updated_ts, u.username, u.first_name"
+
+
+@dataclass(frozen=True)
+class _Spec:
+    family: str  # "users" | "tourn"
+    sql: str  # rebuild query; the ORDER BY must match key()
+    params: tuple
+    where: Callable[[dict], bool]
+    key: Callable[[dict], tuple]  # ascending sort key, last element is user_id
+    out: Callable[[dict], object]
+
+
+def _name(r: dict) -> dict:
+    return {"user_id": int(r["user_id"]), "username": r["username"] or "", "first_name": r["first_name"] or ""}
+
+
+def _score_spec(col: str, game: str) -> _Spec:
+    score, live = f"{col}_{game}", f"season_live_{game}"
+    season = col == "season_rating"
+    return _Spec(
+        family="users",
+        sql=(
+            f"SELECT {_USER_COLS} FROM user_game_stats d JOIN user_profile p ON p.user_id=d.user_id {_USER_JOINS} "
+            f"WHERE d.game='{game}' {f'AND d.season_id={_db._CUR_SEASON} ' if season else ''}"
+            f"ORDER BY d.{col} DESC, d.user_id ASC LIMIT ?"
+        ),
+        params=(),
+        where=(lambda r: bool(r[live])) if season else (lambda r: True),
+        key=lambda r: (-int(r[score]), int(r["user_id"])),
+        out=lambda r: {**_name(r), "score": int(r[score]),
+                       "rating_xo": int(r[f"{col}_xo"]), "rating_ck": int(r[f"{col}_checkers"])},
+    )
+
+
+def _weekly_spec(game: str) -> _Spec:
+    ww, wg, rt = f"week_wins_{game}", f"week_games_{game}", f"rating_{game}"
+    return _Spec(
+        family="users",
+        sql=(
+            f"SELECT {_USER_COLS} FROM user_game_stats d JOIN user_profile p ON p.user_id=d.user_id {_USER_JOINS} "
+            f"WHERE d.game='{game}' AND d.week_epoch={_db._CUR_WEEK} AND d.week_games > 0 "
+            "ORDER BY d.week_wins DESC, d.rating DESC, d.week_games ASC, d.user_id ASC LIMIT ?"
+        ),
+        params=(),
+        where=lambda r: int(r[wg]) > 0,
+        key=lambda r: (-int(r[ww]), -int(r[rt]), int(r[wg]), int(r["user_id"])),
+        out=lambda r: {**_name(r), "week_wins": int(r[ww]), "week_games": int(r[wg]), "rating": int(r[rt])},
+    )
+
+
+def _tourn_spec(game: str) -> _Spec:
+    return _Spec(
+        family="tourn",
+        sql=(
+            f"SELECT {_TOURN_COLS} FROM tournament_rating tr LEFT JOIN user_profile u ON u.user_id=tr.user_id "
+            "WHERE tr.game=? ORDER BY tr.points DESC, tr.updated_ts DESC, tr.user_id ASC LIMIT ?"
+        ),
+        params=(game,),
+        where=lambda r: r["game"] == game,
+        key=lambda r: (-int(r["points"]), -float(r["updated_ts"]), int(r["user_id"])),
+        out=lambda r: {"user_id": int(r["user_id"]), "points": int(r["points"]),
+                       "username": r["username"], "first_name": r["first_name"]},
+    )
+
+
+_SPECS: dict[str, _Spec] = {
+    **{g: _score_spec("rating", g) for g in _BOARD_GAMES},
+    **{f"season_{g}": _score_spec("season_rating", g) for g in _BOARD_GAMES},
+    **{f"weekly_{g}": _weekly_spec(g) for g in _db.GAMES},
+    "ref": _Spec(
+        family="users",
+        sql=(
+            f"SELECT {_USER_COLS} FROM user_marketing d JOIN user_profile p ON p.user_id=d.user_id {_USER_JOINS} "
+            "WHERE d.ref_count > 0 ORDER BY d.ref_count DESC, d.user_id ASC LIMIT ?"
+        ),
+        params=(),
+        where=lambda r: int(r["ref_count"]) > 0,
+        key=lambda r: (-int(r["ref_count"]), int(r["user_id"])),
+        out=lambda r: (int(r["user_id"]), r["username"], r["first_name"], int(r["ref_count"]), int(r["ref_earned"])),
+    ),
+    "tourn_xo": _tourn_spec("xo"),
+    "tourn_checkers": _tourn_spec("checkers"),
+    "tourn_overall": _tourn_spec("overall"),
+}
+
+
+class _Board:
+    __slots__ = ("spec", "keys", "key_of", "rows", "complete", "built_ts", "gen")
+
+    def __init__(self, spec: _Spec):
+        self.spec = spec
+        self.keys: list[tuple] = []
+        self.key_of: dict[int, tuple] = {}
+        self.rows: dict[int, dict] = {}
+        self.complete = False
+        self.built_ts = 0.0
+        self.gen = -1
+
+    def remove(self, uid: int) -> None:
+        k = self.key_of.pop(uid, None)
+        if k is not None:
+            del self.keys[bisect_left(self.keys, k)]
+            del self.rows[uid]
+
+    def apply(self, uid: int, row: dict | None) -> None:
+        """Re-place uid after a write. The board stays an exact top-N prefix."""
+        self.remove(uid)
+        if row is None or not self.spec.where(row):
+            return
+        k = self.spec.key(row)
+        # Outside a partial prefix the user's position is unknown: leave them out.
+        if not self.complete and (not self.keys or k > self.keys[-1]):
+            return
+        insort(self.keys, k)
+        self.key_of[uid] = k
+        self.rows[uid] = row
+        if len(self.keys) > CAPACITY:
+            last = self.keys.pop()
+            del self.key_of[last[-1]], self.rows[last[-1]]
+            self.complete = False
+
+
+_LOCK = threading.Lock()
+_BOARDS: dict[str, _Board] = {name: _Board(spec) for name, spec in _SPECS.items()}
+_DIRTY: dict[str, set[int]] = {"users": set(), "tourn": set()}
+_GEN: dict[str, int] = {"users": 0, "tourn": 0}
+
+# counters for /dbstats
+stats = {"hits": 0, "misses": 0, "rebuilds": 0, "refreshes": 0, "refreshed_users": 0}
+
+
+def _on_change(family: str, user_ids: list[int] | None) -> None:
+    with _LOCK:
+        if user_ids is None:
+            _GEN[family] += 1
+        else:
+            _DIRTY[family].update(user_ids)
+
+
+_db.add_board_listener(_on_change)
+
+
+def invalidate() -> None:
+    """Force every board to rebuild on its next read."""
+    with _LOCK:
+        for family in _GEN:
+            _GEN[family] += 1
+
+
+def _ready(board: _Board, need: int) -> bool:
+    return (
+        board.gen == _GEN[board.spec.family]
+        and time.time() - board.built_ts < TTL_SEC
+        and not _DIRTY[board.spec.family]
+        and (board.complete or len(board.keys) >= need)
+    )
+
+
+# ---- slow path (DB thread) ----
+def _rebuild(name: str) -> None:
+    board = _BOARDS[name]
+    spec = board.spec
+    with _LOCK:
+        gen = _GEN[spec.family]
+    con = _db._con()
+    try:
+        rows = [dict(r) for r in con.execute(spec.sql, spec.params + (CAPACITY + 1,))]
+    finally:
+        con.close()
+    keyed = sorted((spec.key(r), r) for r in rows[:CAPACITY])
+    with _LOCK:
+        board.keys = [k for k, _ in keyed]
+        board.key_of = {k[-1]: k for k in board.keys}
+        board.rows = {k[-1]: r for k, r in keyed}
+        board.complete = len(rows) <= CAPACITY
+        board.built_ts = time.time()
+        board.gen = gen
+        stats["rebuilds"] += 1
+
+
+def _fetch_family(family: str, ids: list[int]) -> dict[int, list[dict]]:
+    found: dict[int, list[dict]] = {}
+    con = _db._con()
+    try:
+        for i in range(0, len(ids), _IN_CHUNK):
+            chunk = ids[i:i + _IN_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            if family == "users":
+                sql = f"SELECT {_USER_COLS} FROM user_profile p {_USER_JOINS} WHERE p.user_id IN ({marks})"
+            else:
+                sql = (f"SELECT {_TOURN_COLS} FROM tournament_rating tr LEFT JOIN user_profile u ON u.user_id=tr.user_id "
+                       f"WHERE tr.user_id IN ({marks})")
+            for r in con.execute(sql, chunk):
+                found.setdefault(int(r["user_id"]), []).append(dict(r))
+    finally:
+        con.close()
+    return found
+
+
+def _refresh(family: str) -> None:
+    with _LOCK:
+        ids = sorted(_DIRTY[family])
+        _DIRTY[family] = set()
+    if not ids:
+        return
+    found = _fetch_family(family, ids)
+    with _LOCK:
+        for board in _BOARDS.values():
+            if board.spec.family != family or board.gen < 0:
+                continue
+            for uid in ids:
+                row = next((r for r in found.get(uid, ()) if board.spec.where(r)), None)
+                board.apply(uid, row)
+        stats["refreshes"] += 1
+        stats["refreshed_users"] += len(ids)
+
+
+def _ensure(name: str, need: int) -> None:
+    board = _BOARDS[name]
+    family = board.spec.family
+    with _LOCK:
+        expired = board.gen != _GEN[family] or time.time() - board.built_ts >= TTL_SEC
+    if expired:
+        _rebuild(name)
+    if _DIRTY[family]:
+        _refresh(family)
+    with _LOCK:
+        short = not board.complete and len(board.keys) < need
+    if short:
+        _rebuild(name)
+
+
+def _slice(name: str, offset: int, limit: int) -> tuple[list, bool]:
+    board = _BOARDS[name]
+    end = offset + limit
+    out = [board.spec.out(board.rows[k[-1]]) for k in board.keys[offset:end]]
+    return out, end < len(board.keys) or not board.complete
+
+
+def _page_sync(name: str, offset: int, limit: int) -> tuple[list, bool]:
+    _ensure(name, offset + limit)
+    with _LOCK:
+        return _slice(name, offset, limit)
+
+
+def _rank_sync(name: str, user_id: int) -> int | None:
+    _ensure(name, 1)
+    with _LOCK:
+        board = _BOARDS[name]
+        k = board.key_of.get(int(user_id))
+        if k is not None:
+            return bisect_left(board.keys, k) + 1
+        if board.complete:
+            return None
+    # below the cached prefix: indexed COUNT(*) (referrer / tournament boards have none)
+    return _db.get_rank(user_id, name) if name in _db._RANK_BOARDS else None
+
+
+# ---- public API (async; served inline when the board is fresh) ----
+def _check(name: str, offset: int = 0, limit: int = 1) -> None:
+    if name not in _BOARDS:
+        raise ValueError(f"unknown leaderboard: {name!r}")
+    if offset + limit > CAPACITY:
+        raise ValueError(f"leaderboard pages end at {CAPACITY}")
+
+
+async def page(name: str, offset: int = 0, limit: int = 20) -> tuple[list, bool]:
+    """(rows, has_more) for board name, rows offset..offset+limit."""
+    offset, limit = max(0, int(offset)), max(1, int(limit))
+    _check(name, offset, limit)
+    with _LOCK:
+        if _ready(_BOARDS[name], offset + limit):
+            stats["hits"] += 1
+            return _slice(name, offset, limit)
+    stats["misses"] += 1
+    return await db_async.run(_page_sync, name, offset, limit)
+
+
+async def rank(user_id: int, name: str) -> int | None:
+    """1-based rank of user_id on board name (see db.get_rank), None if not on it."""
+    _check(name)
+    with _LOCK:
+        board = _BOARDS[name]
+        if _ready(board, 1):
+            k = board.key_of.get(int(user_id))
+            if k is not None:
+                stats["hits"] += 1
+                return bisect_left(board.keys, k) + 1
+            if board.complete:
+                stats["hits"] += 1
+                return None
+    stats["misses"] += 1
+    return await db_async.run(_rank_sync, name, user_id)
+
+
+async def top100(mode: str = "overall", limit: int = 100, offset: int = 0) -> list[dict]:
+    rows, _ = await page(_db.rank_board("top", mode), offset, limit)
+    return rows
+
+
+async def season_top(mode: str = "overall", limit: int = 100) -> list[dict]:
+    rows, _ = await page(_db.rank_board("season", mode), 0, limit)
+    return rows
+
+
+async def weekly_top(limit: int = 10, game: str = "xo") -> list[dict]:
+    rows, _ = await page(_db.rank_board("weekly", game), 0, limit)
+    return rows
+
+
+async def top_weekly(game: str = "xo", limit: int = 3) -> list[dict]:
+    """Like db.get_top_weekly: weekly leaders with at least one win."""
+    rows = await weekly_top(limit, game)
+    return [{"user_id": r["user_id"], "first_name": r["first_name"], "wins": r["week_wins"]}
+            for r in rows if r["week_wins"] > 0]
+
+
+async def ref_top(limit: int = 10) -> list[tuple]:
+    rows, _ = await page("ref", 0, limit)
+    return rows
+
+
+async def tourn_top(game: str = "overall", limit: int = 100, offset: int = 0) -> list[dict]:
+    g = game if game in ("xo", "checkers", "overall") else "overall"
+    rows, _ = await page("tourn_" + g, offset, limit)
+    return rows
+
+
+def cache_stats() -> dict:
+    with _LOCK:
+        sizes = {name: len(b.keys) for name, b in _BOARDS.items() if b.gen >= 0}
+        pending = sum(len(s) for s in _DIRTY.values())
+    total = stats["hits"] + stats["misses"]
+    return {**stats, "hit_rate": (stats["hits"] / total) if total else 0.0, "boards": sizes, "pending": pending}
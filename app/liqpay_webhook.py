@@ -12,9 +12,9 @@ from fastapi.responses import HTMLResponse, PlainTextResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 
 from app import config
-from app.db import (
+from app.db_async import (
     add_coins, add_vip_days, get_lang, get_order, mark_order_paid,
-    get_user, get_coins, has_item, try_spend_coins, add_item
+    get_user_fields, get_rating, get_coins, has_item, try_spend_coins, add_item
 )
 from app.i18n import t
 from app.liqpay_utils import b64decode_json, b64encode_json, liqpay_signature, verify_callback
@@ -62,17 +62,17 @@ def create_app(bot=None) -> FastAPI:
         if not tg_user:
             raise HTTPException(status_code=401, detail="Invalid session")
         uid = int(tg_user.get("id", 0))
-        u = get_user(uid) or {}
-        from app.db import is_vip
+        u = await get_user_fields(uid, "username", "first_name", "coins", "bp_level") or {}
+        from app.db_async import is_vip
         return {
             "user_id": uid,
             "username": u.get("username", ""),
             "first_name": u.get("first_name", ""),
             "coins": int(u.get("coins", 0) or 0),
-            "rating_xo": int(u.get("rating", 1000) or 1000),
-            "rating_ck": int(u.get("rating_ck", 1000) or 1000),
+            "rating_xo": await get_rating(uid, "xo"),
+            "rating_ck": await get_rating(uid, "checkers"),
             "bp_level": int(u.get("bp_level", 1) or 1),
-            "is_vip": is_vip(uid),
+            "is_vip": await is_vip(uid),
         }
 
     @app.get("/api/shop")
@@ -92,9 +92,9 @@ def create_app(bot=None) -> FastAPI:
                 "price": it.get("price", 0),
                 "kind": it.get("kind", "skin"),
                 "game": it.get("game", "xo"),
-                "owned": has_item(uid, it["item_id"]),
+                "owned": await has_item(uid, it["item_id"]),
             })
-        return {"coins": get_coins(uid), "items": items}
+        return {"coins": await get_coins(uid), "items": items}
 
     @app.post("/api/buy")
     async def api_buy(request: Request, x_init_data: str = Header(None)):
@@ -108,14 +108,14 @@ def create_app(bot=None) -> FastAPI:
         it = get_item(item_id)
         if not it:
             raise HTTPException(status_code=400, detail="Unknown item")
-        if has_item(uid, item_id):
+        if await has_item(uid, item_id):
             return {"ok": False, "error": "already_owned"}
         
-        if not try_spend_coins(uid, int(it.get("price", 0) or 0)):
+        if not await try_spend_coins(uid, int(it.get("price", 0) or 0)):
             return {"ok": False, "error": "not_enough_coins"}
         
-        add_item(uid, item_id)
-        return {"ok": True, "coins": get_coins(uid)}
+        await add_item(uid, item_id)
+        return {"ok": True, "coins": await get_coins(uid)}
 
     # --- LiqPay Webhook Endpoints ---
     @app.get("/healthz")
@@ -124,7 +124,7 @@ def create_app(bot=None) -> FastAPI:
 
     @app.get("/pay/{order_id}", response_class=HTMLResponse)
     async def pay_page(order_id: str):
-        row = get_order(order_id)
+        row = await get_order(order_id)
         if not row: return HTMLResponse("Order not found", status_code=404)
         if str(row["status"]) != "NEW": return HTMLResponse("Processed", status_code=400)
         
@@ -159,17 +159,17 @@ def create_app(bot=None) -> FastAPI:
             order_id = payload.get("order_id")
             if payload.get("status") not in ("success", "sandbox"): return PlainTextResponse("ok")
             
-            if mark_order_paid(str(order_id)):
-                row = get_order(str(order_id))
+            if await mark_order_paid(str(order_id)):
+                row = await get_order(str(order_id))
                 uid, sku = int(row["user_id"]), str(row["sku"])
                 if sku.startswith("coins_"):
-                    add_coins(uid, int(config.LIQPAY_COIN_PACKS.get(sku, (0,0))[0]))
+                    await add_coins(uid, int(config.LIQPAY_COIN_PACKS.get(sku, (0,0))[0]))
                 elif sku == config.LIQPAY_VIP_SKU:
-                    add_vip_days(uid, int(config.LIQPAY_VIP_DAYS))
+                    await add_vip_days(uid, int(config.LIQPAY_VIP_DAYS))
                 
                 bot = app.state.bot
                 if bot:
-                    lang = get_lang(uid) or "en"
+                    lang = await get_lang(uid) or "en"
                     t_key = "pay_success_coins" if sku.startswith("coins_") else "pay_success_vip"
                     await bot.send_message(uid, t(lang, t_key).format(days=config.LIQPAY_VIP_DAYS))
             return PlainTextResponse("ok")
@@ -0,0 +1,176 @@
+# app/live_state.py
+"""Write-behind persistence of the in-memory games.
+
+Live matches, matchmaking queues and arena runs are process dicts
+(handlers_menu, checkers_game.storage, chess_game.storage, arena_mode). Each
+owner registers a kind here with three hooks and calls touch(kind, key)
+whenever it changes an entry:
+
+- lookup(key) -> the live object, or None once it is gone;
+- encode(obj) -> a compact string snapshot, or None when the entry should no
+  longer be kept (finished game, empty slot);
+- restore(key, state, bot) -> puts a snapshot back and re-arms its timers.
+
+touch() only marks the entry dirty, so a move costs a set insert. Once per
+tick the flush task encodes the dirty entries on the loop thread (the state
+it sees is consistent) and writes the batch to live_matches in one
+transaction on the DB thread. A crash loses at most one tick of moves.
+rehydrate() runs once on start, before polling.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Callable, NamedTuple
+
+from app import db, db_async
+
+log = logging.getLogger("sm-arena")
+
+
+class _Kind(NamedTuple):
+    lookup: Callable
+    encode: Callable
+    restore: Callable
+
+
+_KINDS: dict[str, _Kind] = {}
+_DIRTY: set[tuple[str, str]] = set()
+
+_stats = {
+    "touches": 0,
+    "flushes": 0,
+    "upserts": 0,
+    "deletes": 0,
+    "max_batch": 0,
+    "flush_ms": 0.0,
+    "errors": 0,
+    "restored": 0,
+}
+_task: asyncio.Task | None = None
+
+
+def register(kind: str, lookup: Callable, encode: Callable, restore: Callable) -> None:
+    _KINDS[kind] = _Kind(lookup, encode, restore)
+
+
+def touch(kind: str, key) -> None:
+    """Mark one live entry changed; it is snapshotted on the next tick."""
+    _DIRTY.add((kind, str(key)))
+    _stats["touches"] += 1
+
+
+def collect() -> tuple[list, list]:
+    """Encode and clear the dirty entries: (upserts, deletes) for db.save_live_matches()."""
+    if not _DIRTY:
+        return [], []
+    dirty = list(_DIRTY)
+    _DIRTY.clear()
+    now = time.time()
+    upserts, deletes = [], []
+    for kind, key in dirty:
+        hooks = _KINDS.get(kind)
+        state = None
+        if hooks is not None:
+            try:
+                obj = hooks.lookup(key)
+                state = hooks.encode(obj) if obj is not None else None
+            except Exception:
+                _stats["errors"] += 1
+                log.exception("live_state: cannot encode %s %s", kind, key)
+                continue
+        if state is None:
+            deletes.append((kind, key))
+        else:
+            upserts.append((kind, key, state, now))
+    return upserts, deletes
+
+
+def _written(upserts: list, deletes: list, sec: float) -> None:
+    _stats["flushes"] += 1
+    _stats["upserts"] += len(upserts)
+    _stats["deletes"] += len(deletes)
+    _stats["max_batch"] = max(_stats["max_batch"], len(upserts) + len(deletes))
+    _stats["flush_ms"] += sec * 1000
+
+
+async def flush() -> int:
+    """Write the dirty entries now; returns the rows written. A failed write is retried next tick."""
+    upserts, deletes = collect()
+    if not upserts and not deletes:
+        return 0
+    t0 = time.perf_counter()
+    try:
+        await db_async.save_live_matches(upserts, deletes)
+    except Exception:
+        _DIRTY.update((kind, key) for kind, key, *_ in upserts)
+        _DIRTY.update(deletes)
+        raise
+    _written(upserts, deletes, time.perf_counter() - t0)
+    return len(upserts) + len(deletes)
+
+
+def flush_sync() -> int:
+    """flush() for shutdown, when the DB thread may already be gone."""
+    upserts, deletes = collect()
+    if upserts or deletes:
+        t0 = time.perf_counter()
+        db.save_live_matches(upserts, deletes)
+        _written(upserts, deletes, time.perf_counter() - t0)
+    return len(upserts) + len(deletes)
+
+
+async def _flush_loop(tick: float) -> None:
+    while True:
+        await asyncio.sleep(tick)
+        try:
+            await flush()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            _stats["errors"] += 1
+            log.exception("live_state: flush failed; retrying next tick")
+
+
+async def rehydrate(bot) -> int:
+    """Hand every stored snapshot back to its owner; returns the entries restored.
+
+    Snapshots that cannot be restored (unknown kind, bad state) are dropped
+    from the table on the next tick.
+    """
+    restored = 0
+    for kind, key, state in await db_async.load_live_matches():
+        hooks = _KINDS.get(kind)
+        try:
+            if hooks is None:
+                raise KeyError(kind)
+            hooks.restore(key, state, bot)
+            restored += 1
+        except Exception:
+            _stats["errors"] += 1
+            log.exception("live_state: dropping %s %s", kind, key)
+            _DIRTY.add((kind, key))
+    _stats["restored"] += restored
+    return restored
+
+
+def start(tick: float = 0.5) -> asyncio.Task:
+    global _task
+    if _task is None or _task.done():
+        _task = asyncio.create_task(_flush_loop(tick))
+    return _task
+
+
+def stop() -> None:
+    """Cancel the flush task and write what is still dirty."""
+    global _task
+    if _task is not None:
+        _task.cancel()
+        _task = None
+    flush_sync()
+
+
+def stats() -> dict:
+    n = _stats["flushes"]
+    return {**_stats, "dirty": len(_DIRTY), "avg_flush_ms": (_stats["flush_ms"] / n) if n else 0.0}
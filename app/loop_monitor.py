@@ -0,0 +1,83 @@
+# app/loop_monitor.py
+"""Event-loop lag probe.
+
+A background task sleeps for INTERVAL_SEC and measures how late it wakes up;
+anything above a few milliseconds is time the loop spent running blocking code
+(sync sqlite, heavy AI search) instead of serving updates.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+log = logging.getLogger("sm-arena")
+
+INTERVAL_SEC = 0.25
+WARN_LAG_SEC = 0.2
+_BUCKETS_MS = (5, 20, 50, 100, 250, 1000)
+
+_stats = {
+    "samples": 0,
+    "last_ms": 0.0,
+    "max_ms": 0.0,
+    "total_ms": 0.0,
+    "hist": [0] * (len(_BUCKETS_MS) + 1),
+}
+_task: asyncio.Task | None = None
+
+
+def _record(lag: float) -> None:
+    ms = lag * 1000
+    _stats["samples"] += 1
+    _stats["last_ms"] = ms
+    _stats["total_ms"] += ms
+    if ms > _stats["max_ms"]:
+        _stats["max_ms"] = ms
+    hist = _stats["hist"]
+    for i, edge in enumerate(_BUCKETS_MS):
+        if ms < edge:
+            hist[i] += 1
+            break
+    else:
+        hist[-1] += 1
+
+
+async def _probe() -> None:
+    while True:
+        t0 = time.perf_counter()
+        await asyncio.sleep(INTERVAL_SEC)
+        lag = max(0.0, time.perf_counter() - t0 - INTERVAL_SEC)
+        _record(lag)
+        if lag >= WARN_LAG_SEC:
+            log.warning("Event loop lag %.0f ms", lag * 1000)
+
+
+def start() -> asyncio.Task:
+    global _task
+    if _task is None or _task.done():
+        _task = asyncio.create_task(_probe())
+    return _task
+
+
+def stop() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        _task = None
+
+
+def stats() -> dict:
+    n = _stats["samples"]
+    labels = [f"<{b}ms" for b in _BUCKETS_MS] + [f">={_BUCKETS_MS[-1]}ms"]
+    return {
+        "samples": n,
+        "last_ms": _stats["last_ms"],
+        "avg_ms": (_stats["total_ms"] / n) if n else 0.0,
+        "max_ms": _stats["max_ms"],
+        "hist": dict(zip(labels, _stats["hist"])),
+    }
+
+
+def reset() -> None:
+    _stats.update(samples=0, last_ms=0.0, max_ms=0.0, total_ms=0.0, hist=[0] * (len(_BUCKETS_MS) + 1))
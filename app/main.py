@@ -12,8 +12,10 @@ from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 from aiogram.types import ErrorEvent
 
-from app import config
+from app import ai_pool, config, db, db_async, live_state, loop_monitor, registry
+from app.db import init_db
 from app.logging_setup import setup_logging
+from app.middlewares import UserSnapshotMiddleware
 
 # Routers
 from app.handlers_menu import router as menu_router, set_tma_url
@@ -77,12 +79,62 @@ async def _polling_loop(dp: Dispatcher, bot: Bot, log: logging.Logger) -> None:
             await asyncio.sleep(5)
 
 
+async def _week_rollover_loop(log: logging.Logger) -> None:
+    """Close finished weeks off the request path (db.reset_week_if_needed is idempotent)."""
+    while True:
+        try:
+            if await db_async.reset_week_if_needed(week_len_days=config.WEEK_LENGTH_DAYS, top_n=config.TOP_N):
+                log.info("Week closed: weekly tops archived, counters rolled over")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.exception("Weekly rollover failed; retrying in 60s")
+        await asyncio.sleep(60)
+
+
+async def _season_settle_loop(log: logging.Logger) -> None:
+    """Store the closed season's soft reset for every player in small batches (db.settle_season_rollover)."""
+    while True:
+        try:
+            settled = 0
+            while n := await db_async.settle_season_rollover():
+                settled += n
+                await asyncio.sleep(0.05)  # let queued DB calls through between batches
+            if settled:
+                log.info("Season rollover stored for %d players", settled)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.exception("Season settle failed; retrying in 30s")
+        await asyncio.sleep(30)
+
+
+async def _rating_period_loop(log: logging.Logger) -> None:
+    """Rate each finished rating period in one batch (db.run_rating_period is idempotent)."""
+    while True:
+        try:
+            # seconds of CPU once a period: its own thread, not the shared DB thread
+            res = await asyncio.to_thread(
+                db.run_rating_period, config.RATING_PERIOD_HOURS, backend=config.RATING_PERIOD_BACKEND
+            )
+            if res:
+                log.info("Rating period %(period)s closed: %(games)s games, %(players)s players in %(total_sec).2fs", res)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.exception("Rating period failed; retrying in 300s")
+        await asyncio.sleep(300)
+
+
 async def main() -> None:
     _load_env()
     setup_logging()
     log = logging.getLogger("sm-arena")
     log.info("Starting SM Arena bot (Integrated Mode)")
-    
+
+    # Schema migrations run once here; db helpers only check a flag afterwards.
+    init_db()
+
     # Set TMA URL for keyboards
     tma_url = (config.WEBHOOK_BASE_URL or "").rstrip("/") + "/"
     set_tma_url(tma_url)
@@ -93,6 +145,8 @@ async def main() -> None:
     )
 
     dp = Dispatcher()
+    # One users-row fetch per update, shared by the db getters (app.user_snapshot).
+    dp.update.outer_middleware(UserSnapshotMiddleware())
 
     @dp.error()
     async def on_dispatch_error(event: ErrorEvent):
@@ -107,12 +161,24 @@ async def main() -> None:
     dp.include_router(admin_router)
     dp.include_router(admin_stats_router)
 
+    # Live games from before the restart (app.live_state), before any update is handled.
+    restored = await live_state.rehydrate(bot)
+    if restored:
+        log.info("Restored %s live games and queue entries", restored)
+
     # background tasks
+    loop_monitor.start()
+    live_state.start(config.LIVE_STATE_FLUSH_SEC)
+    registry.start(config.REGISTRY_SWEEP_SEC)
+    ai_pool.start(config.AI_POOL_WORKERS)
     polling_task = asyncio.create_task(_polling_loop(dp, bot, log))
     asyncio.create_task(daily_tournament_loop(bot))
     asyncio.create_task(tournament_registrar_loop(bot))
     asyncio.create_task(vip_bonus_loop(bot))
     asyncio.create_task(push_loop(bot))
+    asyncio.create_task(_week_rollover_loop(log))
+    asyncio.create_task(_season_settle_loop(log))
+    asyncio.create_task(_rating_period_loop(log))
     asyncio.create_task(start_marketing_engine(bot))
 
     # Set bot description/info
@@ -129,6 +195,9 @@ async def main() -> None:
         polling_task.cancel()
         with suppress(asyncio.CancelledError):
             await polling_task
+        live_state.stop()
+        ai_pool.stop()
+        db_async.shutdown()
 
 
 if __name__ == "__main__":
@@ -4,7 +4,7 @@ import asyncio
 import time
 import logging
 from aiogram import Bot
-from app.db import get_marketing_candidates, set_last_promo_msg_ts, get_coins
+from app.db_async import get_marketing_candidates, set_last_promo_msg_ts, get_coins
 from app.i18n import t
 
 logging.basicConfig(level=logging.INFO)
@@ -21,7 +21,7 @@ async def retention_loop(bot: Bot):
         try:
             logger.info("Marketing: Running retention check...")
             now = time.time()
-            users = get_marketing_candidates()
+            users = await get_marketing_candidates()
             
             for u in users:
                 uid = u['user_id']
@@ -37,7 +37,7 @@ async def retention_loop(bot: Bot):
                             msg = "🏆 <b>Your rank misses you!</b>\n\nCome back today, play a match and get bonus coins! 🔥"
                         
                         await bot.send_message(uid, msg, parse_mode="HTML")
-                        set_last_promo_msg_ts(uid, now)
+                        await set_last_promo_msg_ts(uid, now)
                         logger.info(f"Marketing: Retention sent to {uid}")
                         await asyncio.sleep(0.05) # Rate limit protection
                     except Exception:
@@ -54,14 +54,14 @@ async def referral_booster_loop(bot: Bot):
         try:
             logger.info("Marketing: Running referral booster check...")
             now = time.time()
-            users = get_marketing_candidates()
+            users = await get_marketing_candidates()
             
             for u in users:
                 uid = u['user_id']
                 lang = u.get('lang', 'uk')
                 # For this to work, we'd ideally need a 'registered_at' column.
                 # Assuming 'updated_ts' is close to registration for new users with 0 games.
-                games = u.get('total_games', 0) + u.get('total_games_ck', 0)
+                games = u.get('total_games', 0)  # summed over every game
                 last_active = u.get('updated_ts', 0)
                 last_promo = u.get('last_promo_msg_ts', 0)
                 
@@ -73,7 +73,7 @@ async def referral_booster_loop(bot: Bot):
                             msg = "🎁 <b>Your bonus is waiting!</b>\n\nPlay just 3 rated games to activate your referral bonus and support your friend! 🚀"
                         
                         await bot.send_message(uid, msg, parse_mode="HTML")
-                        set_last_promo_msg_ts(uid, now)
+                        await set_last_promo_msg_ts(uid, now)
                         logger.info(f"Marketing: Ref booster sent to {uid}")
                         await asyncio.sleep(0.05)
                     except Exception:
@@ -97,12 +97,12 @@ async def announce_leader_loop(bot: Bot):
             logger.info(f"Marketing: Leader announcement scheduled in {seconds_until_target}s")
             await asyncio.sleep(seconds_until_target)
             
-            users = get_marketing_candidates()
+            users = await get_marketing_candidates()
             if not users: continue
             
             # Find user with max total_wins across all games
-            leader = max(users, key=lambda x: x.get('total_wins', 0) + x.get('total_wins_ck', 0))
-            if (leader.get('total_wins', 0) + leader.get('total_wins_ck', 0)) == 0:
+            leader = max(users, key=lambda x: x.get('total_wins', 0))
+            if leader.get('total_wins', 0) == 0:
                 continue
 
             name = leader.get('first_name') or leader.get('username') or "Гравець"
@@ -132,8 +132,8 @@ async def daily_bonus_loop(bot: Bot):
         try:
             logger.info("Marketing: Running daily bonus reminder check...")
             now = time.time()
-            users = get_marketing_candidates()
-            from app.db import can_claim_daily_bonus
+            users = await get_marketing_candidates()
+            from app.db_async import can_claim_daily_bonus
             
             for u in users:
                 uid = u['user_id']
@@ -141,11 +141,11 @@ async def daily_bonus_loop(bot: Bot):
                 last_promo = u.get('last_promo_msg_ts', 0)
                 
                 # If bonus available AND no promo in last 24h
-                if can_claim_daily_bonus(uid) and (now - last_promo > PROMO_COOLDOWN):
+                if await can_claim_daily_bonus(uid) and (now - last_promo > PROMO_COOLDOWN):
                     try:
                         msg = t(lang, "daily_bonus_ready")
                         await bot.send_message(uid, msg, parse_mode="HTML")
-                        set_last_promo_msg_ts(uid, now)
+                        await set_last_promo_msg_ts(uid, now)
                         logger.info(f"Marketing: Daily bonus reminder sent to {uid}")
                         await asyncio.sleep(0.05)
                     except Exception:
@@ -165,16 +165,17 @@ async def weekly_reward_loop(bot: Bot):
             # Run only on Monday at 09:00 AM
             if now.weekday() == 0 and now.hour == 9:
                 logger.info("Marketing: Processing weekly rewards...")
-                from app.db import get_top_weekly, add_coins, get_news
+                from app.db_async import add_coins, get_news
+                from app.leaderboard_cache import top_weekly as get_top_weekly
                 
                 for game in ["xo", "checkers"]:
-                    tops = get_top_weekly(game, limit=3)
+                    tops = await get_top_weekly(game, limit=3)
                     rewards = [100, 50, 25] # 1st, 2nd, 3rd place
                     
                     for i, user in enumerate(tops):
                         uid = user['user_id']
                         reward = rewards[i]
-                        add_coins(uid, reward)
+                        await add_coins(uid, reward)
                         try:
                             msg = f"🏆 <b>Вітаємо!</b>\n\nВи посіли {i+1} місце у тижневому рейтингу {game.upper()}! Ваша нагорода: <b>+{reward} 🪙</b>"
                             await bot.send_message(uid, msg, parse_mode="HTML")
@@ -0,0 +1,32 @@
+# app/middlewares.py
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User
+
+from app import user_snapshot
+
+
+class UserSnapshotMiddleware(BaseMiddleware):
+    """Binds a per-update UserSnapshot slot for the caller (see app.user_snapshot).
+
+    The row is loaded lazily by the first db getter that needs it, so updates
+    that never touch the caller's row cost nothing.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user: User | None = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+        slot, token = user_snapshot.bind(user.id)
+        try:
+            return await handler(event, data)
+        finally:
+            user_snapshot.release(slot, token)
@@ -56,8 +56,8 @@ async def cmd_paydiag(msg: Message):
     has_public = bool(getattr(config, "LIQPAY_PUBLIC_KEY", "").strip())
     has_private = bool(getattr(config, "LIQPAY_PRIVATE_KEY", "").strip())
     has_webhook = bool(_base_url())
-    stats = db.db_orders_status_counts(hours=24)
-    revenue = db.db_revenue_summary(days=1)
+    stats = await db.db_orders_status_counts(hours=24)
+    revenue = await db.db_revenue_summary(days=1)
 
     await msg.answer(
         "Pay diagnostics (24h)\n"
@@ -131,7 +131,7 @@ async def cb_pay_coins(cb: CallbackQuery):
         return
 
     coins, price_uah = packs[sku]
-    order_id = db.create_order(cb.from_user.id, sku, uah_to_minor(price_uah), "UAH")
+    order_id = await db.create_order(cb.from_user.id, sku, uah_to_minor(price_uah), "UAH")
     log.info(
         "order created kind=coins order_id=%s user_id=%s sku=%s amount_uah=%s",
         order_id,
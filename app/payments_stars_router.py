@@ -26,7 +26,7 @@ def _lang(ev: Message | CallbackQuery | PreCheckoutQuery) -> str:
 @router.callback_query(F.data == "sm:menu:stars")
 async def cb_stars_menu(cb: CallbackQuery):
     lang = _lang(cb)
-    coins = db.get_coins(cb.from_user.id)
+    coins = await db.get_coins(cb.from_user.id)
     stars = coins // 100
     
     from app.keyboards import stars_menu_kb
@@ -78,15 +78,15 @@ async def cb_stars_deposit_invoice(cb: CallbackQuery, bot: Bot):
 @router.callback_query(F.data == "sm:menu:stars_withdraw")
 async def cb_stars_withdraw(cb: CallbackQuery):
     lang = _lang(cb)
-    coins = db.get_coins(cb.from_user.id)
+    coins = await db.get_coins(cb.from_user.id)
     
     if coins < 100:
         await cb.answer(t(lang, "withdrawal_error_balance"), show_alert=True)
         return
     
     stars = coins // 100
-    db.add_coins(cb.from_user.id, -(stars * 100))
-    db.create_withdrawal(cb.from_user.id, stars * 100, stars)
+    await db.add_coins(cb.from_user.id, -(stars * 100))
+    await db.create_withdrawal(cb.from_user.id, stars * 100, stars)
     
     await cb.message.edit_text(
         t(lang, "withdrawal_request_sent").format(coins=stars*100, stars=stars),
@@ -112,7 +112,7 @@ async def successful_payment(msg: Message):
     if payload.startswith("sm-stars-deposit-"):
         stars = int(payload.split("-")[-1])
         coins = stars * 100
-        new_bal = db.add_coins(user_id, coins)
+        new_bal = await db.add_coins(user_id, coins)
         await msg.answer(f"✅ {t(lang, 'pay_success_coins').format(coins=coins)}\nTotal balance: {new_bal} 🪙")
     
     # Legacy support
@@ -121,9 +121,9 @@ async def successful_payment(msg: Message):
         packs = getattr(config, "STARS_COIN_PACKS", DEFAULT_STARS_PACKS)
         if sku in packs:
             coins = packs[sku][0]
-            db.add_coins(user_id, coins)
+            await db.add_coins(user_id, coins)
             await msg.answer(f"✅ Coins credited!")
     elif payload.startswith("stars-vip-"):
         days = int(payload.replace("stars-vip-", ""))
-        db.add_vip_days(user_id, days)
+        await db.add_vip_days(user_id, days)
         await msg.answer(f"✅ VIP status activated!")
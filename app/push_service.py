@@ -9,28 +9,33 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import time
 from datetime import datetime, timezone, timedelta
 
+from app.registry import BoundedRegistry
+
 log = logging.getLogger("sm-arena.push")
 
-# Remember who we've already notified today (in-memory — resets on restart)
-_notified_daily: set[int] = set()
-_notified_tourn: set[int] = set()
+# Remember who we've already notified (in-memory — resets on restart):
+# daily: user_id -> UTC date of the reminder (the TTL only bounds memory);
+# tournament: user_id -> ts, expiring after an hour, so every tournament gets its reminder
+_notified_daily = BoundedRegistry("push_daily", 2 * 86400, 500_000)
+_notified_tourn = BoundedRegistry("push_tourn", 3600, 100_000)
 _last_tourn_notify_day: str = ""
 
 
 async def push_daily_bonus_remind(bot) -> None:
     """Send daily bonus reminder to players who haven't claimed it today."""
-    from app.db import list_all_user_ids, get_user
+    from app.db_async import list_all_user_ids, get_user_fields
     try:
-        uids = list_all_user_ids()
+        uids = await list_all_user_ids()
         today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
         sent = 0
         for uid in uids:
-            if uid in _notified_daily:
+            if _notified_daily.get(uid) == today:
                 continue
             try:
-                u = get_user(uid) or {}
+                u = await get_user_fields(uid, "vip_last_daily_ts") or {}
                 last_ts = u.get("vip_last_daily_ts") or 0
                 last_date = datetime.fromtimestamp(float(last_ts), tz=timezone.utc).strftime("%Y-%m-%d") if last_ts else ""
                 if last_date != today:
@@ -40,7 +45,7 @@ async def push_daily_bonus_remind(bot) -> None:
                         "Відкрий бота та збери свої монети. 🪙",
                         parse_mode="HTML",
                     )
-                    _notified_daily.add(uid)
+                    _notified_daily[uid] = today
                     sent += 1
                     await asyncio.sleep(0.05)
             except Exception:
@@ -54,9 +59,9 @@ async def push_daily_bonus_remind(bot) -> None:
 async def push_tournament_remind(bot, tournament_id: str, minutes_left: int) -> None:
     """Notify all tournament registrants about upcoming start."""
     global _notified_tourn, _last_tourn_notify_day
-    from app.db import get_tournament_registrants
+    from app.db_async import get_tournament_registrants
     try:
-        registrants = get_tournament_registrants(tournament_id) or []
+        registrants = await get_tournament_registrants(tournament_id) or []
         sent = 0
         for uid in registrants:
             if uid in _notified_tourn:
@@ -68,7 +73,7 @@ async def push_tournament_remind(bot, tournament_id: str, minutes_left: int) ->
                     "Будь готовий до першої гри. ⚔️",
                     parse_mode="HTML",
                 )
-                _notified_tourn.add(uid)
+                _notified_tourn[uid] = time.time()
                 sent += 1
                 await asyncio.sleep(0.05)
             except Exception:
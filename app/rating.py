@@ -1,5 +1,8 @@
 # app/rating.py
-# Простий Elo-рейтинг для SM Arena
+# Простий Elo-рейтинг для SM Arena, плюс Glicko-2 для рейтингових періодів
+import math
+from typing import NamedTuple
+
 
 def expected_score(r_a: int, r_b: int) -> float:
     return 1 / (1 + 10 ** ((r_b - r_a) / 400))
@@ -19,3 +22,149 @@ def update_elo(r_a: int, r_b: int, score_a: float, k: int = 24) -> tuple[int, in
     new_b = round(r_b + k * ((1 - score_a) - e_b))
 
     return new_a, new_b
+
+
+# ---------------- Rating backends (batched per rating period) ----------------
+# A backend rates all games of one period at once:
+#   rate_period(states, games) -> new states of the players that played
+# states maps a player key to a RatingState; games are (a, b, score_a).
+# Players who sat the period out are not returned; idle() ages their state.
+
+GLICKO_SCALE = 173.7178  # 400 / ln(10)
+
+
+class RatingState(NamedTuple):
+    rating: float
+    rd: float = 0.0
+    vol: float = 0.0
+
+
+class EloBackend:
+    """Fixed-K Elo; games are applied in order, rd and vol are carried unchanged."""
+    name = "elo"
+
+    def __init__(self, k: int = 24, initial_rating: float = 1000):
+        self.k = k
+        self.initial_rating = initial_rating
+
+    def initial(self) -> RatingState:
+        return RatingState(self.initial_rating)
+
+    def idle(self, state: RatingState, periods: int) -> RatingState:
+        return state
+
+    def rate_period(self, states: dict, games: list) -> dict:
+        cur = {p: states.get(p, self.initial()) for g in games for p in g[:2]}
+        for a, b, score_a in games:
+            ra, rb = update_elo(round(cur[a].rating), round(cur[b].rating), score_a, k=self.k)
+            cur[a], cur[b] = cur[a]._replace(rating=ra), cur[b]._replace(rating=rb)
+        return cur
+
+
+class Glicko2Backend:
+    """Glicko-2 (Glickman, "Example of the Glicko-2 system").
+
+    Ratings are centred on `center` (the Elo start, so both scales read
+    alike); rd is the rating deviation, vol the volatility. A player's
+    period result uses the opponents' pre-period states, so the order of
+    games inside a period does not matter.
+    """
+    name = "glicko2"
+
+    def __init__(self, tau: float = 0.5, center: float = 1000, initial_rd: float = 350,
+                 initial_vol: float = 0.06, eps: float = 1e-6):
+        self.tau = tau
+        self.center = center
+        self.initial_rd = initial_rd
+        self.initial_vol = initial_vol
+        self.eps = eps
+
+    def initial(self) -> RatingState:
+        return RatingState(self.center, self.initial_rd, self.initial_vol)
+
+    def idle(self, state: RatingState, periods: int) -> RatingState:
+        """state after `periods` rating periods without games (step 6, capped at the initial rd)."""
+        if periods <= 0:
+            return state
+        rd = math.sqrt(state.rd ** 2 + periods * (GLICKO_SCALE * state.vol) ** 2)
+        return state._replace(rd=min(rd, self.initial_rd))
+
+    def rate_period(self, states: dict, games: list) -> dict:
+        init = self.initial()
+        pre = {}  # player -> (mu, phi, g(phi))
+        results: dict = {}  # player -> [(opponent, score)]
+        for a, b, score_a in games:
+            for p in (a, b):
+                if p not in pre:
+                    st = states.get(p, init)
+                    phi = st.rd / GLICKO_SCALE
+                    pre[p] = ((st.rating - self.center) / GLICKO_SCALE, phi, 1 / math.sqrt(1 + 3 * phi * phi / math.pi ** 2))
+                    results[p] = []
+            results[a].append((b, score_a))
+            results[b].append((a, 1.0 - score_a))
+        out = {}
+        for p, played in results.items():
+            mu, phi, _g = pre[p]
+            v_inv = delta_sum = 0.0
+            for o, s in played:
+                mu_o, _phi_o, g_o = pre[o]
+                e = 1 / (1 + math.exp(-g_o * (mu - mu_o)))
+                v_inv += g_o * g_o * e * (1 - e)
+                delta_sum += g_o * (s - e)
+            v = 1 / v_inv
+            sigma = self._volatility(phi, v, v * delta_sum, states.get(p, init).vol)
+            phi_star = math.sqrt(phi * phi + sigma * sigma)
+            phi_new = 1 / math.sqrt(1 / (phi_star * phi_star) + 1 / v)
+            mu_new = mu + phi_new * phi_new * delta_sum
+            out[p] = RatingState(self.center + GLICKO_SCALE * mu_new, min(GLICKO_SCALE * phi_new, self.initial_rd), sigma)
+        return out
+
+    def _volatility(self, phi: float, v: float, delta: float, sigma: float) -> float:
+        """Step 5: new volatility by the Illinois algorithm."""
+        a = math.log(sigma * sigma)
+        tau2, d2, p2 = self.tau * self.tau, delta * delta, phi * phi
+
+        def f(x: float) -> float:
+            ex = math.exp(x)
+            return ex * (d2 - p2 - v - ex) / (2 * (p2 + v + ex) ** 2) - (x - a) / tau2
+
+        lo = a
+        if d2 > p2 + v:
+            hi = math.log(d2 - p2 - v)
+        else:
+            k = 1
+            while f(a - k * self.tau) < 0:
+                k += 1
+            hi = a - k * self.tau
+        f_lo, f_hi = f(lo), f(hi)
+        while abs(hi - lo) > self.eps:
+            c = lo + (lo - hi) * f_lo / (f_hi - f_lo)
+            f_c = f(c)
+            if f_c * f_hi < 0:
+                lo, f_lo = hi, f_hi
+            else:
+                f_lo /= 2
+            hi, f_hi = c, f_c
+        return math.exp(lo / 2)
+
+
+BACKENDS = {"elo": EloBackend, "glicko2": Glicko2Backend}
+
+
+def get_backend(name: str = "glicko2", **params):
+    """A rating backend by name ("elo" or "glicko2")."""
+    try:
+        return BACKENDS[name](**params)
+    except KeyError:
+        raise ValueError(f"unknown rating backend {name!r}") from None
+
+
+def match_distance(r_a: float, rd_a: float, r_b: float, rd_b: float) -> float:
+    """How lopsided a pairing is expected to be: |P(A wins) - 0.5|, with P from Glicko's g(rd).
+
+    Uncertain (high rd) ratings pull P towards 0.5, so provisional players
+    match across a wider rating range than settled ones.
+    """
+    phi = math.sqrt(rd_a * rd_a + rd_b * rd_b) / GLICKO_SCALE
+    g = 1 / math.sqrt(1 + 3 * phi * phi / math.pi ** 2)
+    return abs(1 / (1 + math.exp(-g * (r_a - r_b) / GLICKO_SCALE)) - 0.5)
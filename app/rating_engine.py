@@ -0,0 +1,242 @@
+# app/rating_engine.py
+"""Offline Elo replay over the games ledger.
+
+app.rating.update_elo() rates one game at a time on the live path. Rating
+audits, anti-boost clean-ups and K-factor experiments need the whole history
+replayed, which this module does in one pass over a compact copy of the
+ledger:
+
+- load_ledger() streams the games table into a GameStream: parallel
+  array-module columns (player slots, result flags, season ids), 13 bytes per
+  game.
+- replay() rates a stream using array-backed tables with one slot per
+  (player, game), for both overall and season Elo. It follows the live rules:
+  only rated decisive games move ratings, a shadowbanned player's ratings
+  stay frozen, and season ratings get the soft reset the first time a player
+  plays in a new season. At k=24 it reproduces record_game_result().
+- sweep_k() replays one stream for several K factors in worker processes and
+  reports how well each K predicts the results (Brier score, log loss).
+- write_back() stores a replay in user_game_stats in one bulk transaction.
+
+db.replay_game_ledger() is the audit that also rebuilds the counters; this
+module only deals with ratings, at a scale where per-row dicts do not fit.
+"""
+from __future__ import annotations
+
+import math
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from app import db as _db
+from app.rating import expected_score
+
+GAMES = _db.GAMES
+_G = len(GAMES)
+_GAME_INDEX = {g: i for i, g in enumerate(GAMES)}
+
+# GameStream.flags bits
+A_WIN, B_WIN, RATED, A_SHADOW, B_SHADOW = 1, 2, 4, 8, 16
+
+# expected_score() by rating difference; larger gaps fall back to the formula
+_DIFF_LIMIT = 2000
+_EXPECTED = array("d", (expected_score(0, d) for d in range(-_DIFF_LIMIT, _DIFF_LIMIT + 1)))
+
+
+@dataclass
+class GameStream:
+    """Games in ledger order. A slot is player * len(GAMES) + game index."""
+    users: array = field(default_factory=lambda: array("q"))  # player -> user_id
+    a: array = field(default_factory=lambda: array("i"))
+    b: array = field(default_factory=lambda: array("i"))
+    flags: array = field(default_factory=lambda: array("B"))
+    season: array = field(default_factory=lambda: array("i"))
+    _players: dict[int, int] = field(default_factory=dict, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.flags)
+
+    def player(self, user_id: int) -> int:
+        p = self._players.get(user_id)
+        if p is None:
+            p = self._players[user_id] = len(self.users)
+            self.users.append(user_id)
+        return p
+
+    def add(self, game: str, a_id: int, b_id: int, winner_id: int | None, rated: bool,
+            a_shadowban: bool = False, b_shadowban: bool = False, season_id: int = 1) -> None:
+        g = _GAME_INDEX[game]
+        a, b = int(a_id), int(b_id)
+        self.a.append(self.player(a) * _G + g)
+        self.b.append(self.player(b) * _G + g)
+        self.flags.append(
+            (A_WIN if winner_id == a else B_WIN if winner_id == b else 0)
+            | (RATED if rated else 0) | (A_SHADOW if a_shadowban else 0) | (B_SHADOW if b_shadowban else 0)
+        )
+        self.season.append(int(season_id))
+
+    def nbytes(self) -> int:
+        return sum(col.itemsize * len(col) for col in (self.users, self.a, self.b, self.flags, self.season))
+
+
+@dataclass
+class RatingRun:
+    k: float
+    scored: int  # rated decisive games that moved ratings
+    brier: float
+    log_loss: float
+    rating: array = field(default_factory=lambda: array("i"), repr=False)  # per slot
+    season_rating: array = field(default_factory=lambda: array("i"), repr=False)  # per slot, in season_id
+    season_id: array = field(default_factory=lambda: array("i"), repr=False)  # per player
+    touched: bytearray = field(default_factory=bytearray, repr=False)  # per slot
+
+    def summary(self) -> dict:
+        return {"k": self.k, "scored": self.scored, "brier": self.brier, "log_loss": self.log_loss}
+
+
+def load_ledger(game: str | None = None) -> GameStream:
+    """Stream the games table (optionally one game) into a GameStream."""
+    _db.init_db()
+    stream = GameStream()
+    con = _db._con()
+    try:
+        sql = ("SELECT game, a_id, b_id, winner_id, rated, a_shadowban, b_shadowban, season_id FROM games "
+               + ("WHERE game=? " if game else "") + "ORDER BY id")
+        for row in con.execute(sql, (game,) if game else ()):
+            if row[0] in _GAME_INDEX:
+                stream.add(*row)
+        return stream
+    finally:
+        con.close()
+
+
+def _far(k: float, e_a: float, e_b: float, a_won) -> tuple[float, float]:
+    return (k * (1.0 - e_a), k * (0.0 - e_b)) if a_won else (k * (0.0 - e_a), k * (1.0 - e_b))
+
+
+def replay(stream: GameStream, k: float = 24, void_users=()) -> RatingRun:
+    """Rate every game of stream; games with a player from void_users count as unrated."""
+    n_players = len(stream.users)
+    rating = array("i", [_db.DEFAULT_RATING]) * (n_players * _G)
+    season_rating = array("i", [1000]) * (n_players * _G)
+    season_id = array("i", [-1]) * n_players
+    touched = bytearray(n_players * _G)
+    void = bytearray(n_players)
+    for uid in void_users:
+        p = stream._players.get(int(uid))
+        if p is not None:
+            void[p] = 1
+
+    # k * (score - expected) by rating difference, the same float update_elo() adds
+    exp, lim, soft = _EXPECTED, _DIFF_LIMIT, _db._soft_reset
+    win = array("d", (k * (1.0 - e) for e in _EXPECTED))
+    loss = array("d", (k * (0.0 - e) for e in _EXPECTED))
+    scored, brier, log_loss = 0, 0.0, 0.0
+    log, G = math.log, _G
+    for a, b, f, s in zip(stream.a, stream.b, stream.flags, stream.season):
+        pa, pb = a // G, b // G
+        # db._season_rollover: all of the player's games at once, one soft reset per closed season
+        if season_id[pa] != s:
+            closed, season_id[pa] = s - season_id[pa], s
+            for slot in range(pa * G, pa * G + G):
+                season_rating[slot] = soft(season_rating[slot], seasons=closed)
+        if season_id[pb] != s:
+            closed, season_id[pb] = s - season_id[pb], s
+            for slot in range(pb * G, pb * G + G):
+                season_rating[slot] = soft(season_rating[slot], seasons=closed)
+        touched[a] = touched[b] = 1
+        if not f & RATED or not f & (A_WIN | B_WIN) or void[pa] or void[pb]:
+            continue
+        scored += 1
+        a_won = f & A_WIN
+        ra, rb = rating[a], rating[b]
+        d = rb - ra
+        if -lim <= d <= lim:
+            e_a = exp[d + lim]
+            da, db = (win[d + lim], loss[lim - d]) if a_won else (loss[d + lim], win[lim - d])
+        else:
+            e_a = expected_score(ra, rb)
+            da, db = _far(k, e_a, expected_score(rb, ra), a_won)
+        if a_won:
+            brier += (1.0 - e_a) ** 2
+            log_loss -= log(max(e_a, 1e-12))
+        else:
+            brier += e_a * e_a
+            log_loss -= log(max(1.0 - e_a, 1e-12))
+        sa, sb = season_rating[a], season_rating[b]
+        d = sb - sa
+        if -lim <= d <= lim:
+            dsa, dsb = (win[d + lim], loss[lim - d]) if a_won else (loss[d + lim], win[lim - d])
+        else:
+            dsa, dsb = _far(k, expected_score(sa, sb), expected_score(sb, sa), a_won)
+        if not f & A_SHADOW:
+            rating[a] = round(ra + da)
+            season_rating[a] = round(sa + dsa)
+        if not f & B_SHADOW:
+            rating[b] = round(rb + db)
+            season_rating[b] = round(sb + dsb)
+
+    n = max(1, scored)
+    return RatingRun(k=k, scored=scored, brier=brier / n, log_loss=log_loss / n, rating=rating,
+                     season_rating=season_rating, season_id=season_id, touched=touched)
+
+
+_WORKER_STREAM: GameStream | None = None
+
+
+def _init_worker(stream: GameStream) -> None:
+    global _WORKER_STREAM
+    _WORKER_STREAM = stream
+
+
+def _sweep_one(job: tuple[float, tuple[int, ...]]) -> dict:
+    k, void_users = job
+    return replay(_WORKER_STREAM, k, void_users).summary()
+
+
+def sweep_k(stream: GameStream, ks, workers: int | None = None, void_users=()) -> list[dict]:
+    """replay() summaries for every K in ks, one worker process per K (the stream is sent once per worker)."""
+    ks = list(ks)
+    workers = workers or min(len(ks), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(stream,)) as pool:
+        return list(pool.map(_sweep_one, [(k, tuple(void_users)) for k in ks]))
+
+
+def write_back(stream: GameStream, run: RatingRun) -> int:
+    """Store run's ratings for every (player, game) the stream touched; returns the rows written.
+
+    Players are brought into the current season first (db._season_rollover),
+    then rating and season_rating are written with executemany in one
+    BEGIN IMMEDIATE transaction. Season ratings from an earlier season are
+    stored soft-reset, once per closed season.
+    """
+    _db.init_db()
+    con = _db._con()
+    try:
+        con.execute("BEGIN IMMEDIATE")
+        cur_season = int(_db._meta_get(con, "season_id", "1") or 1)
+        slots = [slot for slot, t in enumerate(run.touched) if t]
+        uids = sorted({stream.users[slot // _G] for slot in slots})
+        for sql in _db._SEASON_ROLLOVER_SQL:
+            con.executemany(sql.format(uid="?"), ((uid,) for uid in uids))
+
+        def rows():
+            for slot in slots:
+                p = slot // _G
+                s = run.season_rating[slot]
+                closed = cur_season - run.season_id[p]
+                yield (run.rating[slot], _db._soft_reset(s, seasons=closed) if closed else s,
+                       stream.users[p], GAMES[slot % _G])
+
+        con.executemany(
+            f"INSERT OR IGNORE INTO user_game_stats(user_id, game, week_epoch, season_id) "
+            f"VALUES(?,?,{_db._CUR_WEEK},{_db._CUR_SEASON})",
+            ((stream.users[slot // _G], GAMES[slot % _G]) for slot in slots),
+        )
+        con.executemany("UPDATE user_game_stats SET rating=?, season_rating=? WHERE user_id=? AND game=?", rows())
+        con.commit()
+    finally:
+        con.close()
+    _db._boards_changed("users", None)
+    return len(slots)
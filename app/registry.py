@@ -0,0 +1,238 @@
+# app/registry.py
+"""Bounded in-memory registries: a dict with an idle TTL and a size cap.
+
+Live matches, click timestamps, timer tasks and "already notified" marks
+are kept in process memory; as plain dicts they only ever grew.
+BoundedRegistry is a drop-in MutableMapping:
+
+- an entry expires after `ttl` seconds of idleness. Idleness is measured
+  from activity(value) when given (e.g. a session's last_activity; reads do
+  not count then, a watchdog polling the entry must not keep it alive),
+  otherwise from the last time the key was set or read with [] / get().
+  peek(), items() and values() don't count as reads: a sweep or snapshot
+  walking the map must not keep idle entries alive;
+- past `max_size` entries, the least recently used one is evicted;
+- on_evict(key, value) runs for every eviction (cancel a timer, drop index
+  entries, delete a live_state snapshot), but not for pop() / del.
+
+Expired entries are removed by sweep(), which the background task started by
+start() runs for every registry. Reads and iteration skip an entry that has
+expired but not been swept yet (len() still counts it). All of this runs on
+the event loop thread, so there are no locks.
+
+    PVP_MATCHES = BoundedRegistry("xo_pvp", ttl=3600, max_size=50_000,
+                                  activity=lambda m: m.last_move)
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import time
+from collections import OrderedDict
+from collections.abc import ItemsView, MutableMapping, ValuesView
+from typing import Callable, Iterator
+
+log = logging.getLogger("sm-arena")
+
+SWEEP_INTERVAL_SEC = 60.0
+_SIZE_SAMPLE = 32  # entries sized per stats() call
+
+_REGISTRIES: dict[str, "BoundedRegistry"] = {}
+_task: asyncio.Task | None = None
+_MISSING = object()
+
+
+def _approx_size(obj) -> int:
+    """getsizeof of obj plus its direct children (dict items, list items, instance fields)."""
+    size = sys.getsizeof(obj)
+    inner = getattr(obj, "__dict__", None)
+    if inner is not None:
+        size += sys.getsizeof(inner)
+        obj = inner
+    elif getattr(type(obj), "__slots__", None):
+        return size + sum(sys.getsizeof(getattr(obj, name, None)) for name in type(obj).__slots__)
+    if isinstance(obj, dict):
+        size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(sys.getsizeof(v) for v in obj)
+    return size
+
+
+class _ItemsView(ItemsView):
+    def __contains__(self, item) -> bool:
+        key, value = item
+        v = self._mapping.peek(key, _MISSING)
+        return v is not _MISSING and (v is value or v == value)
+
+    def __iter__(self):
+        for key in self._mapping:
+            value = self._mapping.peek(key, _MISSING)
+            if value is not _MISSING:
+                yield key, value
+
+
+class _ValuesView(ValuesView):
+    def __contains__(self, value) -> bool:
+        return any(v is value or v == value for v in self)
+
+    def __iter__(self):
+        for key in self._mapping:
+            value = self._mapping.peek(key, _MISSING)
+            if value is not _MISSING:
+                yield value
+
+
+class BoundedRegistry(MutableMapping):
+    def __init__(self, name: str, ttl: float, max_size: int, activity: Callable | None = None,
+                 on_evict: Callable | None = None):
+        self.name = name
+        self.ttl = float(ttl)
+        self.max_size = int(max_size)
+        self.activity = activity
+        self.on_evict = on_evict
+        self._data: OrderedDict = OrderedDict()  # key -> [value, last access]
+        self.evicted_ttl = 0
+        self.evicted_cap = 0
+        _REGISTRIES[name] = self
+
+    def _idle_since(self, item: list) -> float:
+        if self.activity is None:
+            return item[1]
+        try:
+            return float(self.activity(item[0]))
+        except Exception:
+            return item[1]
+
+    def _expired(self, item: list, now: float) -> bool:
+        return now - self._idle_since(item) > self.ttl
+
+    def __getitem__(self, key):
+        item = self._data[key]
+        now = time.time()
+        if self._expired(item, now):
+            raise KeyError(key)
+        if self.activity is None:
+            item[1] = now
+        self._data.move_to_end(key)
+        return item[0]
+
+    def __setitem__(self, key, value) -> None:
+        item = self._data.get(key)
+        if item is None:
+            self._data[key] = [value, time.time()]
+            while len(self._data) > self.max_size:
+                old_key, (old_value, _ts) = self._data.popitem(last=False)
+                self.evicted_cap += 1
+                self._evicted(old_key, old_value)
+        else:
+            item[0], item[1] = value, time.time()
+            self._data.move_to_end(key)
+
+    def __delitem__(self, key) -> None:
+        del self._data[key]
+
+    def __contains__(self, key) -> bool:
+        item = self._data.get(key)
+        return item is not None and not self._expired(item, time.time())
+
+    def __iter__(self) -> Iterator:
+        now = time.time()
+        return iter([k for k, item in self._data.items() if not self._expired(item, now)])
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def peek(self, key, default=None):
+        """The value without counting as a read (no TTL refresh, no LRU move)."""
+        item = self._data.get(key)
+        if item is None or self._expired(item, time.time()):
+            return default
+        return item[0]
+
+    def items(self) -> ItemsView:
+        return _ItemsView(self)
+
+    def values(self) -> ValuesView:
+        return _ValuesView(self)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def _evicted(self, key, value) -> None:
+        if self.on_evict is not None:
+            try:
+                self.on_evict(key, value)
+            except Exception:
+                log.exception("registry %s: on_evict failed for %r", self.name, key)
+
+    def sweep(self, now: float | None = None) -> int:
+        """Evict every expired entry; returns how many."""
+        now = time.time() if now is None else now
+        if self.activity is None:
+            # access order is last-access order: stop at the first live entry
+            dead = []
+            for k, item in self._data.items():
+                if not self._expired(item, now):
+                    break
+                dead.append(k)
+        else:
+            dead = [k for k, item in self._data.items() if self._expired(item, now)]
+        for k in dead:
+            value, _ts = self._data.pop(k)
+            self.evicted_ttl += 1
+            self._evicted(k, value)
+        return len(dead)
+
+    def nbytes(self) -> int:
+        """Rough memory estimate: the table plus a sample of entries scaled to the size."""
+        n = len(self._data)
+        size = sys.getsizeof(self._data)
+        if n:
+            sample = [item for _, item in zip(range(_SIZE_SAMPLE), self._data.items())]
+            per = sum(_approx_size(k) + _approx_size(item[0]) + sys.getsizeof(item) for k, item in sample)
+            size += per * n // len(sample)
+        return size
+
+    def stats(self) -> dict:
+        return {"name": self.name, "entries": len(self._data), "max_size": self.max_size, "ttl": self.ttl,
+                "evicted_ttl": self.evicted_ttl, "evicted_cap": self.evicted_cap, "bytes": self.nbytes()}
+
+
+def sweep_all() -> int:
+    return sum(reg.sweep() for reg in list(_REGISTRIES.values()))
+
+
+async def _sweep_loop(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            n = sweep_all()
+            if n:
+                log.debug("registry sweep: %d entries evicted", n)
+        except Exception:
+            log.exception("registry sweep failed")
+
+
+def start(interval: float = SWEEP_INTERVAL_SEC) -> asyncio.Task:
+    global _task
+    if _task is None or _task.done():
+        _task = asyncio.create_task(_sweep_loop(interval))
+    return _task
+
+
+def stop() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        _task = None
+
+
+def stats() -> list[dict]:
+    return [reg.stats() for reg in _REGISTRIES.values()]
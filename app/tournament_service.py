@@ -9,7 +9,7 @@ from dataclasses import dataclass
 
 from aiogram import Bot
 
-from app import db
+from app import db_async as db
 from app.config import (
     DAILY_TOURNAMENT_HOUR, DAILY_TOURNAMENT_MINUTE,
     TOURN_REG_MINUTES, TOURN_DAILY_SIZE, TOURN_ENTRY_FEE,
@@ -19,7 +19,9 @@ from app.config import (
 # For XO UI
 from app.keyboards import board_kb_pvp
 from app.i18n import t
-from app.db import db_get_lang, get_skin, get_skin_ck
+from app.xo_match import PvPMatch
+from app.db_async import db_get_lang, get_skin, get_skin_ck
+from app.db import _today_key_uzh
 
 # For Checkers UI
 from app.checkers_game.ui import build_board_kb, render_text
@@ -35,46 +37,41 @@ async def start_xo_tournament_match(bot: Bot, a_id: int, b_id: int, tournament_i
     match_id = str(uuid.uuid4())[:8]
     board = "........."
 
-    a_lang = db_get_lang(a_id) or "en"
-    b_lang = db_get_lang(b_id) or "en"
+    a_lang = await db_get_lang(a_id) or "en"
+    b_lang = await db_get_lang(b_id) or "en"
 
     ma = await bot.send_message(
         a_id,
         f"🏆 {t(a_lang,'tourn_match_found')}",
-        reply_markup=board_kb_pvp(match_id, board, a_lang, skin=get_skin(a_id), show_controls=False)
+        reply_markup=board_kb_pvp(match_id, board, a_lang, skin=await get_skin(a_id), show_controls=False)
     )
     mb = await bot.send_message(
         b_id,
         f"🏆 {t(b_lang,'tourn_match_found')}",
-        reply_markup=board_kb_pvp(match_id, board, b_lang, skin=get_skin(b_id), show_controls=False)
+        reply_markup=board_kb_pvp(match_id, board, b_lang, skin=await get_skin(b_id), show_controls=False)
     )
 
     # Inject into handlers_menu PVP registry
     from app.handlers_menu import PVP_MATCHES, set_pvp_timer
-    PVP_MATCHES[match_id] = {
-        "board": board,
-        "x": a_id,
-        "o": b_id,
-        "turn": "X",
-        "status": "playing",
-        "last_move": time.time(),
-        "x_chat": a_id,
-        "o_chat": b_id,
-        "x_msg": ma.message_id,
-        "o_msg": mb.message_id,
-        "x_lang": a_lang,
-        "o_lang": b_lang,
-        "tournament_id": int(tournament_id),
-        "tmatch_id": int(tmatch_id),
-        "tourn_techloss": 1,
-    }
+    PVP_MATCHES[match_id] = PvPMatch(
+        x=a_id,
+        o=b_id,
+        x_chat=a_id,
+        o_chat=b_id,
+        x_msg=ma.message_id,
+        o_msg=mb.message_id,
+        x_lang=a_lang,
+        o_lang=b_lang,
+        tournament_id=int(tournament_id),
+        tmatch_id=int(tmatch_id),
+    )
     set_pvp_timer(match_id, _BotWrap(bot))  # reuse watchdog
 
 # ---------- Checkers tournament match start ----------
 async def start_checkers_tournament_match(bot: Bot, a_id: int, b_id: int, tournament_id: int, tmatch_id: int):
     # Names
-    au = db.get_user(a_id) or {}
-    bu = db.get_user(b_id) or {}
+    au = await db.get_user_fields(a_id, "username", "first_name") or {}
+    bu = await db.get_user_fields(b_id, "username", "first_name") or {}
     a_name = (("@"+au.get("username")) if (au.get("username") or "").strip() else (au.get("first_name") or "Player")).strip()
     b_name = (("@"+bu.get("username")) if (bu.get("username") or "").strip() else (bu.get("first_name") or "Player")).strip()
 
@@ -82,10 +79,10 @@ async def start_checkers_tournament_match(bot: Bot, a_id: int, b_id: int, tourna
 
     # Send initial boards
     # Each player sees their own perspective with skins
-    a_lang = db.db_get_lang(a_id) or "en"
-    b_lang = db.db_get_lang(b_id) or "en"
-    skin_a = get_skin_ck(a_id)
-    skin_b = get_skin_ck(b_id)
+    a_lang = await db.db_get_lang(a_id) or "en"
+    b_lang = await db.db_get_lang(b_id) or "en"
+    skin_a = await get_skin_ck(a_id)
+    skin_b = await get_skin_ck(b_id)
 
     text_a = "🏆 Турнір: матч знайдено!"
     text_b = "🏆 Турнір: матч знайдено!"
@@ -140,8 +137,8 @@ async def _checkers_watchdog(bot: Bot, gid: str):
             # Tournament hook
             if gs.tmatch_id and gs.tournament_id:
                 try:
-                    db.set_match_result(int(gs.tmatch_id), int(winner_uid))
-                    db.advance_round_if_ready(int(gs.tournament_id))
+                    await db.set_match_result(int(gs.tmatch_id), int(winner_uid))
+                    await db.advance_round_if_ready(int(gs.tournament_id))
                 except Exception:
                     pass
 
@@ -155,14 +152,14 @@ async def _checkers_watchdog(bot: Bot, gid: str):
 
 # ---------- Tournament engine ----------
 async def run_pending_for_tournament(bot: Bot, tournament_id: int):
-    t = db.get_tournament_by_id(tournament_id)
+    t = await db.get_tournament_by_id(tournament_id)
     if not t:
         return
     game = str(t["game"])
-    pend = db.get_pending_matches(tournament_id)
+    pend = await db.get_pending_matches(tournament_id)
     for m in pend:
         a = int(m["a_id"]); b = int(m["b_id"])
-        db.mark_match_playing(int(m["id"]))
+        await db.mark_match_playing(int(m["id"]))
         if game == "checkers":
             await start_checkers_tournament_match(bot, a, b, tournament_id, int(m["id"]))
         else:
@@ -171,14 +168,14 @@ async def run_pending_for_tournament(bot: Bot, tournament_id: int):
 async def close_and_start_if_ready(bot: Bot, t: dict):
     tid = int(t["id"])
     game = str(t["game"])
-    players = db.list_tournament_players(tid)
+    players = await db.list_tournament_players(tid)
     if len(players) < db.TOURN_MIN_PLAYERS:
-        db.cancel_tournament(tid)
+        await db.cancel_tournament(tid)
         # refunds handled in db.cancel_tournament
         return
-    matches = db.generate_bracket(tid)
+    matches = await db.generate_bracket(tid)
     if not matches:
-        db.cancel_tournament(tid)
+        await db.cancel_tournament(tid)
         return
     await run_pending_for_tournament(bot, tid)
 
@@ -202,7 +199,7 @@ async def tournament_registrar_loop(bot: Bot):
         fee = int(tinfo.get("entry_fee") or 0)
         # participants count
         try:
-            players = db.list_tournament_players(tid)
+            players = await db.list_tournament_players(tid)
         except Exception:
             players = []
         cnt = len(players)
@@ -224,7 +221,7 @@ async def tournament_registrar_loop(bot: Bot):
         try:
             # reminders for REG tournaments
             try:
-                regs = db.get_reg_open_tournaments()
+                regs = await db.get_reg_open_tournaments()
             except Exception:
                 regs = []
             now = time.time()
@@ -240,7 +237,7 @@ async def tournament_registrar_loop(bot: Bot):
                     if int(tinfo.get("remind_2m_sent") or 0) == 0 and left <= int(TOURN_REMIND_2M_SEC):
                         await _notify(tinfo, left)
                         try:
-                            db.mark_tournament_reminder(tid, "2m")
+                            await db.mark_tournament_reminder(tid, "2m")
                         except Exception:
                             pass
 
@@ -248,7 +245,7 @@ async def tournament_registrar_loop(bot: Bot):
                     if int(tinfo.get("remind_30s_sent") or 0) == 0 and left <= int(TOURN_REMIND_30S_SEC):
                         await _notify(tinfo, left)
                         try:
-                            db.mark_tournament_reminder(tid, "30s")
+                            await db.mark_tournament_reminder(tid, "30s")
                         except Exception:
                             pass
 
@@ -256,7 +253,7 @@ async def tournament_registrar_loop(bot: Bot):
                     pass
 
             # start/cancel when reg ends
-            expired = db.get_reg_expired_tournaments()
+            expired = await db.get_reg_expired_tournaments()
             for t in expired:
                 await close_and_start_if_ready(bot, t)
         except Exception:
@@ -286,7 +283,7 @@ async def daily_tournament_loop(bot: Bot):
             await asyncio.sleep(max(1, target_ts - time.time()))
             # create tournaments
             reg_end = time.time() + TOURN_REG_MINUTES * 60
-            day_key = db._today_key_uzh(time.time())
+            day_key = _today_key_uzh(time.time())
             
             wday = time.localtime(time.time()).tm_wday
             is_weekend = (wday in (4, 5, 6)) # Friday, Saturday, Sunday
@@ -301,7 +298,7 @@ async def daily_tournament_loop(bot: Bot):
                 d_key = day_key
 
             for game, title in (("xo", f"{prefix} XO {day_key}"), ("checkers", f"{prefix} Checkers {day_key}")):
-                db.create_tournament(
+                await db.create_tournament(
                     game, title, TOURN_DAILY_SIZE, created_by=0,
                     entry_fee=fee, reg_ends_ts=reg_end,
                     auto_daily=True, day_key=d_key
@@ -0,0 +1,87 @@
+# app/user_snapshot.py
+"""Per-update cache of the caller's user rows.
+
+UserSnapshotMiddleware (app.middlewares) binds a slot for the user behind the
+current Telegram update. The users data lives in narrow tables (see
+db.USER_TABLES, plus one user_game_stats row per game); the first app.db
+getter that needs one of them loads that row once, and later getters within the same update (get_skin,
+get_rating, is_vip, get_coins, ...) are served from the snapshot. Any write
+made through app.db in the same context drops it, so the next read sees fresh
+data.
+
+The slot lives in a ContextVar, which app.db_async copies into the DB thread.
+Tasks spawned by a handler inherit the slot, so it is closed when the update
+finishes and stops serving reads after that.
+"""
+from __future__ import annotations
+
+import contextvars
+
+MISS = object()
+
+
+class _Slot:
+    __slots__ = ("user_id", "parts", "closed")
+
+    def __init__(self, user_id: int):
+        self.user_id = int(user_id)
+        self.parts: dict[str, dict | None] = {}  # table -> row (None = no such user)
+        self.closed = False
+
+
+_CURRENT: contextvars.ContextVar[_Slot | None] = contextvars.ContextVar("sm_user_snapshot", default=None)
+
+# counters for /dbstats
+stats = {"bound": 0, "loads": 0, "hits": 0, "invalidations": 0}
+
+
+def bind(user_id: int) -> tuple[_Slot, contextvars.Token]:
+    slot = _Slot(user_id)
+    stats["bound"] += 1
+    return slot, _CURRENT.set(slot)
+
+
+def release(slot: _Slot, token: contextvars.Token) -> None:
+    slot.closed = True
+    slot.parts.clear()
+    _CURRENT.reset(token)
+
+
+def _live_slot(user_id) -> _Slot | None:
+    slot = _CURRENT.get()
+    if slot is None or slot.closed:
+        return None
+    try:
+        return slot if slot.user_id == int(user_id) else None
+    except (TypeError, ValueError):
+        return None
+
+
+def has(user_id: int, table: str) -> bool:
+    slot = _live_slot(user_id)
+    return slot is not None and table in slot.parts
+
+
+def lookup(user_id: int, table: str):
+    """Cached row dict of table (or None for a missing user) for user_id, else MISS."""
+    slot = _live_slot(user_id)
+    if slot is None or table not in slot.parts:
+        return MISS
+    stats["hits"] += 1
+    row = slot.parts[table]
+    return dict(row) if row is not None else None
+
+
+def remember(user_id: int, table: str, row: dict | None) -> None:
+    slot = _live_slot(user_id)
+    if slot is None:
+        return
+    slot.parts[table] = dict(row) if row is not None else None
+    stats["loads"] += 1
+
+
+def invalidate() -> None:
+    slot = _CURRENT.get()
+    if slot is not None and slot.parts:
+        slot.parts.clear()
+        stats["invalidations"] += 1
@@ -5,7 +5,7 @@ import logging
 import random
 
 from app import config
-from app import db
+from app import db_async as db
 from app.shop_items import SHOP_ITEMS
 
 log = logging.getLogger("vip")
@@ -22,16 +22,16 @@ def _premium_item_ids() -> list[str]:
             ids.append(iid)
     return ids
 
-def grant_weekly_pack(user_id: int) -> str:
-    owned = db.owned_item_ids(user_id)
+async def grant_weekly_pack(user_id: int) -> str:
+    owned = await db.owned_item_ids(user_id)
     candidates = [iid for iid in _premium_item_ids() if iid not in owned]
     if not candidates:
         # fallback: compensate with coins
-        db.add_coins(user_id, int(getattr(config, "VIP_WEEKLY_PACK_FALLBACK_COINS", 30)))
+        await db.add_coins(user_id, int(getattr(config, "VIP_WEEKLY_PACK_FALLBACK_COINS", 30)))
         return "coins"
     iid = random.choice(candidates)
-    db.add_item(user_id, iid)
-    db.set_active_item(user_id, iid)
+    await db.add_item(user_id, iid)
+    await db.set_active_item(user_id, iid)
     return iid
 
 BP_REWARDS = {
@@ -44,19 +44,19 @@ BP_REWARDS = {
     30: {"free": {"type": "coins", "amount": 100}, "premium": {"type": "item", "id": "skin:xo:3d"}},
 }
 
-def grant_bp_reward(user_id: int, reward: dict) -> str:
+async def grant_bp_reward(user_id: int, reward: dict) -> str:
     rtype = reward.get("type")
     if rtype == "coins":
         amount = reward.get("amount", 0)
-        db.add_coins(user_id, amount)
+        await db.add_coins(user_id, amount)
         return f"{amount} 🪙"
     elif rtype == "item":
         iid = reward.get("id")
-        if db.has_item(user_id, iid):
-            db.add_coins(user_id, 50)
+        if await db.has_item(user_id, iid):
+            await db.add_coins(user_id, 50)
             return f"50 🪙 (компенсація за {iid})"
         else:
-            db.add_item(user_id, iid)
+            await db.add_item(user_id, iid)
             return f"Предмет {iid}!"
     return ""
 
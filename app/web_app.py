@@ -66,19 +66,21 @@ async def api_profile(request: web.Request):
         raise web.HTTPUnauthorized(text="Bad initData")
     uid = int(tg_user.get("id", 0))
 
-    from app.db import get_user, get_coins, is_vip
-    u = get_user(uid) or {}
+    from app.db_async import get_user_fields, get_rating, get_coins, is_vip
+    u = await get_user_fields(
+        uid, "username", "first_name", "coins", "bp_level", "bp_xp", "wallpaper",
+    ) or {}
     data = {
         "user_id": uid,
         "username": u.get("username", ""),
         "first_name": u.get("first_name", ""),
         "coins": int(u.get("coins", 0) or 0),
-        "rating_xo": int(u.get("rating", 1000) or 1000),
-        "rating_ck": int(u.get("rating_ck", 1000) or 1000),
+        "rating_xo": await get_rating(uid, "xo"),
+        "rating_ck": await get_rating(uid, "checkers"),
         "bp_level": int(u.get("bp_level", 1) or 1),
         "bp_xp": int(u.get("bp_xp", 0) or 0),
         "wallpaper": u.get("wallpaper", "default"),
-        "is_vip": is_vip(uid),
+        "is_vip": await is_vip(uid),
     }
     return web.json_response(data)
 
@@ -90,8 +92,8 @@ async def api_shop(request: web.Request):
         raise web.HTTPUnauthorized(text="Bad initData")
     uid = int(tg_user.get("id", 0))
 
-    from app.db import get_coins, has_item
-    coins = get_coins(uid)
+    from app.db_async import get_coins, has_item
+    coins = await get_coins(uid)
     items = []
     for it in SHOP_ITEMS:
         if it.get("kind") == "lootbox":
@@ -103,7 +105,7 @@ async def api_shop(request: web.Request):
             "price": it.get("price", 0),
             "kind": it.get("kind", "skin"),
             "game": it.get("game", "xo"),
-            "owned": has_item(uid, it["item_id"]),
+            "owned": await has_item(uid, it["item_id"]),
         })
     return web.json_response({"coins": coins, "items": items})
 
@@ -119,21 +121,21 @@ async def api_buy(request: web.Request):
     item_id = str(body.get("item_id", ""))
 
     from app.shop_items import get_item
-    from app.db import try_spend_coins, has_item, add_item, get_coins
+    from app.db_async import try_spend_coins, has_item, add_item, get_coins
 
     it = get_item(item_id)
     if not it:
         raise web.HTTPBadRequest(text="Unknown item")
-    if has_item(uid, item_id):
+    if await has_item(uid, item_id):
         return web.json_response({"ok": False, "error": "already_owned"})
 
     price = int(it.get("price", 0) or 0)
-    ok = try_spend_coins(uid, price)
+    ok = await try_spend_coins(uid, price)
     if not ok:
         return web.json_response({"ok": False, "error": "not_enough_coins"})
 
-    add_item(uid, item_id)
-    return web.json_response({"ok": True, "coins": get_coins(uid)})
+    await add_item(uid, item_id)
+    return web.json_response({"ok": True, "coins": await get_coins(uid)})
 
 
 # ---------------------------------------------------------------------------
@@ -2,23 +2,14 @@
 
 from typing import Optional, List, Tuple
 
-WIN_LINES = [
-    (0, 1, 2),
-    (3, 4, 5),
-    (6, 7, 8),
-    (0, 3, 6),
-    (1, 4, 7),
-    (2, 5, 8),
-    (0, 4, 8),
-    (2, 4, 6),
-]
+from app.game_engine import WIN_LINES, winning_line  # noqa: F401  (WIN_LINES re-exported)
 
 def get_winline(board: str) -> Optional[Tuple[str, List[int]]]:
     """
     Returns (winner, [idx, idx, idx]) where winner is 'X' or 'O'
     If no winning line -> None
     """
-    for a, b, c in WIN_LINES:
-        if board[a] != "." and board[a] == board[b] == board[c]:
-            return board[a], [a, b, c]
-    return None
+    line = winning_line(board)
+    if line is None:
+        return None
+    return board[line[0]], list(line)
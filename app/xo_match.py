@@ -0,0 +1,51 @@
+# app/xo_match.py
+"""Live XO match records (handlers_menu.PVP_MATCHES / AI_MATCHES).
+
+Slotted dataclasses instead of per-match dicts: no per-instance __dict__,
+no repeated string keys. The board is the 9-char string game_engine works
+on ("." empty, "X", "O"); moves are the played cells as a digit string.
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+
+EMPTY_BOARD = "........."
+
+
+@dataclass(slots=True)
+class PvPMatch:
+    x: int
+    o: int
+    x_chat: int = 0
+    o_chat: int = 0
+    x_msg: int = 0
+    o_msg: int = 0
+    x_lang: str = "en"
+    o_lang: str = "en"
+    board: str = EMPTY_BOARD
+    turn: str = "X"
+    status: str = "playing"  # playing | ended | finished | canceled
+    last_move: float = field(default_factory=time.time)
+    started_ts: float = field(default_factory=time.time)
+    moves: str = ""
+    # tournament context
+    tournament_id: int = 0
+    tmatch_id: int = 0
+
+    def restart(self) -> None:
+        self.board, self.turn, self.status, self.moves = EMPTY_BOARD, "X", "playing", ""
+        self.last_move = self.started_ts = time.time()
+
+
+@dataclass(slots=True)
+class AIMatch:
+    user_id: int
+    level: str = "normal"
+    board: str = EMPTY_BOARD
+    status: str = "playing"  # playing | ended
+
+
+def as_state(rec: PvPMatch | AIMatch) -> dict:
+    """The record's fields as a plain dict (dataclasses.asdict without the deep copy)."""
+    return {name: getattr(rec, name) for name in rec.__slots__}
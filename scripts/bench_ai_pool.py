@@ -0,0 +1,200 @@
+"""Event-loop lag with the AI moves inline vs on app.ai_pool.
+
+--games concurrent AI games (half checkers, half chess) each ask for
+--moves "hard" moves from positions of seeded random games, while
+app.loop_monitor measures the lag. Run once with the pool off (every move
+on the loop, as the routers did before) and once with --workers processes.
+
+Before timing, checks the pool behaviour:
+- pool moves are legal (checkers: one of the complete turns, chess: a legal
+  move of the position incl. its move stack);
+- cancel() resolves the caller with None;
+- a timed search is cut to the AI_POOL_TIMEOUT_SEC deadline and answers;
+- a job a worker picks up too late to answer gets an inline "easy" move
+  (checkers and chess), counted as a timeout;
+- a job past the deadline gets an inline "easy" move. The pool is replaced
+  if a worker has run that job for STUCK_SEC, and a request caught on a
+  replaced pool is resubmitted;
+- past AI_POOL_MAX_PENDING requests get an inline "easy" move.
+
+    python scripts/bench_ai_pool.py --games 8 --moves 3 --workers 1
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+
+def _positions(bb, chess, n: int, seed: int):
+    rng = random.Random(seed)
+    ck, ch = [], []
+    while len(ck) < n:
+        side, color = bb.sides(bb.INITIAL, bb.RED), bb.RED
+        for _ in range(rng.choice((6, 14, 24))):
+            turns = bb.side_turns(*side, color, bb.side_steps(*side, color), [])
+            if not turns:
+                break
+            m2, k2, e2, ek2 = rng.choice(turns)[3]
+            side, color = (e2, ek2, m2, k2), -color
+        else:
+            ck.append((bb.to_board(bb.join(color, *side)), color))
+    while len(ch) < n:
+        board = chess.Board()
+        for _ in range(rng.choice((4, 12, 30))):
+            legal = list(board.legal_moves)
+            if not legal:
+                break
+            board.push(rng.choice(legal))
+        if not board.is_game_over():
+            ch.append(board)
+    return ck, ch
+
+
+def _hang(level: str, sec: float, budget=None) -> str:
+    """A pool job that ignores its time budget (at every level but the "easy" fallback)."""
+    if level != "easy":
+        time.sleep(sec)
+    return level
+
+
+async def _check(ai_pool, bb, chess, ck, ch) -> None:
+    for board, color in ck:
+        side = bb.sides(bb.from_board(board), color)
+        legal = {bb.join(color, *t[3]) for t in bb.side_turns(*side, color, bb.side_steps(*side, color), [])}
+        after = await ai_pool.checkers_turn(board, color, "hard", "check")
+        assert bb.from_board(after) in legal
+    for board in ch:
+        mv = await ai_pool.chess_move(board, "hard", "check")
+        assert mv in board.legal_moves
+
+    # cancel: the caller gets None at once
+    board = ch[0]
+    task = asyncio.create_task(ai_pool.chess_move(board, "hard", "cancel-me"))
+    await asyncio.sleep(0.01)
+    assert ai_pool.cancel("cancel-me")
+    assert await task is None
+
+    # timeout: an inline "easy" move; a search cut to the deadline still answers in time
+    ck_board, ck_color = ck[0]
+    await ai_pool.checkers_turn(ck_board, ck_color, "normal", "idle")  # after the cancelled search
+    saved = ai_pool.AI_POOL_TIMEOUT_SEC, ai_pool.STUCK_SEC
+    ai_pool.AI_POOL_TIMEOUT_SEC, ai_pool.STUCK_SEC = 0.3, 0.1
+    before = ai_pool.stats()
+    mv = await ai_pool.chess_move(board, "hard", "short")
+    assert mv in board.legal_moves and ai_pool.stats()["completed"] == before["completed"] + 1
+    t0 = time.perf_counter()
+    res = await ai_pool._run("stuck", "hard", _hang, (30.0,))
+    fallback_ms = (time.perf_counter() - t0 - 0.3 - ai_pool.WAIT_MARGIN_SEC) * 1000
+    after = ai_pool.stats()
+    ai_pool.AI_POOL_TIMEOUT_SEC, ai_pool.STUCK_SEC = saved
+    assert res == "easy" and fallback_ms < 50, (res, fallback_ms)
+    assert after["timeouts"] == before["timeouts"] + 1 and after["inline"] == before["inline"] + 1
+    assert after["restarts"] == before["restarts"] + 1
+
+    # late start: a deadline inside REPLY_MARGIN_SEC is skipped by the worker, the caller moves "easy"
+    # (answered by the skip, before the caller's own wait runs out)
+    await ai_pool.checkers_turn(ck_board, ck_color, "normal", "warm")  # the replaced pool is up
+    saved = ai_pool.AI_POOL_TIMEOUT_SEC
+    ai_pool.AI_POOL_TIMEOUT_SEC = ai_pool.REPLY_MARGIN_SEC
+    before = ai_pool.stats()
+    t0 = time.perf_counter()
+    ck_after = await ai_pool.checkers_turn(ck_board, ck_color, "hard", "late-ck")
+    t1 = time.perf_counter()
+    ch_move = await ai_pool.chess_move(board, "hard", "late-ch")
+    late = max(t1 - t0, time.perf_counter() - t1)
+    after = ai_pool.stats()
+    ai_pool.AI_POOL_TIMEOUT_SEC = saved
+    assert late < ai_pool.REPLY_MARGIN_SEC, late
+    side = bb.sides(bb.from_board(ck_board), ck_color)
+    legal = {bb.join(ck_color, *t[3]) for t in bb.side_turns(*side, ck_color, bb.side_steps(*side, ck_color), [])}
+    assert bb.from_board(ck_after) in legal and ch_move in board.legal_moves
+    assert after["timeouts"] == before["timeouts"] + 2 and after["inline"] == before["inline"] + 2
+    assert after["completed"] == before["completed"] and after["errors"] == before["errors"]
+
+    # a request on a pool that gets replaced is resubmitted to the new one
+    before = ai_pool.stats()
+    task = asyncio.create_task(ai_pool.chess_move(board, "hard", "moved"))
+    await asyncio.sleep(0.05)
+    ai_pool._restart_pool(ai_pool._pool)
+    mv = await task
+    after = ai_pool.stats()
+    assert mv in board.legal_moves
+    assert after["completed"] == before["completed"] + 1 and after["inline"] == before["inline"]
+
+    # bounded queue: the second concurrent request gets an inline "easy" move
+    saved = ai_pool.AI_POOL_MAX_PENDING
+    ai_pool.AI_POOL_MAX_PENDING = 1
+    before = ai_pool.stats()
+    moves = await asyncio.gather(ai_pool.chess_move(board, "hard", "a"), ai_pool.chess_move(board, "hard", "b"))
+    after = ai_pool.stats()
+    ai_pool.AI_POOL_MAX_PENDING = saved
+    assert all(mv in board.legal_moves for mv in moves)
+    assert after["degraded"] == before["degraded"] + 1
+    print(f"checks: {len(ck)} checkers + {len(ch)} chess pool moves legal; cancel, late start, timeout "
+          f"({fallback_ms:.1f} ms fallback, pool restarted), resubmit and degrade ok")
+
+
+def run(games: int, moves: int, workers: int, seed: int) -> None:
+    root = Path(__file__).resolve().parents[1]
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+    import chess
+
+    from app import ai_pool, loop_monitor
+    from app.checkers_game import bitboard as bb
+
+    ck, ch = _positions(bb, chess, max(2, games // 2), seed)
+
+    async def game(i: int) -> None:
+        await asyncio.sleep(i * 0.01)
+        for j in range(moves):
+            if i % 2:
+                board = ch[(i // 2 + j) % len(ch)]
+                await ai_pool.chess_move(board, "hard", f"g{i}")
+            else:
+                board, color = ck[(i // 2 + j) % len(ck)]
+                await ai_pool.checkers_turn(board, color, "hard", f"g{i}")
+            await asyncio.sleep(0.2)  # the router's pause before the AI move
+
+    async def scenario(label: str, n_workers: int) -> None:
+        ai_pool.start(n_workers)
+        if n_workers:
+            await _check(ai_pool, bb, chess, ck, ch)
+        ai_pool.reset()
+        loop_monitor.reset()
+        loop_monitor.INTERVAL_SEC = 0.01
+        loop_monitor.start()
+        t0 = time.perf_counter()
+        await asyncio.gather(*(game(i) for i in range(games)))
+        sec = time.perf_counter() - t0
+        loop_monitor.stop()
+        ai_pool.stop()
+        lag, st = loop_monitor.stats(), ai_pool.stats()
+        hist = ", ".join(f"{k}: {v}" for k, v in lag["hist"].items() if v)
+        print(f"{label}: {games} games x {moves} hard moves in {sec:.1f}s")
+        print(f"  loop lag: avg {lag['avg_ms']:.1f} ms, max {lag['max_ms']:.1f} ms  [{hist}]")
+        if n_workers:
+            print(f"  pool: {st['completed']} moves, queue wait avg {st['wait_avg_ms']:.0f} ms / max {st['wait_max_ms']:.0f} ms, "
+                  f"think avg {st['think_avg_ms']:.0f} ms / max {st['think_max_ms']:.0f} ms, "
+                  f"max pending {st['max_pending']}, degraded {st['degraded']}, timeouts {st['timeouts']}, "
+                  f"restarts {st['restarts']}")
+
+    async def main() -> None:
+        await scenario("inline (on the loop)", 0)
+        await scenario(f"pool ({workers} workers)", workers)
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=8)
+    parser.add_argument("--moves", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=22)
+    args = parser.parse_args()
+    run(args.games, args.moves, args.workers, args.seed)
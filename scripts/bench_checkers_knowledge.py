@@ -0,0 +1,194 @@
+"""Checkers opening book and endgame table (app.checkers_game.knowledge).
+
+Needs the tables: python scripts/gen_checkers_knowledge.py
+
+First checks the tables:
+- book: walking the book from the start position (book side's turn, every
+  opponent reply), every book-side position yields a legal book turn;
+- endgame table, on --sample random covered positions:
+  - each value agrees with the values of its children: a win in n has a
+    child lost in n - 1 and none shorter; a loss in n has only won children,
+    the longest in n - 1; a draw has a drawn child and no lost one;
+  - for wins and losses within --mate-depth turns (and a choice of turn),
+    the search at that depth finds the same mate score.
+
+It then reports the probe cost (endgame value, book turn) and plays
+--games endgames won in at least --min-dist turns to the end. The winner plays from the table (or from
+the "hard" search alone); the loser always defends from the table. For
+each, it prints how many games were converted within --max-turns and the
+turns and time per move they took.
+
+    python scripts/bench_checkers_knowledge.py --sample 20000 --games 40
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+
+def _random_position(bb, rng, max_pieces: int):
+    crown = {bb.RED: bb.PROMOTION_ROW[bb.RED], bb.BLUE: bb.PROMOTION_ROW[bb.BLUE]}
+    while True:
+        n = rng.randint(2, max_pieces)
+        n_red = rng.randint(1, n - 1)
+        pos = [0, 0, 0, 0]
+        for i, s in enumerate(rng.sample(range(32), n)):
+            color = bb.RED if i < n_red else bb.BLUE
+            king = rng.random() < 0.5 or bool(bb.BIT[s] & crown[color])
+            pos[(0 if color == bb.RED else 2) + king] |= bb.BIT[s]
+        color = rng.choice((bb.RED, bb.BLUE))
+        return bb.sides(bb.Position(*pos), color), color
+
+
+def _children(bb, side, color):
+    return [t[3] for t in bb.side_turns(*side, color, bb.side_steps(*side, color), [])]
+
+
+def _check_book(bb, K) -> int:
+    checked = 0
+
+    def walk(side, color, ply, book_color, seen):
+        nonlocal checked
+        kids = _children(bb, side, color)
+        if not kids:
+            return
+        if color == book_color:
+            after = K.book_turn(side, color)
+            if after is None:
+                return  # past the book's horizon
+            assert after in kids
+            key = bb.zobrist_side(*side, color)
+            if key in seen:
+                return
+            seen.add(key)
+            checked += 1
+            kids = [after]
+        elif ply > 12:
+            return
+        for m2, k2, e2, ek2 in kids:
+            walk((e2, ek2, m2, k2), -color, ply + 1, book_color, seen)
+
+    for book_color in (bb.RED, bb.BLUE):
+        walk(bb.sides(bb.INITIAL, bb.RED), bb.RED, 0, book_color, set())
+    assert checked, "empty book"
+    return checked
+
+
+def _check_egtb(bb, K, S, rng, sample: int, mate_depth: int, max_pieces: int) -> None:
+    searched = 0
+    for _ in range(sample):
+        side, color = _random_position(bb, rng, max_pieces)
+        v = K.egtb_value(side, color)
+        assert v is not None, (side, color)
+        kids = []
+        for m2, k2, e2, ek2 in _children(bb, side, color):
+            kids.append(K.LOSS if not (e2 | ek2) else K.egtb_value((e2, ek2, m2, k2), -color))
+        lost_in = [c - K.LOSS for c in kids if c >= K.LOSS]
+        won_in = [c for c in kids if 0 < c < K.LOSS]
+        if v == K.DRAW:
+            assert not lost_in and K.DRAW in kids, (side, color, kids)
+            continue
+        if v < K.LOSS:
+            assert min(lost_in) == v - 1, (side, color, v, kids)
+            mate = v
+        else:
+            assert len(won_in) == len(kids) and max(won_in, default=-1) == v - K.LOSS - 1, (side, color, v, kids)
+            mate = v - K.LOSS
+        if mate <= mate_depth:
+            S.clear_tt()
+            res = S.search(side, color, S.SearchLimits(depth=mate))
+            want = S.WIN - mate if v < K.LOSS else -(S.WIN - mate)
+            if len(kids) > 1:  # the search plays a forced turn without scoring it
+                assert res.score == want, (side, color, v, res.score, want)
+            searched += 1
+    print(f"endgame table: {sample} random positions agree with their children; "
+          f"{searched} mates within {mate_depth} turns agree with the search")
+
+
+def _play(bb, K, S, start, color, attacker, limits, max_turns: int):
+    """Plays until the attacker wins; returns (turns, attacker seconds) or None."""
+    side, turns, sec = start, 0, 0.0
+    attacker_color = color
+    while turns < max_turns:
+        if not _children(bb, side, color):
+            return (turns, sec) if color != attacker_color else None
+        if color == attacker_color:
+            t0 = time.perf_counter()
+            after = K.egtb_turn(side, color) if attacker == "table" else S.search(side, color, limits).side
+            sec += time.perf_counter() - t0
+        else:
+            after = K.egtb_turn(side, color)
+        m2, k2, e2, ek2 = after
+        side, color, turns = (e2, ek2, m2, k2), -color, turns + 1
+        if not (m2 | k2):
+            return None
+    return None
+
+
+def run(sample: int, games: int, min_dist: int, mate_depth: int, max_turns: int, seed: int) -> None:
+    root = Path(__file__).resolve().parents[1]
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+    from app.checkers_game import bitboard as bb
+    from app.checkers_game import knowledge as K
+    from app.checkers_game import search as S
+    from app.checkers_game.ai import LEVELS
+    from app import config
+
+    egtb = K._table(config.CK_EGTB_PATH, K.EGTB_MAGIC)
+    book = K._table(config.CK_BOOK_PATH, K.BOOK_MAGIC)
+    assert egtb is not None and book is not None, "run scripts/gen_checkers_knowledge.py first"
+    max_pieces = egtb.param
+    rng = random.Random(seed)
+
+    print(f"book: {_check_book(bb, K)} book-side positions reachable from the start give legal turns")
+    _check_egtb(bb, K, S, rng, sample, mate_depth, max_pieces)
+
+    probes = [_random_position(bb, rng, max_pieces) for _ in range(20000)]
+    t0 = time.perf_counter()
+    for side, color in probes:
+        K.egtb_value(side, color)
+    probe_us = (time.perf_counter() - t0) / len(probes) * 1e6
+    start = bb.sides(bb.INITIAL, bb.RED)
+    t0 = time.perf_counter()
+    for _ in range(2000):
+        K.book_turn(start, bb.RED)
+    book_us = (time.perf_counter() - t0) / 2000 * 1e6
+    print(f"probe: endgame value {probe_us:.1f} us ({len(egtb)} positions, <= {max_pieces} pieces), "
+          f"book turn {book_us:.1f} us ({len(book)} positions)")
+
+    won = []
+    while len(won) < games:
+        side, color = _random_position(bb, rng, max_pieces)
+        v = K.egtb_value(side, color)
+        if min_dist <= v < K.LOSS:
+            won.append((side, color, v))
+    print(f"{games} endgames won in >= {min_dist} turns (mean {sum(v for *_x, v in won) / games:.1f} turns), "
+          f"loser defends from the table:")
+    for name, attacker in (("table", "table"), (f"hard search ({config.CK_AI_HARD_SEC:g}s)", "search")):
+        S.clear_tt()
+        done, turns, sec = 0, 0, 0.0
+        for side, color, _v in won:
+            res = _play(bb, K, S, side, color, attacker, LEVELS["hard"], max_turns)
+            if res is not None:
+                done += 1
+                turns += res[0]
+                sec += res[1]
+        moves = max(1, (turns + 1) // 2)
+        print(f"  {name:22} converted {done:3d}/{games} within {max_turns} turns, "
+              f"mean {turns / max(done, 1):5.1f} turns, {sec / moves * 1000:7.1f} ms per winning-side move")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sample", type=int, default=20000)
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--min-dist", type=int, default=9, help="shortest win to play out, in turns")
+    parser.add_argument("--mate-depth", type=int, default=5)
+    parser.add_argument("--max-turns", type=int, default=80)
+    parser.add_argument("--seed", type=int, default=25)
+    args = parser.parse_args()
+    run(args.sample, args.games, args.min_dist, args.mate_depth, args.max_turns, args.seed)
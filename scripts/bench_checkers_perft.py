@@ -0,0 +1,226 @@
+"""Checkers move generation: bitboards (app.checkers_game.bitboard) against
+the 8x8 list-of-lists generator they replaced.
+
+The old generator is kept below (_old_*), unchanged except for the names.
+
+First checks that the two generators agree:
+- perft counts from the initial position;
+- legal_moves() (the engine.py adapter) against the old legal_moves() on
+  every position of --games random games. These games reach kings, flying
+  captures and multi-jump chains. The check covers forced continuations,
+  promotion and has_any_moves().
+
+It then times perft --depth three ways: the old generator, the list API
+through the adapter, and the native bitboard generator (the one the AI
+builds on).
+
+    python scripts/bench_checkers_perft.py --depth 7 --games 300
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+SIZE = 8
+DIRS = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+
+# ---- the old generator ----
+def _color(v: int) -> int:
+    return 1 if v > 0 else -1 if v < 0 else 0
+
+
+def _in(r: int, c: int) -> bool:
+    return 0 <= r < SIZE and 0 <= c < SIZE
+
+
+def _old_captures(board, r, c, StepMove):
+    v = board[r][c]
+    col = _color(v)
+    res = []
+    if abs(v) != 2:
+        for dr, dc in DIRS:
+            r1, c1, r2, c2 = r + dr, c + dc, r + 2 * dr, c + 2 * dc
+            if not _in(r2, c2) or board[r2][c2] != 0:
+                continue
+            mid = board[r1][c1]
+            if mid != 0 and _color(mid) == -col:
+                res.append(StepMove((r, c), (r2, c2), ((r1, c1),)))
+        return res
+    for dr, dc in DIRS:
+        rr, cc = r + dr, c + dc
+        enemy = None
+        while _in(rr, cc):
+            cell = board[rr][cc]
+            if cell == 0:
+                if enemy is not None:
+                    res.append(StepMove((r, c), (rr, cc), (enemy,)))
+            elif _color(cell) == col or enemy is not None:
+                break
+            else:
+                enemy = (rr, cc)
+            rr, cc = rr + dr, cc + dc
+    return res
+
+
+def _old_simple(board, r, c, StepMove):
+    v = board[r][c]
+    col = _color(v)
+    res = []
+    if abs(v) != 2:
+        for dr, dc in ([(-1, -1), (-1, 1)] if col == 1 else [(1, -1), (1, 1)]):
+            rr, cc = r + dr, c + dc
+            if _in(rr, cc) and board[rr][cc] == 0:
+                res.append(StepMove((r, c), (rr, cc), ()))
+        return res
+    for dr, dc in DIRS:
+        rr, cc = r + dr, c + dc
+        while _in(rr, cc) and board[rr][cc] == 0:
+            res.append(StepMove((r, c), (rr, cc), ()))
+            rr, cc = rr + dr, cc + dc
+    return res
+
+
+def _old_legal_moves(board, color, StepMove, forced_from=None):
+    if forced_from is not None:
+        r, c = forced_from
+        if _color(board[r][c]) != color:
+            return {}
+        caps = _old_captures(board, r, c, StepMove)
+        return {(r, c): caps} if caps else {}
+    must = any(_color(board[r][c]) == color and _old_captures(board, r, c, StepMove)
+               for r in range(SIZE) for c in range(SIZE))
+    moves = {}
+    for r in range(SIZE):
+        for c in range(SIZE):
+            if _color(board[r][c]) != color:
+                continue
+            pm = _old_captures(board, r, c, StepMove) if must else _old_simple(board, r, c, StepMove)
+            if pm:
+                moves[(r, c)] = pm
+    return moves
+
+
+def _old_apply(board, mv):
+    b = [row[:] for row in board]
+    piece = b[mv.fr[0]][mv.fr[1]]
+    b[mv.fr[0]][mv.fr[1]] = 0
+    b[mv.to[0]][mv.to[1]] = piece
+    for cr, cc in mv.captured:
+        b[cr][cc] = 0
+    return b
+
+
+def _old_promote(board, last_to):
+    b = [row[:] for row in board]
+    r, c = last_to
+    if b[r][c] == 1 and r == 0:
+        b[r][c] = 2
+    elif b[r][c] == -1 and r == SIZE - 1:
+        b[r][c] = -2
+    return b
+
+
+def _turns(board, color, legal, apply, promote, forced_from=None):
+    res = []
+    for steps in legal(board, color, forced_from).values():
+        for step in steps:
+            b2 = apply(board, step)
+            if step.captured and legal(b2, color, step.to):
+                res.extend(_turns(b2, color, legal, apply, promote, step.to))
+            else:
+                res.append(promote(b2, step.to))
+    return res
+
+
+def _perft_list(board, color, depth, legal, apply, promote) -> int:
+    children = _turns(board, color, legal, apply, promote)
+    if depth == 1:
+        return len(children)
+    return sum(_perft_list(b, -color, depth - 1, legal, apply, promote) for b in children)
+
+
+def _check(engine, bb, games: int, depth: int, seed: int) -> None:
+    StepMove = engine.StepMove
+
+    def old_legal(board, color, forced_from=None):
+        return _old_legal_moves(board, color, StepMove, forced_from)
+
+    start = engine.initial_board()
+    for d in range(1, depth + 1):
+        old = _perft_list(start, engine.RED, d, old_legal, _old_apply, _old_promote)
+        assert old == bb.perft(bb.INITIAL, engine.RED, d), d
+
+    rng = random.Random(seed)
+    positions = kings = chains = 0
+    for _ in range(games):
+        board, color, forced = engine.initial_board(), engine.RED, None
+        for _ply in range(200):
+            positions += 1
+            moves = engine.legal_moves(board, color, forced_from=forced)
+            assert moves == old_legal(board, color, forced), (board, color, forced)
+            assert engine.count_pieces(board, color) == sum(_color(v) == color for row in board for v in row)
+            if forced is None:
+                assert engine.has_any_moves(board, color) == bool(moves)
+                assert bb.from_board(board) == bb.from_cells(engine.pack_board(board))
+            if not moves:
+                break
+            step = rng.choice([s for ss in moves.values() for s in ss])
+            new = engine.apply_step(board, step)
+            assert new == _old_apply(board, step) and board != new
+            board = new
+            if step.captured and engine.legal_moves(board, color, forced_from=step.to):
+                forced = step.to
+                chains += 1
+                continue
+            promoted = engine.maybe_promote(board, step.to)
+            assert promoted == _old_promote(board, step.to)
+            kings += promoted != board
+            board, color, forced = promoted, -color, None
+    print(f"equivalence: perft 1..{depth} and legal_moves on {positions} positions of {games} games "
+          f"({kings} promotions, {chains} chain continuations)")
+
+
+def run(depth: int, games: int, check_depth: int, seed: int) -> None:
+    root = Path(__file__).resolve().parents[1]
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+    from app.checkers_game import bitboard as bb
+    from app.checkers_game import engine
+
+    _check(engine, bb, games, check_depth, seed)
+
+    def old_legal(board, color, forced_from=None):
+        return _old_legal_moves(board, color, engine.StepMove, forced_from)
+
+    def adapter_legal(board, color, forced_from=None):
+        return engine.legal_moves(board, color, forced_from=forced_from)
+
+    start = engine.initial_board()
+    runs = (
+        ("8x8 lists (old)", lambda: _perft_list(start, engine.RED, depth, old_legal, _old_apply, _old_promote)),
+        ("engine.py adapter", lambda: _perft_list(start, engine.RED, depth, adapter_legal,
+                                                  engine.apply_step, engine.maybe_promote)),
+        ("bitboard native", lambda: bb.perft(bb.INITIAL, engine.RED, depth)),
+    )
+    print(f"perft({depth}) from the initial position:")
+    base = None
+    for name, fn in runs:
+        t0 = time.perf_counter()
+        nodes = fn()
+        sec = time.perf_counter() - t0
+        base = base or sec
+        print(f"  {name:18} {nodes:9d} leaves  {sec:7.2f}s  {nodes / sec:9.0f} leaves/s  x{base / sec:5.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--depth", type=int, default=7)
+    parser.add_argument("--games", type=int, default=300)
+    parser.add_argument("--check-depth", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=20)
+    args = parser.parse_args()
+    run(args.depth, args.games, args.check_depth, args.seed)
@@ -0,0 +1,179 @@
+"""Checkers AI search (app.checkers_game.search) against the old "hard" minimax.
+
+The old "hard" AI is kept below (_OldAI): a 3-ply minimax (its turn, then
+depth 2) over full 8x8 board copies, with no transposition table, ordering
+or clock. It runs on the old list generator from bench_checkers_perft.py,
+as it did before the bitboards.
+
+Test positions are the initial position plus positions reached by
+--positions seeded random games, taken mid-game and in the endgame.
+
+First checks the search on every test position. At depths 1..--check-depth
+its root score must equal a plain negamax with the same evaluation and
+quiescence but no pruning, table or ordering. The move it returns must be
+a legal complete turn.
+
+It then reports nodes per second and time per move for:
+- the old minimax (3 plies);
+- the new search at depth 2, at the "normal" depth and under the "hard"
+  time budget (with the depth reached).
+
+    python scripts/bench_checkers_search.py --positions 12
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+
+# ---- the old AI ----
+class _OldAI:
+    def __init__(self, StepMove):
+        from bench_checkers_perft import _old_apply, _old_legal_moves, _old_promote
+
+        self.legal = lambda board, color, forced_from=None: _old_legal_moves(board, color, StepMove, forced_from)
+        self.apply, self.promote = _old_apply, _old_promote
+        self.nodes = 0
+
+    def eval(self, board, perspective: int) -> int:
+        score = 0
+        for row in board:
+            for v in row:
+                if v:
+                    val = 3 if abs(v) == 2 else 1
+                    score += val if (v > 0) == (perspective > 0) else -val
+        return score
+
+    def turn_ends(self, board, color, forced_from=None):
+        res = []
+        for steps in self.legal(board, color, forced_from).values():
+            for step in steps:
+                b2 = self.apply(board, step)
+                if step.captured and self.legal(b2, color, step.to):
+                    res.extend(self.turn_ends(b2, color, step.to))
+                else:
+                    res.append(self.promote(b2, step.to))
+        return res
+
+    def minimax(self, board, turn, depth, alpha, beta, perspective):
+        self.nodes += 1
+        if not any(v * turn > 0 for row in board for v in row) or not self.legal(board, turn):
+            return 10_000 if -turn == perspective else -10_000
+        if depth <= 0:
+            return self.eval(board, perspective)
+        best = -10**9 if turn == perspective else 10**9
+        for b2 in self.turn_ends(board, turn):
+            val = self.minimax(b2, -turn, depth - 1, alpha, beta, perspective)
+            if turn == perspective:
+                best = max(best, val)
+                alpha = max(alpha, best)
+            else:
+                best = min(best, val)
+                beta = min(beta, best)
+            if beta <= alpha:
+                break
+        return best
+
+    def choose_hard(self, board, color):
+        best, best_val = None, -10**9
+        for b2 in self.turn_ends(board, color):
+            self.nodes += 1
+            v = self.minimax(b2, -color, 2, -10**9, 10**9, color)
+            if v > best_val:
+                best_val, best = v, b2
+        return best
+
+
+def _positions(bb, n: int, seed: int):
+    rng = random.Random(seed)
+    out = [(bb.sides(bb.INITIAL, bb.RED), bb.RED)]
+    while len(out) < n:
+        side, color, plies = bb.sides(bb.INITIAL, bb.RED), bb.RED, rng.choice((12, 24, 40, 60))
+        for _ in range(plies):
+            turns = bb.side_turns(*side, color, bb.side_steps(*side, color), [])
+            if not turns:
+                break
+            m2, k2, e2, ek2 = rng.choice(turns)[3]
+            side, color = (e2, ek2, m2, k2), -color
+        else:
+            if len(bb.side_turns(*side, color, bb.side_steps(*side, color), [])) > 1:
+                out.append((side, color))
+    return out
+
+
+def _plain_root(bb, S, side, color, depth: int) -> int:
+    def negamax(side, color, depth, ply):
+        steps = bb.side_steps(*side, color)
+        if not steps:
+            return -S.WIN + ply
+        if depth <= 0 and (not steps[0][2] or ply >= S.QUIESCENCE_PLIES):
+            return S.evaluate(*side, color)
+        return max(-negamax((e2, ek2, m2, k2), -color, depth - 1, ply + 1)
+                   for _fr, _to, _t, (m2, k2, e2, ek2) in bb.side_turns(*side, color, steps, []))
+
+    return negamax(side, color, depth, 0)
+
+
+def _check(bb, S, positions, depth: int) -> None:
+    for side, color in positions:
+        legal = {t[3] for t in bb.side_turns(*side, color, bb.side_steps(*side, color), [])}
+        for d in range(1, depth + 1):
+            S.clear_tt()
+            res = S.search(side, color, S.SearchLimits(depth=d))
+            plain = _plain_root(bb, S, side, color, d)
+            if abs(plain) > S.MATE_BOUND:
+                assert (res.score > 0) == (plain > 0), (side, color, d, res.score, plain)
+                break  # the search stops at the first mate it proves
+            assert res.score == plain, (side, color, d, res.score, plain)
+            assert res.side in legal
+    print(f"search: root scores equal plain negamax at depths 1..{depth} on {len(positions)} positions")
+
+
+def run(n_positions: int, check_depth: int, seed: int) -> None:
+    root = Path(__file__).resolve().parents[1]
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+    from app import config
+    from app.checkers_game import bitboard as bb
+    from app.checkers_game import engine
+    from app.checkers_game import search as S
+    from app.checkers_game.ai import LEVELS
+
+    positions = _positions(bb, n_positions, seed)
+    _check(bb, S, positions, check_depth)
+
+    old = _OldAI(engine.StepMove)
+    t0 = time.perf_counter()
+    for side, color in positions:
+        old.choose_hard(bb.to_board(bb.join(color, *side)), color)
+    old_sec = time.perf_counter() - t0
+    n = len(positions)
+    print(f"per move over {n} positions:")
+    print(f"  old hard: minimax, 3 plies   {old_sec / n * 1000:8.1f} ms  {old.nodes / old_sec:8.0f} nodes/s")
+
+    runs = (
+        ("search depth 2", S.SearchLimits(depth=2)),
+        (f"normal: depth {LEVELS['normal'].depth}", LEVELS["normal"]),
+        (f"hard: {config.CK_AI_HARD_SEC:g}s budget", LEVELS["hard"]),
+    )
+    for name, limits in runs:
+        S.clear_tt()
+        nodes = sec = depth = 0
+        for side, color in positions:
+            res = S.search(side, color, limits)
+            nodes += res.nodes
+            sec += res.seconds
+            depth += res.depth
+        print(f"  {name:28} {sec / n * 1000:8.1f} ms  {nodes / sec:8.0f} nodes/s   mean depth {depth / n:4.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--positions", type=int, default=12)
+    parser.add_argument("--check-depth", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=21)
+    args = parser.parse_args()
+    run(args.positions, args.check_depth, args.seed)
@@ -0,0 +1,245 @@
+"""Chess AI search (app.chess_game.search) against the old "hard" 2-ply AI.
+
+The old "hard" AI is kept below (_OldAI), unchanged except for the names and
+a node counter. It expands every reply to every move and scores each leaf
+with checkmate/stalemate/draw probes and legal_moves.count().
+
+Test positions: Win At Chess (WAC) 001-020, each with its best move.
+
+First checks the search on the test positions. At depths 1..--check-depth
+its root score must equal a plain negamax with the same evaluation,
+quiescence, check extension and draw rules but no pruning, table or
+ordering. The running material + PST score must equal a recount after every
+move of --games random games.
+
+It then reports, per AI, the solve rate (best move found), time per
+position and nodes per second:
+- the old hard AI;
+- the new search under --time seconds per position (the "hard" budget by
+  default).
+
+    python scripts/bench_chess_search.py --time 1.0
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+WAC = (
+    ("2rr3k/pp3pp1/1nnqbN1p/3pN3/2pP4/2P3Q1/PPB4P/R4RK1 w - -", "Qg6"),
+    ("8/7p/5k2/5p2/p1p2P2/Pr1pPK2/1P1R3P/8 b - -", "Rxb2"),
+    ("5rk1/1ppb3p/p1pb4/6q1/3P1p1r/2P1R2P/PP1BQ1P1/5RKN w - -", "Rg3"),
+    ("r1bq2rk/pp3pbp/2p1p1pQ/7P/3P4/2PB1N2/PP3PPR/2KR4 w - -", "Qxh7+"),
+    ("5k2/6pp/p1qN4/1p1p4/3P4/2PKP2Q/PP3r2/3R4 b - -", "Qc4+"),
+    ("7k/p7/1R5K/6r1/6p1/6P1/8/8 w - -", "Rb7"),
+    ("rnbqkb1r/pppp1ppp/8/4P3/6n1/7P/PPPNPPP1/R1BQKBNR b KQkq -", "Ne3"),
+    ("r4q1k/p2bR1rp/2p2Q1N/5p2/5p2/2P5/PP3PPP/R5K1 w - -", "Rf7"),
+    ("3q1rk1/p4pp1/2pb3p/3p4/6Pr/1PNQ4/P1PB1PP1/4RRK1 b - -", "Bh2+"),
+    ("2br2k1/2q3rn/p2NppQ1/2p1P3/Pp5R/4P3/1P3PPP/3R2K1 w - -", "Rh7"),
+    ("r1b1kb1r/3q1ppp/pBp1pn2/8/Np3P2/5B2/PPP3PP/R2Q1RK1 w kq -", "Bxc6"),
+    ("4k1r1/2p3r1/1pR1p3/3pP2p/3P2qP/P4N2/1PQ4P/5R1K b - -", "Qxf3+"),
+    ("5rk1/pp4p1/2n1p2p/2Npq3/2p5/6P1/P3P1BP/R4Q1K w - -", "Qxf8+"),
+    ("r2rb1k1/pp1q1p1p/2n1p1p1/2bp4/5P2/PP1BPR1Q/1BPN2PP/R5K1 w - -", "Qxh7+"),
+    ("1R6/1brk2p1/4p2p/p1P1Pp2/P7/6P1/1P4P1/2R3K1 w - -", "Rxb7"),
+    ("r4rk1/ppp2ppp/2n5/2bqp3/8/P2PB3/1PP1NPPP/R2Q1RK1 w - -", "Nc3"),
+    ("1k5r/pppbn1pp/4q1r1/1P3p2/2NPp3/1QP5/P4PPP/R1B1R1K1 w - -", "Ne5"),
+    ("R7/P4k2/8/8/8/8/r7/6K1 w - -", "Rh8"),
+    ("r1b2rk1/ppbn1ppp/4p3/1QP4q/3P4/N4N2/5PPP/R1B2RK1 w - -", "c6"),
+    ("r2qkb1r/1ppb1ppp/p7/4p3/P1Q1P3/2P5/5PPP/R1B2KNR b kq -", "Bb5"),
+)
+
+
+# ---- the old AI ----
+class _OldAI:
+    VALUE = {1: 100, 2: 320, 3: 330, 4: 500, 5: 900, 6: 0}
+
+    def __init__(self, chess):
+        self.chess = chess
+        self.nodes = 0
+
+    def material_eval(self, board, side) -> int:
+        score = 0
+        for piece_type, val in self.VALUE.items():
+            score += len(board.pieces(piece_type, side)) * val
+            score -= len(board.pieces(piece_type, not side)) * val
+        return score
+
+    def position_eval(self, board, side) -> int:
+        if board.is_checkmate():
+            return -100_000 if board.turn == side else 100_000
+        if board.is_stalemate() or board.is_insufficient_material() or board.can_claim_draw():
+            return 0
+        score = self.material_eval(board, side)
+        mobility = board.legal_moves.count()
+        score += mobility if board.turn == side else -mobility
+        if board.is_check():
+            score += 25 if board.turn != side else -25
+        return score
+
+    def tactical_score(self, board, move) -> int:
+        score = 0
+        if board.is_capture(move):
+            captured = board.piece_at(move.to_square)
+            if captured:
+                score += self.VALUE.get(captured.piece_type, 0) * 8
+        if move.promotion:
+            score += self.VALUE.get(move.promotion, 0) * 4
+        board.push(move)
+        if board.is_checkmate():
+            score += 200_000
+        elif board.is_check():
+            score += 50
+        board.pop()
+        return score
+
+    def choose_hard(self, board):
+        legal = list(board.legal_moves)
+        side = board.turn
+        best_score = -10**9
+        best_moves = []
+        for mv in legal:
+            board.push(mv)
+            self.nodes += 1
+            if board.is_checkmate():
+                score = 200_000
+            else:
+                opp_moves = list(board.legal_moves)
+                if not opp_moves:
+                    score = self.position_eval(board, side)
+                else:
+                    worst_reply = 10**9
+                    for omv in opp_moves:
+                        board.push(omv)
+                        self.nodes += 1
+                        val = self.position_eval(board, side)
+                        board.pop()
+                        if val < worst_reply:
+                            worst_reply = val
+                    score = worst_reply
+            board.pop()
+            score += self.tactical_score(board, mv)
+            if score > best_score:
+                best_score = score
+                best_moves = [mv]
+            elif score == best_score:
+                best_moves.append(mv)
+        return random.choice(best_moves) if best_moves else random.choice(legal)
+
+
+def _plain_root(S, board, depth: int) -> int:
+    s = S._Search(board.copy(stack=False), None, S._game_positions(board))
+    s.seen.add(S._key(board))
+
+    def negamax(depth, ply):
+        b = s.board
+        key = S._key(b)
+        if b.halfmove_clock >= 100 or key in s.seen:
+            return 0
+        in_check = b.is_check()
+        if in_check:
+            depth += 1
+        if depth <= 0:
+            return s.quiesce(-S.INF, S.INF, ply)
+        moves = list(b.legal_moves)
+        if not moves:
+            return -S.WIN + ply if in_check else 0
+        s.seen.add(key)
+        best = -S.INF
+        for mv in moves:
+            s.push(mv)
+            best = max(best, -negamax(depth - 1, ply + 1))
+            s.pop()
+        s.seen.discard(key)
+        return best
+
+    best = -S.INF
+    for mv in list(board.legal_moves):
+        s.push(mv)
+        best = max(best, -negamax(depth - 1, 1))
+        s.pop()
+    return best
+
+
+def _check(chess, S, boards, depth: int, games: int, seed: int) -> None:
+    rng = random.Random(seed)
+    plies = 0
+    for _ in range(games):
+        s = S._Search(chess.Board(), None, set())
+        for _ply in range(200):
+            moves = list(s.board.legal_moves)
+            if not moves:
+                break
+            s.push(rng.choice(moves))
+            plies += 1
+            assert (s.score, s.phase) == S.material_pst(s.board), s.board.fen()
+
+    margin, S.DELTA_MARGIN = S.DELTA_MARGIN, 10**6  # delta pruning only bounds the value, compare it exact
+    try:
+        for board in boards:
+            for d in range(1, depth + 1):
+                S.clear_tt()
+                res = S.search(board, S.SearchLimits(depth=d))
+                plain = _plain_root(S, board, d)
+                if abs(plain) > S.MATE_BOUND:
+                    assert (res.score > 0) == (plain > 0), (board.fen(), d, res.score, plain)
+                    break  # the search stops at the first mate it proves
+                assert res.score == plain, (board.fen(), d, res.score, plain)
+                assert res.move in board.legal_moves
+    finally:
+        S.DELTA_MARGIN = margin
+    print(f"search: running score equals a recount over {plies} plies of {games} games; "
+          f"root scores equal plain negamax at depths 1..{depth} on {len(boards)} positions")
+
+
+def run(budget: float, check_depth: int, games: int, seed: int) -> None:
+    root = Path(__file__).resolve().parents[1]
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+    import chess
+
+    from app.chess_game import search as S
+
+    boards = [chess.Board(fen + " 0 1") for fen, _bm in WAC]
+    best = [b.parse_san(bm) for b, (_fen, bm) in zip(boards, WAC)]
+    _check(chess, S, boards, check_depth, games, seed)
+
+    random.seed(seed)
+    old = _OldAI(chess)
+    solved, t0 = 0, time.perf_counter()
+    for board, bm in zip(boards, best):
+        solved += old.choose_hard(board.copy()) == bm
+    old_sec = time.perf_counter() - t0
+    n = len(boards)
+    print(f"WAC 001-{n:03d}:")
+    print(f"  {'old hard: 2 plies':24} solved {solved:2d}/{n}  {old_sec / n * 1000:7.0f} ms/pos  "
+          f"{old.nodes / old_sec:8.0f} nodes/s")
+
+    S.clear_tt()
+    solved = nodes = depth = 0
+    sec = 0.0
+    for board, bm in zip(boards, best):
+        res = S.search(board, S.SearchLimits(time_sec=budget))
+        solved += res.move == bm
+        nodes += res.nodes
+        sec += res.seconds
+        depth += res.depth
+    print(f"  {f'search: {budget:g}s budget':24} solved {solved:2d}/{n}  {sec / n * 1000:7.0f} ms/pos  "
+          f"{nodes / sec:8.0f} nodes/s   mean depth {depth / n:4.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--time", type=float, default=None, help="seconds per position (default: CH_AI_HARD_SEC)")
+    parser.add_argument("--check-depth", type=int, default=2)
+    parser.add_argument("--games", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=23)
+    args = parser.parse_args()
+    if args.time is None:
+        sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+        from app.config import CH_AI_HARD_SEC
+
+        args.time = CH_AI_HARD_SEC
+    run(args.time, args.check_depth, args.games, args.seed)
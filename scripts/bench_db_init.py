@@ -0,0 +1,85 @@
+"""Per-call latency of app.db helpers with and without the old per-call schema bootstrap.
+
+Runs against a throw-away SQLite file, never against the production DB:
+
+    python scripts/bench_db_init.py --users 2000 --calls 2000
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def _percentiles(samples: list[float]) -> str:
+    s = sorted(samples)
+    n = len(s)
+    p50 = s[n // 2] * 1e6
+    p99 = s[min(n - 1, int(n * 0.99))] * 1e6
+    avg = sum(s) / n * 1e6
+    return f"avg={avg:8.1f}us p50={p50:8.1f}us p99={p99:8.1f}us"
+
+
+def run(users: int, calls: int) -> None:
+    root = Path(__file__).resolve().parents[1]
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+
+    tmp = tempfile.mkdtemp(prefix="sm_bench_")
+    os.environ["DB_PATH"] = str(Path(tmp) / "bench.db")
+
+    from app import db
+
+    db.init_db()
+    for uid in range(1, users + 1):
+        db.upsert_user(uid, f"user{uid}", f"User {uid}", "uk")
+
+    def legacy_bootstrap() -> None:
+        # What every helper paid before: the whole schema script + column checks + meta upserts.
+        # (The later migrations reshape the users table and cannot be re-run on top of the split.)
+        con = db._con()
+        try:
+            for version, _name, step in db.MIGRATIONS:
+                if version > 2:
+                    break
+                step(con)
+            con.commit()
+        finally:
+            con.close()
+
+    cases = [
+        ("get_user", lambda uid: db.get_user(uid)),
+        ("get_rating", lambda uid: db.get_rating(uid)),
+        ("add_coins", lambda uid: db.add_coins(uid, 1)),
+        ("bump_total", lambda uid: db.bump_total(uid, win=True)),
+    ]
+
+    print(f"DB={db.DB_PATH} users={users} calls={calls} schema_version={db.SCHEMA_VERSION}")
+    for name, fn in cases:
+        before: list[float] = []
+        after: list[float] = []
+        for i in range(calls):
+            uid = (i % users) + 1
+            t0 = time.perf_counter()
+            legacy_bootstrap()
+            fn(uid)
+            before.append(time.perf_counter() - t0)
+        for i in range(calls):
+            uid = (i % users) + 1
+            t0 = time.perf_counter()
+            fn(uid)
+            after.append(time.perf_counter() - t0)
+        speedup = (sum(before) / len(before)) / max(1e-12, sum(after) / len(after))
+        print(f"{name:12s} before: {_percentiles(before)}")
+        print(f"{name:12s} after:  {_percentiles(after)}  x{speedup:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--calls", type=int, default=1000)
+    args = parser.parse_args()
+    run(args.users, args.calls)
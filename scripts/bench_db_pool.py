@@ -0,0 +1,87 @@
+"""Connect-per-call vs pooled connections for app.db helpers.
+
+Runs against a throw-away SQLite file, never against the production DB:
+
+    python scripts/bench_db_pool.py --users 2000 --calls 5000 --threads 16
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+
+def run(users: int, calls: int, threads: int) -> None:
+    root = Path(__file__).resolve().parents[1]
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+
+    tmp = tempfile.mkdtemp(prefix="sm_bench_")
+    os.environ["DB_PATH"] = str(Path(tmp) / "bench.db")
+
+    from app import db
+
+    db.init_db()
+    for uid in range(1, users + 1):
+        db.upsert_user(uid, f"user{uid}", f"User {uid}", "uk")
+
+    pooled_con = db._con
+
+    def connect_per_call():
+        # The old db._con(): a fresh connection + WAL pragma every time.
+        con = sqlite3.connect(db.DB_PATH)
+        con.row_factory = sqlite3.Row
+        con.execute("PRAGMA journal_mode=WAL;")
+        return con
+
+    def timed(label: str) -> float:
+        t0 = time.perf_counter()
+        for i in range(calls):
+            uid = (i % users) + 1
+            db.get_user(uid)
+            db.add_coins(uid, 1)
+        dt = time.perf_counter() - t0
+        print(f"{label:16s} {calls * 2 / dt:10.0f} calls/s  ({dt / (calls * 2) * 1e6:6.1f}us/call)")
+        return dt
+
+    print(f"DB={db.DB_PATH} users={users} calls={calls}")
+    db._con = connect_per_call
+    try:
+        before = timed("connect-per-call")
+    finally:
+        db._con = pooled_con
+    after = timed("pooled")
+    print(f"speedup x{before / after:.1f}")
+
+    # Concurrent readers/writers: more threads than pool slots, to exercise waits.
+    per_thread = max(1, calls // threads)
+
+    def worker(n: int) -> None:
+        for i in range(per_thread):
+            uid = ((n * per_thread + i) % users) + 1
+            db.get_user(uid)
+            db.add_coins(uid, 1)
+
+    t0 = time.perf_counter()
+    ts = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    dt = time.perf_counter() - t0
+    print(f"{threads} threads     {threads * per_thread * 2 / dt:10.0f} calls/s")
+    print("pool:", db.pool_stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=16)
+    args = parser.parse_args()
+    run(args.users, args.calls, args.threads)
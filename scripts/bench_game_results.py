@@ -0,0 +1,189 @@
+"""Games/sec for post-game bookkeeping: per-helper commits vs record_game_result().
+
+The "legacy" path replays what pvp_move did before (bump_total, bump_weekly,
+inc_season_games, add_bp_xp, set_rating, set_season_rating, record_pair_game,
+try_pay_referral_reward, each with its own commit). Both paths are run from the
+same starting DB and the resulting users/pair_stats/referrals rows are
+compared. On the record_game_result() DB, more games are then played across a
+week and a season rollover (some with a shadowbanned player), and
+replay_game_ledger() has to rebuild the same ratings and counters from the
+games ledger, also after they are scrambled. The per-player and per-game
+ledger queries must be index-driven. Runs against throw-away SQLite files:
+
+    python scripts/bench_game_results.py --players 200 --games 2000
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+WINDOW_SEC = 24 * 3600
+MAX_RATED = 5
+
+
+def run(players: int, games: int, seed: int) -> None:
+    root = Path(__file__).resolve().parents[1]
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+
+    tmp = Path(tempfile.mkdtemp(prefix="sm_bench_"))
+    base = tmp / "base.db"
+    os.environ["DB_PATH"] = str(base)
+
+    from app import db
+    from app.rating import update_elo
+
+    db.init_db()
+    for uid in range(1, players + 1):
+        db.upsert_user(uid, f"user{uid}", f"User {uid}", "uk")
+    for uid in range(2, players + 1, 10):
+        db.try_attach_referral(uid, 1)
+    db.get_pool(base).close_all()
+
+    rng = random.Random(seed)
+    schedule = []
+    for _ in range(games):
+        a, b = rng.sample(range(1, players + 1), 2)
+        schedule.append((a, b, rng.choice((a, b, None))))
+
+    def legacy(a: int, b: int, winner: int | None) -> None:
+        sb_a, sb_b = db.is_shadowbanned(a), db.is_shadowbanned(b)
+        rated = db.is_rated_pair_game(a, b, WINDOW_SEC, MAX_RATED)
+        for uid, sb in ((a, sb_a), (b, sb_b)):
+            if sb:
+                continue
+            db.bump_total(uid, win=(uid == winner))
+            db.bump_weekly(uid, win=(uid == winner))
+            db.inc_season_games(uid, "xo", win=(uid == winner))
+            if rated:
+                db.add_bp_xp(uid, 20 if uid == winner else 10)
+        for uid in (a, b):
+            db.try_pay_referral_reward(uid)
+        if winner is not None and rated:
+            score_a = 1.0 if winner == a else 0.0
+            na, nb = update_elo(db.get_rating(a), db.get_rating(b), score_a)
+            if not sb_a:
+                db.set_rating(a, na)
+            if not sb_b:
+                db.set_rating(b, nb)
+            sa, sb2 = update_elo(db.get_season_rating(a, "xo"), db.get_season_rating(b, "xo"), score_a)
+            if not sb_a:
+                db.set_season_rating(a, "xo", sa)
+            if not sb_b:
+                db.set_season_rating(b, "xo", sb2)
+            db.record_pair_game(a, b, WINDOW_SEC)
+
+    def batched(a: int, b: int, winner: int | None) -> None:
+        db.record_game_result(db.GameResult(
+            game="xo", a_id=a, b_id=b, winner_id=winner,
+            anti_boost_window_sec=WINDOW_SEC, anti_boost_max_rated=MAX_RATED,
+        ))
+
+    def snapshot() -> tuple:
+        con = db._con()
+        try:
+            users = [tuple(r) for r in con.execute(
+                "SELECT user_id, coins, rating, season_rating, total_games, total_wins, week_games, week_wins, "
+                "season_games, season_wins, bp_xp, bp_level, ref_earned FROM users ORDER BY user_id"
+            )]
+            pairs = [tuple(r) for r in con.execute("SELECT pair_key, count, total FROM pair_stats ORDER BY pair_key")]
+            refs = [tuple(r) for r in con.execute(
+                "SELECT invited_id, inviter_id, rewarded_ts IS NOT NULL FROM referrals ORDER BY invited_id"
+            )]
+            return users, pairs, refs
+        finally:
+            con.close()
+
+    results = {}
+    for label, fn in (("legacy", legacy), ("batched", batched)):
+        path = tmp / f"{label}.db"
+        shutil.copy(base, path)
+        db.DB_PATH = path
+        t0 = time.perf_counter()
+        for a, b, winner in schedule:
+            fn(a, b, winner)
+        dt = time.perf_counter() - t0
+        results[label] = snapshot()
+        print(f"{label:8s} {games / dt:8.0f} games/s  ({dt / games * 1e3:6.2f} ms/game)")
+
+    assert results["legacy"] == results["batched"], "record_game_result diverges from the per-helper sequence"
+    print("end state identical: users, pair_stats, referrals")
+
+    # ledger: db.DB_PATH still points at the batched DB
+    db.set_shadowban(players, True)
+    for _ in range(2):
+        db.set_week_start_ts(time.time() - 8 * 86400)
+        assert db.reset_week_if_needed(7, 10)
+        con = db._con()
+        try:
+            db._meta_set(con, "season_start_ts", str(time.time() - (db.SEASON_LENGTH_DAYS + 1) * 86400))
+            con.commit()
+        finally:
+            con.close()
+        db._meta_changed()
+        db._SEASON_END_TS = 0.0
+        assert db.reset_season_if_needed(top_n=10) is not None
+        while db.settle_season_rollover():  # the app.main background loop
+            pass
+        for _ in range(games // 4):
+            a, b = rng.sample(range(1, players + 1), 2)
+            db.record_game_result(db.GameResult(
+                game=rng.choice(db.GAMES), a_id=a, b_id=b, winner_id=rng.choice((a, b, None)),
+                anti_boost_window_sec=WINDOW_SEC, anti_boost_max_rated=MAX_RATED,
+                moves=("4", "0", "8"), duration_sec=12.5,
+            ))
+    want = snapshot()
+    con = db._con()
+    try:
+        ledger = con.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+        assert ledger == games + 2 * (games // 4), f"{ledger} ledger rows"
+        for sql in ("SELECT g.* FROM game_players p JOIN games g ON g.id=p.game_id WHERE p.user_id=1 AND p.ts < 1e18 "
+                    "ORDER BY p.ts DESC, p.game_id DESC LIMIT 20",
+                    "SELECT COUNT(*), SUM(rated) FROM games WHERE game='xo' AND ts >= 0"):
+            plan = " | ".join(r["detail"] for r in con.execute("EXPLAIN QUERY PLAN " + sql))
+            assert "TEMP B-TREE" not in plan and "SCAN g" not in plan and "SCAN games" not in plan, plan
+        try:
+            con.execute("DELETE FROM games")
+            raise AssertionError("games rows can be deleted")
+        except db.sqlite3.IntegrityError:
+            con.rollback()
+        own = con.execute("SELECT COUNT(*) FROM game_players WHERE user_id=1").fetchone()[0]
+    finally:
+        con.close()
+    assert len(db.get_user_games(1, limit=5)) == min(5, own)
+
+    t0 = time.perf_counter()
+    report = db.replay_game_ledger()
+    replay_sec = time.perf_counter() - t0
+    assert report["mismatched"] == 0 and report["drift"] == 0, report
+    con = db._con()
+    try:
+        # only (user, game) rows the ledger covers: replay leaves the others alone
+        con.execute(
+            "UPDATE user_game_stats SET rating=rating+37, total_wins=0, season_games=season_games+1 "
+            "WHERE game != 'overall' AND EXISTS (SELECT 1 FROM game_players p JOIN games g ON g.id=p.game_id "
+            "WHERE p.user_id=user_game_stats.user_id AND g.game=user_game_stats.game)"
+        )
+        con.commit()
+    finally:
+        con.close()
+    fixed = db.replay_game_ledger(apply=True)
+    assert fixed["mismatched"] > 0 and snapshot() == want, "replay did not restore the ledger state"
+    assert db.replay_game_ledger()["mismatched"] == 0
+    print(f"ledger: {ledger} games, replay {ledger / replay_sec:8.0f} games/s, "
+          f"rebuilt {fixed['mismatched']} scrambled rows across 2 week/season rollovers")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    run(args.players, args.games, args.seed)
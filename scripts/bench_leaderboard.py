@@ -0,0 +1,213 @@
+"""Leaderboard query plans and latency on synthetic users.
+
+Captures the exact SQL issued by the db leaderboard helpers, asserts via
+EXPLAIN QUERY PLAN that each one is served by its index (no full scan, no temp
+B-tree sort), then times every helper with and without the indexes.
+get_rank() is checked against the position in a fully ordered scan for a
+sample of users on every board and timed against the old streaming walk.
+Runs against throw-away SQLite files:
+
+    python scripts/bench_leaderboard.py --users 100000 --users 1000000
+    python scripts/bench_leaderboard.py --users 20000 --explain-only
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def _seed_users(db, n: int, seed: int = 1) -> None:
+    rng = random.Random(seed)
+    con = db._con()
+    try:
+        def rows():
+            for uid in range(1, n + 1):
+                wg = rng.randint(1, 40) if rng.random() < 0.3 else 0
+                wg_ck = rng.randint(1, 40) if rng.random() < 0.15 else 0
+                yield (
+                    uid, f"user{uid}", f"User {uid}",
+                    rng.randint(600, 2400), rng.randint(600, 2400),
+                    rng.randint(600, 2000), rng.randint(600, 2000),
+                    rng.randint(0, wg), wg, rng.randint(0, wg_ck), wg_ck,
+                    time.time(),
+                )
+        con.executemany(
+            "INSERT INTO users(user_id, username, first_name, rating, rating_ck, season_rating, season_rating_ck, "
+            "week_wins, week_games, week_wins_ck, week_games_ck, updated_ts) VALUES(?,?,?,?,?,?,?,?,?,?,?,?)",
+            rows(),
+        )
+        # chess has its own rows: a smaller, independent board
+        con.executemany(
+            "UPDATE user_game_stats SET rating=?, week_games=?, week_wins=? WHERE user_id=? AND game='chess'",
+            ((rng.randint(600, 2400), wg, rng.randint(0, wg), uid)
+             for uid in range(1, n + 1, 3) for wg in (rng.randint(0, 20),)),
+        )
+        con.executemany(
+            "INSERT INTO tournament_rating(user_id, game, points, updated_ts) VALUES(?,?,?,?)",
+            ((uid, g, rng.randint(1, 500), time.time()) for uid in range(1, n + 1, 7) for g in ("xo", "checkers", "overall")),
+        )
+        con.commit()
+        con.execute("ANALYZE")
+    finally:
+        con.close()
+
+
+def _calls(db) -> list[tuple[str, object]]:
+    return [
+        ("top100 overall", lambda: db.get_top100("overall")),
+        ("top100 xo", lambda: db.get_top100("xo")),
+        ("top100 checkers", lambda: db.get_top100("checkers")),
+        ("season overall", lambda: db.get_season_top100("overall")),
+        ("season xo", lambda: db.get_season_top100("xo")),
+        ("season checkers", lambda: db.get_season_top100("checkers")),
+        ("top100 chess", lambda: db.get_top100("chess")),
+        ("weekly xo", lambda: db.get_weekly_top(100, game="xo")),
+        ("weekly checkers", lambda: db.get_weekly_top(100, game="checkers")),
+        ("weekly chess", lambda: db.get_weekly_top(100, game="chess")),
+        ("top_weekly xo", lambda: db.get_top_weekly("xo", limit=3)),
+        ("tourn top overall", lambda: db.get_tourn_top100("overall")),
+    ]
+
+
+def _captured_sql(db, fn) -> list[str]:
+    seen: list[str] = []
+    pooled_con = db._con
+
+    def traced():
+        con = pooled_con()
+        con.set_trace_callback(seen.append)
+        return con
+
+    db._con = traced
+    try:
+        fn()
+    finally:
+        db._con = pooled_con
+    return [q for q in seen if q.lstrip().upper().startswith("SELECT")]
+
+
+def assert_plans(db) -> None:
+    con = db._con()
+    try:
+        for label, fn in _calls(db):
+            for sql in _captured_sql(db, fn):
+                plan = " | ".join(r["detail"] for r in con.execute("EXPLAIN QUERY PLAN " + sql))
+                ok = re.search(r"USING (COVERING )?INDEX idx_", plan) and "TEMP B-TREE" not in plan
+                print(f"  {label:18s} {plan}")
+                assert ok, f"{label}: not index-driven: {plan}"
+    finally:
+        con.close()
+
+
+def _streamed_rank(db, uid: int, board: str) -> int | None:
+    """Pre-rank-service lookup: stream the ordered board, walk to the user."""
+    game, cond, keys = db._RANK_BOARDS[board]
+    order = ", ".join(f"{e} {d}" for e, d in keys + (("user_id", "ASC"),))
+    con = db._con()
+    try:
+        cur = con.execute(
+            f"SELECT user_id FROM user_game_stats WHERE game=? {'AND ' + cond if cond else ''} ORDER BY {order}", (game,)
+        )
+        for rank, r in enumerate(cur, start=1):
+            if r[0] == uid:
+                return rank
+        return None
+    finally:
+        con.close()
+
+
+def check_ranks(db, n: int, samples: int, seed: int = 3) -> None:
+    rng = random.Random(seed)
+    uids = rng.sample(range(1, n + 1), min(samples, n)) + [n + 1]
+    con = db._con()
+    try:
+        for board in db._RANK_BOARDS:
+            probe_sql, count_sql = db._rank_sql(board)
+            plan = " | ".join(r["detail"] for r in con.execute("EXPLAIN QUERY PLAN " + count_sql, [0] * count_sql.count("?")))
+            assert "TEMP B-TREE" not in plan and "SCAN user_game_stats" not in plan.replace("SCAN user_game_stats USING", ""), f"{board}: {plan}"
+            for uid in uids:
+                got, want = db.get_rank(uid, board), _streamed_rank(db, uid, board)
+                assert got == want, f"{board} uid={uid}: get_rank={got} expected {want}"
+            print(f"  rank {board:16s} ok ({len(uids)} users)")
+    finally:
+        con.close()
+
+
+def time_ranks(db, n: int, repeat: int) -> None:
+    uids = [n // 2, n]
+    for board in ("overall", "season_xo", "weekly_xo"):
+        fast = _time(lambda: [db.get_rank(u, board) for u in uids], repeat) / len(uids)
+        slow = _time(lambda: [_streamed_rank(db, u, board) for u in uids], max(1, repeat // 10)) / len(uids)
+        print(f"  rank {board:16s} streamed {slow * 1e3:9.2f} ms   count {fast * 1e3:7.3f} ms   x{slow / fast:.0f}")
+
+
+def _time(fn, repeat: int) -> float:
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+
+def run(sizes: list[int], repeat: int, explain_only: bool) -> None:
+    root = Path(__file__).resolve().parents[1]
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+    tmp = Path(tempfile.mkdtemp(prefix="sm_bench_"))
+    os.environ["DB_PATH"] = str(tmp / "init.db")
+
+    from app import db
+
+    db.init_db()
+    for n in sizes:
+        db.DB_PATH = tmp / f"lb_{n}.db"
+        con = db._con()
+        try:
+            db.migrate(con)
+        finally:
+            con.close()
+        t0 = time.perf_counter()
+        _seed_users(db, n)
+        print(f"\n== {n} users (seeded in {time.perf_counter() - t0:.1f}s) DB={db.DB_PATH}")
+        assert_plans(db)
+        check_ranks(db, n, samples=20 if explain_only else 5)
+        if explain_only:
+            continue
+        time_ranks(db, n, repeat)
+
+        indexed = {label: _time(fn, repeat) for label, fn in _calls(db)}
+        con = db._con()
+        try:
+            names = [r[0] for r in con.execute(
+                "SELECT name FROM sqlite_master WHERE type='index' "
+                "AND (name LIKE 'idx_game_stats_%' OR name IN ('idx_marketing_ref', 'idx_tourn_rating_top'))"
+            )]
+            for name in names:
+                con.execute(f"DROP INDEX {name}")
+            con.commit()
+        finally:
+            con.close()
+        scan = {label: _time(fn, max(1, repeat // 10)) for label, fn in _calls(db)}
+        con = db._con()
+        try:
+            con.executescript(db._USER_INDEXES + "CREATE INDEX IF NOT EXISTS idx_tourn_rating_top "
+                              "ON tournament_rating(game, points DESC, updated_ts DESC);")
+        finally:
+            con.close()
+        for label, _fn in _calls(db):
+            print(f"  {label:18s} scan {scan[label] * 1e3:9.2f} ms   indexed {indexed[label] * 1e3:7.3f} ms   x{scan[label] / indexed[label]:.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, action="append", help="synthetic user count (repeatable)")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--explain-only", action="store_true")
+    args = parser.parse_args()
+    run(args.users or [100_000, 1_000_000], args.repeat, args.explain_only)
@@ -0,0 +1,167 @@
+"""Leaderboard cache: correctness under random writes and page latency vs SQLite.
+
+Seeds synthetic users, then alternates batches of random writes through the
+app.db helpers (set_rating, bump_weekly, set_season_rating,
+record_game_result, tournament points, referrals) with reads from
+app.leaderboard_cache. Every page and rank is compared with the same query
+against SQLite, also across a weekly reset and a season rollover (checked after every settle
+batch). A small
+--capacity exercises the partial-prefix path.
+Runs against a throw-away SQLite file:
+
+    python scripts/bench_leaderboard_cache.py --users 20000 --rounds 30 --capacity 150
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def run(users: int, rounds: int, writes: int, capacity: int, seed: int) -> None:
+    root = Path(__file__).resolve().parents[1]
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+    tmp = tempfile.mkdtemp(prefix="sm_bench_")
+    os.environ["DB_PATH"] = str(Path(tmp) / "bench.db")
+
+    from app import db, db_async
+    from app import leaderboard_cache as lb
+
+    lb.CAPACITY = capacity
+    rng = random.Random(seed)
+    db.init_db()
+    con = db._con()
+    try:
+        con.executemany(
+            "INSERT INTO users(user_id, username, first_name, rating, rating_ck, season_rating, season_rating_ck, "
+            "week_wins, week_games, ref_count, updated_ts) VALUES(?,?,?,?,?,?,?,?,?,?,?)",
+            ((uid, f"user{uid}", f"User {uid}", rng.randint(800, 1600), rng.randint(800, 1600),
+              rng.randint(900, 1300), rng.randint(900, 1300), 0, 0, 0, time.time()) for uid in range(1, users + 1)),
+        )
+        con.commit()
+    finally:
+        con.close()
+
+    def tourn_points(uid: int, game: str, pts: int) -> None:
+        con = db._con()
+        try:
+            db._tourn_points_add(con, uid, game, pts)
+            con.commit()
+        finally:
+            con.close()
+
+    def random_write() -> None:
+        uid = rng.randint(1, users)
+        game = rng.choice(("xo", "checkers"))
+        op = rng.randrange(6)
+        if op == 0:
+            db.set_rating(uid, rng.randint(800, 2000), game=game)
+        elif op == 1:
+            db.bump_weekly(uid, win=rng.random() < 0.5, game=game)
+        elif op == 2:
+            db.set_season_rating(uid, game, rng.randint(900, 1600))
+        elif op == 3:
+            b = rng.randint(1, users)
+            if b != uid:
+                db.record_game_result(db.GameResult(game, uid, b, rng.choice((uid, b, None)), 60, 1000))
+        elif op == 4:
+            tourn_points(uid, game, rng.randint(1, 30))
+        else:
+            db.try_attach_referral(rng.randint(1, users), uid)
+
+    def expected(board: str, offset: int, limit: int) -> list:
+        spec = lb._SPECS[board]
+        con = db._con()
+        try:
+            rows = [dict(r) for r in con.execute(spec.sql + " OFFSET ?", spec.params + (limit, offset))]
+        finally:
+            con.close()
+        return [spec.out(r) for r in rows]
+
+    async def check_round() -> None:
+        for board in lb._SPECS:
+            for offset in (0, capacity // 2, capacity - 20):
+                got, _ = await lb.page(board, offset, 20)
+                want = expected(board, offset, 20)
+                assert got == want, f"{board}@{offset}: cache diverges from SQLite"
+        for board in db._RANK_BOARDS:
+            for uid in rng.sample(range(1, users + 1), 5):
+                got, want = await lb.rank(uid, board), db.get_rank(uid, board)
+                assert got == want, f"rank {board} uid={uid}: {got} != {want}"
+
+    async def timing(repeat: int = 200) -> None:
+        for board in ("overall", "weekly_xo", "season_checkers"):
+            await lb.page(board, 0, 20)
+            t0 = time.perf_counter()
+            for i in range(repeat):
+                await lb.page(board, (i % 5) * 20, 20)
+            cached = (time.perf_counter() - t0) / repeat
+            t0 = time.perf_counter()
+            for i in range(repeat):
+                await db_async.run(expected, board, (i % 5) * 20, 20)
+            sql = (time.perf_counter() - t0) / repeat
+            print(f"page {board:16s} sqlite {sql * 1e3:7.3f} ms   cache {cached * 1e3:7.3f} ms   x{sql / cached:.0f}")
+
+    async def main() -> None:
+        print(f"DB={db.DB_PATH} users={users} capacity={capacity}")
+        await check_round()
+        for _ in range(rounds):
+            for _ in range(writes):
+                random_write()
+            await check_round()
+        # weekly reset: the epoch moves on, whole family invalidated
+        db.set_week_start_ts(time.time() - 8 * 86400)
+        assert db.reset_week_if_needed(week_len_days=7, top_n=10)
+        assert not db.reset_week_if_needed(week_len_days=7, top_n=10)
+        for g in db.GAMES:
+            assert not (await lb.page(f"weekly_{g}", 0, 20))[0], f"weekly_{g} not empty after the reset"
+        await check_round()
+        for _ in range(writes):
+            random_write()
+        await check_round()
+        # season rollover: boards start empty until settle_season_rollover() has
+        # stored everyone's soft reset (the app.main background loop)
+        con = db._con()
+        try:
+            db._meta_set(con, "season_start_ts", str(time.time() - (db.SEASON_LENGTH_DAYS + 1) * 86400))
+            con.commit()
+            db._meta_changed()
+        finally:
+            con.close()
+        db._SEASON_END_TS = 0.0
+        assert db.reset_season_if_needed(top_n=10) is not None
+        for g in ("overall",) + db.GAMES:
+            assert not (await lb.page(f"season_{g}", 0, 20))[0], f"season_{g} not empty after the rollover"
+        while await db_async.settle_season_rollover():
+            await check_round()
+        for g in ("overall",) + db.GAMES:
+            rows = (await lb.page(f"season_{g}", 0, 20))[0]
+            assert rows, f"season_{g} empty after the settle"
+            assert all(r["score"] == db.get_game_stats(r["user_id"], g)["season_rating"] for r in rows if g != "overall")
+        await check_round()
+        for _ in range(writes):
+            random_write()
+        await check_round()
+        print(f"{rounds} rounds x {writes} writes + weekly reset + season rollover: pages and ranks match SQLite")
+        await timing()
+        print("cache stats:", lb.cache_stats())
+
+    asyncio.run(main())
+    db_async.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=30)
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--capacity", type=int, default=150)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+    run(args.users, args.rounds, args.writes, args.capacity, args.seed)
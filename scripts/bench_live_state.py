@@ -0,0 +1,218 @@
+"""Write-behind snapshots of live games (app.live_state).
+
+First checks that every registered kind survives a snapshot round-trip:
+- XO PvP (the watchdog is re-armed), XO vs AI, queue entries (the AI
+  fallback is re-armed);
+- checkers and chess sessions with their private / lobby indexes, plus the
+  waiting slots;
+- arena runs.
+Finished games must be dropped from live_matches.
+
+It then simulates --matches concurrent games, each making one move per
+--move-interval seconds, and compares two costs:
+- write-behind: touch() per move plus one collect() + save_live_matches()
+  batch per tick;
+- write-through: one save_live_matches() transaction per move.
+
+    python scripts/bench_live_state.py --matches 2000 --ticks 40
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from pathlib import Path
+
+
+def _roundtrip() -> None:
+    import chess
+
+    from app import arena_mode, db, db_async, live_state
+    from app import handlers_menu as hm
+    from app.checkers_game import storage as ck
+    from app.checkers_game.engine import apply_step, legal_moves, RED
+    from app.chess_game import storage as ch
+    from app.xo_match import AIMatch, PvPMatch
+
+    hm.PVP_MATCHES["p1"] = PvPMatch(1, 2, x_chat=1, o_chat=2, x_msg=10, o_msg=20, x_lang="uk", board="X...O....",
+                                    last_move=time.time() - 50, started_ts=time.time() - 60, moves="04")
+    hm.PVP_MATCHES["p2"] = replace(hm.PVP_MATCHES["p1"], status="ended")
+    hm.AI_MATCHES["a1"] = AIMatch(3, "hard", "X...O....")
+    hm.AI_MATCHES["a2"] = AIMatch(3, "hard", "XXXOO....")  # won
+    entry = {"user_id": 4, "chat_id": 4, "message_id": 40, "lang": "uk", "ts": time.time(), "rating": 1010,
+             "rd": 200.0, "vip": True, "side": "o"}
+    hm.WAIT_O_VIP.append(entry)
+    for key in ("p1", "p2"):
+        live_state.touch("pvp", key)
+    for key in ("a1", "a2"):
+        live_state.touch("ai", key)
+    live_state.touch("queue", 4)
+
+    gs = ck.create_private_match(5, "Red", 6, "Blue", tournament_id=7, tmatch_id=8)
+    step = next(iter(legal_moves(gs.board, RED).values()))[0]
+    gs.board = apply_step(gs.board, step)
+    gs.moves.append("move")
+    gs.selected = (5, 0)
+    lobby = ck.create_lobby(-100, 55, 9, "Lobby")
+    ck.enqueue_or_match(11, "Waiter")
+    done = ck.create_private_match(12, "A", 13, "B")
+    done.finished = True
+    live_state.touch("ck", done.gid)
+
+    cg = ch.create_private_match(14, "White", 15, "Black")
+    for uci in ("e2e4", "e7e5", "g1f3"):
+        cg.board.push_uci(uci)
+    cg.selected = chess.B8
+    live_state.touch("chess", cg.gid)
+    ch.enqueue_or_match(16, "Waiter")
+
+    arena_mode.start_session(17, "xo")
+    arena_mode.report_win(17)
+    arena_mode.report_loss(17)
+
+    live_state.flush_sync()
+    kinds = sorted(kind for kind, _key, _state in db.load_live_matches())
+    assert kinds == ["ai", "arena", "chess", "chess_wait", "ck", "ck", "ck_wait", "pvp", "queue"], kinds
+
+    snap = {
+        "pvp": replace(hm.PVP_MATCHES["p1"]), "ai": replace(hm.AI_MATCHES["a1"]), "queue": dict(entry),
+        "ck": {k: getattr(gs, k) for k in ("board", "moves", "selected", "red_id", "blue_id", "tmatch_id")},
+        "ck_lobby": lobby.chat_id, "ck_wait": ck.STORE.waiting,
+        "chess": (cg.board.fen(), [m.uci() for m in cg.board.move_stack], cg.selected),
+        "chess_wait": ch.STORE.waiting.user_id,
+        "arena": (arena_mode._SESSIONS[17].wins, arena_mode._SESSIONS[17].losses),
+    }
+    # "restart": drop everything held in memory, then rehydrate
+    hm.PVP_MATCHES.clear(); hm.AI_MATCHES.clear(); hm.remove_from_queue(4)
+    live_state._DIRTY.clear()
+    for store in (ck.STORE, ch.STORE):
+        store.games.clear(); store.active_by_user.clear(); store.lobby_by_chat.clear(); store.waiting = None
+    arena_mode._SESSIONS.clear()
+
+    async def restart() -> int:
+        n = await live_state.rehydrate(bot=None)
+        assert "p1" in hm.PVP_TIMER_TASKS and 4 in hm.WAIT_TASKS, "timers not re-armed"
+        for task in (*hm.PVP_TIMER_TASKS.values(), *hm.WAIT_TASKS.values()):
+            task.cancel()
+        return n
+
+    assert asyncio.run(restart()) == 9
+    m = hm.PVP_MATCHES["p1"]
+    assert replace(m, last_move=0) == replace(snap["pvp"], last_move=0)
+    assert m.last_move > snap["pvp"].last_move, "downtime counted as inactivity"
+    assert dict(hm.AI_MATCHES) == {"a1": snap["ai"]}
+    assert hm.WAIT_O_VIP == [snap["queue"]]
+    back = ck.STORE.games[gs.gid]
+    assert {k: getattr(back, k) for k in snap["ck"]} == snap["ck"]
+    assert ck.user_active_game(5) is back and ck.user_active_game(6) is back
+    assert ck.get_lobby(snap["ck_lobby"]).red_id == 9 and done.gid not in ck.STORE.games
+    assert ck.STORE.waiting == snap["ck_wait"]
+    back = ch.STORE.games[cg.gid]
+    assert (back.board.fen(), [m.uci() for m in back.board.move_stack], back.selected) == snap["chess"]
+    assert ch.user_active_game(15) is back and ch.STORE.waiting.user_id == snap["chess_wait"]
+    assert (arena_mode._SESSIONS[17].wins, arena_mode._SESSIONS[17].losses) == snap["arena"]
+    db_async.shutdown()
+    print("round-trip: pvp, ai, queue, checkers, chess, waiting slots and arena restored; finished games dropped")
+
+
+def run(matches: int, ticks: int, tick: float, move_interval: float, seed: int) -> None:
+    root = Path(__file__).resolve().parents[1]
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+    tmp = tempfile.mkdtemp(prefix="sm_bench_")
+    os.environ["DB_PATH"] = str(Path(tmp) / "live.db")
+
+    from app import db, live_state
+    from app import handlers_menu as hm
+    from app.checkers_game import storage as ck
+    from app.checkers_game.engine import apply_step, legal_moves, RED, BLUE
+    from app.xo_match import PvPMatch
+
+    db.init_db()
+    _roundtrip()
+
+    # half XO PvP, half checkers PvP
+    rng = random.Random(seed)
+    hm.PVP_MATCHES.clear()
+    xo, cks = [], []
+    for i in range(matches):
+        if i % 2:
+            mid = f"m{i}"
+            hm.PVP_MATCHES[mid] = PvPMatch(i, -i, x_chat=i, o_chat=-i, x_msg=1, o_msg=2, x_lang="uk", o_lang="uk")
+            xo.append(mid)
+        else:
+            cks.append(ck.create_private_match(10_000_000 + i, "A", 20_000_000 + i, "B"))
+    live_state.flush_sync()
+
+    def move(i: int) -> tuple[str, str]:
+        if i % 2:
+            mid = xo[i // 2]
+            m = hm.PVP_MATCHES[mid]
+            free = [c for c, ch in enumerate(m.board) if ch == "."] or [0]
+            cell = rng.choice(free)
+            m.board = (m.board[:cell] + m.turn + m.board[cell + 1:]) if m.board[cell] == "." else "........."
+            m.moves += str(cell)
+            m.turn = "O" if m.turn == "X" else "X"
+            return "pvp", mid
+        gs = cks[i // 2]
+        opts = [st for steps in legal_moves(gs.board, gs.turn).values() for st in steps]
+        if opts:
+            step = rng.choice(opts)
+            gs.board = apply_step(gs.board, step)
+            gs.moves.append(f"{step.fr[0]}{step.fr[1]}{step.to[0]}{step.to[1]}")
+        gs.turn = BLUE if gs.turn == RED else RED
+        return "ck", gs.gid
+
+    per_tick = max(1, round(matches * tick / move_interval))
+    order = list(range(matches))
+    moves = touch_sec = collect_sec = save_sec = 0.0
+    for _ in range(ticks):
+        rng.shuffle(order)
+        for i in order[:per_tick]:
+            kind, key = move(i)
+            t0 = time.perf_counter()
+            live_state.touch(kind, key)
+            touch_sec += time.perf_counter() - t0
+        moves += per_tick
+        t0 = time.perf_counter()
+        upserts, deletes = live_state.collect()
+        collect_sec += time.perf_counter() - t0
+        t0 = time.perf_counter()
+        db.save_live_matches(upserts, deletes)
+        save_sec += time.perf_counter() - t0
+
+    n_through = min(int(moves), 2000)
+    t0 = time.perf_counter()
+    for j in range(n_through):
+        kind, key = move(order[j % per_tick])
+        live_state.touch(kind, key)
+        db.save_live_matches(*live_state.collect())
+    through = (time.perf_counter() - t0) / n_through
+
+    con = db._con()
+    try:
+        size = con.execute("SELECT COUNT(*), SUM(LENGTH(state)) FROM live_matches").fetchone()
+    finally:
+        con.close()
+    print(f"{matches} live games, {per_tick} moves per {tick:g}s tick, {ticks} ticks; "
+          f"{size[0]} rows, {size[1] / size[0]:.0f} bytes per snapshot")
+    print(f"write-behind   loop: touch {touch_sec / moves * 1e6:6.2f} us + encode {collect_sec / moves * 1e6:6.1f} us per move"
+          f"   DB thread: {save_sec / ticks * 1000:6.1f} ms per tick ({save_sec / moves * 1e6:6.1f} us per move)")
+    print(f"write-through  {through * 1e6:6.1f} us per move (one transaction each), "
+          f"x{through / ((collect_sec + save_sec + touch_sec) / moves):.1f} the write-behind cost")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--matches", type=int, default=2000)
+    parser.add_argument("--ticks", type=int, default=40)
+    parser.add_argument("--tick", type=float, default=0.5)
+    parser.add_argument("--move-interval", type=float, default=5.0, help="seconds between moves of one game")
+    parser.add_argument("--seed", type=int, default=17)
+    args = parser.parse_args()
+    run(args.matches, args.ticks, args.tick, args.move_interval, args.seed)
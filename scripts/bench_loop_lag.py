@@ -0,0 +1,154 @@
+"""Event-loop lag with sync app.db calls vs awaited app.db_async calls.
+
+Replays a mixed bot load open-loop: presses arrive at a fixed --rate
+whether or not the previous ones are done, as Telegram updates do. Most of
+them are in-memory game moves (checkers legal_moves + apply_step), the rest
+button presses that read and write the user (get_user + add_coins), and
+every --slow-every seconds an admin overview query runs next to them. Each
+press is timed from its scheduled arrival, so time spent waiting behind a
+blocked loop counts. Reports the lag measured by app.loop_monitor and the
+per-kind latency for both variants. When the slow query takes 20 ms or more
+it checks that with db_async neither the loop nor the in-memory moves wait
+for it; db presses still queue behind it on the DB thread. Runs against a
+throw-away SQLite file:
+
+    python scripts/bench_loop_lag.py --users 200000 --rate 400 --seconds 6
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def _percentiles(samples: list[float]) -> str:
+    s = sorted(samples)
+    n = len(s)
+    p50 = s[n // 2] * 1e3
+    p99 = s[min(n - 1, int(n * 0.99))] * 1e3
+    return f"p50={p50:6.2f}ms p99={p99:7.2f}ms max={s[-1] * 1e3:7.2f}ms"
+
+
+def _p99(samples: list[float]) -> float:
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(len(s) * 0.99))]
+
+
+def run(users: int, rate: float, seconds: float, db_share: float, slow_every: float, seed: int) -> None:
+    root = Path(__file__).resolve().parents[1]
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+
+    tmp = tempfile.mkdtemp(prefix="sm_bench_")
+    os.environ["DB_PATH"] = str(Path(tmp) / "bench.db")
+
+    from app import db, db_async, loop_monitor
+    from app.checkers_game import engine
+
+    db.init_db()
+    con = db._con()
+    try:
+        con.executemany(
+            "INSERT OR IGNORE INTO users (user_id, username, first_name, lang, coins, rating) VALUES (?, ?, ?, 'uk', ?, ?)",
+            ((uid, f"user{uid}", f"User {uid}", uid % 500, 800 + uid % 700) for uid in range(1, users + 1)),
+        )
+        con.commit()
+    finally:
+        con.close()
+    t0 = time.perf_counter()
+    db.get_admin_overview()
+    slow_sec = time.perf_counter() - t0
+
+    board = engine.initial_board()
+
+    def move() -> None:
+        moves = engine.legal_moves(board, 1)
+        fr = next(iter(moves))
+        engine.apply_step(board, moves[fr][0])
+
+    async def sync_press(uid: int) -> None:
+        db.get_user(uid)
+        db.add_coins(uid, 1)
+
+    async def async_press(uid: int) -> None:
+        await db_async.get_user(uid)
+        await db_async.add_coins(uid, 1)
+
+    async def sync_slow() -> None:
+        db.get_admin_overview()
+
+    async def async_slow() -> None:
+        await db_async.get_admin_overview()
+
+    async def scenario(label: str, press, slow) -> dict:
+        rng = random.Random(seed)
+        lat = {"move": [], "db": []}
+        loop_monitor.reset()
+        loop_monitor.INTERVAL_SEC = 0.01
+        loop_monitor.start()
+
+        async def one(kind: str, due: float, uid: int) -> None:
+            if kind == "move":
+                move()
+            else:
+                await press(uid)
+            lat[kind].append(time.perf_counter() - due)
+
+        async def slow_loop(until: float) -> None:
+            while time.perf_counter() + slow_every < until:
+                await asyncio.sleep(slow_every)
+                await slow()
+
+        tasks = []
+        start = time.perf_counter()
+        slow_task = asyncio.create_task(slow_loop(start + seconds))
+        for i in range(int(rate * seconds)):
+            due = start + i / rate
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            kind = "db" if rng.random() < db_share else "move"
+            tasks.append(asyncio.create_task(one(kind, due, rng.randint(1, users))))
+        await asyncio.gather(*tasks, slow_task)
+        dt = time.perf_counter() - start
+        await asyncio.sleep(0.05)
+        loop_monitor.stop()
+        s = loop_monitor.stats()
+        print(f"{label:6s} {len(tasks) / dt:6.0f} presses/s  loop lag avg={s['avg_ms']:6.2f}ms max={s['max_ms']:7.2f}ms")
+        print(f"       move   {_percentiles(lat['move'])}")
+        print(f"       db     {_percentiles(lat['db'])}")
+        return {"lag_max": s["max_ms"] / 1e3, "move_p99": _p99(lat["move"]), "db_p99": _p99(lat["db"])}
+
+    async def main() -> None:
+        print(f"DB={db.DB_PATH} users={users} rate={rate:.0f}/s for {seconds:.0f}s, {db_share:.0%} db presses, "
+              f"admin overview ({slow_sec * 1e3:.0f} ms) every {slow_every}s")
+        sync = await scenario("sync", sync_press, sync_slow)
+        async_ = await scenario("async", async_press, async_slow)
+        # db presses queue behind the slow query on the DB thread either way;
+        # the gain is that nothing else waits for it
+        print(f"gain: move p99 x{sync['move_p99'] / async_['move_p99']:.1f}, "
+              f"loop lag max x{sync['lag_max'] / max(async_['lag_max'], 1e-4):.1f}, "
+              f"db press p99 x{sync['db_p99'] / async_['db_p99']:.1f}")
+        if slow_sec >= 0.02:
+            assert async_["lag_max"] * 3 < sync["lag_max"], "the slow query still blocks the loop"
+            assert async_["move_p99"] * 5 < sync["move_p99"], "in-memory moves still wait for the DB"
+
+    asyncio.run(main())
+    db_async.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--rate", type=float, default=400.0)
+    parser.add_argument("--seconds", type=float, default=6.0)
+    parser.add_argument("--db-share", type=float, default=0.3)
+    parser.add_argument("--slow-every", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+    run(args.users, args.rate, args.seconds, args.db_share, args.slow_every, args.seed)
@@ -0,0 +1,162 @@
+"""Bytes per live match: slotted records (app.xo_match, *.storage.GameSession)
+against the per-match dicts and list-of-lists boards they replaced.
+
+First checks that the compact forms round-trip:
+- a checkers board packed to 32 bytes and back, through GameSession.board;
+- XO records through their live_state snapshot.
+
+It then builds --games mid-game records of each kind and measures them with
+tracemalloc: XO PvP, XO vs AI, checkers and chess. The old layout is rebuilt
+here from the same values: XO as dicts, checkers with an 8x8 list board.
+Keys and the registry table are not counted, because they are the same for
+both layouts. Chess uses a tenth of --games: each chess.Board carries its
+move stack, and that stack is most of the record.
+
+    python scripts/bench_match_memory.py --games 100000
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+from dataclasses import field, fields, make_dataclass
+from pathlib import Path
+
+
+def _measure(build, n: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    keep = [build(i) for i in range(n)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del keep
+    return (after - before) / n
+
+
+def _check_roundtrip() -> None:
+    import json
+
+    from app.checkers_game.engine import apply_step, initial_board, legal_moves, pack_board, unpack_board, RED
+    from app.checkers_game.storage import GameSession
+    from app.xo_match import AIMatch, PvPMatch, as_state
+
+    board = initial_board()
+    step = next(iter(legal_moves(board, RED).values()))[0]
+    board = apply_step(board, step)
+    packed = pack_board(board)
+    assert len(packed) == 32 and unpack_board(packed) == board == unpack_board(packed.decode("ascii"))
+    gs = GameSession(gid="g")
+    gs.board = board
+    assert gs.cells == packed and gs.board == board
+    assert not hasattr(gs, "__dict__"), "GameSession lost its slots"
+
+    m = PvPMatch(1, 2, board="X...O....", moves="04", tmatch_id=3)
+    assert PvPMatch(**json.loads(json.dumps(as_state(m)))) == m
+    a = AIMatch(5, "hard", "X........")
+    assert AIMatch(**json.loads(json.dumps(as_state(a)))) == a
+    print("round-trip: checkers cells <-> 8x8 board, XO records <-> snapshot")
+
+
+def run(games: int, seed: int) -> None:
+    root = Path(__file__).resolve().parents[1]
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+    tmp = tempfile.mkdtemp(prefix="sm_bench_")
+    os.environ["DB_PATH"] = str(Path(tmp) / "memory.db")
+
+    import time
+
+    import chess
+
+    from app.checkers_game import storage as ck
+    from app.checkers_game.engine import apply_step, initial_board, legal_moves, BLUE, RED
+    from app.chess_game import storage as ch
+    from app.xo_match import AIMatch, PvPMatch
+
+    _check_roundtrip()
+    rng = random.Random(seed)
+    now = time.time()
+    uid = 400_000_000
+
+    # shared mid-game positions: the values differ per game, the shapes do not
+    xo_board, xo_moves = "X.O.X..O.", "0428"
+    ck_boards, board, turn = [], initial_board(), RED
+    for _ in range(12):
+        steps = [st for sts in legal_moves(board, turn).values() for st in sts]
+        board = apply_step(board, rng.choice(steps))
+        turn = BLUE if turn == RED else RED
+        ck_boards.append(board)
+    ck_moves = [f"{r}{c}{r + 1}{c + 1}" for r, c in ((5, 0), (2, 1), (5, 2), (2, 3), (6, 1), (1, 0))]
+    chess_ucis = ["e2e4", "e7e5", "g1f3", "b8c6", "f1c4", "g8f6"]
+
+    def xo_dict(i: int) -> dict:
+        return {"board": "".join(xo_board), "x": uid + i, "o": uid - i, "turn": "X", "status": "playing",
+                "last_move": now + i, "started_ts": now - i, "moves": [int(c) for c in xo_moves],
+                "x_chat": uid + i, "o_chat": uid - i, "x_msg": 1000 + i, "o_msg": 2000 + i,
+                "x_lang": "uk", "o_lang": "en"}
+
+    def xo_record(i: int) -> PvPMatch:
+        return PvPMatch(uid + i, uid - i, x_chat=uid + i, o_chat=uid - i, x_msg=1000 + i, o_msg=2000 + i,
+                        x_lang="uk", board="".join(xo_board), last_move=now + i, started_ts=now - i,
+                        moves="".join(xo_moves))
+
+    def ai_dict(i: int) -> dict:
+        return {"level": "hard", "board": "".join(xo_board), "user_id": uid + i, "status": "playing"}
+
+    def ai_record(i: int) -> AIMatch:
+        return AIMatch(uid + i, "hard", "".join(xo_board))
+
+    spec = [(f.name, f.type, f) for f in fields(ck.GameSession) if f.name != "cells"]
+    spec.append(("board", list, field(default_factory=initial_board)))
+    LegacyCk = make_dataclass("GameSession", spec)
+
+    def ck_kwargs(i: int) -> dict:
+        return {"gid": f"{i:06x}", "red_id": uid + i, "blue_id": uid - i, "red_name": "@red", "blue_name": "@blue",
+                "red_chat_id": uid + i, "blue_chat_id": uid - i, "red_message_id": 1000 + i,
+                "blue_message_id": 2000 + i, "last_activity": now + i, "started_ts": now - i,
+                "moves": list(ck_moves)}
+
+    def ck_legacy(i: int):
+        return LegacyCk(**ck_kwargs(i), board=[row[:] for row in ck_boards[i % len(ck_boards)]])
+
+    def ck_record(i: int) -> ck.GameSession:
+        gs = ck.GameSession(**ck_kwargs(i))
+        gs.board = ck_boards[i % len(ck_boards)]
+        return gs
+
+    LegacyChess = make_dataclass("GameSession", [(f.name, f.type, f) for f in fields(ch.GameSession)])
+
+    def chess_kwargs(i: int) -> dict:
+        board = chess.Board()
+        for uci in chess_ucis:
+            board.push_uci(uci)
+        return {"gid": f"{i:06x}", "white_id": uid + i, "black_id": uid - i, "white_name": "@w", "black_name": "@b",
+                "white_chat_id": uid + i, "black_chat_id": uid - i, "white_message_id": 1000 + i,
+                "black_message_id": 2000 + i, "last_activity": now + i, "started_ts": now - i, "board": board}
+
+    print(f"bytes per live match, {games} concurrent games of each kind (tracemalloc):")
+    rows = (
+        ("XO PvP", xo_dict, xo_record, games),
+        ("XO vs AI", ai_dict, ai_record, games),
+        ("checkers", ck_legacy, ck_record, games),
+        ("chess", lambda i: LegacyChess(**chess_kwargs(i)), lambda i: ch.GameSession(**chess_kwargs(i)),
+         max(1, games // 10)),
+    )
+    for name, old, new, n in rows:
+        old_b, new_b = _measure(old, n), _measure(new, n)
+        note = "" if n == games else f"   ({n} games, chess.Board dominates)"
+        print(f"  {name:9} before {old_b:7.0f} B   after {new_b:7.0f} B   "
+              f"x{old_b / new_b:4.1f}   {(old_b - new_b) * games / 2**20:6.1f} MiB saved at {games}{note}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=19)
+    args = parser.parse_args()
+    run(args.games, args.seed)
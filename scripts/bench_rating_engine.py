@@ -0,0 +1,195 @@
+"""Offline Elo replay (app.rating_engine) on synthetic game streams.
+
+First plays games through record_game_result() on a throw-away DB, across
+a season rollover and with a shadowbanned player. It then checks that
+replay() of the loaded ledger at k=24 reproduces every stored rating and
+season rating, and that write_back() restores them after they are
+scrambled. Next it checks replay() against a plain update_elo() loop on a
+prefix of the synthetic stream. Finally it times a replay of the full
+synthetic stream and a K-factor sweep, run sequentially and through
+sweep_k() worker processes:
+
+    python scripts/bench_rating_engine.py --games 10000000 --players 200000
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def _check_ledger(db, engine, rng: random.Random, players: int = 300, games: int = 3000) -> None:
+    for uid in range(1, players + 1):
+        db.upsert_user(uid, f"user{uid}", f"User {uid}", "uk")
+    db.set_shadowban(players, True)
+
+    def play(n: int) -> None:
+        for _ in range(n):
+            a, b = rng.sample(range(1, players + 1), 2)
+            db.record_game_result(db.GameResult(
+                game=rng.choice(db.GAMES), a_id=a, b_id=b, winner_id=rng.choice((a, b, b, None)),
+                anti_boost_window_sec=3600, anti_boost_max_rated=1000,
+            ))
+
+    play(games // 2)
+    con = db._con()
+    try:
+        db._meta_set(con, "season_start_ts", str(time.time() - (db.SEASON_LENGTH_DAYS + 1) * 86400))
+        con.commit()
+    finally:
+        con.close()
+    db._meta_changed()
+    db._SEASON_END_TS = 0.0
+    assert db.reset_season_if_needed(top_n=10) is not None
+    while db.settle_season_rollover():  # the app.main background loop
+        pass
+    play(games - games // 2)
+
+    def stored() -> dict:
+        con = db._con()
+        try:
+            return {(r[0], r[1]): (r[2], r[3]) for r in con.execute(
+                f"SELECT user_id, game, rating, {db._season_col('season_rating')} FROM user_game_stats "
+                "WHERE game != 'overall'"
+            )}
+        finally:
+            con.close()
+
+    stream = engine.load_ledger()
+    run = engine.replay(stream)
+    want = stored()
+    keys = []
+    for slot, t in enumerate(run.touched):
+        if not t:
+            continue
+        p, g = divmod(slot, len(db.GAMES))
+        uid = stream.users[p]
+        season = run.season_rating[slot]
+        if run.season_id[p] != int(db.get_season_meta()["season_id"]):
+            season = db._soft_reset(season)
+        keys.append((uid, db.GAMES[g]))
+        assert (run.rating[slot], season) == want[keys[-1]], keys[-1]
+    con = db._con()
+    try:
+        con.execute("UPDATE user_game_stats SET rating=rating+41, season_rating=season_rating-13 WHERE game != 'overall'")
+        con.commit()
+    finally:
+        con.close()
+    assert engine.write_back(stream, run) == len(keys)
+    after = stored()
+    assert all(after[key] == want[key] for key in keys), "write_back did not restore the replayed ratings"
+    print(f"ledger: {len(stream)} games, {len(keys)} (player, game) ratings reproduced at k=24 and written back")
+
+
+def _synthetic(engine, games: int, players: int, seed: int):
+    rng = random.Random(seed)
+    stream = engine.GameStream()
+    for uid in range(1, players + 1):
+        stream.player(uid)
+    n_games = len(engine.GAMES)
+    flags = (engine.A_WIN | engine.RATED, engine.B_WIN | engine.RATED, engine.RATED, engine.A_WIN,
+             engine.B_WIN | engine.RATED, engine.A_WIN | engine.RATED | engine.B_SHADOW)
+    a_col, b_col, f_col, s_col = stream.a, stream.b, stream.flags, stream.season
+    per_season = max(1, games // 4)
+    for i in range(games):
+        pa = rng.randrange(players)
+        pb = (pa + 1 + rng.randrange(players - 1)) % players
+        g = rng.randrange(n_games)
+        a_col.append(pa * n_games + g)
+        b_col.append(pb * n_games + g)
+        f_col.append(flags[rng.randrange(len(flags))])
+        s_col.append(1 + i // per_season)
+    return stream
+
+
+def _naive(engine, stream, limit: int) -> dict:
+    """update_elo() one game at a time, dicts keyed by slot."""
+    from app import db
+    from app.rating import update_elo
+
+    rating: dict[int, int] = {}
+    season: dict[int, int] = {}
+    last: dict[int, int] = {}
+    n_games = len(engine.GAMES)
+    for a, b, f, s in zip(stream.a[:limit], stream.b[:limit], stream.flags[:limit], stream.season[:limit]):
+        for p in (a // n_games, b // n_games):
+            if last.get(p, s) != s:
+                for slot in range(p * n_games, p * n_games + n_games):
+                    if slot in season:
+                        season[slot] = db._soft_reset(season[slot])
+            last[p] = s
+        if f & engine.RATED and f & (engine.A_WIN | engine.B_WIN):
+            score_a = 1.0 if f & engine.A_WIN else 0.0
+            ra, rb = update_elo(rating.get(a, 1000), rating.get(b, 1000), score_a)
+            sa, sb = update_elo(season.get(a, 1000), season.get(b, 1000), score_a)
+            if not f & engine.A_SHADOW:
+                rating[a], season[a] = ra, sa
+            if not f & engine.B_SHADOW:
+                rating[b], season[b] = rb, sb
+    return {slot: (rating.get(slot, 1000), season.get(slot, 1000)) for slot in set(rating) | set(season)}
+
+
+def run(games: int, players: int, ks: list[float], workers: int | None, seed: int) -> None:
+    root = Path(__file__).resolve().parents[1]
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+    tmp = tempfile.mkdtemp(prefix="sm_bench_")
+    os.environ["DB_PATH"] = str(Path(tmp) / "ledger.db")
+
+    from app import db
+    from app import rating_engine as engine
+
+    db.init_db()
+    _check_ledger(db, engine, random.Random(seed))
+
+    t0 = time.perf_counter()
+    stream = _synthetic(engine, games, players, seed)
+    print(f"synthetic stream: {len(stream)} games, {players} players, {stream.nbytes() / 2**20:.0f} MiB "
+          f"(built in {time.perf_counter() - t0:.1f}s)")
+
+    prefix = min(len(stream), 200_000)
+    head = engine.GameStream(users=stream.users, a=stream.a[:prefix], b=stream.b[:prefix],
+                             flags=stream.flags[:prefix], season=stream.season[:prefix])
+    t0 = time.perf_counter()
+    check = engine.replay(head)
+    fast = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    naive = _naive(engine, stream, prefix)
+    slow = time.perf_counter() - t0
+    for slot, want in naive.items():
+        assert (check.rating[slot], check.season_rating[slot]) == want, slot
+    print(f"replay == update_elo loop on the first {prefix} games   "
+          f"(update_elo + dicts {slow:5.2f}s, replay {fast:5.2f}s, x{slow / fast:.1f})")
+
+    t0 = time.perf_counter()
+    base = engine.replay(stream)
+    one = time.perf_counter() - t0
+    print(f"replay k=24            {one:7.1f}s   {len(stream) / one / 1e6:5.2f} M games/s   "
+          f"({base.scored} rated decisive)")
+
+    t0 = time.perf_counter()
+    seq = [engine.replay(stream, k).summary() for k in ks]
+    seq_sec = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    par = engine.sweep_k(stream, ks, workers=workers)
+    par_sec = time.perf_counter() - t0
+    assert par == seq, "sweep_k differs from sequential replays"
+    print(f"K sweep x{len(ks)}: sequential {seq_sec:7.1f}s   {workers or min(len(ks), os.cpu_count() or 1)} "
+          f"worker process(es) {par_sec:7.1f}s   (cpu_count={os.cpu_count()})")
+    for r in par:
+        print(f"  k={r['k']:<5g} brier {r['brier']:.5f}   log loss {r['log_loss']:.5f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=10_000_000)
+    parser.add_argument("--players", type=int, default=200_000)
+    parser.add_argument("--k", type=float, action="append", help="K factor to sweep (repeatable)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+    run(args.games, args.players, args.k or [16, 24, 32, 40], args.workers, args.seed)
@@ -0,0 +1,126 @@
+"""Glicko-2 rating periods: one batch over a day of ledger games.
+
+First checks Glicko2Backend against the worked example in Glickman's paper,
+and checks that a period's result does not depend on the order of its
+games. It then seeds a throw-away DB ledger with a day of games and times
+run_rating_period() over them. Finally it checks:
+- the period is closed once;
+- shadowbanned players keep their state;
+- an idle player's rd grows with the periods they sit out, without their
+  row being rewritten;
+- get_glicko() marks new players as provisional.
+
+    python scripts/bench_rating_period.py --players 50000 --games 200000
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def _seed_ledger(db, players: int, games: int, rng: random.Random, banned: int) -> None:
+    con = db._con()
+    try:
+        skill = [rng.gauss(0, 200) for _ in range(players + 1)]
+
+        def rows():
+            now = time.time()
+            for i in range(games):
+                a, b = rng.sample(range(1, players + 1), 2)
+                p_a = 1 / (1 + 10 ** ((skill[b] - skill[a]) / 400))
+                x = rng.random()
+                winner = None if x > 0.95 else (a if x < p_a * 0.95 else b)
+                game = "xo" if i % 3 else rng.choice(("checkers", "chess"))
+                yield (now, game, a, b, winner, "draw" if winner is None else ("a" if winner == a else "b"),
+                       int(rng.random() < 0.9), int(a == banned), int(b == banned),
+                       1000, 1000, 1000, 1000, 1000, 1000, 1000, 1000, 0, 1)
+
+        con.executemany(
+            "INSERT INTO games(ts, game, a_id, b_id, winner_id, result, rated, a_shadowban, b_shadowban, "
+            "a_rating_before, a_rating_after, b_rating_before, b_rating_after, a_season_before, a_season_after, "
+            "b_season_before, b_season_after, week_epoch, season_id) VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            rows(),
+        )
+        con.commit()
+    finally:
+        con.close()
+
+
+def run(players: int, games: int, seed: int) -> None:
+    root = Path(__file__).resolve().parents[1]
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+    tmp = tempfile.mkdtemp(prefix="sm_bench_")
+    os.environ["DB_PATH"] = str(Path(tmp) / "glicko.db")
+
+    from app import db
+    from app.rating import Glicko2Backend, RatingState, match_distance
+
+    paper = Glicko2Backend(center=1500)
+    st = {"p": RatingState(1500, 200, 0.06), "a": RatingState(1400, 30, 0.06),
+          "b": RatingState(1550, 100, 0.06), "c": RatingState(1700, 300, 0.06)}
+    got = paper.rate_period(st, [("p", "a", 1.0), ("p", "b", 0.0), ("p", "c", 0.0)])["p"]
+    assert (round(got.rating, 2), round(got.rd, 2), round(got.vol, 5)) == (1464.05, 151.52, 0.06), got
+
+    rng = random.Random(seed)
+    backend = Glicko2Backend(center=db.DEFAULT_RATING)
+    sample = [(rng.randrange(200), rng.randrange(200), rng.choice((0.0, 0.5, 1.0))) for _ in range(2000)]
+    sample = [(a, b, s) for a, b, s in sample if a != b]
+    one = backend.rate_period({}, sample)
+    two = backend.rate_period({}, list(reversed(sample)))
+    assert all(math.isclose(one[p].rating, two[p].rating) and math.isclose(one[p].rd, two[p].rd) for p in one)
+    assert match_distance(1000, 350, 1300, 350) < match_distance(1000, 50, 1300, 50)
+
+    db.init_db()
+    banned = 7
+    t0 = time.perf_counter()
+    _seed_ledger(db, players, games, rng, banned)
+    print(f"DB={db.DB_PATH} players={players} ledger games={games} (seeded in {time.perf_counter() - t0:.1f}s)")
+
+    assert db.run_rating_period(24) is None, "period closed before it was over"
+    res = db.run_rating_period(24, force=True)
+    assert res and res["period"] == 1, res
+    print(f"period 1: {res['games']} rated games, {res['players']} (player, game) states, "
+          f"rated in {res['rate_sec']:.2f}s, {res['total_sec']:.2f}s with reads and the write")
+
+    con = db._con()
+    try:
+        n_banned = con.execute("SELECT COUNT(*) FROM user_glicko WHERE user_id=?", (banned,)).fetchone()[0]
+        idle = con.execute("SELECT user_id, rd, vol, period FROM user_glicko WHERE game='checkers' LIMIT 1").fetchone()
+    finally:
+        con.close()
+    assert n_banned == 0, "shadowbanned player was rated"
+    assert db.get_glicko(players + 1)["provisional"] and db.get_glicko(players + 1)["rd"] == 350
+
+    uid = int(idle["user_id"])
+    before = db.get_glicko(uid, "checkers")
+    for _ in range(3):  # empty periods
+        assert db.run_rating_period(24, force=True)["games"] == 0
+    after = db.get_glicko(uid, "checkers")
+    want = min(350.0, math.sqrt(before["rd"] ** 2 + 3 * (173.7178 * before["vol"]) ** 2))
+    assert math.isclose(after["rd"], want) and after["rating"] == before["rating"], (before, after)
+    con = db._con()
+    try:
+        assert con.execute("SELECT period FROM user_glicko WHERE user_id=? AND game='checkers'", (uid,)).fetchone()[0] == 1
+    finally:
+        con.close()
+    print(f"idle player rd {before['rd']:.1f} -> {after['rd']:.1f} after 3 empty periods (row not rewritten)")
+
+    top = db.get_glicko(1)
+    print(f"user 1 xo: rating {top['rating']:.0f} rd {top['rd']:.1f} vol {top['vol']:.4f} "
+          f"provisional={top['provisional']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--players", type=int, default=50_000)
+    parser.add_argument("--games", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args()
+    run(args.players, args.games, args.seed)
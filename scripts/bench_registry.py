@@ -0,0 +1,157 @@
+"""Bounded in-memory registries (app.registry.BoundedRegistry).
+
+First checks the eviction rules:
+- idle TTL from activity() and from the last access;
+- reads do not keep an activity-keyed entry alive;
+- peek(), items() and values() do not refresh a last-access entry;
+- LRU eviction at the size cap;
+- on_evict cleaning up the checkers store's indexes and the XO PvP timer.
+
+It then simulates --hours of traffic: --games-per-hour checkers games, each
+played for a few minutes and then abandoned or finished, plus one click per
+move. Every simulated minute the registry is swept. The final size is
+compared with plain dicts fed the same traffic. get/set cost is timed
+against a plain dict first.
+
+    python scripts/bench_registry.py --hours 48 --games-per-hour 3000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def _check_rules() -> None:
+    from app import live_state, registry
+    from app import handlers_menu as hm
+    from app.checkers_game import storage as ck
+    from app.xo_match import PvPMatch
+
+    reg = registry.BoundedRegistry("bench_ttl", ttl=10, max_size=3)
+    reg["a"] = 1
+    reg["b"] = 2
+    reg._data["a"][1] -= 11  # a idle for 11s
+    assert "a" not in reg and reg.get("a") is None and list(reg) == ["b"]
+    assert reg.sweep() == 1 and reg.evicted_ttl == 1
+    reg["c"], reg["d"] = 3, 4
+    assert reg["b"] == 2  # b is now the most recently used
+    reg["e"] = 5
+    assert list(reg) == ["d", "b", "e"] and reg.evicted_cap == 1, list(reg)
+    reg._data["d"][1] -= 9  # d idle for 9s: walking the map must not renew it
+    assert reg.peek("d") == 4 and dict(reg.items())["d"] == 4 and 4 in reg.values() and ("d", 4) in reg.items()
+    reg._data["d"][1] -= 2
+    assert reg.peek("d") is None and "d" not in dict(reg.items()), "a walk kept an idle entry alive"
+    assert list(reg) == ["b", "e"]
+
+    seen = {"ts": time.time() - 100}
+    act = registry.BoundedRegistry("bench_activity", ttl=10, max_size=10, activity=lambda v: v["ts"])
+    act["m"] = seen
+    act._data["m"][1] -= 100
+    assert act.get("m") is None, "a read kept an idle entry alive"
+    seen["ts"] = time.time()
+    assert act.get("m") is seen
+
+    gs = ck.create_private_match(1, "A", 2, "B")
+    lobby = ck.create_lobby(-5, 1, 3, "C")
+    for s in (gs, lobby):
+        s.last_activity -= ck.STORE.games.ttl + 1
+        ck.STORE.games._data[s.gid][1] -= ck.STORE.games.ttl + 1
+    assert ck.STORE.games.sweep() == 2
+    assert not ck.STORE.active_by_user and not ck.STORE.lobby_by_chat and ck.user_active_game(1) is None
+
+    async def pvp_timer() -> None:
+        hm.PVP_MATCHES["x1"] = PvPMatch(1, 2, last_move=time.time() - hm.PVP_MATCHES.ttl - 1)
+        hm.set_pvp_timer("x1", hm._BotWrap(None))
+        task = hm.PVP_TIMER_TASKS["x1"]
+        assert hm.PVP_MATCHES.sweep() == 1
+        await asyncio.sleep(0)
+        assert "x1" not in hm.PVP_TIMER_TASKS and task.cancelled(), "evicted match kept its watchdog"
+
+    asyncio.run(pvp_timer())
+    live_state._DIRTY.clear()
+    print("rules: TTL by activity and by access, LRU cap, on_evict cleans indexes and timers")
+
+
+def _simulate(hours: int, per_hour: int, seed: int) -> None:
+    from app import registry
+    from app.checkers_game.storage import GameSession
+
+    rng = random.Random(seed)
+    games = registry.BoundedRegistry("bench_games", ttl=6 * 3600, max_size=50_000,
+                                     activity=lambda gs: gs.last_activity)
+    clicks = registry.BoundedRegistry("bench_clicks", ttl=60, max_size=200_000)
+    plain_games: dict = {}
+    plain_clicks: dict = {}
+    t0 = time.time() - hours * 3600
+    uid = 0
+    started = time.perf_counter()
+    for minute in range(hours * 60):
+        now = t0 + minute * 60
+        for _ in range(per_hour // 60):
+            uid += 2
+            gs = GameSession(gid=f"g{uid}", red_id=uid, blue_id=uid + 1)
+            gs.last_activity = now + rng.randrange(60, 900)  # last move a few minutes in
+            games[gs.gid] = gs
+            games._data[gs.gid][1] = now
+            plain_games[gs.gid] = gs
+            for user in (uid, uid + 1):
+                clicks[user] = now
+                clicks._data[user][1] = now
+                plain_clicks[user] = now
+        games.sweep(now)
+        clicks.sweep(now)
+    took = time.perf_counter() - started
+    print(f"{hours}h at {per_hour} games/h ({uid // 2} games, {uid} players), swept every minute in {took:.1f}s:")
+    for name, reg, plain in (("games", games, plain_games), ("clicks", clicks, plain_clicks)):
+        st = reg.stats()
+        plain_bytes = registry.BoundedRegistry("bench_plain_" + name, ttl=1e12, max_size=10**9)
+        plain_bytes._data.update((k, [v, 0.0]) for k, v in plain.items())
+        print(f"  {name:6} registry {st['entries']:8d} entries ~{st['bytes'] / 2**20:7.1f} MiB "
+              f"(evicted {st['evicted_ttl']} by TTL, {st['evicted_cap']} by cap)   "
+              f"plain dict {len(plain):8d} entries ~{plain_bytes.nbytes() / 2**20:7.1f} MiB")
+
+
+def _timing(n: int = 200_000) -> None:
+    from app import registry
+
+    reg = registry.BoundedRegistry("bench_timing", ttl=60, max_size=n)
+    plain: dict = {}
+    keys = list(range(n))
+    for name, target in (("dict", plain), ("BoundedRegistry", reg)):
+        t0 = time.perf_counter()
+        for k in keys:
+            target[k] = 1.0
+        set_us = (time.perf_counter() - t0) / n * 1e6
+        t0 = time.perf_counter()
+        for k in keys:
+            target.get(k, 0.0)
+        get_us = (time.perf_counter() - t0) / n * 1e6
+        print(f"  {name:16} set {set_us:5.2f} us   get {get_us:5.2f} us")
+
+
+def run(hours: int, per_hour: int, seed: int) -> None:
+    root = Path(__file__).resolve().parents[1]
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+    tmp = tempfile.mkdtemp(prefix="sm_bench_")
+    os.environ["DB_PATH"] = str(Path(tmp) / "registry.db")
+
+    _check_rules()
+    print("per call (one click = one get + one set):")
+    _timing()
+    _simulate(hours, per_hour, seed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hours", type=int, default=48)
+    parser.add_argument("--games-per-hour", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=19)
+    args = parser.parse_args()
+    run(args.hours, args.games_per_hour, args.seed)
@@ -0,0 +1,162 @@
+"""Season rollover: lazy season_id stamps vs the table-wide UPDATE it replaced.
+
+Seeds synthetic users with season ratings, then times the old rollover (one
+UPDATE over user_game_stats, run inside a rolled-back transaction) against
+reset_season_if_needed(), and the per-update "is the season over" check
+(season_rollover_due() vs reading the meta row). Checks that the season_history
+snapshot matches the board it was taken from, that every player reads
+soft-reset afterwards (get_game_stats and the users view), that a season write
+stores the soft reset for all of the player's games with a consistent overall
+row, and that the new season boards start empty. settle_season_rollover()
+(the background loop in app.main) then stores the soft reset for everyone:
+the overall top is back after its first batch, and once it is done every
+season board lists all players at their soft-reset rating, ranks included.
+Runs against a throw-away SQLite file:
+
+    python scripts/bench_season_rollover.py --users 200000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def _time(fn, repeat: int) -> float:
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+
+def _soft(r: int, base: int, factor: float) -> int:
+    d = (r - base) * factor  # SQLite ROUND: halves away from zero
+    return base + int(math.copysign(math.floor(abs(d) + 0.5), d))
+
+
+def run(users: int, seed: int) -> None:
+    root = Path(__file__).resolve().parents[1]
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+    tmp = tempfile.mkdtemp(prefix="sm_bench_")
+    os.environ["DB_PATH"] = str(Path(tmp) / "season.db")
+
+    from app import db
+
+    rng = random.Random(seed)
+    db.init_db()
+    con = db._con()
+    try:
+        seeded = {uid: (rng.randint(700, 1700), rng.randint(700, 1700)) for uid in range(1, users + 1)}
+        con.executemany(
+            "INSERT INTO users(user_id, username, first_name, season_rating, season_rating_ck, season_games, "
+            "season_games_ck, updated_ts) VALUES(?,?,?,?,?,?,?,?)",
+            ((uid, f"user{uid}", f"User {uid}", xo, ck, rng.randint(1, 30), rng.randint(1, 30), time.time())
+             for uid, (xo, ck) in seeded.items()),
+        )
+        con.commit()
+        con.execute("ANALYZE")
+        before = {uid: db.get_game_stats(uid, "xo")["season_rating"] for uid in rng.sample(range(1, users + 1), 50)}
+        want_top = db.get_season_top100("overall", limit=10)
+
+        def old_rollover():
+            con.execute("BEGIN IMMEDIATE")
+            con.execute(
+                "UPDATE user_game_stats SET season_rating=1000, season_wins=0, season_games=0 "
+                "WHERE game != 'overall' AND (season_rating != 1000 OR season_games != 0)"
+            )
+            con.rollback()
+
+        old_sec = _time(old_rollover, 1)
+        meta_sec = _time(lambda: db._meta_get(con, "season_start_ts"), 2000)
+        db._meta_set(con, "season_start_ts", str(time.time() - (db.SEASON_LENGTH_DAYS + 1) * 86400))
+        con.commit()
+        db._meta_changed()
+    finally:
+        con.close()
+
+    db._SEASON_END_TS = 0.0
+    t0 = time.perf_counter()
+    payload = db.reset_season_if_needed(top_n=10)
+    new_sec = time.perf_counter() - t0
+    assert payload is not None and db.reset_season_if_needed(top_n=10) is None
+    assert not db.season_rollover_due()
+    due_sec = _time(db.season_rollover_due, 20000)
+    want = [(r["user_id"], r["score"]) for r in want_top]
+    assert [(r["user_id"], r["r"]) for r in payload["top_all"]] == want, "season_history top differs from the board"
+
+    f = db.SOFT_RESET_FACTOR
+    con = db._con()
+    try:
+        stored = json.loads(con.execute("SELECT top_json FROM season_history").fetchone()[0])
+        assert stored["season_id"] == payload["season_id"]
+        for uid, r in before.items():
+            assert db.get_game_stats(uid, "xo")["season_rating"] == _soft(r, 1000, f), uid
+            row = con.execute("SELECT season_rating, season_games FROM users WHERE user_id=?", (uid,)).fetchone()
+            assert tuple(row) == (_soft(r, 1000, f), 0), (uid, tuple(row))
+    finally:
+        con.close()
+    for g in ("overall",) + db.GAMES:
+        assert not db.get_season_top100(g), f"season {g} board not empty after the rollover"
+
+    def want_board(game: str, soft: dict, limit: int = 100) -> list:
+        if game == "overall":
+            # the stored overall row is the sum of the stored game rows (trigger deltas)
+            scores = {u: soft.get(u, _soft(xo, 1000, f) + _soft(ck, 1000, f)) for u, (xo, ck) in seeded.items()}
+        else:
+            i = 0 if game == "xo" else 1
+            scores = {u: soft.get(u, _soft(r[i], 1000, f)) for u, r in seeded.items()}
+        return sorted((-v, u) for u, v in scores.items())[:limit]
+
+    def board(game: str, limit: int = 100) -> list:
+        return [(-r["score"], r["user_id"]) for r in db.get_season_top100(game, limit=limit)]
+
+    # settle: the overall top is back after the first batch, everyone once it returns 0
+    t0 = time.perf_counter()
+    first = db.settle_season_rollover()
+    first_sec = time.perf_counter() - t0
+    assert board("overall", 10) == want_board("overall", {}, 10), "overall top not settled first"
+    batches, settled = 1, first
+    while n := db.settle_season_rollover():
+        batches, settled = batches + 1, settled + n
+    settle_sec = time.perf_counter() - t0
+    assert settled == users, (settled, users)
+    for g in ("overall", "xo", "checkers"):
+        top = db.get_season_top100(g)
+        assert board(g) == want_board(g, {}), f"season {g} board after the settle"
+        for pos in (0, 57, 99):
+            assert db.get_rank(top[pos]["user_id"], "season_" + g) == pos + 1, (g, pos)
+
+    # a season write after the settle: counters and the other games stay as stored
+    uid = next(iter(before))
+    ck = db.get_game_stats(uid, "checkers")["season_rating"]
+    db.inc_season_games(uid, "xo", win=True)
+    db.set_season_rating(uid, "xo", 1900)
+    assert db.get_game_stats(uid, "xo")["season_games"] == 1
+    assert db.get_game_stats(uid, "checkers")["season_rating"] == ck
+    assert board("xo")[0] == (-1900, uid) and db.get_rank(uid, "season_xo") == 1
+    assert board("overall") == want_board("overall", {uid: 1900 + ck})
+
+    print(f"DB={db.DB_PATH} users={users}")
+    print(f"old rollover (mass UPDATE)  {old_sec * 1e3:9.1f} ms")
+    print(f"lazy rollover               {new_sec * 1e3:9.1f} ms   (history top built from idx_game_stats_season)")
+    print(f"per-update check: meta read {meta_sec * 1e6:7.1f} us   cached timestamp {due_sec * 1e6:7.3f} us")
+    print(f"settle: {settled} players in {batches} batches of {db.SEASON_SETTLE_BATCH}, {settle_sec:.1f} s "
+          f"({first_sec * 1e3:.0f} ms for the first batch, which restores the top of the boards)")
+    print("soft reset read on 50 sampled users, stored by the settle and on a season write, "
+          "boards and ranks match, overall row consistent")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=9)
+    args = parser.parse_args()
+    run(args.users, args.seed)
@@ -0,0 +1,101 @@
+"""SQL statements per callback with and without the per-update UserSnapshot.
+
+Replays the db access pattern of a typical XO move callback (ensure_user,
+render_xo_msg, pvp_move getters, the menu keyboard) for one caller, counting
+statements with sqlite's trace hook. Runs against a throw-away SQLite file:
+
+    python scripts/bench_user_snapshot.py --callbacks 500
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+
+def run(callbacks: int) -> None:
+    root = Path(__file__).resolve().parents[1]
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+
+    tmp = tempfile.mkdtemp(prefix="sm_bench_")
+    os.environ["DB_PATH"] = str(Path(tmp) / "bench.db")
+    os.environ.setdefault("BOT_TOKEN", "0:bench")
+
+    from app import db, db_async, user_snapshot
+    from app.handlers_menu import ensure_user
+
+    db.init_db()
+    uid = 42
+    db.upsert_user(uid, "bench", "Bench", "uk")
+
+    statements = 0
+
+    def _trace(_sql: str) -> None:
+        nonlocal statements
+        statements += 1
+
+    pooled_con = db._con
+
+    def traced_con():
+        con = pooled_con()
+        con.set_trace_callback(_trace)
+        return con
+
+    db._con = traced_con
+    caller = SimpleNamespace(from_user=SimpleNamespace(id=uid, username="bench", first_name="Bench", language_code="uk"))
+
+    async def one_callback() -> None:
+        await ensure_user(caller)
+        # render_xo_msg
+        await db_async.get_skin(uid)
+        await db_async.get_active_wallpaper(uid)
+        # pvp_move / menu getters
+        await db_async.is_shadowbanned(uid)
+        await db_async.get_rating(uid)
+        await db_async.is_vip(uid)
+        await db_async.get_coins(uid)
+        await db_async.db_get_lang(uid)
+        await db_async.get_active_game(uid)
+        await db_async.get_skin(uid)
+        # menu_kb: links from the meta cache, bonus flag from the snapshot
+        await db_async.get_chat()
+        await db_async.get_news()
+        await db_async.can_claim_daily_bonus(uid)
+
+    async def scenario(label: str, bound: bool) -> None:
+        nonlocal statements
+        statements = 0
+        t0 = time.perf_counter()
+        for _ in range(callbacks):
+            if bound:
+                slot, token = user_snapshot.bind(uid)
+                try:
+                    await one_callback()
+                finally:
+                    user_snapshot.release(slot, token)
+            else:
+                await one_callback()
+        dt = time.perf_counter() - t0
+        print(f"{label:12s} {statements / callbacks:5.1f} statements/callback  {dt / callbacks * 1e3:6.2f} ms/callback")
+
+    async def main() -> None:
+        print(f"DB={db.DB_PATH} callbacks={callbacks}")
+        await scenario("no snapshot", False)
+        await scenario("snapshot", True)
+        print("snapshot stats:", user_snapshot.stats)
+
+    asyncio.run(main())
+    db_async.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--callbacks", type=int, default=300)
+    args = parser.parse_args()
+    run(args.callbacks)
@@ -0,0 +1,178 @@
+"""Wide users row vs the narrow per-concern tables (migration 005_split_users).
+
+Builds a schema-version-4 database with the single wide users table, seeds
+synthetic users, and measures bytes per row (dbstat), a point read of the
+whole row, the typical hot reads/writes and a full scan of the weekly
+counters. Then applies migration 5 on that file, checks that every row reads
+back unchanged through the users compatibility view, and repeats the
+measurements against the narrow tables. Finally applies the remaining
+migrations (user_game_stats, week_epoch) and checks the view rows and the
+overall sums once more.
+Runs against throw-away SQLite files:
+
+    python scripts/bench_user_split.py --users 100000
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def _time(fn, repeat: int) -> float:
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+
+def _table_bytes(con, names: list[str]) -> dict[str, int]:
+    marks = ",".join("?" * len(names))
+    return {r[0]: int(r[1]) for r in con.execute(
+        f"SELECT name, SUM(pgsize) FROM dbstat WHERE name IN ({marks}) GROUP BY name", names
+    )}
+
+
+def run(users: int, repeat: int, seed: int) -> None:
+    root = Path(__file__).resolve().parents[1]
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+    tmp = Path(tempfile.mkdtemp(prefix="sm_bench_"))
+    os.environ["DB_PATH"] = str(tmp / "split.db")
+
+    from app import db
+
+    rng = random.Random(seed)
+    con = db._con()
+    try:
+        db.get_schema_version(con)
+        for version, _name, step in db.MIGRATIONS:
+            if version >= 5:
+                break
+            step(con)
+        db._meta_set(con, "schema_version", "4")
+        con.commit()
+        con.executemany(
+            "INSERT INTO users(user_id, username, first_name, lang, coins, rating, rating_ck, "
+            "total_wins, total_games, week_wins, week_games, season_rating, skin, bp_xp, ref_count, updated_ts) "
+            "VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            ((uid, f"user{uid}", f"User {uid}", rng.choice(("uk", "en", "ru")), rng.randint(0, 5000),
+              rng.randint(600, 2400), rng.randint(600, 2400), rng.randint(0, 300), rng.randint(0, 600),
+              rng.randint(0, 10), rng.randint(0, 20), rng.randint(800, 1600), rng.choice(("classic", "neon")),
+              rng.randint(0, 5000), rng.randint(0, 3), time.time()) for uid in range(1, users + 1)),
+        )
+        con.commit()
+        wide_rows = {uid: dict(con.execute("SELECT * FROM users WHERE user_id=?", (uid,)).fetchone())
+                     for uid in rng.sample(range(1, users + 1), 200)}
+        ncols = len(wide_rows[next(iter(wide_rows))])
+        wide_bytes = _table_bytes(con, ["users"])["users"]
+    finally:
+        con.close()
+
+    uids = [rng.randint(1, users) for _ in range(512)]
+
+    def point_reads(sql: str):
+        def fn():
+            c = db._con()
+            try:
+                for uid in uids:
+                    dict(c.execute(sql, (uid,)).fetchone())
+            finally:
+                c.close()
+        return fn
+
+    def rating_writes(table: str):
+        def fn():
+            c = db._con()
+            try:
+                for uid in uids:
+                    c.execute(f"UPDATE {table} SET rating=rating+1, total_games=total_games+1 WHERE user_id=?", (uid,))
+                c.commit()
+            finally:
+                c.close()
+        return fn
+
+    def scan(table: str):
+        def fn():
+            c = db._con()
+            try:
+                c.execute(f"SELECT SUM(week_games), SUM(week_wins) FROM {table}").fetchone()
+            finally:
+                c.close()
+        return fn
+
+    def measure(profile: str, stats: str) -> dict[str, float]:
+        n = len(uids)
+        return {
+            "SELECT * -> dict": _time(point_reads(f"SELECT * FROM {profile} WHERE user_id=?"), repeat) / n,
+            "lang+coins read": _time(point_reads(f"SELECT lang, coins FROM {profile} WHERE user_id=?"), repeat) / n,
+            "rating read": _time(point_reads(f"SELECT rating, rating_ck FROM {stats} WHERE user_id=?"), repeat) / n,
+            "rating write": _time(rating_writes(stats), max(1, repeat // 5)) / n,
+            "weekly scan": _time(scan(stats), max(1, repeat // 5)),
+        }
+
+    before = measure("users", "users")
+
+    con = db._con()
+    try:
+        t0 = time.perf_counter()
+        db._m005_split_users(con)
+        db._meta_set(con, "schema_version", "5")
+        con.commit()
+        migrate_sec = time.perf_counter() - t0
+        con.execute("VACUUM")
+        for uid, want in wide_rows.items():
+            got = dict(con.execute("SELECT * FROM users WHERE user_id=?", (uid,)).fetchone())
+            want = {**want, "rating": got["rating"], "total_games": got["total_games"]}  # bumped above
+            assert got == want, f"user {uid} changed across the split"
+        assert con.execute("SELECT COUNT(*) FROM users").fetchone()[0] == users
+        narrow = _table_bytes(con, list(db._USER_TABLES_V5))
+    finally:
+        con.close()
+
+    after = measure("user_profile", "user_stats")
+
+    con = db._con()
+    try:
+        view_rows = {uid: dict(con.execute("SELECT * FROM users WHERE user_id=?", (uid,)).fetchone()) for uid in wide_rows}
+        t0 = time.perf_counter()
+        db.migrate(con)
+        games_sec = time.perf_counter() - t0
+        for uid, want in view_rows.items():
+            got = dict(con.execute("SELECT * FROM users WHERE user_id=?", (uid,)).fetchone())
+            assert got == want, f"user {uid} changed across migration 6"
+        bad = con.execute(
+            "SELECT COUNT(*) FROM user_game_stats o JOIN user_game_stats x ON x.user_id=o.user_id AND x.game='xo' "
+            "JOIN user_game_stats c ON c.user_id=o.user_id AND c.game='checkers' WHERE o.game='overall' "
+            "AND (o.rating != x.rating + c.rating OR o.season_rating != x.season_rating + c.season_rating)"
+        ).fetchone()[0]
+        assert bad == 0, f"{bad} overall rows do not match xo + checkers"
+        con.execute("VACUUM")
+        game_bytes = _table_bytes(con, ["user_game_stats"]).get("user_game_stats", 0)
+    finally:
+        con.close()
+
+    print(f"DB={db.DB_PATH} users={users}")
+    print(f"migration 005_split_users: {migrate_sec:.2f}s, view rows identical")
+    print(f"  users (wide, {ncols} cols)     {wide_bytes / users:7.1f} bytes/row")
+    for table, cols in db._USER_TABLES_V5.items():
+        print(f"  {table:17s} ({len(cols) + 1:2d} cols) {narrow.get(table, 0) / users:7.1f} bytes/row")
+    for label in before:
+        b, a = before[label], after[label]
+        print(f"  {label:16s} wide {b * 1e6:9.1f} us   narrow {a * 1e6:9.1f} us   x{b / a:.1f}")
+    print(f"migrations 006_game_stats+: {games_sec:.2f}s, view rows identical, overall rows consistent")
+    print(f"  user_game_stats   ({len(db.GAMES) + 1} rows/user) {game_bytes / users:7.1f} bytes/user")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+    run(args.users, args.repeat, args.seed)
@@ -0,0 +1,147 @@
+"""Weekly reset: week_epoch rollover vs the mass UPDATE it replaced.
+
+Seeds synthetic users with weekly counters and quest masks in every game,
+then times the old reset (one UPDATE over user_game_stats, run inside a
+rolled-back transaction) against reset_week_if_needed(), together with the
+worst bump_weekly() latency seen by a concurrent writer during each. Checks
+that concurrent reset calls close the week once, that the old week reads as
+zero everywhere (get_game_stats, the users view, the weekly boards) and that
+the next write starts the new week from zero. Runs against a throw-away
+SQLite file:
+
+    python scripts/bench_week_reset.py --users 200000
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+
+def _seed(db, n: int, rng: random.Random) -> None:
+    con = db._con()
+    try:
+        con.executemany(
+            "INSERT INTO users(user_id, username, first_name, week_wins, week_games, week_wins_ck, week_games_ck, "
+            "quest_mask, quest_mask_ck, updated_ts) VALUES(?,?,?,?,?,?,?,?,?,?)",
+            ((uid, f"user{uid}", f"User {uid}", rng.randint(0, 5), rng.randint(5, 20), rng.randint(0, 5),
+              rng.randint(5, 20), rng.randint(0, 15), rng.randint(0, 15), time.time()) for uid in range(1, n + 1)),
+        )
+        con.execute("UPDATE user_game_stats SET week_games=3, week_wins=1, quest_mask=1 WHERE game='chess'")
+        con.commit()
+    finally:
+        con.close()
+
+
+def _old_reset(db) -> None:
+    con = db._con()
+    try:
+        con.execute("BEGIN IMMEDIATE")
+        con.execute(
+            "UPDATE user_game_stats SET week_wins=0, week_games=0, quest_mask=0 "
+            "WHERE week_games > 0 OR quest_mask != 0"
+        )
+        con.rollback()  # keep the data for the new path
+    finally:
+        con.close()
+
+
+def _under_load(db, n: int, fn) -> tuple[float, float]:
+    """Run fn while another thread keeps writing; (fn seconds, worst write seconds)."""
+    stop = threading.Event()
+    worst = [0.0]
+
+    def writer():
+        rng = random.Random(7)
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            db.bump_weekly(rng.randint(1, n), win=True, game="xo")
+            worst[0] = max(worst[0], time.perf_counter() - t0)
+
+    th = threading.Thread(target=writer)
+    th.start()
+    time.sleep(0.2)
+    t0 = time.perf_counter()
+    fn()
+    took = time.perf_counter() - t0
+    time.sleep(0.2)
+    stop.set()
+    th.join()
+    return took, worst[0]
+
+
+def run(users: int, seed: int) -> None:
+    root = Path(__file__).resolve().parents[1]
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+    tmp = tempfile.mkdtemp(prefix="sm_bench_")
+    os.environ["DB_PATH"] = str(Path(tmp) / "week.db")
+
+    from app import db
+
+    rng = random.Random(seed)
+    db.init_db()
+    _seed(db, users, rng)
+    probe = rng.randint(1, users)
+    assert db.get_game_stats(probe, "xo")["week_games"] > 0
+
+    old_sec, old_worst = _under_load(db, users, lambda: _old_reset(db))
+
+    db.set_week_start_ts(time.time() - 8 * 86400)
+    results: list[bool] = []
+
+    def closers():
+        threads = [threading.Thread(target=lambda: results.append(db.reset_week_if_needed(7, 10))) for _ in range(4)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+
+    new_sec, new_worst = _under_load(db, users, closers)
+    assert results.count(True) == 1, f"week closed {results.count(True)} times"
+    assert not db.reset_week_if_needed(7, 10)
+    con = db._con()
+    try:
+        archived = con.execute("SELECT COUNT(*) FROM week_history").fetchone()[0]
+        assert archived == len(db.OVERALL_GAMES), f"{archived} week_history rows"
+        stale = con.execute(
+            "SELECT COUNT(*) FROM users WHERE week_games + week_games_ck + quest_mask + quest_mask_ck > 0"
+        ).fetchone()[0]
+    finally:
+        con.close()
+
+    # the concurrent writer only touches xo rows
+    for g in ("checkers", "chess"):
+        st = db.get_game_stats(probe, g)
+        assert (st["week_games"], st["week_wins"], st["quest_mask"]) == (0, 0, 0), (g, st)
+        assert not db.get_weekly_top(10, game=g), f"weekly {g} board survived the reset"
+    db.set_quest_mask(probe, 4, game="checkers")
+    db.bump_weekly(probe, win=True, game="checkers")
+    st = db.get_game_stats(probe, "checkers")
+    assert (st["week_games"], st["week_wins"], st["quest_mask"]) == (1, 1, 4), st
+    assert db.get_weekly_rank(probe, "checkers") == 1
+    con = db._con()
+    try:
+        row = con.execute("SELECT week_games_ck, week_wins_ck, quest_mask_ck FROM users WHERE user_id=?", (probe,)).fetchone()
+        assert tuple(row) == (1, 1, 4), tuple(row)
+    finally:
+        con.close()
+
+    print(f"DB={db.DB_PATH} users={users}")
+    print(f"old reset (mass UPDATE)  {old_sec * 1e3:9.1f} ms   worst concurrent write {old_worst * 1e3:8.1f} ms")
+    print(f"epoch rollover           {new_sec * 1e3:9.1f} ms   worst concurrent write {new_worst * 1e3:8.1f} ms")
+    print(f"closed once by 4 concurrent callers, {archived} week_history rows, "
+          f"{stale} users with weekly values left (the concurrent writer's new week)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+    run(args.users, args.seed)
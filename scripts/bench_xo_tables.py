@@ -0,0 +1,168 @@
+"""Tic-tac-toe table lookups (app.game_engine) against the functions they replaced.
+
+The old functions are kept below (_old_*), unchanged except for the names.
+
+First checks, on every one of the 3^9 boards (reachable or not), that the
+lookups return the same as the old code:
+- check_winner;
+- winline.get_winline, and compute_highlight through winning_line;
+- ai_move_normal and ai_move_hard (for every board with an empty cell).
+The table file (assets/xo_tables.bin) must equal a fresh build.
+
+It then times each old function against its lookup over the boards an AI
+game reaches (O to move, no winner yet), plus the table import.
+
+    python scripts/bench_xo_tables.py
+"""
+from __future__ import annotations
+
+import sys
+import time
+from itertools import product
+from pathlib import Path
+
+WIN_LINES = [
+    (0, 1, 2), (3, 4, 5), (6, 7, 8),
+    (0, 3, 6), (1, 4, 7), (2, 5, 8),
+    (0, 4, 8), (2, 4, 6),
+]
+
+
+# ---- the old functions ----
+def _old_check_winner(board):
+    for a, b, c in WIN_LINES:
+        if board[a] != "." and board[a] == board[b] == board[c]:
+            return board[a]
+    if "." not in board:
+        return "D"
+    return None
+
+
+def _old_get_winline(board):
+    for a, b, c in WIN_LINES:
+        if board[a] != "." and board[a] == board[b] == board[c]:
+            return board[a], [a, b, c]
+    return None
+
+
+def _old_compute_highlight(board):
+    wb = _old_get_winline(board)
+    if not wb:
+        return set()
+    _, line = wb
+    return set(line)
+
+
+def _available_moves(board):
+    return [i for i, ch in enumerate(board) if ch == "."]
+
+
+def _apply_move(board, cell, mark):
+    return board[:cell] + mark + board[cell + 1:]
+
+
+def _old_ai_move_normal(board):
+    for m in _available_moves(board):
+        if _old_check_winner(_apply_move(board, m, "O")) == "O":
+            return m
+    for m in _available_moves(board):
+        if _old_check_winner(_apply_move(board, m, "X")) == "X":
+            return m
+    if board[4] == ".":
+        return 4
+    for m in [0, 2, 6, 8]:
+        if board[m] == ".":
+            return m
+    return _available_moves(board)[0]
+
+
+def _old_ai_move_hard(board):
+    def score(b, turn):
+        w = _old_check_winner(b)
+        if w == "O":
+            return 10
+        if w == "X":
+            return -10
+        if w == "D":
+            return 0
+        moves = _available_moves(b)
+        if turn == "O":
+            best = -999
+            for m in moves:
+                best = max(best, score(_apply_move(b, m, "O"), "X"))
+            return best
+        best = 999
+        for m in moves:
+            best = min(best, score(_apply_move(b, m, "X"), "O"))
+        return best
+
+    best_move = None
+    best_val = -999
+    for m in _available_moves(board):
+        val = score(_apply_move(board, m, "O"), "X")
+        if val > best_val:
+            best_val = val
+            best_move = m
+    return best_move if best_move is not None else _available_moves(board)[0]
+
+
+def _check(ge, winline, boards) -> None:
+    assert ge.TABLES_PATH.read_bytes() == b"".join(ge._build_tables()), "stale xo_tables.bin"
+    for b in boards:
+        assert ge.check_winner(b) == _old_check_winner(b), b
+        assert winline.get_winline(b) == _old_get_winline(b), b
+        line = ge.winning_line(b)
+        assert (set(line) if line else set()) == _old_compute_highlight(b), b
+        if "." in b:
+            assert ge.ai_move_normal(b) == _old_ai_move_normal(b), b
+    t0 = time.perf_counter()
+    n = 0
+    for b in boards:
+        if "." in b:
+            assert ge.ai_move_hard(b) == _old_ai_move_hard(b), b
+            n += 1
+    print(f"equivalence: all {len(boards)} boards (winner, win line, highlight, normal), "
+          f"hard on {n} boards ({time.perf_counter() - t0:.0f}s of old minimax)")
+
+
+def _time(fn, boards, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for b in boards:
+            fn(b)
+    return (time.perf_counter() - t0) / (repeat * len(boards))
+
+
+def run() -> None:
+    root = Path(__file__).resolve().parents[1]
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+    t0 = time.perf_counter()
+    from app import game_engine as ge
+    import_ms = (time.perf_counter() - t0) * 1000
+    from app import winline
+
+    boards = ["".join(cells) for cells in product(".XO", repeat=9)]
+    _check(ge, winline, boards)
+
+    ai_boards = [b for b in boards if b.count("X") == b.count("O") + 1 and _old_check_winner(b) is None]
+    t0 = time.perf_counter()
+    ge._build_tables()
+    build_ms = (time.perf_counter() - t0) * 1000
+    print(f"tables: import {import_ms:.1f} ms from {ge.TABLES_PATH.name}, {build_ms:.0f} ms to build")
+    print(f"per call over the {len(ai_boards)} boards an AI game reaches:")
+    runs = (
+        ("check_winner", _old_check_winner, ge.check_winner, 200),
+        ("compute_highlight", _old_compute_highlight,
+         lambda b: set(ge.winning_line(b) or ()), 200),
+        ("ai_move_normal", _old_ai_move_normal, ge.ai_move_normal, 20),
+        ("ai_move_hard", _old_ai_move_hard, ge.ai_move_hard, 1),
+    )
+    for name, old, new, repeat in runs:
+        old_s = _time(old, ai_boards, repeat)
+        new_s = _time(new, ai_boards, max(repeat, 200))
+        print(f"  {name:18} old {old_s * 1e6:10.1f} us   table {new_s * 1e6:6.2f} us   x{old_s / new_s:9.0f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,209 @@
+"""Write the checkers opening book and endgame table (app.checkers_game.knowledge).
+
+Endgame table (--pieces, default 3): every legal position with at most that
+many pieces, both colours on the board, either side to move. Men never
+stand on their own crowning row. Solved by retrograde analysis:
+- every position's complete turns are generated once;
+- positions with no move are lost (in 0). A position with a turn that takes
+  the last enemy piece is won in 1.
+- The rest is worked back from those in distance order. A position is won in
+  n + 1 if some turn reaches a position lost in n. It is lost in n + 1 once
+  every turn reaches a won position; n is the longest of those wins.
+- Whatever stays unresolved can be played forever: a draw.
+
+Opening book (--book-plies, default 6): from the start position, for each
+colour as the book side. The book side's turn is the --book-depth search
+result (app.checkers_game.search). Every opponent reply is followed, up to
+--book-plies turns from the start.
+
+    python scripts/gen_checkers_knowledge.py --pieces 3 --book-plies 6 --book-depth 8
+    python scripts/gen_checkers_knowledge.py --only egtb --pieces 4
+
+Both files ship in app/assets; rerun after changing bitboard, the search or
+the evaluation, and commit the result. A --pieces 4 table is ~1.5 GB: point
+CK_EGTB_PATH at it instead of committing it.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from collections import deque
+from itertools import combinations, product
+from pathlib import Path
+
+
+def _positions(bb, max_pieces: int):
+    """Every legal Position with 1..max_pieces - 1 pieces of each colour."""
+    crown = {bb.RED: bb.PROMOTION_ROW[bb.RED], bb.BLUE: bb.PROMOTION_ROW[bb.BLUE]}
+    squares = range(32)
+    for n_red in range(1, max_pieces):
+        for n_blue in range(1, max_pieces - n_red + 1):
+            for red_sq in combinations(squares, n_red):
+                rest = [s for s in squares if s not in red_sq]
+                for blue_sq in combinations(rest, n_blue):
+                    for kinds in product((0, 1), repeat=n_red + n_blue):
+                        pos = [0, 0, 0, 0]
+                        ok = True
+                        for s, king, field in zip(red_sq + blue_sq, kinds, [0] * n_red + [2] * n_blue):
+                            bit = bb.BIT[s]
+                            color = bb.RED if field == 0 else bb.BLUE
+                            if not king and bit & crown[color]:
+                                ok = False
+                                break
+                            pos[field + king] |= bit
+                        if ok:
+                            yield bb.Position(*pos)
+
+
+def build_egtb(bb, knowledge, max_pieces: int) -> dict:
+    t0 = time.perf_counter()
+    # node id = rank of the position's key; arrays instead of dicts keep --pieces 4 in memory
+    enum_keys = array("Q")
+    for pos in _positions(bb, max_pieces):
+        enum_keys.append(bb.zobrist(pos, bb.RED))
+        enum_keys.append(bb.zobrist(pos, bb.BLUE))
+    keys = array("Q", sorted(enum_keys))
+    n = len(keys)
+    assert all(keys[i] != keys[i + 1] for i in range(n - 1)), "Zobrist collision"
+    node_of = array("i", (bisect_left(keys, k) for k in enum_keys))  # enumeration order -> node
+    del enum_keys
+
+    # children of every position (enumeration order, CSR); -1 = the last enemy piece was taken
+    offsets = array("i", [0])
+    children = array("i")
+    for pos in _positions(bb, max_pieces):
+        for color in (bb.RED, bb.BLUE):
+            men, kings, emen, ekings = bb.sides(pos, color)
+            for _fr, _to, _taken, (m2, k2, e2, ek2) in bb.side_turns(
+                    men, kings, emen, ekings, color, bb.side_steps(men, kings, emen, ekings, color), []):
+                children.append(bisect_left(keys, bb.zobrist_side(e2, ek2, m2, k2, -color)) if e2 | ek2 else -1)
+            offsets.append(len(children))
+    gen_sec = time.perf_counter() - t0
+
+    # predecessors (CSR by node) and the unresolved-children counter of each node
+    pred_off = array("i", bytes(4 * (n + 1)))
+    for c in children:
+        if c >= 0:
+            pred_off[c + 1] += 1
+    for i in range(n):
+        pred_off[i + 1] += pred_off[i]
+    preds = array("i", bytes(4 * pred_off[n]))
+    fill = array("i", pred_off)
+    left = array("i", bytes(4 * n))
+    value = bytearray(n)            # knowledge encoding; resolved[] tells a draw from unresolved
+    resolved = bytearray(n)
+    queue = deque()
+    for e in range(n):
+        p = node_of[e]
+        lo, hi = offsets[e], offsets[e + 1]
+        left[p] = hi - lo
+        if lo == hi:
+            value[p], resolved[p] = knowledge.LOSS, 1
+            queue.append(p)
+        for j in range(lo, hi):
+            c = children[j]
+            if c >= 0:
+                preds[fill[c]] = p
+                fill[c] += 1
+            elif not resolved[p]:
+                value[p], resolved[p] = 1, 1
+                queue.append(p)
+    del children, offsets, fill, node_of
+
+    while queue:
+        c = queue.popleft()
+        v = value[c]
+        lost = v >= knowledge.LOSS
+        dist = (v - knowledge.LOSS if lost else v) + 1
+        if dist > knowledge.MAX_DIST:
+            continue  # too long to encode: left as a draw
+        for j in range(pred_off[c], pred_off[c + 1]):
+            p = preds[j]
+            if resolved[p]:
+                continue
+            if lost:
+                value[p], resolved[p] = dist, 1
+                queue.append(p)
+            else:
+                left[p] -= 1
+                if not left[p]:
+                    value[p], resolved[p] = knowledge.LOSS + dist, 1
+                    queue.append(p)
+
+    wins = sum(1 for v in value if 0 < v < knowledge.LOSS)
+    losses = sum(1 for v in value if v >= knowledge.LOSS)
+    longest = max((v - knowledge.LOSS for v in value if v >= knowledge.LOSS), default=0)
+    return {
+        "items": zip(keys, value),
+        "positions": n,
+        "edges": pred_off[n],
+        "wins": wins,
+        "losses": losses,
+        "draws": n - wins - losses,
+        "longest_loss": longest,
+        "gen_sec": gen_sec,
+        "sec": time.perf_counter() - t0,
+    }
+
+
+def build_book(bb, S, plies: int, depth: int) -> dict:
+    t0 = time.perf_counter()
+    book = {}
+
+    def walk(side, color, ply, book_color):
+        if ply >= plies:
+            return
+        key = bb.zobrist_side(*side, color)
+        turns = bb.side_turns(*side, color, bb.side_steps(*side, color), [])
+        if not turns:
+            return
+        if color == book_color:
+            if key not in book:
+                res = S.search(side, color, S.SearchLimits(depth=depth))
+                m2, k2, e2, ek2 = res.side
+                book[key] = bb.zobrist_side(e2, ek2, m2, k2, -color)
+            target = book[key]
+            turns = [t for t in turns if bb.zobrist_side(t[3][2], t[3][3], t[3][0], t[3][1], -color) == target]
+        for _fr, _to, _taken, (m2, k2, e2, ek2) in turns:
+            walk((e2, ek2, m2, k2), -color, ply + 1, book_color)
+
+    for book_color in (bb.RED, bb.BLUE):
+        walk(bb.sides(bb.INITIAL, bb.RED), bb.RED, 0, book_color)
+    return {"items": book.items(), "positions": len(book), "sec": time.perf_counter() - t0}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pieces", type=int, default=3)
+    parser.add_argument("--book-plies", type=int, default=6)
+    parser.add_argument("--book-depth", type=int, default=8)
+    parser.add_argument("--only", choices=("book", "egtb"))
+    args = parser.parse_args()
+
+    root = Path(__file__).resolve().parents[1]
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+    from app import config
+    from app.checkers_game import bitboard as bb
+    from app.checkers_game import knowledge
+    from app.checkers_game import search as S
+
+    if args.only != "book":
+        res = build_egtb(bb, knowledge, args.pieces)
+        knowledge.write_table(config.CK_EGTB_PATH, knowledge.EGTB_MAGIC, res["items"], 1, args.pieces)
+        print(f"endgame table, <= {args.pieces} pieces: {res['positions']} positions, {res['edges']} turns "
+              f"({res['gen_sec']:.1f}s to generate), solved in {res['sec']:.1f}s")
+        print(f"  won {res['wins']}, lost {res['losses']}, drawn {res['draws']}; "
+              f"longest loss {res['longest_loss']} turns -> {config.CK_EGTB_PATH}")
+    if args.only != "egtb":
+        res = build_book(bb, S, args.book_plies, args.book_depth)
+        knowledge.write_table(config.CK_BOOK_PATH, knowledge.BOOK_MAGIC, res["items"], 8)
+        print(f"opening book, {args.book_plies} plies at depth {args.book_depth}: "
+              f"{res['positions']} positions in {res['sec']:.1f}s -> {config.CK_BOOK_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""Write app/assets/xo_tables.bin, the tic-tac-toe tables app.game_engine loads.
+
+Four byte tables of 3^9 entries each, indexed by game_engine.board_index():
+the winner, the first winning line, the "hard" move and the "normal" move.
+Rerun after changing the rules or the AI in game_engine._build_tables.
+
+    python scripts/gen_xo_tables.py
+"""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+
+def main() -> None:
+    root = Path(__file__).resolve().parents[1]
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+    from app import game_engine
+
+    blob = b"".join(game_engine._build_tables())
+    game_engine.TABLES_PATH.write_bytes(blob)
+    print(f"{game_engine.TABLES_PATH}: {len(blob)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Rebuild ratings and game counters from the games ledger.
+
+Streams the games table in order, replays every game the way
+record_game_result() applied it and compares the result with
+user_game_stats. Without --apply nothing is written; the script prints the
+number of rows that differ (and the first few), plus the games whose stored
+Elo before differs from the replayed one. With --apply the differing rows are
+overwritten in one transaction:
+
+    python scripts/replay_games.py
+    python scripts/replay_games.py --apply
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+
+def run(apply: bool, show: int) -> int:
+    root = Path(__file__).resolve().parents[1]
+    if str(root) not in sys.path:
+        sys.path.insert(0, str(root))
+    load_dotenv(root / ".env")
+
+    from app import db
+
+    t0 = time.perf_counter()
+    report = db.replay_game_ledger(apply=apply, max_mismatches=show)
+    took = time.perf_counter() - t0
+    print(f"DB={db.DB_PATH}")
+    print(f"replayed {report['games']} games into {report['rows']} (user, game) rows in {took:.2f}s")
+    print(f"games with Elo drift: {report['drift']}")
+    print(f"rows differing from user_game_stats: {report['mismatched']}")
+    cols = ", ".join(db._LEDGER_STATS)
+    for uid, game, got, want in report["mismatches"]:
+        print(f"  {uid} {game}: stored {got} replayed {want}  ({cols})")
+    if report["mismatched"]:
+        print("rows rewritten from the ledger" if apply else "run with --apply to rewrite them")
+    return 0 if apply or not report["mismatched"] else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--apply", action="store_true", help="overwrite the differing rows")
+    parser.add_argument("--show", type=int, default=20, help="differing rows to print")
+    args = parser.parse_args()
+    sys.exit(run(args.apply, args.show))